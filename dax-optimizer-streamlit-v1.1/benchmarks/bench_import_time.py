@@ -0,0 +1,130 @@
+"""
+Benchmark de tiempo de importación (arranque de CLI y de workers spawn)
+
+Cada caso se ejecuta en un intérprete nuevo y mide solo la sentencia de import
+(sin el arranque de Python). Además verifica que los casos livianos no carguen
+dependencias pesadas (multiprocessing, zipfile, pandas, plotly...).
+
+Uso:
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --repeat 10 --budget-scale 2 --output imports.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# (nombre, sentencia, presupuesto en ms, módulos que no deben cargarse)
+CASES = [
+    ('core', 'import core', 10.0,
+     ['core.dax_parser', 'multiprocessing', 'zipfile', 'pandas']),
+    ('core.parse_dax_code', 'from core import parse_dax_code', 40.0,
+     ['multiprocessing', 'zipfile', 'pandas', 'plotly', 'cProfile', 'pstats', 'tracemalloc']),
+    ('core.analyze_dax', 'from core import parse_dax_code, analyze_dax, generate_suggestions', 50.0,
+     ['multiprocessing', 'zipfile', 'pandas', 'plotly', 'cProfile', 'pstats', 'tracemalloc']),
+    ('worker (spawn)', 'import core.analysis_runner', 80.0,
+     ['zipfile', 'pandas', 'plotly', 'cProfile', 'pstats', 'tracemalloc', 'core.pbip_extractor']),
+    ('core.extract', 'from core import extract_measures_from_pbip', 80.0,
+     ['multiprocessing', 'pandas', 'plotly']),
+    ('cli', 'import cli', 30.0,
+     ['core.dax_parser', 'multiprocessing', 'pandas', 'plotly']),
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def measure_import(statement: str, repeat: int) -> Dict:
+    """
+    Importa en intérpretes nuevos y retorna el mínimo y la mediana
+
+    Returns:
+        {'min_ms', 'median_ms', 'modules'}
+    """
+    samples = []
+    modules: List[str] = []
+
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-c', _PROBE.format(statement=statement)],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=120
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Falló '{statement}':\n{result.stderr}")
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(data['seconds'] * 1000)
+        modules = data['modules']
+
+    return {
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'modules': modules
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de tiempo de importación")
+    parser.add_argument('--repeat', type=int, default=5, help="Intérpretes nuevos por caso")
+    parser.add_argument('--budget-scale', type=float, default=1.0,
+                        help="Multiplicador de los presupuestos (máquinas de CI lentas)")
+    parser.add_argument('--output', help="Archivo JSON con los resultados")
+    args = parser.parse_args(argv)
+
+    results = []
+    failures = []
+
+    print(f"{'caso':<22} {'mín ms':>9} {'mediana ms':>11} {'presup. ms':>11}  estado")
+    for name, statement, budget_ms, forbidden in CASES:
+        data = measure_import(statement, args.repeat)
+        budget = budget_ms * args.budget_scale
+        loaded_forbidden = [m for m in forbidden if m in data['modules']]
+
+        problems = []
+        if data['min_ms'] > budget:
+            problems.append(f"supera el presupuesto ({data['min_ms']:.1f} > {budget:.1f} ms)")
+        if loaded_forbidden:
+            problems.append(f"carga {', '.join(loaded_forbidden)}")
+
+        status = 'ok' if not problems else '⚠ ' + '; '.join(problems)
+        print(f"{name:<22} {data['min_ms']:>9.2f} {data['median_ms']:>11.2f} {budget:>11.1f}  {status}")
+
+        if problems:
+            failures.append(f"{name}: {'; '.join(problems)}")
+        results.append({
+            'case': name,
+            'statement': statement,
+            'min_ms': data['min_ms'],
+            'median_ms': data['median_ms'],
+            'budget_ms': budget,
+            'forbidden_loaded': loaded_forbidden,
+            'module_count': len(data['modules'])
+        })
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version, 'results': results}, f, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+    if failures:
+        print(f"\n{len(failures)} caso(s) fuera de presupuesto:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\nImportaciones dentro del presupuesto")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
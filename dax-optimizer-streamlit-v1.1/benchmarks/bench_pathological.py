@@ -0,0 +1,298 @@
+"""
+Benchmark de entradas patológicas (backtracking de regex y crecimiento superlineal)
+
+Genera expresiones DAX adversariales o muy largas (cadenas SWITCH de 100 KB,
+anidamiento profundo, corchetes y paréntesis desbalanceados, cientos de VAR) y
+mide cada función de dax_parser, dax_analyzer, dax_rewriter y pbip_extractor
+duplicando el tamaño de la entrada. Si el tiempo crece más rápido que lineal (exponente del
+ajuste log-log mayor al umbral) la función se marca.
+
+Uso:
+    python -m benchmarks.bench_pathological
+    python -m benchmarks.bench_pathological --max-bytes 200000 --output pathological.json
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import dax_parser, dax_analyzer, dax_rewriter, pbip_extractor
+from core.dax_parser import ParsedDaxExpression
+
+
+# ============================================
+# Generadores de entradas (tamaño aproximado en bytes)
+# ============================================
+
+def gen_switch_chain(size: int) -> str:
+    """SWITCH(TRUE(), [M0] > 0, "v0", ...) de ~size bytes"""
+    parts = []
+    total = 0
+    i = 0
+    while total < size:
+        part = f'[Medida {i}] > {i}, "v{i}"'
+        parts.append(part)
+        total += len(part) + 2
+        i += 1
+    return "SWITCH(TRUE(),\n" + ",\n".join(parts) + ",\nBLANK())"
+
+
+def gen_deep_nesting(size: int) -> str:
+    """CALCULATE(SUMX(T, CALCULATE(...))) anidado hasta ~size bytes"""
+    depth = max(1, size // 40)
+    return "CALCULATE(SUMX(Ventas, " * depth + "[Total]" + "), Ventas[Q] > 1)" * depth
+
+
+def gen_unclosed_calculate(size: int) -> str:
+    """CALCULATE( repetido sin cerrar ni FILTER (backtracking de [^)]*)"""
+    return "CALCULATE(" * max(1, size // 10)
+
+
+def gen_unbalanced_brackets(size: int) -> str:
+    """Corchetes sin cerrar mezclados con referencias Tabla[Columna]"""
+    return "Ventas[Monto] + [" * max(1, size // 17)
+
+
+def gen_many_variables(size: int) -> str:
+    """Cientos de VAR encadenadas (cada una usa la anterior)"""
+    count = max(1, size // 30)
+    lines = ["VAR v0 = SUM(Ventas[Monto])"]
+    lines += [f"VAR v{i} = v{i - 1} + {i}" for i in range(1, count)]
+    return "\n".join(lines) + f"\nRETURN v{count - 1}"
+
+
+def gen_many_measure_refs(size: int) -> str:
+    """Muchas referencias distintas a medidas, cada una repetida"""
+    count = max(1, size // 40)
+    return " + ".join(f"[M{i}] + [M{i}] + [M{i}]" for i in range(count))
+
+
+def gen_nested_iterators(size: int) -> str:
+    """SUMX( repetido: cada iterador externo busca todos los internos"""
+    return "SUMX(Ventas, " * max(1, size // 13) + "1"
+
+
+def gen_tmdl_no_blank_lines(size: int) -> str:
+    """Archivo TMDL sin líneas en blanco entre medidas (el lookahead nunca cierra)"""
+    lines = ["table Ventas"]
+    total = 0
+    i = 0
+    while total < size:
+        block = [f"\tmeasure 'M{i}' =", "\t\t\tSUM(Ventas[Monto])", "\t\tformatString: 0"]
+        lines.extend(block)
+        total += sum(len(b) + 1 for b in block)
+        i += 1
+    return "\n".join(lines) + "\n"
+
+
+def gen_tmdl_long_expression(size: int) -> str:
+    """Archivo TMDL con una única medida de ~size bytes"""
+    body = gen_switch_chain(size).split("\n")
+    return "table Ventas\n\n\tmeasure 'Grande' =\n" + "\n".join(f"\t\t\t{line}" for line in body) + "\n\n"
+
+
+GENERATORS: Dict[str, Callable[[int], str]] = {
+    'switch_chain': gen_switch_chain,
+    'deep_nesting': gen_deep_nesting,
+    'unclosed_calculate': gen_unclosed_calculate,
+    'unbalanced_brackets': gen_unbalanced_brackets,
+    'many_variables': gen_many_variables,
+    'many_measure_refs': gen_many_measure_refs,
+    'nested_iterators': gen_nested_iterators,
+}
+
+TMDL_GENERATORS: Dict[str, Callable[[int], str]] = {
+    'tmdl_no_blank_lines': gen_tmdl_no_blank_lines,
+    'tmdl_long_expression': gen_tmdl_long_expression,
+}
+
+
+# ============================================
+# Funciones objetivo
+# ============================================
+
+def _parser_targets() -> Dict[str, Callable[[str], object]]:
+    return {
+        'dax_parser.parse_dax_code': dax_parser.parse_dax_code,
+        'dax_parser.detect_object_type': dax_parser.detect_object_type,
+        'dax_parser.extract_name': lambda code: dax_parser.extract_name(code, 'measure'),
+        'dax_parser.extract_variables': dax_parser.extract_variables,
+        'dax_parser.extract_functions': dax_parser.extract_functions,
+        'dax_parser.extract_table_column_references': dax_parser.extract_table_column_references,
+        'dax_parser.extract_measure_references': dax_parser.extract_measure_references,
+        'dax_rewriter.rewrite_dax': lambda code: dax_rewriter.rewrite_dax(code, dax_rewriter.REWRITE_RULES),
+    }
+
+
+def prepare_parsed(code: str) -> ParsedDaxExpression:
+    """Construye la expresión parseada sin medir (preparación de las reglas)"""
+    return dax_parser.parse_dax_code(code)
+
+
+def time_call(func: Callable, arg, repeat: int = 3) -> float:
+    """Mejor tiempo de varias ejecuciones (reduce el ruido en mediciones cortas)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+        if best > 1.0:
+            break
+    return best
+
+
+def growth_exponent(points: List[Tuple[int, float]]) -> Optional[float]:
+    """
+    Exponente de crecimiento por mínimos cuadrados en escala log-log
+
+    1.0 = lineal, 2.0 = cuadrático. Ignora mediciones demasiado cortas para
+    ser confiables.
+    """
+    usable = [(n, t) for n, t in points if t >= 1e-3]
+    if len(usable) < 2:
+        return None
+
+    xs = [math.log(n) for n, _ in usable]
+    ys = [math.log(t) for _, t in usable]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    if denominator == 0:
+        return None
+
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator
+
+
+def run_case(target_name: str, func: Callable, gen_name: str, generator: Callable[[int], str],
+             sizes: List[int], max_seconds: float,
+             prepare: Optional[Callable[[str], object]] = None) -> Dict:
+    """
+    Mide una función sobre entradas de tamaño creciente
+
+    Se detiene al superar max_seconds en un tamaño (el caso queda marcado como
+    'budget_exceeded').
+    """
+    points = []
+    budget_exceeded = False
+
+    for size in sizes:
+        data = generator(size)
+        arg = prepare(data) if prepare else data
+        elapsed = time_call(func, arg)
+        points.append((len(data), elapsed))
+        if elapsed > max_seconds:
+            budget_exceeded = True
+            break
+
+    return {
+        'target': target_name,
+        'input': gen_name,
+        'points': [{'bytes': n, 'seconds': round(t, 6)} for n, t in points],
+        'exponent': growth_exponent(points),
+        'budget_exceeded': budget_exceeded
+    }
+
+
+def run_all(sizes: List[int], max_seconds: float, only: Optional[str] = None) -> List[Dict]:
+    """Ejecuta todos los casos (función x entrada)"""
+    results = []
+
+    def selected(name: str) -> bool:
+        return only is None or only in name
+
+    for target_name, func in _parser_targets().items():
+        for gen_name, generator in GENERATORS.items():
+            if selected(target_name):
+                results.append(run_case(target_name, func, gen_name, generator, sizes, max_seconds))
+
+    for rule in dax_analyzer.ANALYSIS_RULES:
+        target_name = f'dax_analyzer.{rule.__name__}'
+        if not selected(target_name):
+            continue
+        for gen_name, generator in GENERATORS.items():
+            results.append(run_case(
+                target_name, lambda parsed, rule=rule: rule(parsed, []),
+                gen_name, generator, sizes, max_seconds, prepare=prepare_parsed
+            ))
+
+    target_name = 'pbip_extractor.parse_single_tmdl_file'
+    if selected(target_name):
+        with tempfile.TemporaryDirectory(prefix='dax_patho_') as work_dir:
+            tmdl_path = os.path.join(work_dir, 'Ventas.tmdl')
+
+            def write_tmdl(content: str) -> str:
+                with open(tmdl_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                return tmdl_path
+
+            for gen_name, generator in TMDL_GENERATORS.items():
+                results.append(run_case(
+                    target_name, pbip_extractor.parse_single_tmdl_file,
+                    gen_name, generator, sizes, max_seconds, prepare=write_tmdl
+                ))
+
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de entradas patológicas")
+    parser.add_argument('--min-bytes', type=int, default=12_500)
+    parser.add_argument('--max-bytes', type=int, default=100_000)
+    parser.add_argument('--max-exponent', type=float, default=1.4,
+                        help="Exponente log-log a partir del cual se marca crecimiento superlineal")
+    parser.add_argument('--max-seconds', type=float, default=5.0,
+                        help="Tiempo máximo por medición; al superarlo se corta el caso y se marca")
+    parser.add_argument('--min-seconds', type=float, default=0.01,
+                        help="No marcar crecimiento si la medición más grande es más rápida que esto (ruido)")
+    parser.add_argument('--only', help="Filtrar funciones por nombre (substring)")
+    parser.add_argument('--output', help="Archivo JSON con los resultados")
+    args = parser.parse_args(argv)
+
+    sizes = []
+    size = args.min_bytes
+    while size <= args.max_bytes:
+        sizes.append(size)
+        size *= 2
+
+    results = run_all(sizes, args.max_seconds, args.only)
+    flagged = []
+
+    print(f"{'función':<48} {'entrada':<22} {'máx bytes':>10} {'máx seg':>9} {'exp':>6}")
+    for result in results:
+        last = result['points'][-1]
+        exponent = result['exponent']
+        is_superlinear = (
+            exponent is not None and exponent > args.max_exponent and last['seconds'] >= args.min_seconds
+        )
+        is_flagged = result['budget_exceeded'] or is_superlinear
+        result['flagged'] = is_flagged
+        if is_flagged:
+            flagged.append(result)
+
+        exponent_text = f"{exponent:.2f}" if exponent is not None else '-'
+        mark = '  ⚠ SUPERLINEAL' if is_flagged else ''
+        print(f"{result['target']:<48} {result['input']:<22} {last['bytes']:>10} {last['seconds']:>9.4f} {exponent_text:>6}{mark}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'sizes': sizes, 'max_exponent': args.max_exponent, 'results': results}, f, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+    if flagged:
+        print(f"\n{len(flagged)} caso(s) con crecimiento superlineal o fuera de presupuesto")
+        return 1
+
+    print("\nSin crecimiento superlineal")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Benchmark del pipeline completo sobre modelos PBIP sintéticos
+
+Mide tiempo, throughput y memoria pico de cada etapa (validación, extracción,
+parseo, análisis, sugerencias, expresiones compartidas, ranking y exportación)
+y guarda un baseline JSON que puede compararse entre commits.
+
+Uso:
+    python -m benchmarks.bench_pipeline --measures 1000 10000 --output baseline.json
+    python -m benchmarks.bench_pipeline --measures 1000 --compare baseline.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import (
+    validate_pbip_file,
+    get_pbip_info,
+    extract_measures_from_pbip,
+    parse_dax_code,
+    analyze_dax,
+    generate_suggestions,
+    calculate_score,
+    apply_shared_expressions,
+    rank_measures,
+    export_measures_to_csv,
+    export_measures_to_html,
+    CATALOG_VERSION
+)
+from benchmarks.synthetic_pbip import generate_measures, generate_pbip_project
+
+BASELINE_SCHEMA = 1
+
+
+def measure_stage(func: Callable, track_memory: bool) -> Tuple[object, float, Optional[float]]:
+    """
+    Ejecuta una etapa midiendo tiempo y, opcionalmente, memoria pico
+
+    La memoria se mide en una segunda ejecución bajo tracemalloc para que su
+    overhead no contamine el tiempo reportado.
+
+    Returns:
+        (resultado, segundos, memoria pico en MB o None)
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+
+    peak_mb = None
+    if track_memory:
+        gc.collect()
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = peak / (1024 * 1024)
+
+    return result, elapsed, peak_mb
+
+
+def run_pipeline(pbip_path: str, track_memory: bool = True) -> Dict[str, Dict]:
+    """
+    Ejecuta todas las etapas del pipeline sobre un proyecto y mide cada una
+
+    Args:
+        pbip_path: Ruta al archivo .pbip
+        track_memory: Medir memoria pico de cada etapa
+
+    Returns:
+        Diccionario etapa -> {'seconds', 'items', 'throughput_per_s', 'peak_mb'}
+    """
+    stages: Dict[str, Dict] = {}
+
+    def record(name: str, func: Callable, items: Optional[int] = None):
+        result, seconds, peak_mb = measure_stage(func, track_memory)
+        count = items if items is not None else (len(result) if hasattr(result, '__len__') else 1)
+        stages[name] = {
+            'seconds': round(seconds, 6),
+            'items': count,
+            'throughput_per_s': round(count / seconds, 2) if seconds > 0 else None,
+            'peak_mb': round(peak_mb, 3) if peak_mb is not None else None
+        }
+        return result
+
+    record('validate_pbip_file', lambda: validate_pbip_file(pbip_path), items=1)
+    record('get_pbip_info', lambda: get_pbip_info(pbip_path), items=1)
+    measures = record('extract_measures_from_pbip', lambda: extract_measures_from_pbip(pbip_path))
+    expressions = [m['expression'] for m in measures]
+    count = len(expressions)
+
+    parsed_list = record('parse_dax_code', lambda: [parse_dax_code(e) for e in expressions], items=count)
+    analyses = record('analyze_dax', lambda: [analyze_dax(p) for p in parsed_list], items=count)
+    suggestions = record(
+        'generate_suggestions',
+        lambda: [generate_suggestions(p, a[0]) for p, a in zip(parsed_list, analyses)],
+        items=count
+    )
+    scores = record(
+        'calculate_score',
+        lambda: [calculate_score(p, a[0]) for p, a in zip(parsed_list, analyses)],
+        items=count
+    )
+
+    analyzed_measures = [
+        {
+            'name': m['name'],
+            'table': m['table'],
+            'expression': m['expression'],
+            'issues': a[0],
+            'metrics': a[1],
+            'suggestions': s,
+            'base_score': score
+        }
+        for m, a, s, score in zip(measures, analyses, suggestions, scores)
+    ]
+    record('apply_shared_expressions', lambda: apply_shared_expressions(analyzed_measures), items=count)
+    ranked = record('rank_measures', lambda: rank_measures(analyzed_measures), items=count)
+
+    # Las exportaciones dependen de pandas (dependencia de la app)
+    for name, exporter in (('export_csv', export_measures_to_csv), ('export_html', export_measures_to_html)):
+        try:
+            record(name, lambda: exporter(ranked), items=count)
+        except ImportError as e:
+            stages[name] = {'skipped': str(e)}
+
+    return stages
+
+
+def get_git_commit() -> Optional[str]:
+    """Retorna el commit actual del repositorio (si está disponible)"""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).parent, capture_output=True, text=True, timeout=10
+        )
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare_with_baseline(results: Dict, baseline: Dict, threshold: float,
+                          min_seconds: float = 0.05) -> List[str]:
+    """
+    Compara resultados con un baseline y lista las regresiones
+
+    Args:
+        results: Resultados actuales
+        baseline: Baseline cargado desde JSON
+        threshold: Ratio máximo permitido (actual / baseline), por ejemplo 1.2
+        min_seconds: Etapas más rápidas que esto no se marcan (ruido de medición)
+
+    Returns:
+        Lista de mensajes de regresión (vacía si no hay)
+    """
+    regressions = []
+    baseline_runs = {run['key']: run for run in baseline.get('runs', [])}
+
+    for run in results['runs']:
+        previous = baseline_runs.get(run['key'])
+        if previous is None:
+            continue
+
+        for stage, data in run['stages'].items():
+            old = previous['stages'].get(stage, {})
+            if 'seconds' not in data or not old.get('seconds'):
+                continue
+
+            ratio = data['seconds'] / old['seconds']
+            is_regression = ratio > threshold and max(data['seconds'], old['seconds']) >= min_seconds
+            status = 'REGRESIÓN' if is_regression else 'ok'
+            print(f"  {run['key']:<40} {stage:<28} {old['seconds']:>10.4f}s -> {data['seconds']:>10.4f}s  x{ratio:5.2f}  {status}")
+            if is_regression:
+                regressions.append(f"{run['key']} / {stage}: x{ratio:.2f}")
+
+            old_peak, new_peak = old.get('peak_mb'), data.get('peak_mb')
+            if old_peak and new_peak and new_peak / old_peak > threshold:
+                regressions.append(f"{run['key']} / {stage} (memoria): x{new_peak / old_peak:.2f}")
+
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de DAX Optimizer")
+    parser.add_argument('--measures', type=int, nargs='+', default=[1000],
+                        help="Cantidades de medidas a generar (ej: 1000 10000 100000)")
+    parser.add_argument('--formats', nargs='+', default=['bim', 'tmdl'], choices=['bim', 'tmdl'])
+    parser.add_argument('--expression-length', type=int, default=200)
+    parser.add_argument('--nesting-depth', type=int, default=3)
+    parser.add_argument('--tables', type=int, default=20)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help="No medir memoria pico (más rápido)")
+    parser.add_argument('--output', help="Archivo JSON donde guardar el baseline")
+    parser.add_argument('--compare', help="Baseline JSON contra el cual comparar")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Ratio de tiempo a partir del cual se considera regresión")
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help="Ignorar regresiones en etapas más rápidas que este valor")
+    args = parser.parse_args(argv)
+
+    results = {
+        'schema': BASELINE_SCHEMA,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'git_commit': get_git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'catalog_version': CATALOG_VERSION,
+        'runs': []
+    }
+
+    with tempfile.TemporaryDirectory(prefix='dax_bench_') as work_dir:
+        for measure_count in args.measures:
+            measures_by_table = generate_measures(
+                measure_count, args.tables, args.expression_length,
+                args.nesting_depth, args.duplicate_ratio, args.seed
+            )
+
+            for model_format in args.formats:
+                key = f"{model_format}-{measure_count}-len{args.expression_length}-depth{args.nesting_depth}"
+                project_dir = os.path.join(work_dir, key)
+                pbip_path = generate_pbip_project(
+                    project_dir, model_format=model_format, measures_by_table=measures_by_table
+                )
+
+                print(f"\n▶ {key}")
+                stages = run_pipeline(pbip_path, track_memory=not args.no_memory)
+                for stage, data in stages.items():
+                    if 'skipped' in data:
+                        print(f"  {stage:<28} omitido ({data['skipped']})")
+                    else:
+                        peak = f"{data['peak_mb']:.1f} MB" if data['peak_mb'] is not None else '-'
+                        print(f"  {stage:<28} {data['seconds']:>10.4f}s  {data['throughput_per_s'] or 0:>12.1f}/s  {peak:>10}")
+
+                results['runs'].append({
+                    'key': key,
+                    'format': model_format,
+                    'measures': measure_count,
+                    'expression_length': args.expression_length,
+                    'nesting_depth': args.nesting_depth,
+                    'duplicate_ratio': args.duplicate_ratio,
+                    'stages': stages
+                })
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline guardado en {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nComparación con {args.compare} (commit {baseline.get('git_commit')}):")
+        regressions = compare_with_baseline(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"\n{len(regressions)} regresión(es) sobre x{args.threshold}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\nSin regresiones")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Generador de proyectos PBIP sintéticos para benchmarks
+Crea modelos en formato model.bim (JSON) o TMDL con N medidas configurables
+"""
+
+import json
+import os
+import random
+from typing import List, Dict, Optional
+
+
+# Plantillas de anidamiento: {inner} es la sub-expresión, {t}/{c} tabla y columna
+NESTING_TEMPLATES = [
+    "CALCULATE(\n{inner},\n{t}[{c}] > {n}\n)",
+    "SUMX(\n{t},\n{inner}\n)",
+    "IF(\n{inner} > {n},\n{inner_ref},\nBLANK()\n)",
+    "DIVIDE(\n{inner},\nSUM({t}[{c}])\n)",
+    "CALCULATE(\n{inner},\nFILTER(ALL({t}), {t}[{c}] = {n})\n)",
+    "AVERAGEX(\nVALUES({t}[{c}]),\n{inner}\n)",
+]
+
+LEAF_TEMPLATES = [
+    "SUM({t}[{c}])",
+    "COUNTROWS({t})",
+    "[{m}]",
+    "MAX({t}[{c}])",
+]
+
+COLUMNS = ['Amount', 'Quantity', 'Cost', 'Discount', 'Price', 'Key']
+
+
+def generate_expression(rng: random.Random, tables: List[str], measure_names: List[str],
+                        expression_length: int, nesting_depth: int) -> str:
+    """
+    Genera una expresión DAX sintética
+
+    Args:
+        rng: Generador aleatorio (determinista con semilla)
+        tables: Tablas disponibles para referencias Tabla[Columna]
+        measure_names: Medidas existentes que pueden referenciarse
+        expression_length: Longitud mínima aproximada en caracteres
+        nesting_depth: Niveles de funciones anidadas
+
+    Returns:
+        Código DAX
+    """
+    def leaf() -> str:
+        template = rng.choice(LEAF_TEMPLATES)
+        if template == "[{m}]" and not measure_names:
+            template = LEAF_TEMPLATES[0]
+        return template.format(
+            t=rng.choice(tables),
+            c=rng.choice(COLUMNS),
+            m=rng.choice(measure_names) if measure_names else ''
+        )
+
+    expression = leaf()
+    for _ in range(nesting_depth):
+        expression = rng.choice(NESTING_TEMPLATES).format(
+            inner=expression,
+            inner_ref=leaf(),
+            t=rng.choice(tables),
+            c=rng.choice(COLUMNS),
+            n=rng.randint(0, 1000)
+        )
+
+    # Rellenar hasta la longitud deseada con términos adicionales
+    while len(expression) < expression_length:
+        expression += "\n+ " + leaf()
+
+    return expression
+
+
+def generate_measures(measure_count: int, table_count: int = 20, expression_length: int = 200,
+                      nesting_depth: int = 3, duplicate_ratio: float = 0.0,
+                      seed: int = 42) -> Dict[str, List[Dict]]:
+    """
+    Genera medidas sintéticas agrupadas por tabla
+
+    Args:
+        measure_count: Número total de medidas
+        table_count: Número de tablas del modelo
+        expression_length: Longitud mínima aproximada de cada expresión
+        nesting_depth: Niveles de anidamiento de cada expresión
+        duplicate_ratio: Fracción de medidas que copian la expresión de otra (0-1)
+        seed: Semilla para resultados reproducibles
+
+    Returns:
+        Diccionario tabla -> lista de medidas {'name', 'expression'}
+    """
+    rng = random.Random(seed)
+    tables = [f"Table{i:03d}" for i in range(table_count)]
+    measures_by_table: Dict[str, List[Dict]] = {t: [] for t in tables}
+    names: List[str] = []
+    expressions: List[str] = []
+
+    for idx in range(measure_count):
+        name = f"Measure {idx:06d}"
+
+        if expressions and rng.random() < duplicate_ratio:
+            expression = rng.choice(expressions)
+        else:
+            expression = generate_expression(
+                rng, tables, names[-50:], expression_length, nesting_depth
+            )
+            expressions.append(expression)
+
+        measures_by_table[tables[idx % table_count]].append({
+            'name': name,
+            'expression': expression
+        })
+        names.append(name)
+
+    return measures_by_table
+
+
+def write_model_bim(definition_path: str, measures_by_table: Dict[str, List[Dict]]) -> None:
+    """Escribe el modelo en formato model.bim (JSON)"""
+    model = {
+        'name': 'SyntheticModel',
+        'compatibilityLevel': 1567,
+        'model': {
+            'culture': 'en-US',
+            'tables': [
+                {
+                    'name': table,
+                    'columns': [
+                        {'name': c, 'dataType': 'double', 'sourceColumn': c}
+                        for c in COLUMNS
+                    ],
+                    'measures': [
+                        {
+                            'name': m['name'],
+                            'expression': m['expression'],
+                            'formatString': '#,0'
+                        }
+                        for m in measures
+                    ]
+                }
+                for table, measures in measures_by_table.items()
+            ]
+        }
+    }
+
+    with open(os.path.join(definition_path, 'model.bim'), 'w', encoding='utf-8') as f:
+        json.dump(model, f, indent=2)
+
+
+def write_tmdl(definition_path: str, measures_by_table: Dict[str, List[Dict]]) -> None:
+    """Escribe el modelo en formato TMDL (un archivo por tabla)"""
+    tables_path = os.path.join(definition_path, 'tables')
+    os.makedirs(tables_path, exist_ok=True)
+
+    with open(os.path.join(definition_path, 'model.tmdl'), 'w', encoding='utf-8') as f:
+        f.write("model Model\n\tculture: en-US\n")
+
+    for table, measures in measures_by_table.items():
+        lines = [f"table {table}", ""]
+
+        for m in measures:
+            lines.append(f"\tmeasure '{m['name']}' =")
+            for expression_line in m['expression'].split('\n'):
+                lines.append(f"\t\t\t{expression_line}")
+            lines.append("")
+
+        for c in COLUMNS:
+            lines.append(f"\tcolumn {c}")
+            lines.append("\t\tdataType: double")
+            lines.append(f"\t\tsourceColumn: {c}")
+            lines.append("")
+
+        with open(os.path.join(tables_path, f"{table}.tmdl"), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+
+
+def generate_pbip_project(output_dir: str, name: str = 'Synthetic', model_format: str = 'tmdl',
+                          measure_count: int = 1000, table_count: int = 20,
+                          expression_length: int = 200, nesting_depth: int = 3,
+                          duplicate_ratio: float = 0.0, seed: int = 42,
+                          measures_by_table: Optional[Dict[str, List[Dict]]] = None) -> str:
+    """
+    Genera un proyecto PBIP sintético completo (.pbip + .SemanticModel)
+
+    Args:
+        output_dir: Carpeta donde se crea el proyecto
+        name: Nombre del proyecto
+        model_format: 'bim' o 'tmdl'
+        measure_count: Número total de medidas
+        table_count: Número de tablas
+        expression_length: Longitud mínima aproximada de cada expresión
+        nesting_depth: Niveles de anidamiento de cada expresión
+        duplicate_ratio: Fracción de medidas con expresión duplicada
+        seed: Semilla para resultados reproducibles
+        measures_by_table: Medidas ya generadas (para reutilizar entre formatos)
+
+    Returns:
+        Ruta al archivo .pbip generado
+    """
+    if model_format not in ('bim', 'tmdl'):
+        raise ValueError(f"Formato no soportado: {model_format}")
+
+    if measures_by_table is None:
+        measures_by_table = generate_measures(
+            measure_count, table_count, expression_length, nesting_depth, duplicate_ratio, seed
+        )
+
+    os.makedirs(output_dir, exist_ok=True)
+    pbip_path = os.path.join(output_dir, f"{name}.pbip")
+    definition_path = os.path.join(output_dir, f"{name}.SemanticModel", 'definition')
+    os.makedirs(definition_path, exist_ok=True)
+
+    with open(pbip_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': '1.0',
+            'artifacts': [{'report': {'path': f"{name}.Report"}}],
+            'settings': {'enableAutoRecovery': True}
+        }, f, indent=2)
+
+    if model_format == 'bim':
+        write_model_bim(definition_path, measures_by_table)
+    else:
+        write_tmdl(definition_path, measures_by_table)
+
+    return pbip_path
@@ -0,0 +1,403 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+DAX Optimizer - línea de comandos
+
+Uso:
+    python cli.py analyze "C:/ruta/Modelo.pbip"
+    python cli.py analyze Modelo.pbip --top 20 --format json --output resultado.json
+    python cli.py analyze Modelo.pbip --profile --trace-memory
+    python cli.py analyze Modelo.pbip --watch
+    python cli.py analyze Modelo.pbip --vpax Modelo.vpax
+    python cli.py analyze Modelo.pbip --performance-trace PowerBIPerformanceData.json
+    python cli.py analyze Modelo.pbip --server-timings timings/
+    python cli.py analyze Modelo.pbip --report-usage
+    python cli.py analyze Modelo.pbip --dead-measures --exclude-dead
+    python cli.py analyze Modelo.pbip --measures-only
+    python cli.py serve --port 8765
+"""
+
+import argparse
+import json
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import List, Dict, Optional
+
+# Agregar path del proyecto
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Solo constantes al importar: el pipeline se carga al ejecutar un comando (arranque rápido)
+from core.analysis_budget import DEFAULT_MEASURE_TIMEOUT, DEFAULT_MEMORY_LIMIT_MB
+
+# Sufijo del nombre en el reporte de texto para objetos que no son medidas
+OBJECT_TYPE_LABELS = {
+    'calculated-column': ' (columna calculada)',
+    'calculated-table': ' (tabla calculada)',
+    'column': ' (columna)',
+    'relationship': ' (relación)'
+}
+
+
+def measure_to_dict(measure) -> Dict:
+    """Representación JSON de una medida rankeada"""
+    return {
+        'name': measure.name,
+        'table': measure.table,
+        'object_type': measure.object_type,
+        'impact_score': measure.impact_score,
+        'priority': measure.priority_label,
+        'complexity': measure.complexity,
+        'critical_issues': measure.critical_issues,
+        'warnings': measure.warnings,
+        'estimated_rows': measure.estimated_rows,
+        'observed_ms': measure.observed_ms,
+        'observed_visual_ms': measure.observed_visual_ms,
+        'observed_queries': measure.observed_queries,
+        'server_timings': server_timings_to_dict(measure.server_timings),
+        'usage': usage_to_dict(measure),
+        'reachable': measure.reachable,
+        'issues': [
+            {'id': issue.id, 'severity': issue.severity, 'line': issue.line, 'title': issue.title}
+            for issue in measure.issues
+        ]
+    }
+
+
+def server_timings_to_dict(timings) -> Optional[Dict]:
+    """Representación JSON del desglose SE/FE de una medida (None si no hay server timings)"""
+    if timings is None:
+        return None
+    return {
+        'total_ms': round(timings.total_ms, 1),
+        'se_ms': round(timings.se_ms, 1),
+        'fe_ms': round(timings.fe_ms, 1),
+        'fe_ratio': round(timings.fe_ratio, 3),
+        'se_queries': timings.se_queries,
+        'callbacks': timings.callbacks,
+        'queries': timings.query_count
+    }
+
+
+def usage_to_dict(measure) -> Optional[Dict]:
+    """Representación JSON del uso de una medida en el reporte (None si no se analizó el reporte)"""
+    if measure.usage_weight is None:
+        return None
+    usage = measure.usage
+    return {
+        'visuals': usage.visual_count if usage is not None else 0,
+        'pages': list(usage.pages) if usage is not None else [],
+        'on_landing_page': usage.on_landing_page if usage is not None else False,
+        'weight': round(measure.usage_weight, 2),
+        'weighted_score': round(measure.weighted_score, 1)
+    }
+
+
+def print_dead_measures(reachability) -> None:
+    print(f"\nMedidas muertas (ningún visual las usa ni directa ni indirectamente): {len(reachability.unreachable)}")
+    for measure in reachability.unreachable:
+        print(f"  - {measure['table']} / {measure['name']}")
+
+
+def print_text_report(ranked_measures: List, failed_measures: List[Dict], top: int) -> None:
+    from core import get_summary_stats
+
+    stats = get_summary_stats(ranked_measures)
+    print(f"Medidas analizadas: {stats['total_measures']}")
+    if stats['calculated_objects']:
+        print(f"Columnas y tablas calculadas incluidas: {stats['calculated_objects']}")
+    if stats['model_objects']:
+        print(f"Columnas y relaciones con problemas de modelo: {stats['model_objects']}")
+    print(f"Score promedio: {stats['avg_score']:.1f}  |  Críticas: {stats['critical_measures']}  "
+          f"Altas: {stats['high_priority']}  Medias: {stats['medium_priority']}  Bajas: {stats['low_priority']}")
+
+    # Con una sesión del Performance Analyzer se agrega la columna de tiempo observado
+    observed = any(measure.observed_ms is not None for measure in ranked_measures)
+    observed_header = f"{'DAX ms':>9}  " if observed else ''
+    usage = any(measure.usage_weight is not None for measure in ranked_measures)
+    usage_header = f"{'Visuales':>8}  " if usage else ''
+
+    print(f"\n{'#':>4}  {'Score':>5}  {observed_header}{usage_header}{'Prioridad':<10} {'Tabla':<24} Medida")
+    for position, measure in enumerate(ranked_measures[:top], start=1):
+        observed_column = ''
+        if observed:
+            observed_column = f"{measure.observed_ms:>9.1f}  " if measure.observed_ms is not None else f"{'-':>9}  "
+        usage_column = ''
+        if usage:
+            usage_column = f"{measure.usage.visual_count if measure.usage is not None else 0:>8}  "
+        print(f"{position:>4}  {measure.impact_score:>5}  {observed_column}{usage_column}{measure.priority_label:<10} "
+              f"{measure.table[:24]:<24} {measure.name}{OBJECT_TYPE_LABELS.get(measure.object_type, '')}")
+
+    fe_bound = [m for m in ranked_measures if m.server_timings is not None and m.server_timings.is_fe_bound]
+    if fe_bound:
+        print("\nMedidas con planes dominados por el formula engine (server timings):")
+        for measure in sorted(fe_bound, key=lambda m: -m.server_timings.fe_ms)[:top]:
+            timings = measure.server_timings
+            print(f"  - {measure.name}: FE {timings.fe_ms:.0f} ms / SE {timings.se_ms:.0f} ms "
+                  f"({timings.fe_ratio:.0%} FE), {timings.se_queries} consultas SE, {timings.callbacks} callbacks")
+
+    if failed_measures:
+        print(f"\n⚠ {len(failed_measures)} medida(s) no se pudieron analizar:")
+        for failed in failed_measures:
+            print(f"  - {failed['table']} / {failed['name']}: {failed['error']}")
+
+
+def load_statistics(args):
+    """Estadísticas VertiPaq de --vpax (None si no se indicó); ValueError si el archivo no es válido"""
+    if not args.vpax:
+        return None
+    from core import load_vpax
+    try:
+        return load_vpax(args.vpax)
+    except OSError as e:
+        raise ValueError(f"No se pudo leer {args.vpax}: {e}")
+
+
+def load_trace(args):
+    """Sesión del Performance Analyzer de --performance-trace (None si no se indicó)"""
+    if not args.performance_trace:
+        return None
+    from core import load_performance_trace
+    try:
+        return load_performance_trace(args.performance_trace)
+    except OSError as e:
+        raise ValueError(f"No se pudo leer {args.performance_trace}: {e}")
+
+
+def load_timings(args):
+    """Server timings de --server-timings (None si no se indicó)"""
+    if not args.server_timings:
+        return None
+    from core import load_server_timings
+    timings = []
+    for path in args.server_timings:
+        try:
+            timings.extend(load_server_timings(path))
+        except OSError as e:
+            raise ValueError(f"No se pudo leer {path}: {e}")
+    return timings
+
+
+def load_usage(args):
+    """Uso de las medidas en el reporte con --report-usage (None si no se pidió o no hay .Report)"""
+    if not (args.report_usage or args.dead_measures or args.exclude_dead):
+        return None
+    from core import load_report_usage
+    usage = load_report_usage(args.path)
+    if usage is None:
+        print("Aviso: no se encontró la carpeta .Report; el ranking no se pondera por uso", file=sys.stderr)
+    return usage
+
+
+def command_analyze(args) -> int:
+    from core import trace_to, configure_tracing_from_env, OTLPJsonFileExporter
+
+    # Con --profile el análisis corre en el proceso actual para que cProfile lo vea
+    workers = args.workers if args.workers is not None else (0 if args.profile else None)
+    profiling = args.profile or args.trace_memory
+
+    run = run_watch if args.watch else run_analyze
+
+    if args.trace_file:
+        with trace_to(OTLPJsonFileExporter(args.trace_file)):
+            return run(args, workers, profiling)
+    configure_tracing_from_env()
+    return run(args, workers, profiling)
+
+
+def find_dead(args, report_usage):
+    """Medidas muertas para --dead-measures / --exclude-dead (None si no se pidió o no hay reporte)"""
+    if report_usage is None or not (args.dead_measures or args.exclude_dead):
+        return None
+    from core import extract_measures_from_pbip, find_dead_measures
+    return find_dead_measures(extract_measures_from_pbip(args.path, use_index=not args.no_index), report_usage)
+
+
+def run_analyze(args, workers: Optional[int], profiling: bool) -> int:
+    from core import analyze_pbip, get_summary_stats, instrumented, format_report
+
+    with instrumented(profile=args.profile, trace_memory=args.trace_memory) if profiling else nullcontext() as inst:
+        try:
+            report_usage = load_usage(args)
+            reachability = find_dead(args, report_usage)
+            ranked_measures, failed_measures = analyze_pbip(
+                args.path, timeout=args.timeout, memory_limit_mb=args.memory_limit, workers=workers,
+                use_index=not args.no_index, statistics=load_statistics(args),
+                performance_trace=load_trace(args), server_timings=load_timings(args),
+                report_usage=report_usage if args.report_usage else None,
+                reachability=reachability if args.exclude_dead else None,
+                include_calculated=not args.measures_only, model_rules=not args.measures_only
+            )
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+
+    report = inst.report(profile_top=args.profile_top) if inst is not None else None
+
+    if args.format == 'json':
+        output = {
+            'summary': get_summary_stats(ranked_measures),
+            'measures': [measure_to_dict(m) for m in ranked_measures[:args.top]],
+            'failed_measures': failed_measures
+        }
+        if reachability is not None:
+            output['dead_measures'] = [
+                {'name': measure['name'], 'table': measure['table']} for measure in reachability.unreachable
+            ]
+        if report is not None:
+            output['instrumentation'] = report
+        text = json.dumps(output, indent=2, ensure_ascii=False, default=str)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(text)
+        else:
+            print(text)
+    else:
+        print_text_report(ranked_measures, failed_measures, args.top)
+        if reachability is not None and args.dead_measures:
+            print_dead_measures(reachability)
+        if report is not None:
+            print("\n" + "=" * 60)
+            print("INSTRUMENTACIÓN")
+            print("=" * 60)
+            print(format_report(report))
+
+    return 0
+
+
+def run_watch(args, workers: Optional[int], profiling: bool) -> int:
+    """Analiza y vuelve a analizar cada vez que se guarda un archivo del modelo"""
+    from core import ModelWatcher, validate_pbip_file, get_summary_stats
+
+    if profiling:
+        print("Error: --watch no se puede combinar con --profile ni --trace-memory", file=sys.stderr)
+        return 2
+
+    is_valid, message = validate_pbip_file(args.path)
+    if not is_valid:
+        print(f"Error: {message}", file=sys.stderr)
+        return 2
+
+    try:
+        watcher = ModelWatcher(args.path, timeout=args.timeout, memory_limit_mb=args.memory_limit, workers=workers,
+                               statistics=load_statistics(args), performance_trace=load_trace(args),
+                               server_timings=load_timings(args),
+                               report_usage=load_usage(args) if args.report_usage else None,
+                               include_calculated=not args.measures_only,
+                               model_rules=not args.measures_only)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    def on_update(update) -> None:
+        if args.format == 'json':
+            # Una línea JSON por ciclo (para editores y otras herramientas)
+            print(json.dumps({
+                'cycle': update.cycle,
+                'changed_files': update.changed_files,
+                'analyzed_expressions': update.analyzed_expressions,
+                'seconds': round(update.seconds, 4),
+                'summary': get_summary_stats(update.ranked_measures),
+                'measures': [measure_to_dict(m) for m in update.ranked_measures[:args.top]],
+                'failed_measures': update.failed_measures
+            }, ensure_ascii=False, default=str), flush=True)
+            return
+
+        print("\n" + "=" * 60)
+        if update.changed_files:
+            print(f"[{time.strftime('%H:%M:%S')}] Cambios: {', '.join(update.changed_files)}")
+        print(f"[{time.strftime('%H:%M:%S')}] {update.analyzed_expressions} expresión(es) analizada(s) "
+              f"en {update.seconds:.2f} s")
+        print("=" * 60)
+        print_text_report(update.ranked_measures, update.failed_measures, args.top)
+        print(f"\nObservando {watcher.definition_path} (Ctrl+C para salir)", flush=True)
+
+    try:
+        watcher.run(on_update, interval=args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def command_serve(args) -> int:
+    """Servicio HTTP/JSON local con workers ya arrancados"""
+    from core.analysis_service import serve
+
+    def on_ready(server) -> None:
+        print(f"Servicio de análisis DAX en {server.url} ({server.service.workers} workers; Ctrl+C para salir)",
+              flush=True)
+
+    try:
+        serve(args.host, args.port, workers=args.workers, timeout=args.timeout,
+              memory_limit_mb=args.memory_limit, verbose=args.verbose, on_ready=on_ready)
+    except OSError as e:
+        print(f"Error: no se pudo abrir {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='dax-optimizer', description="DAX Optimizer - análisis de medidas PBIP")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    analyze = subparsers.add_parser('analyze', help="Analizar un archivo PBIP")
+    analyze.add_argument('path', help="Ruta al .pbip, carpeta .SemanticModel o ZIP")
+    analyze.add_argument('--top', type=int, default=20, help="Cantidad de medidas a listar")
+    analyze.add_argument('--format', choices=['text', 'json'], default='text')
+    analyze.add_argument('--output', help="Archivo de salida (solo --format json)")
+    analyze.add_argument('--timeout', type=float, default=DEFAULT_MEASURE_TIMEOUT,
+                         help="Segundos máximos de análisis por expresión")
+    analyze.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT_MB,
+                         help="Memoria máxima por worker en MB (Linux/macOS)")
+    analyze.add_argument('--workers', type=int, help="Procesos worker (0 = sin aislamiento)")
+    analyze.add_argument('--no-index', action='store_true',
+                         help="Releer todos los archivos del modelo sin usar el índice persistente")
+    analyze.add_argument('--vpax',
+                         help="Estadísticas VertiPaq Analyzer (.vpax) para ponderar el riesgo por filas reales")
+    analyze.add_argument('--performance-trace',
+                         help="Sesión exportada del Performance Analyzer (.json) para ordenar por tiempo observado")
+    analyze.add_argument('--server-timings', action='append',
+                         help="Server timings de DAX Studio (.json, .daxx o carpeta); se puede repetir")
+    analyze.add_argument('--report-usage', action='store_true',
+                         help="Ponderar el ranking por los visuales y páginas del .Report que usan cada medida")
+    analyze.add_argument('--dead-measures', action='store_true',
+                         help="Listar las medidas que ningún visual usa ni directa ni indirectamente")
+    analyze.add_argument('--exclude-dead', action='store_true',
+                         help="No analizar las medidas muertas (solo con carpeta .Report)")
+    analyze.add_argument('--measures-only', action='store_true',
+                         help="Analizar solo medidas (sin columnas ni tablas calculadas ni reglas del modelo)")
+    analyze.add_argument('--watch', action='store_true',
+                         help="Volver a analizar cada vez que cambia un .tmdl o model.bim")
+    analyze.add_argument('--interval', type=float, default=0.5,
+                         help="Segundos entre verificaciones de cambios (--watch)")
+    analyze.add_argument('--profile', action='store_true',
+                         help="Mostrar tiempos por etapa, contadores y perfil cProfile")
+    analyze.add_argument('--profile-top', type=int, default=25, help="Funciones a listar del perfil")
+    analyze.add_argument('--trace-memory', action='store_true', help="Medir memoria pico con tracemalloc")
+    analyze.add_argument('--trace-file',
+                         help="Agregar las trazas (spans OTLP-JSON) a este archivo; "
+                              "también se puede usar la variable DAX_OPTIMIZER_TRACE_FILE")
+    analyze.set_defaults(func=command_analyze)
+
+    serve = subparsers.add_parser('serve', help="Servicio HTTP/JSON local (parse, analyze, rank y batch NDJSON)")
+    serve.add_argument('--host', default='127.0.0.1', help="Interfaz (por defecto solo localhost)")
+    serve.add_argument('--port', type=int, default=8765, help="Puerto (0 = uno libre)")
+    serve.add_argument('--workers', type=int, help="Procesos worker (0 = sin aislamiento)")
+    serve.add_argument('--timeout', type=float, default=DEFAULT_MEASURE_TIMEOUT,
+                       help="Segundos máximos de análisis por expresión")
+    serve.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT_MB,
+                       help="Memoria máxima por worker en MB (Linux/macOS)")
+    serve.add_argument('--verbose', action='store_true', help="Registrar cada pedido")
+    serve.set_defaults(func=command_serve)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
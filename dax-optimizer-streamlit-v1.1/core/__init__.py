@@ -1,54 +1,385 @@
 """
 DAX Optimizer Core Module
 Análisis y optimización de código DAX
+
+Los submódulos se cargan al primer uso (PEP 562): `from core import parse_dax_code`
+solo importa el parser y sus dependencias, no multiprocessing, zipfile ni pandas.
 """
 
-from .dax_parser import parse_dax_code, ParsedDaxExpression
-from .dax_analyzer import analyze_dax, Issue, PerformanceMetrics
-from .dax_suggestions import generate_suggestions, calculate_score, Suggestion
-from .pbip_extractor import (
-    extract_measures_from_pbip,
-    parse_model_bim,
-    parse_tmdl_files,
-    validate_pbip_file,
-    get_pbip_info
-)
-from .measure_ranker import (
-    rank_measures,
-    calculate_impact_score,
-    get_priority_label,
-    get_priority_color,
-    get_summary_stats,
-    filter_measures_by_priority,
-    get_top_issues,
-    RankedMeasure
-)
-
-__all__ = [
-    # Parser
-    'parse_dax_code',
-    'ParsedDaxExpression',
-    # Analyzer
-    'analyze_dax',
-    'Issue',
-    'PerformanceMetrics',
-    # Suggestions
-    'generate_suggestions',
-    'calculate_score',
-    'Suggestion',
-    # PBIP Extractor
-    'extract_measures_from_pbip',
-    'parse_model_bim',
-    'parse_tmdl_files',
-    'validate_pbip_file',
-    'get_pbip_info',
-    # Measure Ranker
-    'rank_measures',
-    'calculate_impact_score',
-    'get_priority_label',
-    'get_priority_color',
-    'get_summary_stats',
-    'filter_measures_by_priority',
-    'get_top_issues',
-    'RankedMeasure'
-]
+import importlib
+from typing import TYPE_CHECKING
+
+# Submódulo que define cada nombre exportado
+_SUBMODULE_EXPORTS = {
+    'analysis_budget': (
+        'TimeBudget',
+        'AnalysisTimeoutError',
+        'DEFAULT_EXPRESSION_TIME_BUDGET',
+        'DEFAULT_MEASURE_TIMEOUT',
+        'DEFAULT_MEMORY_LIMIT_MB'
+    ),
+    'instrumentation': (
+        'Instrumentation',
+        'instrumented',
+        'format_report',
+        'STAGE_CATEGORIES'
+    ),
+    'tracing': (
+        'trace_to',
+        'enable_tracing',
+        'disable_tracing',
+        'configure_tracing_from_env',
+        'span',
+        'traced',
+        'current_span',
+        'InMemorySpanExporter',
+        'OTLPJsonFileExporter',
+        'TRACE_FILE_ENV'
+    ),
+    'analysis_runner': (
+        'analyze_pbip',
+        'analyze_measures',
+        'analyze_expression',
+        'AnalysisCache',
+        'WorkerPool'
+    ),
+    'analysis_service': (
+        'AnalysisService',
+        'AnalysisServer',
+        'serve'
+    ),
+    'dax_parser': (
+        'parse_dax_code',
+        'ParsedDaxExpression'
+    ),
+    'dax_analyzer': (
+        'analyze_dax',
+        'Issue',
+        'PerformanceMetrics'
+    ),
+    'batch': (
+        'parse_dax_batch',
+        'analyze_dax_batch',
+        'generate_suggestions_batch',
+        'calculate_score_batch',
+        'analyze_expressions_batch',
+        'iter_analyze_expressions'
+    ),
+    'dax_suggestions': (
+        'generate_suggestions',
+        'calculate_score',
+        'Suggestion',
+        'SuggestionTemplate'
+    ),
+    'pbip_extractor': (
+        'extract_measures_from_pbip',
+        'parse_model_bim',
+        'parse_tmdl_files',
+        'validate_pbip_file',
+        'get_pbip_info',
+        'get_model_name',
+        'find_report_path',
+        'is_measure',
+        'extract_model_from_pbip'
+    ),
+    'measure_ranker': (
+        'rank_measures',
+        'calculate_impact_score',
+        'get_priority_label',
+        'get_priority_color',
+        'get_summary_stats',
+        'filter_measures_by_priority',
+        'get_top_issues',
+        'RankedMeasure'
+    ),
+    'report_exporter': (
+        'export_measures_to_csv',
+        'export_measures_to_html'
+    ),
+    'rule_catalog': (
+        'CATALOG_VERSION',
+        'RULES',
+        'SUGGESTION_TEMPLATES',
+        'RuleDefinition',
+        'get_rule',
+        'get_text',
+        'set_language',
+        'get_language'
+    ),
+    'model_index': (
+        'load_measures_indexed',
+        'load_model_indexed',
+        'clear_model_index',
+        'get_cache_dir',
+        'IndexStats'
+    ),
+    'model_watcher': (
+        'ModelWatcher',
+        'WatchUpdate'
+    ),
+    'incremental': (
+        'AnalysisSession',
+        'TextEdit',
+        'Diagnostics'
+    ),
+    'dax_lexer': (
+        'tokenize',
+        'lex_line',
+        'Token'
+    ),
+    'measure_dedup': (
+        'normalize_expression',
+        'expression_hash',
+        'group_measures_by_expression',
+        'get_dedup_stats',
+        'ExpressionGroup'
+    ),
+    'vpax_importer': (
+        'load_vpax',
+        'parse_vpa_view',
+        'ModelStatistics',
+        'TableStatistics',
+        'ColumnStatistics'
+    ),
+    'performance_trace': (
+        'load_performance_trace',
+        'parse_performance_data',
+        'join_trace_to_measures',
+        'PerformanceTrace',
+        'QueryTiming',
+        'MeasureTiming'
+    ),
+    'server_timings': (
+        'load_server_timings',
+        'read_server_timings',
+        'parse_server_timings',
+        'join_server_timings_to_measures',
+        'ServerTiming',
+        'MeasureServerTiming'
+    ),
+    'report_usage': (
+        'load_report_usage',
+        'parse_report_usage',
+        'ReportUsage',
+        'MeasureUsage'
+    ),
+    'measure_graph': (
+        'find_dead_measures',
+        'build_dependency_graph',
+        'find_reachable',
+        'exclude_dead_measures',
+        'Reachability'
+    ),
+    'model_metadata': (
+        'build_model_metadata',
+        'ModelMetadata',
+        'TableInfo',
+        'ColumnInfo',
+        'RelationshipInfo'
+    ),
+    'model_analyzer': (
+        'analyze_model',
+        'ModelFinding',
+        'MODEL_RULES'
+    ),
+    'relationship_graph': (
+        'RelationshipGraph',
+        'RelationshipRewriteCache',
+        'LookupRewrite',
+        'build_relationship_graph',
+        'find_lookup_rewrites',
+        'rewrite_expression',
+        'apply_relationship_rewrites'
+    ),
+    'dax_ast': (
+        'parse_dax_ast',
+        'format_dax',
+        'DaxSyntaxError',
+        'Node',
+        'Call',
+        'Reference',
+        'walk',
+        'transform',
+        'SubtreeIndex'
+    ),
+    'dax_rewriter': (
+        'rewrite_dax',
+        'split_definition',
+        'repeated_subexpressions',
+        'REWRITE_RULES'
+    ),
+    'shared_expressions': (
+        'SharedExpression',
+        'SharedExpressionCache',
+        'find_shared_expressions',
+        'apply_shared_expressions'
+    )
+}
+
+_LAZY_ATTRIBUTES = {
+    name: module
+    for module, names in _SUBMODULE_EXPORTS.items()
+    for name in names
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value  # Las siguientes búsquedas no pasan por __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+# Para los analizadores estáticos y los IDE (no ejecutan __getattr__); deben
+# coincidir con _SUBMODULE_EXPORTS (tests/test_core_exports.py lo verifica)
+if TYPE_CHECKING:
+    from .analysis_budget import (
+        TimeBudget,
+        AnalysisTimeoutError,
+        DEFAULT_EXPRESSION_TIME_BUDGET,
+        DEFAULT_MEASURE_TIMEOUT,
+        DEFAULT_MEMORY_LIMIT_MB
+    )
+    from .instrumentation import (
+        Instrumentation,
+        instrumented,
+        format_report,
+        STAGE_CATEGORIES
+    )
+    from .tracing import (
+        trace_to,
+        enable_tracing,
+        disable_tracing,
+        configure_tracing_from_env,
+        span,
+        traced,
+        current_span,
+        InMemorySpanExporter,
+        OTLPJsonFileExporter,
+        TRACE_FILE_ENV
+    )
+    from .analysis_runner import analyze_pbip, analyze_measures, analyze_expression, AnalysisCache, WorkerPool
+    from .analysis_service import AnalysisService, AnalysisServer, serve
+    from .dax_parser import parse_dax_code, ParsedDaxExpression
+    from .dax_analyzer import analyze_dax, Issue, PerformanceMetrics
+    from .batch import (
+        parse_dax_batch,
+        analyze_dax_batch,
+        generate_suggestions_batch,
+        calculate_score_batch,
+        analyze_expressions_batch,
+        iter_analyze_expressions
+    )
+    from .dax_suggestions import (
+        generate_suggestions,
+        calculate_score,
+        Suggestion,
+        SuggestionTemplate
+    )
+    from .pbip_extractor import (
+        extract_measures_from_pbip,
+        parse_model_bim,
+        parse_tmdl_files,
+        validate_pbip_file,
+        get_pbip_info,
+        get_model_name,
+        find_report_path,
+        is_measure,
+        extract_model_from_pbip
+    )
+    from .measure_ranker import (
+        rank_measures,
+        calculate_impact_score,
+        get_priority_label,
+        get_priority_color,
+        get_summary_stats,
+        filter_measures_by_priority,
+        get_top_issues,
+        RankedMeasure
+    )
+    from .report_exporter import export_measures_to_csv, export_measures_to_html
+    from .rule_catalog import (
+        CATALOG_VERSION,
+        RULES,
+        SUGGESTION_TEMPLATES,
+        RuleDefinition,
+        get_rule,
+        get_text,
+        set_language,
+        get_language
+    )
+    from .model_index import load_measures_indexed, load_model_indexed, clear_model_index, get_cache_dir, IndexStats
+    from .model_watcher import ModelWatcher, WatchUpdate
+    from .incremental import AnalysisSession, TextEdit, Diagnostics
+    from .dax_lexer import tokenize, lex_line, Token
+    from .measure_dedup import (
+        normalize_expression,
+        expression_hash,
+        group_measures_by_expression,
+        get_dedup_stats,
+        ExpressionGroup
+    )
+    from .vpax_importer import load_vpax, parse_vpa_view, ModelStatistics, TableStatistics, ColumnStatistics
+    from .performance_trace import (
+        load_performance_trace,
+        parse_performance_data,
+        join_trace_to_measures,
+        PerformanceTrace,
+        QueryTiming,
+        MeasureTiming
+    )
+    from .server_timings import (
+        load_server_timings,
+        read_server_timings,
+        parse_server_timings,
+        join_server_timings_to_measures,
+        ServerTiming,
+        MeasureServerTiming
+    )
+    from .report_usage import load_report_usage, parse_report_usage, ReportUsage, MeasureUsage
+    from .measure_graph import (
+        find_dead_measures,
+        build_dependency_graph,
+        find_reachable,
+        exclude_dead_measures,
+        Reachability
+    )
+    from .model_metadata import build_model_metadata, ModelMetadata, TableInfo, ColumnInfo, RelationshipInfo
+    from .model_analyzer import analyze_model, ModelFinding, MODEL_RULES
+    from .relationship_graph import (
+        RelationshipGraph,
+        RelationshipRewriteCache,
+        LookupRewrite,
+        build_relationship_graph,
+        find_lookup_rewrites,
+        rewrite_expression,
+        apply_relationship_rewrites
+    )
+    from .dax_ast import (
+        parse_dax_ast,
+        format_dax,
+        DaxSyntaxError,
+        Node,
+        Call,
+        Reference,
+        walk,
+        transform,
+        SubtreeIndex
+    )
+    from .dax_rewriter import rewrite_dax, split_definition, repeated_subexpressions, REWRITE_RULES
+    from .shared_expressions import (
+        SharedExpression,
+        SharedExpressionCache,
+        find_shared_expressions,
+        apply_shared_expressions
+    )
+
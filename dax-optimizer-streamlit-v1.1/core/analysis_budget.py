@@ -0,0 +1,55 @@
+"""
+Presupuesto de tiempo por expresión DAX
+Evita que una sola medida patológica detenga el análisis de todo el modelo
+"""
+
+import time
+from typing import Optional
+
+
+# Tiempo máximo (segundos) para parsear y analizar una expresión
+DEFAULT_EXPRESSION_TIME_BUDGET = 10.0
+
+# Límites por medida de los workers de análisis (core.analysis_runner)
+DEFAULT_MEASURE_TIMEOUT = DEFAULT_EXPRESSION_TIME_BUDGET
+DEFAULT_MEMORY_LIMIT_MB = 1024
+
+
+class AnalysisTimeoutError(TimeoutError):
+    """La expresión superó su presupuesto de tiempo de análisis"""
+
+
+class TimeBudget:
+    """
+    Presupuesto de tiempo cooperativo
+
+    Se verifica entre etapas del parser y entre reglas del analizador: no
+    interrumpe una regex en curso, pero corta el resto del trabajo apenas se
+    supera el límite.
+    """
+
+    def __init__(self, seconds: Optional[float] = DEFAULT_EXPRESSION_TIME_BUDGET):
+        self.seconds = seconds
+        self.started = time.perf_counter()
+        self.deadline = self.started + seconds if seconds is not None else None
+
+    def elapsed(self) -> float:
+        """Segundos transcurridos desde la creación del presupuesto"""
+        return time.perf_counter() - self.started
+
+    def expired(self) -> bool:
+        """Indica si se superó el límite"""
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+    def check(self, stage: str = "") -> None:
+        """
+        Lanza AnalysisTimeoutError si se superó el límite
+
+        Args:
+            stage: Etapa en curso (se incluye en el mensaje de error)
+        """
+        if self.expired():
+            where = f" en {stage}" if stage else ""
+            raise AnalysisTimeoutError(
+                f"Tiempo de análisis excedido ({self.seconds:g} s){where}"
+            )
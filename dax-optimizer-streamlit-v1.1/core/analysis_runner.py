@@ -0,0 +1,714 @@
+"""
+Ejecución aislada del análisis de medidas
+Cada expresión se analiza en un proceso worker con límite de tiempo y memoria;
+un watchdog termina los workers que se exceden y los reemplaza, de modo que una
+medida patológica no bloquee el análisis del resto del modelo
+"""
+
+import os
+import time
+import hashlib
+import multiprocessing
+from collections import deque, OrderedDict
+from dataclasses import replace
+from contextlib import nullcontext
+from multiprocessing.connection import wait
+from typing import List, Dict, Optional, Callable, Tuple, TYPE_CHECKING
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:  # Windows
+    RESOURCE_AVAILABLE = False
+
+from .analysis_budget import (
+    TimeBudget,
+    AnalysisTimeoutError,
+    DEFAULT_MEASURE_TIMEOUT,
+    DEFAULT_MEMORY_LIMIT_MB
+)
+from .dax_parser import parse_dax_code
+from .dax_analyzer import Issue, analyze_dax, get_location, get_offset
+from .dax_suggestions import generate_suggestions, calculate_score
+from .measure_dedup import (
+    group_measures_by_expression,
+    get_dedup_stats,
+    significant_offsets,
+    map_offset,
+    ExpressionGroup
+)
+from . import instrumentation
+from . import tracing
+
+if TYPE_CHECKING:
+    from .measure_ranker import RankedMeasure
+    from .vpax_importer import ModelStatistics
+    from .performance_trace import PerformanceTrace
+    from .server_timings import ServerTiming
+    from .report_usage import ReportUsage
+    from .measure_graph import Reachability
+
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Expresiones por chunk en las trazas (un span 'analyze.chunk' por chunk)
+TRACE_CHUNK_SIZE = 250
+
+# Motivos de falla reportados en failed_measures
+FAILURE_ERROR = 'error'
+FAILURE_TIMEOUT = 'timeout'
+FAILURE_MEMORY = 'memory'
+FAILURE_CRASH = 'crash'
+
+# Expresiones guardadas por AnalysisCache antes de descartar las menos usadas
+DEFAULT_CACHE_ENTRIES = 50_000
+
+# spawn en todas las plataformas: evita heredar hilos de Streamlit con fork
+_START_METHOD = 'spawn'
+
+# Mensaje inicial del worker: el plazo de cada tarea no incluye el arranque del proceso
+_READY = 'ready'
+
+ProgressCallback = Callable[[int, int, str], None]
+ResultCallback = Callable[[int, str, object, Optional[Dict]], None]
+StartCallback = Callable[[int], None]
+
+
+def analyze_expression(expression: str, timeout: Optional[float] = DEFAULT_MEASURE_TIMEOUT,
+                       object_type: Optional[str] = None) -> Dict:
+    """
+    Parsea y analiza una expresión DAX completa
+
+    Args:
+        expression: Código DAX
+        timeout: Presupuesto de tiempo cooperativo en segundos (None = sin límite)
+        object_type: Tipo de objeto según los metadatos del modelo (None = deducirlo del código)
+
+    Returns:
+        Diccionario con 'issues', 'metrics', 'suggestions' y 'base_score'
+    """
+    budget = TimeBudget(timeout)
+    parsed = parse_dax_code(expression, budget=budget, object_type=object_type)
+    issues, metrics = analyze_dax(parsed, budget=budget)
+
+    return {
+        'issues': issues,
+        'metrics': metrics,
+        'suggestions': generate_suggestions(parsed, issues),
+        'base_score': calculate_score(parsed, issues)
+    }
+
+
+class AnalysisCache:
+    """
+    Resultados de análisis por expresión, reutilizables entre ejecuciones
+
+    La clave es el texto exacto de la expresión (no la normalizada de
+    measure_dedup): si solo cambia la indentación, las líneas de los issues
+    cambian y hay que reanalizar. También se guardan las fallas, para no
+    repetir un timeout en cada ciclo del modo watch. Con tipo de objeto, la
+    clave lo incluye (las reglas dependen de él).
+
+    Args:
+        max_entries: Máximo de expresiones guardadas (se descartan las menos usadas)
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, Tuple[str, object]]' = OrderedDict()
+
+    @staticmethod
+    def key(expression: str, object_type: Optional[str] = None) -> str:
+        if object_type is not None:
+            expression = f'{object_type}\n{expression}'
+        return hashlib.sha1(expression.encode('utf-8')).hexdigest()
+
+    def get(self, expression: str, object_type: Optional[str] = None) -> Optional[Tuple[str, object]]:
+        """(estado, resultado) guardado para la expresión, o None"""
+        key = self.key(expression, object_type)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, expression: str, status: str, payload: object, object_type: Optional[str] = None) -> None:
+        key = self.key(expression, object_type)
+        self._entries[key] = (status, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def apply_memory_limit(memory_limit_mb: Optional[int]) -> bool:
+    """
+    Limita la memoria virtual del proceso actual (solo POSIX)
+
+    Returns:
+        True si el límite se aplicó
+    """
+    if not memory_limit_mb or not RESOURCE_AVAILABLE:
+        return False
+
+    limit = memory_limit_mb * 1024 * 1024
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+        return True
+    except (ValueError, OSError):
+        return False
+
+
+def _worker_main(conn, timeout: Optional[float], memory_limit_mb: Optional[int]) -> None:
+    """
+    Bucle del proceso worker: recibe (task_id, expresión, tipo de objeto, medir etapas) y responde
+    (task_id, estado, resultado, estadísticas de instrumentación o None)
+    """
+    apply_memory_limit(memory_limit_mb)
+    conn.send(_READY)
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+
+        task_id, expression, object_type, collect_stats = task
+        with instrumentation.instrumented() if collect_stats else nullcontext() as stats:
+            try:
+                status, payload = 'ok', analyze_expression(expression, timeout, object_type)
+            except AnalysisTimeoutError as e:
+                status, payload = FAILURE_TIMEOUT, str(e)
+            except MemoryError:
+                status, payload = FAILURE_MEMORY, f"Límite de memoria excedido ({memory_limit_mb} MB)"
+            except Exception as e:
+                status, payload = FAILURE_ERROR, str(e)
+        snapshot = stats.snapshot() if stats is not None else None
+
+        try:
+            conn.send((task_id, status, payload, snapshot))
+        except MemoryError:
+            conn.send((task_id, FAILURE_MEMORY, f"Límite de memoria excedido ({memory_limit_mb} MB)", None))
+        except Exception as e:
+            conn.send((task_id, FAILURE_ERROR, f"Resultado no serializable: {e}", None))
+
+    conn.close()
+
+
+class _Worker:
+    """Proceso worker con su canal y la tarea en curso"""
+
+    def __init__(self, context, timeout: Optional[float], memory_limit_mb: Optional[int]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, timeout, memory_limit_mb), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.task_id: Optional[int] = None
+        self.deadline: Optional[float] = None
+
+    @property
+    def waiting(self) -> bool:
+        """Arrancando o procesando una tarea"""
+        return not self.ready or self.task_id is not None
+
+    def submit(self, task_id: int, expression: str, object_type: Optional[str],
+               timeout: Optional[float], collect_stats: bool) -> None:
+        self.task_id = task_id
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.conn.send((task_id, expression, object_type, collect_stats))
+
+    def release(self) -> None:
+        self.task_id = None
+        self.deadline = None
+
+    def kill(self) -> None:
+        self.process.terminate()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+def run_sequential(expressions: List[str], task_ids: List[int], timeout: Optional[float],
+                   on_start: StartCallback, on_result: ResultCallback,
+                   object_types: Optional[List[Optional[str]]] = None) -> None:
+    """
+    Analiza expressions[task_id] en el proceso actual (solo presupuesto cooperativo, sin aislamiento)
+
+    object_types: Tipo de objeto de cada expresión, alineado con expressions (None = deducirlo)
+    """
+    for task_id in task_ids:
+        on_start(task_id)
+        object_type = object_types[task_id] if object_types is not None else None
+        try:
+            on_result(task_id, 'ok', analyze_expression(expressions[task_id], timeout, object_type), None)
+        except AnalysisTimeoutError as e:
+            on_result(task_id, FAILURE_TIMEOUT, str(e), None)
+        except MemoryError:
+            on_result(task_id, FAILURE_MEMORY, "Memoria insuficiente", None)
+        except Exception as e:
+            on_result(task_id, FAILURE_ERROR, str(e), None)
+
+
+def _run_workers(groups: List[ExpressionGroup], task_ids: List[int], timeout: Optional[float],
+                 memory_limit_mb: Optional[int], workers: int,
+                 on_start: StartCallback, on_result: ResultCallback) -> None:
+    """Analiza en procesos worker temporales (se detienen al terminar)"""
+    with WorkerPool(workers, timeout, memory_limit_mb) as pool:
+        pool.run([group.expression for group in groups], task_ids, on_start, on_result,
+                 [group.object_type for group in groups])
+
+
+class WorkerPool:
+    """
+    Procesos worker reutilizables entre análisis, con watchdog de tiempo
+
+    Los procesos arrancan una vez (spawn + imports) y quedan esperando tareas;
+    un servicio de larga duración (analysis_service) evita así pagar el
+    arranque en cada pedido. Un worker que excede su plazo o muere se
+    reemplaza por uno nuevo.
+
+    Args:
+        workers: Cantidad de procesos
+        timeout: Segundos máximos por expresión (None = sin límite)
+        memory_limit_mb: Memoria máxima por worker en MB (solo POSIX; None = sin límite)
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS,
+                 timeout: Optional[float] = DEFAULT_MEASURE_TIMEOUT,
+                 memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB):
+        self.size = max(1, workers)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._context = multiprocessing.get_context(_START_METHOD)
+        self._workers: List[_Worker] = []
+
+    def __enter__(self) -> 'WorkerPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    def start(self, wait_ready: bool = False) -> None:
+        """
+        Arranca los procesos que falten
+
+        Args:
+            wait_ready: Esperar a que todos terminen de importar el análisis
+        """
+        while len(self._workers) < self.size:
+            self._workers.append(_Worker(self._context, self.timeout, self.memory_limit_mb))
+
+        if wait_ready:
+            for worker in self._workers:
+                if not worker.ready:
+                    try:
+                        message = worker.conn.recv()
+                    except (EOFError, OSError):
+                        message = None
+                    if message != _READY:
+                        raise RuntimeError(
+                            f"No se pudo iniciar el proceso de análisis (código {worker.process.exitcode})"
+                        )
+                    worker.ready = True
+
+    def close(self) -> None:
+        """Detiene los procesos (los que están analizando se terminan)"""
+        for worker in self._workers:
+            if worker.task_id is None:
+                worker.stop()
+            else:
+                worker.kill()
+        self._workers = []
+
+    def run(self, expressions: List[str], task_ids: List[int],
+            on_start: StartCallback, on_result: ResultCallback,
+            object_types: Optional[List[Optional[str]]] = None) -> None:
+        """
+        Analiza expressions[task_id] para cada task_id, repartiendo entre los workers
+
+        object_types, alineado con expressions, indica el tipo de objeto de cada
+        una (None = deducirlo del código).
+
+        Si se interrumpe (excepción en un callback, KeyboardInterrupt) el pool se
+        cierra; el siguiente run() arranca procesos nuevos.
+        """
+        self.start()
+        pool = self._workers
+        timeout = self.timeout
+        collect_stats = instrumentation.is_enabled()
+        pending = deque(task_ids)
+
+        try:
+            while pending or any(w.task_id is not None for w in pool):
+                # Asignar tareas a los workers listos y libres
+                for worker in pool:
+                    if worker.ready and worker.task_id is None and pending:
+                        task_id = pending.popleft()
+                        on_start(task_id)
+                        object_type = object_types[task_id] if object_types is not None else None
+                        worker.submit(task_id, expressions[task_id], object_type, timeout, collect_stats)
+
+                waiting = [w for w in pool if w.waiting]
+                deadlines = [w.deadline for w in waiting if w.deadline is not None]
+                wait_timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+                ready = wait([w.conn for w in waiting], timeout=wait_timeout)
+
+                for index, worker in enumerate(pool):
+                    if not worker.waiting:
+                        continue
+
+                    if worker.conn in ready:
+                        try:
+                            message = worker.conn.recv()
+                            if message == _READY:
+                                worker.ready = True
+                                continue
+                            task_id, status, payload, stats = message
+                            worker.release()
+                            on_result(task_id, status, payload, stats)
+                            continue
+                        except (EOFError, OSError):
+                            if worker.task_id is None:
+                                raise RuntimeError(
+                                    f"No se pudo iniciar el proceso de análisis (código {worker.process.exitcode})"
+                                )
+                            # El proceso murió (p. ej. terminado por el sistema al exceder memoria)
+                            status = FAILURE_CRASH
+                            payload = f"El proceso de análisis terminó inesperadamente (código {worker.process.exitcode})"
+                    elif worker.deadline is not None and time.monotonic() >= worker.deadline:
+                        status = FAILURE_TIMEOUT
+                        payload = f"Tiempo de análisis excedido ({timeout:g} s)"
+                    else:
+                        continue
+
+                    # Watchdog: descartar el worker y reemplazarlo
+                    task_id = worker.task_id
+                    worker.kill()
+                    pool[index] = _Worker(self._context, timeout, self.memory_limit_mb)
+                    on_result(task_id, status, payload, None)
+        except BaseException:
+            self.close()
+            raise
+
+
+class _ChunkSpans:
+    """Un span por cada chunk de expresiones: abre con la primera tarea y cierra con la última"""
+
+    def __init__(self, groups: List[ExpressionGroup], task_ids: List[int], chunk_size: int = TRACE_CHUNK_SIZE):
+        self.groups = groups
+        self.chunk_size = chunk_size
+        self.spans: Dict[int, object] = {}
+        self.remaining: Dict[int, int] = {}
+        # Tareas a analizar por chunk (las que salen de la caché no abren ni cierran chunks)
+        self.chunk_tasks: Dict[int, List[int]] = {}
+        for task_id in task_ids:
+            self.chunk_tasks.setdefault(task_id // chunk_size, []).append(task_id)
+
+    def start(self, task_id: int) -> None:
+        chunk = task_id // self.chunk_size
+        if chunk in self.spans:
+            return
+        chunk_groups = [self.groups[t] for t in self.chunk_tasks[chunk]]
+        self.remaining[chunk] = len(chunk_groups)
+        self.spans[chunk] = tracing.start_span('analyze.chunk', {
+            'dax.chunk.index': chunk,
+            'dax.chunk.expressions': len(chunk_groups),
+            'dax.chunk.measures': sum(len(g.measures) for g in chunk_groups),
+            'dax.chunk.failed': 0
+        })
+
+    def finish(self, task_id: int, status: str) -> None:
+        chunk = task_id // self.chunk_size
+        chunk_span = self.spans[chunk]
+        if status != 'ok':
+            chunk_span.attributes['dax.chunk.failed'] += 1
+        self.remaining[chunk] -= 1
+        if self.remaining[chunk] == 0:
+            chunk_span.end()
+
+
+def relocate_issues(issues: List[Issue], source: str, target: str) -> List[Issue]:
+    """
+    Issues de una expresión ubicados en otra con la misma normalización (measure_dedup)
+
+    Las copias de un grupo pueden diferir en espacios y saltos de línea: la
+    línea y columna de cada issue se trasladan al mismo token de la copia.
+    Los issues sin ubicación (línea 0) no cambian.
+    """
+    if not any(issue.line for issue in issues):
+        return issues
+
+    source_offsets = significant_offsets(source)
+    target_offsets = significant_offsets(target)
+    relocated = []
+    for issue in issues:
+        if issue.line:
+            offset = map_offset(source_offsets, target_offsets, get_offset(source, issue.line, issue.column),
+                                len(target))
+            line, column = get_location(target, offset)
+            issue = replace(issue, line=line, column=column)
+        relocated.append(issue)
+    return relocated
+
+
+@tracing.traced('analyze')
+def analyze_measures(measures: List[Dict],
+                     timeout: Optional[float] = DEFAULT_MEASURE_TIMEOUT,
+                     memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+                     workers: Optional[int] = None,
+                     progress_callback: Optional[ProgressCallback] = None,
+                     cache: Optional[AnalysisCache] = None,
+                     pool: Optional[WorkerPool] = None,
+                     dedup_stats: Optional[Dict] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Analiza todas las medidas con límite de tiempo y memoria por expresión
+
+    Las medidas con la misma expresión (y tipo de objeto) se analizan una sola vez. Las que fallan
+    o exceden sus límites se incluyen con score neutral y se listan en
+    failed_measures con el motivo ('error', 'timeout', 'memory' o 'crash').
+    Con una AnalysisCache solo se analizan las expresiones que no estaban en ella.
+
+    Args:
+        measures: Lista de medidas {'name', 'table', 'expression'} y opcionalmente
+            'object_type' (columnas y tablas calculadas; sin él se deduce del código)
+        timeout: Segundos máximos por expresión (None = sin límite)
+        memory_limit_mb: Memoria máxima por worker en MB (solo POSIX; None = sin límite)
+        workers: Procesos worker (0 = analizar en el proceso actual, sin aislamiento)
+        progress_callback: Función (completadas, total, nombre de medida) llamada por expresión
+        cache: Resultados de ejecuciones anteriores (se actualiza con los nuevos)
+        pool: Workers ya arrancados a reutilizar (ignora timeout, memory_limit_mb y workers)
+        dedup_stats: Diccionario que se completa con las estadísticas de los grupos
+            (measure_dedup.get_dedup_stats), para no volver a agrupar las medidas
+
+    Returns:
+        Tupla (analyzed_measures, failed_measures)
+    """
+    groups = group_measures_by_expression(measures)
+    group_stats = get_dedup_stats(groups)
+    if dedup_stats is not None:
+        dedup_stats.update(group_stats)
+
+    analyzed_measures: List[Dict] = []
+    failed_measures: List[Dict] = []
+    results: Dict[int, Tuple[str, object]] = {}
+
+    if cache is not None:
+        hits_before, misses_before = cache.hits, cache.misses
+        for task_id, group in enumerate(groups):
+            cached = cache.get(group.expression, group.object_type)
+            if cached is not None:
+                results[task_id] = cached
+        instrumentation.count('analysis_cache_hits', len(results))
+    task_ids = [task_id for task_id in range(len(groups)) if task_id not in results]
+
+    if pool is not None:
+        workers = pool.size
+    elif workers is None:
+        workers = DEFAULT_WORKERS
+    workers = min(workers, len(task_ids))
+
+    chunk_spans = _ChunkSpans(groups, task_ids) if tracing.is_tracing() else None
+
+    def on_start(task_id: int) -> None:
+        if chunk_spans is not None:
+            chunk_spans.start(task_id)
+
+    def on_result(task_id: int, status: str, payload: object, stats: Optional[Dict]) -> None:
+        results[task_id] = (status, payload)
+        if cache is not None:
+            cache.put(groups[task_id].expression, status, payload, groups[task_id].object_type)
+        if chunk_spans is not None:
+            chunk_spans.finish(task_id, status)
+        active = instrumentation.get_active()
+        if active is not None:
+            if stats:
+                active.merge(stats)
+            active.count(f'analysis_{status}')
+        if progress_callback:
+            progress_callback(len(results), len(groups), groups[task_id].measures[0]['name'])
+
+    expressions = [group.expression for group in groups]
+    object_types = [group.object_type for group in groups]
+    if pool is not None:
+        if task_ids:
+            pool.run(expressions, task_ids, on_start, on_result, object_types)
+    elif workers > 0:
+        _run_workers(groups, task_ids, timeout, memory_limit_mb, workers, on_start, on_result)
+    else:
+        run_sequential(expressions, task_ids, timeout, on_start, on_result, object_types)
+
+    # Repartir el resultado de cada grupo a sus medidas (orden original de los grupos)
+    for task_id, group in enumerate(groups):
+        status, payload = results[task_id]
+        if status == 'ok':
+            result = payload
+        else:
+            result = {'issues': [], 'metrics': None, 'suggestions': [], 'base_score': 100}
+
+        for measure in group.measures:
+            if status != 'ok':
+                failed_measures.append({
+                    'name': measure['name'],
+                    'table': measure['table'],
+                    'error': payload,
+                    'reason': status
+                })
+
+            issues = result['issues']
+            if measure['expression'] != group.expression:
+                issues = relocate_issues(issues, group.expression, measure['expression'])
+
+            analyzed_measures.append({
+                'name': measure['name'],
+                'table': measure['table'],
+                'expression': measure['expression'],
+                'object_type': measure.get('object_type', 'measure'),
+                'issues': issues,
+                'metrics': result['metrics'],
+                'suggestions': result['suggestions'],
+                'base_score': result['base_score']
+            })
+
+    attributes = {
+        'dax.measure_count': group_stats['total_measures'],
+        'dax.unique_expressions': group_stats['unique_expressions'],
+        'dax.duplicate_ratio': round(group_stats['duplicated_measures'] / group_stats['total_measures'], 4)
+        if group_stats['total_measures'] else 0.0,
+        'dax.failed_count': len(failed_measures),
+        'dax.workers': workers,
+        'dax.analyzed_expressions': len(task_ids)
+    }
+    if cache is not None:
+        # Consultas a la caché de esta ejecución (los contadores son acumulados)
+        hits, misses = cache.hits - hits_before, cache.misses - misses_before
+        attributes['dax.cache_hit_rate'] = round(hits / (hits + misses), 4) if hits + misses else 0.0
+    tracing.current_span().set_attributes(attributes)
+
+    return analyzed_measures, failed_measures
+
+
+def analyze_pbip(file_path: str,
+                 timeout: Optional[float] = DEFAULT_MEASURE_TIMEOUT,
+                 memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+                 workers: Optional[int] = None,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 use_index: bool = False,
+                 statistics: Optional['ModelStatistics'] = None,
+                 performance_trace: Optional['PerformanceTrace'] = None,
+                 server_timings: Optional[List['ServerTiming']] = None,
+                 report_usage: Optional['ReportUsage'] = None,
+                 reachability: Optional['Reachability'] = None,
+                 include_calculated: bool = True,
+                 model_rules: bool = True) -> Tuple[List['RankedMeasure'], List[Dict]]:
+    """
+    Pipeline completo sin interfaz: extrae, analiza y rankea las medidas de un PBIP
+
+    Las columnas y tablas calculadas se analizan con su tipo de objeto y se
+    rankean junto con las medidas, igual que los hallazgos de las reglas del
+    modelo (model_analyzer) sobre los metadatos leídos en la misma extracción.
+
+    Args:
+        file_path: Ruta al archivo .pbip, carpeta .SemanticModel o ZIP
+        timeout: Segundos máximos por expresión
+        memory_limit_mb: Memoria máxima por worker en MB
+        workers: Procesos worker (0 = en el proceso actual)
+        progress_callback: Función (completadas, total, nombre de medida)
+        use_index: Reutilizar el índice persistente del modelo (solo relee archivos modificados)
+        statistics: Estadísticas VertiPaq (vpax_importer.load_vpax) para ponderar el ranking
+        performance_trace: Sesión del Performance Analyzer (performance_trace.load_performance_trace)
+            para ordenar por tiempo observado
+        server_timings: Server timings de DAX Studio (server_timings.load_server_timings) con el
+            desglose SE/FE de cada medida
+        report_usage: Uso de las medidas en el reporte (report_usage.load_report_usage) para
+            ponderar el ranking por exposición
+        reachability: Si se indica, solo se analizan las medidas alcanzables desde el reporte
+            (measure_graph.find_dead_measures); las muertas no se analizan ni se rankean
+        include_calculated: Incluir columnas y tablas calculadas (False = solo medidas)
+        model_rules: Incluir las reglas del modelo (relaciones, columnas, Fecha/hora automática)
+
+    Returns:
+        Tupla (medidas rankeadas, failed_measures)
+
+    Raises:
+        ValueError: Si el archivo no es un PBIP válido
+    """
+    # Extracción y ranking solo se cargan aquí: los workers importan este módulo al arrancar
+    from .pbip_extractor import extract_model_from_pbip, validate_pbip_file, get_model_name
+    from .measure_ranker import rank_measures
+
+    with tracing.span('analyze_pbip', {'dax.model.name': get_model_name(file_path)}) as root:
+        is_valid, message = validate_pbip_file(file_path)
+        if not is_valid:
+            raise ValueError(message)
+
+        measures, metadata = extract_model_from_pbip(file_path, use_index=use_index,
+                                                     include_calculated=include_calculated)
+        if reachability is not None:
+            from .measure_graph import exclude_dead_measures
+            measures = exclude_dead_measures(measures, reachability)
+            root.set_attribute('dax.excluded_measures', len(reachability.unreachable))
+        analyzed_measures, failed_measures = analyze_measures(
+            measures, timeout, memory_limit_mb, workers, progress_callback
+        )
+        root.set_attributes({'dax.measure_count': len(measures), 'dax.failed_count': len(failed_measures)})
+
+        from .relationship_graph import apply_relationship_rewrites
+        root.set_attribute('dax.relationship_rewrites', apply_relationship_rewrites(analyzed_measures, metadata))
+
+        from .shared_expressions import apply_shared_expressions
+        root.set_attribute('dax.shared_expressions', apply_shared_expressions(analyzed_measures))
+
+        if model_rules:
+            from .model_analyzer import analyze_model
+            model_findings = analyze_model(metadata, statistics)
+            analyzed_measures.extend(model_findings)
+            root.set_attribute('dax.model_findings', len(model_findings))
+
+        observed = None
+        if performance_trace is not None:
+            from .performance_trace import join_trace_to_measures
+            observed = join_trace_to_measures(performance_trace, measures)
+
+        measure_timings = None
+        if server_timings:
+            from .server_timings import join_server_timings_to_measures
+            measure_timings = join_server_timings_to_measures(server_timings, measures)
+
+        return rank_measures(analyzed_measures, statistics, observed, measure_timings, report_usage), failed_measures
@@ -0,0 +1,543 @@
+"""
+Servicio HTTP/JSON local de análisis DAX
+Mantiene un pool de workers ya arrancados y la caché de análisis entre
+pedidos, para que otras herramientas (scripts de Tabular Editor, tareas de
+VS Code, CI) no paguen el arranque de Python y los imports en cada llamada.
+Solo usa la biblioteca estándar (http.server).
+
+Endpoints:
+    GET  /health           Estado del servicio
+    POST /parse            {"expression": "..."} -> expresión parseada
+    POST /parse/batch      {"expressions": [...]} -> NDJSON, una línea por expresión
+    POST /analyze          {"expression": "..."} -> issues, métricas, sugerencias y score
+    POST /analyze/batch    {"expressions": [...]} -> NDJSON a medida que terminan
+    POST /rank             {"measures": [{"name", "table", "expression"}], "top": 20} -> ranking
+
+En los endpoints batch cada elemento puede ser un texto o {"id": ..., "expression": "..."};
+cada línea de la respuesta lleva el índice (y el id) del elemento, y la última
+línea es {"summary": {...}}.
+"""
+
+import json
+import time
+import threading
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional, Callable, Tuple, Any
+
+from .analysis_budget import (
+    TimeBudget,
+    AnalysisTimeoutError,
+    DEFAULT_MEASURE_TIMEOUT,
+    DEFAULT_MEMORY_LIMIT_MB
+)
+from .analysis_runner import (
+    DEFAULT_WORKERS,
+    DEFAULT_CACHE_ENTRIES,
+    AnalysisCache,
+    WorkerPool,
+    analyze_measures,
+    run_sequential
+)
+from .dax_parser import parse_dax_code, ParsedDaxExpression
+from .measure_ranker import rank_measures, get_summary_stats, RankedMeasure
+from . import tracing
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Tamaño máximo del cuerpo de un pedido (miles de expresiones entran holgadas)
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+# (índice, estado, resultado serializado o mensaje de error)
+BatchCallback = Callable[[int, str, object], None]
+
+
+class ServiceError(Exception):
+    """Pedido inválido: se responde con el código HTTP indicado"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ----------------------------------------------------------------------
+# Serialización
+# ----------------------------------------------------------------------
+
+def issue_to_dict(issue) -> Dict:
+    """Representación JSON de un Issue (con los textos del catálogo)"""
+    return {
+        'id': issue.id,
+        'severity': issue.severity,
+        'category': issue.category,
+        'line': issue.line,
+        'column': issue.column,
+        'title': issue.title,
+        'description': issue.description,
+        'snippet': issue.snippet
+    }
+
+
+def suggestion_to_dict(suggestion) -> Dict:
+    """Representación JSON de una Suggestion"""
+    return {
+        'id': suggestion.id,
+        'title': suggestion.title,
+        'description': suggestion.description,
+        'original_code': suggestion.original_code,
+        'suggested_code': suggestion.suggested_code,
+        'is_rewrite': suggestion.is_rewrite,
+        'comments_removed': suggestion.comments_removed,
+        'impact': suggestion.impact
+    }
+
+
+def result_to_dict(result: Dict) -> Dict:
+    """Representación JSON del resultado de analyze_expression"""
+    return {
+        'issues': [issue_to_dict(issue) for issue in result['issues']],
+        'metrics': asdict(result['metrics']) if result['metrics'] is not None else None,
+        'suggestions': [suggestion_to_dict(suggestion) for suggestion in result['suggestions']],
+        'base_score': result['base_score']
+    }
+
+
+def parsed_to_dict(parsed: ParsedDaxExpression) -> Dict:
+    """Representación JSON de una expresión parseada (sin el texto original)"""
+    data = asdict(parsed)
+    del data['raw']
+    data['tables'] = sorted(data['tables'])
+    data['columns'] = sorted(data['columns'])
+    return data
+
+
+def ranked_measure_to_dict(measure: RankedMeasure) -> Dict:
+    """Representación JSON de una medida rankeada"""
+    return {
+        'name': measure.name,
+        'table': measure.table,
+        'impact_score': measure.impact_score,
+        'priority': measure.priority_label,
+        'complexity': measure.complexity,
+        'critical_issues': measure.critical_issues,
+        'warnings': measure.warnings,
+        'infos': measure.infos,
+        'issues': [issue_to_dict(issue) for issue in measure.issues],
+        'suggestions': [suggestion_to_dict(suggestion) for suggestion in measure.suggestions]
+    }
+
+
+# ----------------------------------------------------------------------
+# Servicio
+# ----------------------------------------------------------------------
+
+class AnalysisService:
+    """
+    Análisis con workers persistentes y caché compartida entre pedidos
+
+    Los análisis se serializan (un pedido a la vez usa el pool); el parseo
+    corre en el thread del pedido.
+
+    Args:
+        workers: Procesos worker (0 = analizar en el proceso del servicio, sin aislamiento)
+        timeout: Segundos máximos por expresión
+        memory_limit_mb: Memoria máxima por worker en MB
+        cache_entries: Expresiones guardadas en la caché de análisis
+    """
+
+    def __init__(self, workers: Optional[int] = None,
+                 timeout: Optional[float] = DEFAULT_MEASURE_TIMEOUT,
+                 memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+                 cache_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.workers = DEFAULT_WORKERS if workers is None else workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.cache = AnalysisCache(cache_entries)
+        self.pool = WorkerPool(self.workers, timeout, memory_limit_mb) if self.workers > 0 else None
+        self.started = time.time()
+        self.requests = 0
+        self._lock = threading.Lock()           # Un análisis a la vez en el pool
+        self._requests_lock = threading.Lock()  # Contador de pedidos (no espera a los análisis)
+
+    def warm_up(self) -> None:
+        """Arranca los workers y espera a que terminen de importar el análisis"""
+        if self.pool is not None:
+            with self._lock:
+                self.pool.start(wait_ready=True)
+
+    def close(self) -> None:
+        if self.pool is not None:
+            with self._lock:
+                self.pool.close()
+
+    def count_request(self) -> None:
+        """Cuenta un pedido (los handlers corren en un thread por conexión)"""
+        with self._requests_lock:
+            self.requests += 1
+
+    def health(self) -> Dict:
+        return {
+            'status': 'ok',
+            'workers': self.workers,
+            'workers_started': self.pool.started if self.pool is not None else False,
+            'timeout': self.timeout,
+            'cache_entries': len(self.cache),
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+            'requests': self.requests,
+            'uptime_seconds': round(time.time() - self.started, 1)
+        }
+
+    def parse(self, expression: str) -> Dict:
+        """
+        Parsea una expresión
+
+        Raises:
+            AnalysisTimeoutError: Si se supera el tiempo máximo por expresión
+        """
+        return parsed_to_dict(parse_dax_code(expression, budget=TimeBudget(self.timeout)))
+
+    def parse_batch(self, expressions: List[str], on_result: BatchCallback) -> Dict:
+        """Parsea cada expresión y entrega (índice, estado, resultado) en orden"""
+        started = time.perf_counter()
+        failed = 0
+        for index, expression in enumerate(expressions):
+            try:
+                status, payload = 'ok', self.parse(expression)
+            except AnalysisTimeoutError as e:
+                status, payload = 'timeout', str(e)
+            except Exception as e:
+                status, payload = 'error', str(e)
+            failed += status != 'ok'
+            on_result(index, status, payload)
+        return {'count': len(expressions), 'failed': failed, 'seconds': round(time.perf_counter() - started, 4)}
+
+    def analyze_batch(self, expressions: List[str], on_result: BatchCallback) -> Dict:
+        """
+        Analiza las expresiones y entrega cada resultado apenas está disponible
+
+        Las repetidas se analizan una sola vez y las que están en la caché se
+        entregan primero, sin pasar por los workers.
+
+        Args:
+            expressions: Códigos DAX
+            on_result: Función (índice, estado, resultado serializado o mensaje de error)
+
+        Returns:
+            Resumen {'count', 'unique', 'cached', 'failed', 'seconds'}
+        """
+        started = time.perf_counter()
+        positions: Dict[str, List[int]] = {}
+        for index, expression in enumerate(expressions):
+            positions.setdefault(expression, []).append(index)
+        unique = list(positions)
+        summary = {'count': len(expressions), 'unique': len(unique), 'cached': 0, 'failed': 0}
+
+        def deliver(task_id: int, status: str, payload: object) -> None:
+            if status == 'ok':
+                payload = result_to_dict(payload)
+            else:
+                summary['failed'] += len(positions[unique[task_id]])
+            for index in positions[unique[task_id]]:
+                on_result(index, status, payload)
+
+        def on_task_result(task_id: int, status: str, payload: object, stats: Optional[Dict]) -> None:
+            self.cache.put(unique[task_id], status, payload)
+            deliver(task_id, status, payload)
+
+        with self._lock:
+            task_ids = []
+            for task_id, expression in enumerate(unique):
+                cached = self.cache.get(expression)
+                if cached is None:
+                    task_ids.append(task_id)
+                else:
+                    summary['cached'] += 1
+                    deliver(task_id, *cached)
+
+            if self.pool is not None:
+                self.pool.run(unique, task_ids, lambda task_id: None, on_task_result)
+            else:
+                run_sequential(unique, task_ids, self.timeout, lambda task_id: None, on_task_result)
+
+        summary['seconds'] = round(time.perf_counter() - started, 4)
+        return summary
+
+    def analyze(self, expression: str) -> Tuple[str, object]:
+        """Analiza una expresión; retorna (estado, resultado serializado o mensaje de error)"""
+        results = []
+        self.analyze_batch([expression], lambda index, status, payload: results.append((status, payload)))
+        return results[0]
+
+    def rank(self, measures: List[Dict], top: Optional[int] = None) -> Dict:
+        """
+        Analiza y rankea medidas {'name', 'table', 'expression'}
+
+        Returns:
+            {'summary', 'measures', 'failed_measures'}
+        """
+        with self._lock:
+            analyzed_measures, failed_measures = analyze_measures(
+                measures, self.timeout, self.memory_limit_mb,
+                workers=self.workers, cache=self.cache, pool=self.pool
+            )
+        ranked_measures = rank_measures(analyzed_measures)
+
+        return {
+            'summary': get_summary_stats(ranked_measures),
+            'measures': [ranked_measure_to_dict(m) for m in ranked_measures[:top]],
+            'failed_measures': failed_measures
+        }
+
+
+# ----------------------------------------------------------------------
+# HTTP
+# ----------------------------------------------------------------------
+
+def _batch_items(body: Dict) -> Tuple[List[str], List[Any]]:
+    """Expresiones e ids de un pedido batch"""
+    items = body.get('expressions')
+    if not isinstance(items, list):
+        raise ServiceError(400, "Se esperaba 'expressions': una lista de textos o de {'id', 'expression'}")
+
+    expressions, ids = [], []
+    for item in items:
+        if isinstance(item, dict):
+            expression, item_id = item.get('expression'), item.get('id')
+        else:
+            expression, item_id = item, None
+        if not isinstance(expression, str):
+            raise ServiceError(400, f"Expresión inválida en la posición {len(expressions)}")
+        expressions.append(expression)
+        ids.append(item_id)
+    return expressions, ids
+
+
+def _measures(body: Dict) -> List[Dict]:
+    """Medidas de un pedido /rank (table es opcional)"""
+    items = body.get('measures')
+    if not isinstance(items, list):
+        raise ServiceError(400, "Se esperaba 'measures': una lista de {'name', 'table', 'expression'}")
+
+    measures = []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('expression'), str):
+            raise ServiceError(400, f"Medida inválida en la posición {position}")
+        measures.append({
+            'name': str(item.get('name') or f"Medida {position + 1}"),
+            'table': str(item.get('table') or ''),
+            'expression': item['expression']
+        })
+    return measures
+
+
+def _expression(body: Dict) -> str:
+    expression = body.get('expression')
+    if not isinstance(expression, str):
+        raise ServiceError(400, "Se esperaba 'expression': un texto con el código DAX")
+    return expression
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    """Atiende los endpoints del servicio (un thread por conexión)"""
+
+    protocol_version = 'HTTP/1.1'  # Necesario para las respuestas NDJSON en chunks
+    server: 'AnalysisServer'
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # --- Respuestas ---
+
+    def _send_json(self, status: int, data: Dict) -> None:
+        body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', NDJSON_CONTENT_TYPE)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _write_line(self, data: Dict) -> None:
+        line = (json.dumps(data, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+        self.wfile.write(f"{len(line):X}\r\n".encode('ascii') + line + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _read_json(self) -> Dict:
+        length = self.headers.get('Content-Length')
+        if length is None:
+            raise ServiceError(411, "Falta Content-Length")
+        try:
+            length = int(length)
+        except ValueError:
+            raise ServiceError(400, "Content-Length inválido")
+        if length > MAX_REQUEST_BYTES:
+            raise ServiceError(413, f"El pedido supera {MAX_REQUEST_BYTES // (1024 * 1024)} MB")
+
+        try:
+            body = json.loads(self.rfile.read(length).decode('utf-8'))
+        except (UnicodeDecodeError, ValueError) as e:
+            raise ServiceError(400, f"JSON inválido: {e}")
+        if not isinstance(body, dict):
+            raise ServiceError(400, "Se esperaba un objeto JSON")
+        return body
+
+    # --- Rutas ---
+
+    def do_GET(self) -> None:
+        if self.path == '/health':
+            self._send_json(200, self.server.service.health())
+        else:
+            self._send_json(404, {'error': f"Ruta desconocida: {self.path}"})
+
+    def do_POST(self) -> None:
+        routes = {
+            '/parse': self._handle_parse,
+            '/parse/batch': self._handle_parse_batch,
+            '/analyze': self._handle_analyze,
+            '/analyze/batch': self._handle_analyze_batch,
+            '/rank': self._handle_rank,
+        }
+        handler = routes.get(self.path)
+        service = self.server.service
+        service.count_request()
+
+        try:
+            if handler is None:
+                raise ServiceError(404, f"Ruta desconocida: {self.path}")
+            body = self._read_json()
+            with tracing.span('service.request', {'http.route': self.path}):
+                handler(service, body)
+        except ServiceError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except AnalysisTimeoutError as e:
+            self._send_json(422, {'error': str(e), 'status': 'timeout'})
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # El cliente cortó la conexión
+        except Exception as e:
+            self.close_connection = True
+            self._send_json(500, {'error': str(e)})
+
+    def _handle_parse(self, service: AnalysisService, body: Dict) -> None:
+        self._send_json(200, service.parse(_expression(body)))
+
+    def _handle_analyze(self, service: AnalysisService, body: Dict) -> None:
+        status, payload = service.analyze(_expression(body))
+        if status == 'ok':
+            self._send_json(200, payload)
+        else:
+            self._send_json(422, {'error': payload, 'status': status})
+
+    def _handle_rank(self, service: AnalysisService, body: Dict) -> None:
+        top = body.get('top')
+        if top is not None and not isinstance(top, int):
+            raise ServiceError(400, "'top' debe ser un entero")
+        self._send_json(200, service.rank(_measures(body), top))
+
+    def _handle_parse_batch(self, service: AnalysisService, body: Dict) -> None:
+        self._stream_batch(service.parse_batch, body)
+
+    def _handle_analyze_batch(self, service: AnalysisService, body: Dict) -> None:
+        self._stream_batch(service.analyze_batch, body)
+
+    def _stream_batch(self, run: Callable[[List[str], BatchCallback], Dict], body: Dict) -> None:
+        expressions, ids = _batch_items(body)
+        self._start_stream()
+        disconnected = False
+
+        def on_result(index: int, status: str, payload: object) -> None:
+            nonlocal disconnected
+            if disconnected:
+                return  # Se sigue analizando: los resultados quedan en la caché
+            line = {'index': index, 'id': ids[index], 'status': status}
+            line['result' if status == 'ok' else 'error'] = payload
+            try:
+                self._write_line(line)
+            except (BrokenPipeError, ConnectionResetError):
+                disconnected = True
+
+        try:
+            summary = run(expressions, on_result)
+        except Exception as e:
+            # Los encabezados ya se enviaron: el error va como última línea
+            self.close_connection = True
+            summary = {'error': str(e)}
+        if disconnected:
+            self.close_connection = True
+            return
+        self._write_line({'summary': summary})
+        self._end_stream()
+
+
+class AnalysisServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP del servicio de análisis
+
+    Con port=0 el sistema elige un puerto libre (útil en pruebas): ver url.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, service: AnalysisService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 verbose: bool = False):
+        self.service = service
+        self.verbose = verbose
+        super().__init__((host, port), _ServiceHandler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_in_thread(self) -> threading.Thread:
+        """Atiende pedidos en un thread en segundo plano (detener con shutdown())"""
+        thread = threading.Thread(target=self.serve_forever, name='analysis-service', daemon=True)
+        thread.start()
+        return thread
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.service.close()
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          workers: Optional[int] = None,
+          timeout: Optional[float] = DEFAULT_MEASURE_TIMEOUT,
+          memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+          verbose: bool = False,
+          on_ready: Optional[Callable[[AnalysisServer], None]] = None) -> None:
+    """
+    Arranca los workers y atiende pedidos hasta Ctrl+C
+
+    Args:
+        host: Interfaz (por defecto solo localhost)
+        port: Puerto (0 = uno libre)
+        workers: Procesos worker (0 = en el proceso del servicio)
+        timeout: Segundos máximos por expresión
+        memory_limit_mb: Memoria máxima por worker en MB
+        verbose: Registrar cada pedido en stderr
+        on_ready: Función llamada con el servidor una vez listo para atender
+    """
+    service = AnalysisService(workers, timeout, memory_limit_mb)
+    service.warm_up()
+    with AnalysisServer(service, host, port, verbose) as server:
+        if on_ready is not None:
+            on_ready(server)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,178 @@
+"""
+API por lotes del análisis DAX
+Variantes de parse_dax_code, analyze_dax, generate_suggestions y calculate_score
+que reciben muchas expresiones y devuelven resultados alineados (mismo orden y
+misma cantidad que la entrada). Las expresiones repetidas se parsean y analizan
+una sola vez, la forma parseada se reutiliza entre reglas, sugerencias y score,
+y cada regla se aplica a todo el lote antes de pasar a la siguiente, saltando
+las expresiones que no contienen las funciones que la regla busca.
+
+Sin presupuesto de tiempo ni aislamiento: para modelos no confiables usar
+analysis_runner.analyze_measures (workers con timeout).
+"""
+
+import itertools
+from typing import List, Dict, Iterable, Iterator, Tuple, Callable, Optional
+
+from .dax_parser import ParsedDaxExpression, parse_dax_code
+from .dax_analyzer import (
+    ANALYSIS_RULES,
+    NESTED_ITERATORS,
+    EXPENSIVE_FUNCTIONS,
+    CALCULATED_COLUMN_SCANS,
+    Issue,
+    PerformanceMetrics,
+    calculate_metrics
+)
+from .dax_suggestions import Suggestion, generate_suggestions, calculate_score
+from . import instrumentation
+
+
+# Expresiones por lote en iter_analyze_expressions (acota la memoria con iteradores largos)
+BATCH_CHUNK_SIZE = 512
+
+
+# Condición necesaria para que cada regla reporte algo, evaluada sobre el código
+# en mayúsculas (solo para código ASCII: fuera de ASCII upper() y la búsqueda
+# sin distinguir mayúsculas de las regex no siempre coinciden)
+RULE_PREFILTERS: Dict[str, Callable[[ParsedDaxExpression, str], bool]] = {
+    'check_nested_iterators': lambda parsed, upper: any(name in upper for name in NESTED_ITERATORS),
+    'check_filter_without_keepfilters': lambda parsed, upper: 'CALCULATE' in upper and 'FILTER' in upper,
+    'check_calculate_nesting': lambda parsed, upper: upper.count('CALCULATE') > 1,
+    'check_all_in_filter': lambda parsed, upper: 'FILTER' in upper and 'ALL' in upper,
+    'check_expensive_functions': lambda parsed, upper: any(name in upper for name in EXPENSIVE_FUNCTIONS),
+    'check_calculated_column_refresh_cost': lambda parsed, upper: (
+        parsed.object_type == 'calculated-column' and any(name in upper for name in CALCULATED_COLUMN_SCANS)
+    ),
+    'check_calculated_table_refresh_cost': lambda parsed, upper: parsed.object_type == 'calculated-table',
+    'check_calculated_columns_in_measures': lambda parsed, upper: parsed.object_type == 'measure' and 'EARLIER' in upper,
+}
+
+
+def parse_dax_batch(expressions: Iterable[str]) -> List[ParsedDaxExpression]:
+    """
+    Parsea varias expresiones (las repetidas una sola vez)
+
+    Args:
+        expressions: Códigos DAX (lista o iterador)
+
+    Returns:
+        Expresiones parseadas, alineadas con la entrada; las repetidas comparten el mismo objeto
+    """
+    parsed_by_code: Dict[str, ParsedDaxExpression] = {}
+    result = []
+    for code in expressions:
+        parsed = parsed_by_code.get(code)
+        if parsed is None:
+            parsed = parsed_by_code[code] = parse_dax_code(code)
+        result.append(parsed)
+    return result
+
+
+def analyze_dax_batch(parsed_expressions: List[ParsedDaxExpression]) -> List[Tuple[List[Issue], PerformanceMetrics]]:
+    """
+    analyze_dax para varias expresiones parseadas, regla por regla
+
+    Cada regla recorre todo el lote (sus patrones y datos quedan calientes) y
+    se salta las expresiones que no cumplen su condición necesaria
+    (RULE_PREFILTERS). Los issues de cada expresión quedan en el mismo orden
+    que con analyze_dax.
+
+    Args:
+        parsed_expressions: Expresiones parseadas (parse_dax_batch)
+
+    Returns:
+        Lista de (issues, métricas) alineada con la entrada
+    """
+    unique = list({id(parsed): parsed for parsed in parsed_expressions}.values())
+    # Scratch por expresión, compartido entre reglas: código en mayúsculas o None si no es ASCII
+    uppers = [parsed.raw.upper() if parsed.raw.isascii() else None for parsed in unique]
+    issues_by_expression: List[List[Issue]] = [[] for _ in unique]
+
+    for rule in ANALYSIS_RULES:
+        prefilter = RULE_PREFILTERS.get(rule.__name__)
+        with instrumentation.stage(f'rules.{rule.__name__}'):
+            for parsed, upper, issues in zip(unique, uppers, issues_by_expression):
+                if prefilter is None or upper is None or prefilter(parsed, upper):
+                    rule(parsed, issues)
+
+    with instrumentation.stage('metrics.calculate_metrics'):
+        results = {
+            id(parsed): (issues, calculate_metrics(parsed))
+            for parsed, issues in zip(unique, issues_by_expression)
+        }
+    instrumentation.count('issues', sum(len(issues) for issues in issues_by_expression))
+
+    return [results[id(parsed)] for parsed in parsed_expressions]
+
+
+def generate_suggestions_batch(parsed_expressions: List[ParsedDaxExpression],
+                               issues_list: List[List[Issue]]) -> List[List[Suggestion]]:
+    """generate_suggestions para varias expresiones (resultados alineados)"""
+    return [generate_suggestions(parsed, issues) for parsed, issues in zip(parsed_expressions, issues_list)]
+
+
+def calculate_score_batch(parsed_expressions: List[ParsedDaxExpression],
+                          issues_list: List[List[Issue]]) -> List[int]:
+    """calculate_score para varias expresiones (resultados alineados)"""
+    return [calculate_score(parsed, issues) for parsed, issues in zip(parsed_expressions, issues_list)]
+
+
+def analyze_expressions_batch(expressions: Iterable[str],
+                              chunk_size: int = BATCH_CHUNK_SIZE) -> List[Dict]:
+    """
+    analyze_expression para varias expresiones
+
+    Args:
+        expressions: Códigos DAX (lista o iterador)
+        chunk_size: Expresiones procesadas por lote
+
+    Returns:
+        Diccionarios {'issues', 'metrics', 'suggestions', 'base_score'} alineados con la
+        entrada; las expresiones repetidas dentro de un lote comparten el mismo diccionario
+    """
+    return list(iter_analyze_expressions(expressions, chunk_size))
+
+
+def iter_analyze_expressions(expressions: Iterable[str],
+                             chunk_size: int = BATCH_CHUNK_SIZE,
+                             results_by_code: Optional[Dict[str, Dict]] = None) -> Iterator[Dict]:
+    """
+    Analiza un flujo de expresiones por lotes y entrega los resultados en orden
+
+    Args:
+        expressions: Códigos DAX (lista o iterador, se consume de a chunk_size)
+        chunk_size: Expresiones procesadas por lote
+        results_by_code: Resultados ya calculados por código (se completa con los nuevos;
+            por defecto solo se reutilizan dentro de cada lote)
+
+    Yields:
+        Diccionario {'issues', 'metrics', 'suggestions', 'base_score'} por expresión
+    """
+    iterator = iter(expressions)
+
+    while True:
+        chunk = list(itertools.islice(iterator, max(1, chunk_size)))
+        if not chunk:
+            return
+
+        results = results_by_code if results_by_code is not None else {}
+        pending = list(dict.fromkeys(code for code in chunk if code not in results))
+        if pending:
+            parsed_expressions = parse_dax_batch(pending)
+            analyses = analyze_dax_batch(parsed_expressions)
+            issues_list = [issues for issues, _ in analyses]
+
+            suggestions_list = generate_suggestions_batch(parsed_expressions, issues_list)
+            scores = calculate_score_batch(parsed_expressions, issues_list)
+
+            for code, (issues, metrics), suggestions, score in zip(pending, analyses, suggestions_list, scores):
+                results[code] = {
+                    'issues': issues,
+                    'metrics': metrics,
+                    'suggestions': suggestions,
+                    'base_score': score
+                }
+
+        for code in chunk:
+            yield results[code]
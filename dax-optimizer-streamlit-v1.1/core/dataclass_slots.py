@@ -0,0 +1,68 @@
+"""
+Dataclasses con __slots__ compatibles con Python 3.8+
+dataclass(slots=True) existe recién desde Python 3.10. slotted_dataclass
+produce la misma clase en cualquier versión: aplica dataclass y la vuelve a
+crear con __slots__ (los valores por defecto de los campos no pueden quedar
+como atributos de clase junto a __slots__ del mismo nombre).
+"""
+
+from dataclasses import dataclass, fields
+from typing import Callable, Type, TypeVar
+
+
+T = TypeVar('T')
+
+
+def add_slots(cls: Type[T]) -> Type[T]:
+    """
+    Vuelve a crear una dataclass con __slots__ (sin __dict__ por instancia)
+
+    Solo declara los campos propios: los de una clase base con __slots__ ya
+    tienen su slot.
+
+    Args:
+        cls: Clase ya procesada por dataclass
+
+    Returns:
+        Clase nueva con los mismos métodos y __slots__
+    """
+    inherited = {name for base in cls.__mro__[1:] for name in getattr(base, '__slots__', ())}
+    slots = tuple(field.name for field in fields(cls) if field.name not in inherited)
+
+    namespace = dict(cls.__dict__)
+    for name in slots:
+        namespace.pop(name, None)  # Valor por defecto: ya está en el __init__ generado
+    namespace.pop('__dict__', None)
+    namespace.pop('__weakref__', None)
+    namespace['__slots__'] = slots
+    if cls.__dataclass_params__.frozen:
+        names = tuple(field.name for field in fields(cls))
+
+        def __getstate__(self):
+            return tuple(getattr(self, name) for name in names)
+
+        def __setstate__(self, state):
+            # El __setattr__ de una dataclass frozen rechaza la restauración por defecto de pickle
+            for name, value in zip(names, state):
+                object.__setattr__(self, name, value)
+
+        namespace['__getstate__'] = __getstate__
+        namespace['__setstate__'] = __setstate__
+
+    slotted = type(cls)(cls.__name__, cls.__bases__, namespace)
+    slotted.__qualname__ = cls.__qualname__
+    return slotted
+
+
+def slotted_dataclass(**kwargs) -> Callable[[Type[T]], Type[T]]:
+    """
+    Equivalente a dataclass(**kwargs, slots=True) que funciona desde Python 3.8
+
+    Ejemplo:
+        @slotted_dataclass(frozen=True)
+        class Issue:
+            id: str
+    """
+    def decorate(cls: Type[T]) -> Type[T]:
+        return add_slots(dataclass(**kwargs)(cls))
+    return decorate
@@ -4,26 +4,107 @@ Detecta problemas de performance y anti-patrones
 """
 
 import re
-from typing import List, Dict, Tuple
-from dataclasses import dataclass, field
-from .dax_parser import ParsedDaxExpression, calculate_complexity
-
-
-@dataclass
+import functools
+from collections import Counter
+from typing import List, Dict, Optional, Tuple, FrozenSet, TYPE_CHECKING
+from dataclasses import field
+from .dataclass_slots import slotted_dataclass
+from .dax_parser import ParsedDaxExpression, TABLE_COLUMN_PATTERN, calculate_complexity
+from .analysis_budget import TimeBudget
+from . import instrumentation
+from .rule_catalog import get_rule, get_text
+
+if TYPE_CHECKING:
+    from .vpax_importer import ModelStatistics
+
+# dax_ast y dax_rewriter se importan dentro de las reglas que los usan: crear las
+# clases de nodos del árbol cuesta ~10 ms y este módulo se importa al arrancar cada
+# worker (presupuesto de benchmarks/bench_import_time.py). El árbol solo se construye
+# para las expresiones que pasan el prefiltro de la regla, y rewrite_dax reutiliza
+# el mismo árbol en el worker (dax_rewriter.parse_expression)
+
+
+_CALCULATE_OPEN = re.compile(r'CALCULATE\s*\(', re.IGNORECASE)
+_FILTER_OPEN = re.compile(r'FILTER\s*\(', re.IGNORECASE)
+_BRACKET_REFERENCE = re.compile(r'\[([^\[\]]+)\]')
+_CALCULATE_CALL = re.compile(r'\bCALCULATE\s*\(', re.IGNORECASE)
+_ALL_IN_FILTER = re.compile(r'FILTER\s*\(\s*ALL\s*\(', re.IGNORECASE)
+_EARLIER_CALL = re.compile(r'\bEARLIER\s*\(', re.IGNORECASE)
+
+# Llamadas que recorren una tabla completa; en una columna calculada se evalúan
+# una vez por fila en cada actualización (RELATEDTABLE solo recorre las filas relacionadas)
+CALCULATED_COLUMN_SCANS = ['FILTER', 'SUMX', 'AVERAGEX', 'COUNTX', 'COUNTAX', 'MINX', 'MAXX', 'RANKX',
+                           'CONCATENATEX', 'CALCULATETABLE']
+_CALCULATED_COLUMN_SCAN = re.compile(
+    rf"\b({'|'.join(CALCULATED_COLUMN_SCANS)})\s*\(\s*(?!RELATEDTABLE\b)", re.IGNORECASE
+)
+
+# Funciones de tabla con las que una tabla calculada copia o deriva filas de otra tabla
+DERIVED_TABLE_FUNCTIONS = ['FILTER', 'SUMMARIZE', 'SUMMARIZECOLUMNS', 'ADDCOLUMNS', 'SELECTCOLUMNS',
+                           'CROSSJOIN', 'GENERATE', 'DISTINCT', 'VALUES', 'ALL', 'CALCULATETABLE']
+_DERIVED_TABLE_CALL = re.compile(rf"\b({'|'.join(DERIVED_TABLE_FUNCTIONS)})\s*\(", re.IGNORECASE)
+
+EXPENSIVE_FUNCTIONS = ['CROSSJOIN', 'GENERATE', 'SUMMARIZE', 'LOOKUPVALUE']
+_EXPENSIVE_CALLS = {name: re.compile(rf'\b{name}\s*\(', re.IGNORECASE) for name in EXPENSIVE_FUNCTIONS}
+
+# Issues cuyo costo crece con las filas que recorre la llamada donde se detectan
+ROW_SCALED_ISSUES = frozenset({
+    'nested-iterators', 'all-in-filter', 'filter-without-keepfilters', 'measure-in-calculated-column',
+    'expensive-crossjoin', 'expensive-generate', 'expensive-summarize', 'table-scan-in-calculated-column',
+    'derived-calculated-table', 'filter-on-related-key', 'filter-key-equality'
+})
+
+# Primer argumento de una llamada: tabla ('Tabla', Tabla o Tabla[Columna]), atravesando
+# funciones de tabla anidadas como FILTER(ALL(Tabla), ...) o VALUES(Tabla[Columna])
+_CALL_TABLE_ARGUMENT = re.compile(
+    r"\w+\s*\(\s*(?:(?:ALL|ALLNOBLANKROW|ALLSELECTED|VALUES|DISTINCT|FILTER|RELATEDTABLE|CALCULATETABLE|KEEPFILTERS)\s*\(\s*)*"
+    r"('(?:[^']|'')+'|[^\W\d][\w.]*)(?:\s*\[([^\]]+)\])?",
+    re.IGNORECASE
+)
+
+# Iteradores considerados por check_nested_iterators (en orden de reporte)
+NESTED_ITERATORS = ['SUMX', 'AVERAGEX', 'COUNTX', 'COUNTAX', 'MINX', 'MAXX', 'CONCATENATEX', 'RANKX']
+NESTED_ITERATOR_WINDOW = 1000
+# Todas las llamadas en una sola pasada (dos llamadas nunca se solapan)
+_ANY_ITERATOR_CALL = re.compile(rf"\b({'|'.join(NESTED_ITERATORS)})\s*\(", re.IGNORECASE)
+
+
+@slotted_dataclass(frozen=True)
 class Issue:
-    """Representa un problema detectado en el código DAX"""
+    """
+    Representa un problema detectado en el código DAX
+
+    Solo guarda el id de la regla, la ubicación y los parámetros; los textos
+    (título, descripción, enlace) se resuelven en el catálogo de reglas.
+    """
     id: str
-    severity: str  # 'critical', 'warning', 'info'
-    category: str
-    title: str
-    description: str
     line: int = 0
     column: int = 0
     snippet: str = ""
-    learn_more: str = ""
+    params: Tuple[Tuple[str, object], ...] = ()
+
+    @property
+    def severity(self) -> str:
+        return get_rule(self.id).severity
 
+    @property
+    def category(self) -> str:
+        return get_rule(self.id).category
 
-@dataclass
+    @property
+    def title(self) -> str:
+        return get_text(self.id, 'title', self.params)
+
+    @property
+    def description(self) -> str:
+        return get_text(self.id, 'description', self.params)
+
+    @property
+    def learn_more(self) -> str:
+        return get_rule(self.id).learn_more
+
+
+@slotted_dataclass(frozen=True)
 class PerformanceMetrics:
     """Métricas de performance del código DAX"""
     complexity: int  # 0-100
@@ -34,175 +115,127 @@ class PerformanceMetrics:
     estimated_impact: str  # 'high', 'medium', 'low'
 
 
-def analyze_dax(parsed: ParsedDaxExpression) -> Tuple[List[Issue], PerformanceMetrics]:
+def analyze_dax(parsed: ParsedDaxExpression,
+                budget: Optional[TimeBudget] = None) -> Tuple[List[Issue], PerformanceMetrics]:
     """
     Analiza código DAX parseado y detecta problemas
 
     Args:
         parsed: Expresión DAX parseada
+        budget: Presupuesto de tiempo opcional (se verifica antes de cada regla)
 
     Returns:
         Tupla con (lista de issues, métricas de performance)
+
+    Raises:
+        AnalysisTimeoutError: Si se supera el presupuesto de tiempo
     """
     issues = []
 
     # Ejecutar todas las verificaciones de anti-patrones
-    check_nested_iterators(parsed, issues)
-    check_filter_without_keepfilters(parsed, issues)
-    check_missing_variables(parsed, issues)
-    check_calculate_nesting(parsed, issues)
-    check_all_in_filter(parsed, issues)
-    check_expensive_functions(parsed, issues)
-    check_context_transitions(parsed, issues)
-    check_calculated_columns_in_measures(parsed, issues)
-    check_repeated_expressions(parsed, issues)
+    for rule in ANALYSIS_RULES:
+        if budget is not None:
+            budget.check(rule.__name__)
+        with instrumentation.stage(f'rules.{rule.__name__}'):
+            rule(parsed, issues)
 
     # Calcular métricas
-    metrics = calculate_metrics(parsed)
+    with instrumentation.stage('metrics.calculate_metrics'):
+        metrics = calculate_metrics(parsed)
+    instrumentation.count('issues', len(issues))
 
     return issues, metrics
 
 
 def check_nested_iterators(parsed: ParsedDaxExpression, issues: List[Issue]) -> None:
     """Detecta iteradores anidados (muy costosos)"""
-    iterators = ['SUMX', 'AVERAGEX', 'COUNTX', 'COUNTAX', 'MINX', 'MAXX', 'CONCATENATEX', 'RANKX']
+    calls: Dict[str, List[re.Match]] = {name: [] for name in NESTED_ITERATORS}
+    for match in _ANY_ITERATOR_CALL.finditer(parsed.raw):
+        calls[match.group(1).upper()].append(match)
 
-    for outer_iterator in iterators:
+    for outer_iterator in NESTED_ITERATORS:
         # Búsqueda simple de patrones anidados
-        outer_pattern = re.compile(rf'\b{outer_iterator}\s*\(', re.IGNORECASE)
-        outer_matches = list(outer_pattern.finditer(parsed.raw))
+        outer_matches = calls[outer_iterator]
 
         if outer_matches:
-            for inner_iterator in iterators:
-                # Buscar patrón de anidamiento
-                nested_pattern = re.compile(
-                    rf'\b{outer_iterator}\s*\(.*?\b{inner_iterator}\s*\(',
-                    re.IGNORECASE | re.DOTALL
-                )
-
-                # Limitar búsqueda a los primeros 1000 caracteres después del iterador externo
-                # para evitar backtracking excesivo
-                for outer_match in outer_matches:
-                    search_text = parsed.raw[outer_match.start():outer_match.start() + 1000]
-                    if re.search(rf'\b{inner_iterator}\s*\(', search_text, re.IGNORECASE):
+            # Limitar búsqueda a los primeros 1000 caracteres después del iterador externo
+            # para evitar backtracking excesivo
+            windows = [parsed.raw[m.start():m.start() + NESTED_ITERATOR_WINDOW] for m in outer_matches]
+            found = [iterators_in_window(window) for window in windows]
+
+            for inner_iterator in NESTED_ITERATORS:
+                for outer_match, search_text, inner_found in zip(outer_matches, windows, found):
+                    if inner_iterator in inner_found:
+                        line, column = get_location(parsed.raw, outer_match.start())
                         issues.append(Issue(
                             id='nested-iterators',
-                            severity='critical',
-                            category='Performance',
-                            title='Iteradores anidados detectados',
-                            description=f'Se detectó {inner_iterator} dentro de {outer_iterator}. Esto causa que cada fila de la tabla externa evalúe todas las filas de la tabla interna, resultando en complejidad O(n²) o mayor.',
+                            line=line,
+                            column=column,
                             snippet=search_text[:100] + '...',
-                            learn_more='https://www.sqlbi.com/articles/optimizing-nested-iterators-in-dax/'
+                            params=(('inner', inner_iterator), ('outer', outer_iterator))
                         ))
                         break  # Solo reportar una vez por iterador externo
 
 
+@functools.lru_cache(maxsize=4096)
+def iterators_in_window(window: str) -> FrozenSet[str]:
+    """
+    Iteradores llamados dentro de un fragmento de código
+
+    Con caché: al editar una expresión, los fragmentos que no cambiaron no se
+    vuelven a recorrer (ver incremental.AnalysisSession).
+    """
+    return frozenset(match.group(1).upper() for match in _ANY_ITERATOR_CALL.finditer(window))
+
+
 def check_filter_without_keepfilters(parsed: ParsedDaxExpression, issues: List[Issue]) -> None:
     """Detecta FILTER en CALCULATE sin KEEPFILTERS"""
-    calculate_with_filter = re.compile(r'CALCULATE\s*\([^)]*FILTER\s*\(', re.IGNORECASE)
+    # Equivale a CALCULATE\s*\([^)]*FILTER\s*\( sin backtracking cuadrático
+    start = find_call_before_close(parsed.raw, _CALCULATE_OPEN, _FILTER_OPEN)
 
-    if calculate_with_filter.search(parsed.raw) and 'KEEPFILTERS' not in parsed.raw.upper():
-        issues.append(Issue(
-            id='filter-without-keepfilters',
-            severity='warning',
-            category='Filter Context',
-            title='FILTER en CALCULATE sin KEEPFILTERS',
-            description='Usar FILTER directamente en CALCULATE puede sobrescribir filtros existentes. Considera usar KEEPFILTERS(FILTER(...)) para mantener el contexto de filtro existente.',
-            learn_more='https://www.sqlbi.com/articles/using-keepfilters-in-dax/'
-        ))
+    if start is not None and 'KEEPFILTERS' not in parsed.raw.upper():
+        line, column = get_location(parsed.raw, start)
+        issues.append(Issue(id='filter-without-keepfilters', line=line, column=column))
 
 
 def check_missing_variables(parsed: ParsedDaxExpression, issues: List[Issue]) -> None:
     """Detecta expresiones repetidas que deberían usar variables"""
     # Contar referencias a CALCULATE (sin intentar extraer todo el contenido)
-    calculate_pattern = re.compile(r'\bCALCULATE\s*\(', re.IGNORECASE)
-    calculate_count = len(calculate_pattern.findall(parsed.raw))
+    calculate_count = len(_CALCULATE_CALL.findall(parsed.raw))
 
     if calculate_count > 2 and len(parsed.variables) == 0:
-        issues.append(Issue(
-            id='missing-variables',
-            severity='warning',
-            category='Code Quality',
-            title='Múltiples CALCULATE sin variables',
-            description='Se detectaron múltiples llamadas a CALCULATE. Usar VAR para almacenar cálculos intermedios mejora la performance y legibilidad.',
-            snippet='',
-            learn_more='https://www.sqlbi.com/articles/using-variables-in-dax/'
-        ))
+        issues.append(Issue(id='missing-variables'))
 
     # Verificar código complejo sin variables
     if len(parsed.functions) > 5 and len(parsed.variables) == 0:
-        issues.append(Issue(
-            id='no-variables-complex',
-            severity='info',
-            category='Code Quality',
-            title='Código complejo sin variables',
-            description='Tu código tiene múltiples funciones pero no usa variables. Considera usar VAR para mejorar legibilidad y potencialmente performance.',
-            learn_more='https://www.sqlbi.com/articles/using-variables-in-dax/'
-        ))
+        issues.append(Issue(id='no-variables-complex'))
 
 
 def check_calculate_nesting(parsed: ParsedDaxExpression, issues: List[Issue]) -> None:
     """Detecta CALCULATEs anidados innecesarios"""
-    nested_calculate = re.compile(r'CALCULATE\s*\([^)]*CALCULATE\s*\(', re.IGNORECASE)
+    # Equivale a CALCULATE\s*\([^)]*CALCULATE\s*\( sin backtracking cuadrático
+    start = find_call_before_close(parsed.raw, _CALCULATE_OPEN, _CALCULATE_OPEN)
 
-    if nested_calculate.search(parsed.raw):
-        issues.append(Issue(
-            id='nested-calculate',
-            severity='warning',
-            category='Context Transition',
-            title='CALCULATE anidado detectado',
-            description='CALCULATE anidado causa múltiples transiciones de contexto innecesarias. Considera combinar los filtros en un solo CALCULATE.',
-            learn_more='https://www.sqlbi.com/articles/understanding-context-transition/'
-        ))
+    if start is not None:
+        line, column = get_location(parsed.raw, start)
+        issues.append(Issue(id='nested-calculate', line=line, column=column))
 
 
 def check_all_in_filter(parsed: ParsedDaxExpression, issues: List[Issue]) -> None:
     """Detecta ALL() usado directamente en FILTER (muy ineficiente)"""
-    all_in_filter = re.compile(r'FILTER\s*\(\s*ALL\s*\(', re.IGNORECASE)
-
-    if all_in_filter.search(parsed.raw):
-        issues.append(Issue(
-            id='all-in-filter',
-            severity='critical',
-            category='Performance',
-            title='ALL() usado en FILTER sobre tabla completa',
-            description='FILTER(ALL(Tabla), ...) itera sobre todas las filas sin aprovechar índices. Considera usar CALCULATE con filtros o FILTER solo sobre columnas específicas.',
-            learn_more='https://www.sqlbi.com/articles/best-practices-using-filter-and-all/'
-        ))
+    match = _ALL_IN_FILTER.search(parsed.raw)
+    if match:
+        line, column = get_location(parsed.raw, match.start())
+        issues.append(Issue(id='all-in-filter', line=line, column=column))
 
 
 def check_expensive_functions(parsed: ParsedDaxExpression, issues: List[Issue]) -> None:
     """Detecta funciones conocidas por ser costosas"""
-    expensive_functions = [
-        {
-            'name': 'CROSSJOIN',
-            'reason': 'genera producto cartesiano de tablas'
-        },
-        {
-            'name': 'GENERATE',
-            'reason': 'itera y genera filas para cada fila de entrada'
-        },
-        {
-            'name': 'SUMMARIZE',
-            'reason': 'puede ser reemplazado por SUMMARIZECOLUMNS (más eficiente)'
-        },
-        {
-            'name': 'LOOKUPVALUE',
-            'reason': 'hace búsquedas lineales, considera usar RELATED si hay relación'
-        }
-    ]
-
-    for func_info in expensive_functions:
-        pattern = re.compile(rf'\b{func_info["name"]}\s*\(', re.IGNORECASE)
-        if pattern.search(parsed.raw):
-            issues.append(Issue(
-                id=f'expensive-{func_info["name"].lower()}',
-                severity='warning',
-                category='Performance',
-                title=f'Función costosa: {func_info["name"]}',
-                description=f'{func_info["name"]} {func_info["reason"]}. Evalúa si hay una alternativa más eficiente.',
-                learn_more='https://www.sqlbi.com/articles/optimizing-dax-expressions/'
-            ))
+    for func_name in EXPENSIVE_FUNCTIONS:
+        match = _EXPENSIVE_CALLS[func_name].search(parsed.raw)
+        if match:
+            line, column = get_location(parsed.raw, match.start())
+            issues.append(Issue(id=f'expensive-{func_name.lower()}', line=line, column=column))
 
 
 def check_context_transitions(parsed: ParsedDaxExpression, issues: List[Issue]) -> None:
@@ -210,66 +243,265 @@ def check_context_transitions(parsed: ParsedDaxExpression, issues: List[Issue])
     # En columnas calculadas, usar medidas causa transición de contexto
     if parsed.object_type == 'calculated-column':
         if parsed.measures:
+            issues.append(Issue(id='measure-in-calculated-column'))
+
+
+def check_calculated_column_refresh_cost(parsed: ParsedDaxExpression, issues: List[Issue]) -> None:
+    """Detecta columnas calculadas que recorren una tabla por cada fila (O(n·m) en cada actualización)"""
+    if parsed.object_type == 'calculated-column':
+        match = _CALCULATED_COLUMN_SCAN.search(parsed.raw)
+        if match:
+            line, column = get_location(parsed.raw, match.start())
             issues.append(Issue(
-                id='measure-in-calculated-column',
-                severity='critical',
-                category='Context Transition',
-                title='Medida usada en columna calculada',
-                description='Usar medidas en columnas calculadas causa transición de contexto en cada fila, lo cual es muy costoso. Considera reescribir la lógica usando funciones de columna calculada.',
-                learn_more='https://www.sqlbi.com/articles/understanding-context-transition/'
+                id='table-scan-in-calculated-column',
+                line=line,
+                column=column,
+                params=(('function', match.group(1).upper()),)
             ))
 
 
+def check_calculated_table_refresh_cost(parsed: ParsedDaxExpression, issues: List[Issue]) -> None:
+    """Detecta tablas calculadas que materializan filas de otra tabla en cada actualización"""
+    if parsed.object_type != 'calculated-table':
+        return
+
+    for match in _DERIVED_TABLE_CALL.finditer(parsed.raw):
+        # Solo si el primer argumento es una tabla del modelo (no CALENDAR(...), DATATABLE(...), {...})
+        argument = _CALL_TABLE_ARGUMENT.match(parsed.raw, match.start())
+        if argument is None or parsed.raw[argument.end(1):].lstrip().startswith('('):
+            continue
+        line, column = get_location(parsed.raw, match.start())
+        issues.append(Issue(
+            id='derived-calculated-table',
+            line=line,
+            column=column,
+            params=(('function', match.group(1).upper()),)
+        ))
+        return
+
+
 def check_calculated_columns_in_measures(parsed: ParsedDaxExpression, issues: List[Issue]) -> None:
     """Detecta uso de lógica de columnas calculadas en medidas"""
     if parsed.object_type == 'measure':
-        has_earlier = re.search(r'\bEARLIER\s*\(', parsed.raw, re.IGNORECASE)
+        has_earlier = _EARLIER_CALL.search(parsed.raw)
 
         if has_earlier:
-            issues.append(Issue(
-                id='earlier-in-measure',
-                severity='warning',
-                category='Code Quality',
-                title='EARLIER detectado en medida',
-                description='EARLIER se usa típicamente en columnas calculadas. Si estás intentando usar lógica de columna calculada en una medida, considera crear la columna calculada por separado o usar variables.',
-                learn_more='https://www.sqlbi.com/articles/row-context-and-filter-context-in-dax/'
-            ))
+            line, column = get_location(parsed.raw, has_earlier.start())
+            issues.append(Issue(id='earlier-in-measure', line=line, column=column))
 
 
 def check_repeated_expressions(parsed: ParsedDaxExpression, issues: List[Issue]) -> None:
     """Detecta referencias a medidas repetidas que deberían estar en variables"""
     measure_counts = {}
 
+    # Contar todas las referencias [..] en una sola pasada
+    reference_counts = Counter(_BRACKET_REFERENCE.findall(parsed.raw))
+
     for measure in parsed.measures:
-        # Escapar caracteres especiales de regex en el nombre de la medida
-        escaped_measure = re.escape(measure)
-        pattern = re.compile(rf'\[{escaped_measure}\]')
-        matches = pattern.findall(parsed.raw)
-        if len(matches) > 2:
-            measure_counts[measure] = len(matches)
+        if '[' in measure:
+            # Nombres con corchetes no aparecen en el conteo por patrón
+            count = parsed.raw.count(f'[{measure}]')
+        else:
+            count = reference_counts[measure]
+        if count > 2:
+            measure_counts[measure] = count
 
     if measure_counts and len(parsed.variables) == 0:
         most_repeated = max(measure_counts.items(), key=lambda x: x[1])
 
         issues.append(Issue(
             id='repeated-measure-reference',
-            severity='info',
-            category='Code Quality',
-            title='Referencia a medida repetida',
-            description=f'La medida [{most_repeated[0]}] se usa {most_repeated[1]} veces. Considera almacenarla en una variable para evaluar solo una vez.',
-            learn_more='https://www.sqlbi.com/articles/using-variables-in-dax/'
+            params=(('measure', most_repeated[0]), ('count', most_repeated[1]))
+        ))
+
+
+def check_repeated_subexpressions(parsed: ParsedDaxExpression, issues: List[Issue]) -> None:
+    """
+    Detecta llamadas repetidas en el mismo contexto de evaluación
+
+    Los subárboles se comparan por id estructural (dax_ast.SubtreeIndex), así
+    que SUM(Ventas[Monto]) y sum( Ventas[monto] ) cuentan como la misma
+    subexpresión. Se reporta la más grande; las referencias a medidas
+    repetidas las reporta check_repeated_expressions.
+    """
+    # Prefiltro: sin una función llamada dos veces no hay llamadas repetidas
+    function_counts = Counter(function.name for function in parsed.functions)
+    if not function_counts or function_counts.most_common(1)[0][1] < 2:
+        return
+
+    from .dax_rewriter import largest_repeated_call  # Ver la nota de importación al inicio del módulo
+
+    repeated = largest_repeated_call(parsed.raw)
+    if repeated is not None:
+        expression, count = repeated
+        issues.append(Issue(
+            id='repeated-subexpression',
+            params=(('expression', expression), ('count', count))
         ))
 
 
+# Reglas de anti-patrones, en el orden en que se ejecutan
+ANALYSIS_RULES = [
+    check_nested_iterators,
+    check_filter_without_keepfilters,
+    check_missing_variables,
+    check_calculate_nesting,
+    check_all_in_filter,
+    check_expensive_functions,
+    check_context_transitions,
+    check_calculated_column_refresh_cost,
+    check_calculated_table_refresh_cost,
+    check_calculated_columns_in_measures,
+    check_repeated_expressions,
+    check_repeated_subexpressions,
+]
+
+
+def find_call_before_close(code: str, outer_pattern: re.Pattern, inner_pattern: re.Pattern) -> Optional[int]:
+    """
+    Busca outer seguido de inner sin un ')' entre ambos
+
+    Equivale a la regex outer[^)]*inner pero recorre el código una sola vez:
+    como ninguno de los dos patrones contiene ')', basta con buscar dentro de
+    cada segmento delimitado por ')'.
+
+    Returns:
+        Offset del inicio de outer, o None si no hay coincidencia
+    """
+    segment_start = 0
+    length = len(code)
+
+    while segment_start <= length:
+        segment_end = code.find(')', segment_start)
+        if segment_end == -1:
+            segment_end = length
+
+        outer = outer_pattern.search(code, segment_start, segment_end)
+        if outer and inner_pattern.search(code, outer.end(), segment_end):
+            return outer.start()
+
+        segment_start = segment_end + 1
+
+    return None
+
+
+def get_offset(code: str, line: int, column: int) -> int:
+    """Convierte (línea base 1, columna) en un offset del código (inversa de get_location)"""
+    offset = 0
+    for _ in range(line - 1):
+        offset = code.index('\n', offset) + 1
+    return offset + column
+
+
+def estimate_call_rows(code: str, offset: int, statistics: 'ModelStatistics') -> Optional[int]:
+    """
+    Filas que recorre la llamada que empieza en offset (según su primer argumento)
+
+    Tabla -> filas de la tabla; Tabla[Columna] (p. ej. VALUES(Tabla[Columna])) ->
+    cardinalidad de la columna.
+
+    Returns:
+        Filas estimadas, o None si la tabla no está en las estadísticas
+    """
+    match = _CALL_TABLE_ARGUMENT.match(code, offset)
+    if match is None:
+        return None
+
+    table = match.group(1)
+    if table.startswith("'"):
+        table = table[1:-1].replace("''", "'")
+    if match.group(2):
+        cardinality = statistics.column_cardinality(table, match.group(2))
+        if cardinality is not None:
+            return cardinality
+    return statistics.table_rows(table)
+
+
+def estimate_rows_iterated(code: str, issue: Issue, statistics: 'ModelStatistics',
+                           row_table: Optional[str] = None) -> Optional[int]:
+    """
+    Filas que recorre el patrón de un issue según las estadísticas VertiPaq
+
+    Con ubicación se usa la tabla de la llamada (en iteradores anidados, filas
+    del externo por filas del interno); sin ubicación o si la tabla no se
+    reconoce, la tabla más grande referenciada en el código.
+
+    Args:
+        code: Código de la expresión (el mismo que se analizó)
+        issue: Issue detectado
+        statistics: Estadísticas del modelo (vpax_importer.load_vpax)
+        row_table: Tabla de una columna calculada: el patrón se evalúa una vez por
+            cada una de sus filas en cada actualización
+
+    Returns:
+        Filas estimadas, o None si el issue no depende de las filas o no hay datos
+    """
+    if issue.id not in ROW_SCALED_ISSUES:
+        return None
+
+    rows = None
+    if issue.line > 0:
+        offset = get_offset(code, issue.line, issue.column)
+        if issue.id == 'filter-without-keepfilters':
+            # El issue apunta al CALCULATE; las filas son las del FILTER
+            match = _FILTER_OPEN.search(code, offset)
+            offset = match.start() if match is not None else offset
+        rows = estimate_call_rows(code, offset, statistics)
+
+        if rows is not None and issue.id == 'nested-iterators':
+            inner = dict(issue.params).get('inner')
+            for match in _ANY_ITERATOR_CALL.finditer(code, offset + 1, offset + NESTED_ITERATOR_WINDOW):
+                if match.group(1).upper() == inner:
+                    rows *= estimate_call_rows(code, match.start(), statistics) or 1
+                    break
+
+    if rows is None:
+        known = [
+            statistics.table_rows(match.group(1)) for match in TABLE_COLUMN_PATTERN.finditer(code)
+        ]
+        known = [r for r in known if r is not None]
+        rows = max(known) if known else None
+
+    if row_table is not None:
+        table_rows = statistics.table_rows(row_table)
+        if table_rows is not None:
+            rows = (rows or 1) * table_rows
+
+    return rows
+
+
+def get_location(code: str, offset: int) -> Tuple[int, int]:
+    """Convierte un offset del código en (línea, columna), con línea base 1"""
+    line = code.count('\n', 0, offset) + 1
+    column = offset - (code.rfind('\n', 0, offset) + 1)
+    return line, column
+
+
 def find_repeated_expressions(expressions: List[str]) -> List[str]:
-    """Encuentra expresiones que se repiten en el código"""
-    counts = {}
+    """
+    Encuentra expresiones que se repiten (misma estructura, sin importar formato ni mayúsculas)
+
+    Las expresiones que no se pueden parsear se comparan por su texto con los
+    espacios normalizados.
+
+    Returns:
+        Primera aparición de cada expresión repetida, en orden de aparición
+    """
+    # Ver la nota de importación al inicio del módulo
+    from .dax_ast import SubtreeIndex
+    from .dax_rewriter import parse_expression
+
+    index = SubtreeIndex()
+    counts: Dict[object, int] = {}
+    first: Dict[object, str] = {}
 
     for expr in expressions:
-        normalized = ' '.join(expr.split()).strip()
-        counts[normalized] = counts.get(normalized, 0) + 1
+        root = parse_expression(expr)
+        key = index.add(root) if root is not None else ' '.join(expr.split())
+        counts[key] = counts.get(key, 0) + 1
+        first.setdefault(key, expr)
 
-    return [expr for expr, count in counts.items() if count > 1]
+    return [first[key] for key, count in counts.items() if count > 1]
 
 
 def calculate_metrics(parsed: ParsedDaxExpression) -> PerformanceMetrics:
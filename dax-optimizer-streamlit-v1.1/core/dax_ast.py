@@ -0,0 +1,530 @@
+"""
+Árbol de sintaxis de expresiones DAX
+parse_dax_ast convierte una expresión en nodos inmutables a partir de los
+tokens de dax_lexer, y format_dax la vuelve a imprimir con un formato
+estable: llamadas cortas en una línea y largas con un argumento por línea,
+indentación de 4 espacios y VAR / RETURN en líneas propias.
+
+Los nodos son dataclasses congeladas: dos subárboles con la misma estructura
+son iguales y tienen el mismo hash. Los comentarios y los paréntesis de
+agrupación no se guardan (format_dax agrega los que exige la precedencia).
+Para comparar muchos subárboles, SubtreeIndex les asigna ids estructurales
+(hash-consing) en tiempo lineal, sin recalcular el hash de cada subárbol.
+"""
+
+from typing import List, Dict, Optional, Tuple, Iterator, Callable
+
+from .dataclass_slots import slotted_dataclass
+from .dax_lexer import (
+    tokenize,
+    Token,
+    TOKEN_WHITESPACE,
+    TOKEN_COMMENT,
+    TOKEN_STRING,
+    TOKEN_BRACKET,
+    TOKEN_QUOTED_NAME,
+    TOKEN_NUMBER,
+    TOKEN_KEYWORD,
+    TOKEN_IDENTIFIER,
+    TOKEN_OPERATOR,
+    TOKEN_PAREN_OPEN,
+    TOKEN_PAREN_CLOSE,
+    TOKEN_COMMA,
+    TOKEN_UNKNOWN
+)
+
+
+# Precedencia de los operadores binarios (mayor = se agrupa antes)
+BINARY_PRECEDENCE = {
+    '||': 1,
+    '&&': 2,
+    '=': 4, '==': 4, '<>': 4, '<': 4, '>': 4, '<=': 4, '>=': 4, 'IN': 4,
+    '&': 5,
+    '+': 6, '-': 6,
+    '*': 7, '/': 7,
+    '^': 9,
+}
+_NOT_PRECEDENCE = 3
+_SIGN_PRECEDENCE = 8
+
+INDENT = 4
+MAX_LINE_WIDTH = 80
+
+# Tokens que pueden continuar en la línea siguiente (texto, [nombre] o 'nombre' con salto de línea)
+_MULTILINE_KINDS = (TOKEN_STRING, TOKEN_BRACKET, TOKEN_QUOTED_NAME)
+
+
+class DaxSyntaxError(ValueError):
+    """La expresión no se pudo convertir en un árbol (sintaxis no soportada o inválida)"""
+
+
+@slotted_dataclass(frozen=True)
+class Node:
+    """Nodo del árbol de sintaxis"""
+
+
+@slotted_dataclass(frozen=True)
+class Literal(Node):
+    """Número, texto ("...") o TRUE / FALSE sin paréntesis (texto tal como se escribió)"""
+    text: str
+
+
+@slotted_dataclass(frozen=True)
+class Name(Node):
+    """Tabla o variable (Ventas, 'Mi tabla', _Total) o palabra clave como ASC / DESC"""
+    text: str
+
+
+@slotted_dataclass(frozen=True)
+class Reference(Node):
+    """Tabla[Columna], 'Tabla'[Columna] o [Nombre] (medida o columna del contexto de fila)"""
+    table: str  # Como se escribió ('' sin tabla)
+    name: str   # Con corchetes, como se escribió
+
+    @property
+    def table_name(self) -> str:
+        return self.table[1:-1].replace("''", "'") if self.table.startswith("'") else self.table
+
+    @property
+    def column_name(self) -> str:
+        return self.name[1:-1].replace(']]', ']')
+
+
+@slotted_dataclass(frozen=True)
+class Call(Node):
+    """Llamada a función (nombre en mayúsculas)"""
+    name: str
+    args: Tuple[Node, ...] = ()
+
+
+@slotted_dataclass(frozen=True)
+class Unary(Node):
+    """Signo (-, +) o NOT"""
+    op: str
+    operand: Node
+
+
+@slotted_dataclass(frozen=True)
+class Binary(Node):
+    """Operación binaria (operador en mayúsculas: IN)"""
+    op: str
+    left: Node
+    right: Node
+
+
+@slotted_dataclass(frozen=True)
+class VarBlock(Node):
+    """VAR nombre = expresión ... RETURN cuerpo"""
+    variables: Tuple[Tuple[str, Node], ...]
+    body: Node
+
+
+@slotted_dataclass(frozen=True)
+class TableConstructor(Node):
+    """{ valor, ... } o { (valor, valor), ... }"""
+    rows: Tuple[Node, ...]
+
+
+@slotted_dataclass(frozen=True)
+class Row(Node):
+    """(valor, valor, ...) dentro de un constructor de tabla"""
+    items: Tuple[Node, ...]
+
+
+@slotted_dataclass(frozen=True)
+class Empty(Node):
+    """Argumento omitido (RANKX(Tabla, [Medida], , DESC))"""
+
+
+def children(node: Node) -> Tuple[Node, ...]:
+    """Hijos directos de un nodo, en orden de aparición"""
+    if isinstance(node, Call):
+        return node.args
+    if isinstance(node, Binary):
+        return node.left, node.right
+    if isinstance(node, Unary):
+        return (node.operand,)
+    if isinstance(node, VarBlock):
+        return tuple(value for _, value in node.variables) + (node.body,)
+    if isinstance(node, TableConstructor):
+        return node.rows
+    if isinstance(node, Row):
+        return node.items
+    return ()
+
+
+def with_children(node: Node, new_children: List[Node]) -> Node:
+    """Copia de un nodo con otros hijos (en el orden de children)"""
+    if isinstance(node, Call):
+        return Call(node.name, tuple(new_children))
+    if isinstance(node, Binary):
+        return Binary(node.op, new_children[0], new_children[1])
+    if isinstance(node, Unary):
+        return Unary(node.op, new_children[0])
+    if isinstance(node, VarBlock):
+        names = [name for name, _ in node.variables]
+        return VarBlock(tuple(zip(names, new_children[:-1])), new_children[-1])
+    if isinstance(node, TableConstructor):
+        return TableConstructor(tuple(new_children))
+    if isinstance(node, Row):
+        return Row(tuple(new_children))
+    return node
+
+
+def walk(node: Node) -> Iterator[Node]:
+    """Todos los nodos del árbol en preorden (sin recursión)"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        yield current
+        stack.extend(reversed(children(current)))
+
+
+def transform(node: Node, function: Callable[[Node], Node]) -> Node:
+    """
+    Aplica function a cada nodo de abajo hacia arriba (los hijos ya transformados)
+
+    Los subárboles que no cambian se conservan (mismo objeto).
+    """
+    original = children(node)
+    if original:
+        updated = [transform(child, function) for child in original]
+        if any(new is not old for new, old in zip(updated, original)):
+            node = with_children(node, updated)
+    return function(node)
+
+
+def is_call(node: Node, *names: str) -> bool:
+    """True si el nodo es una llamada a alguna de las funciones"""
+    return isinstance(node, Call) and node.name in names
+
+
+class SubtreeIndex:
+    """
+    Ids estructurales de subárboles (hash-consing)
+
+    Dos subárboles con la misma estructura reciben el mismo id, sin distinguir
+    mayúsculas en nombres de tablas, columnas y variables. La clave de cada
+    nodo es su tipo, su etiqueta y los ids de sus hijos: numerar un árbol
+    cuesta tiempo lineal en su tamaño y un mismo índice se puede compartir
+    entre todas las expresiones del modelo.
+    """
+
+    def __init__(self):
+        self._ids: Dict[tuple, int] = {}
+        self._numbered: Dict[int, Tuple[Node, int]] = {}  # id(nodo) -> (nodo, id estructural)
+        self.nodes: List[Node] = []                        # Primer subárbol con cada id
+        self.sizes: List[int] = []                         # Cantidad de nodos de cada id
+        self.children: List[Tuple[int, ...]] = []          # Ids de los hijos de cada id
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def add(self, root: Node) -> int:
+        """
+        Numera todos los subárboles de root (sin recursión)
+
+        Los subárboles ya numerados (el mismo objeto) no se recorren de nuevo,
+        de modo que volver a agregar un árbol reescrito solo numera los nodos nuevos.
+
+        Returns:
+            Id estructural de root
+        """
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in self._numbered:
+                continue
+            node_children = children(node)
+            if node_children and not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node_children)
+                continue
+
+            child_ids = tuple(self._numbered[id(child)][1] for child in node_children)
+            key = (type(node), _structural_label(node), child_ids)
+            subtree_id = self._ids.get(key)
+            if subtree_id is None:
+                subtree_id = len(self.nodes)
+                self._ids[key] = subtree_id
+                self.nodes.append(node)
+                self.sizes.append(1 + sum(self.sizes[child_id] for child_id in child_ids))
+                self.children.append(child_ids)
+            self._numbered[id(node)] = (node, subtree_id)
+        return self._numbered[id(root)][1]
+
+    def id_of(self, node: Node) -> int:
+        """Id estructural de un nodo ya numerado con add"""
+        return self._numbered[id(node)][1]
+
+
+def _structural_label(node: Node) -> object:
+    """Parte de la clave de SubtreeIndex que no son los hijos"""
+    if isinstance(node, Literal):
+        return node.text if node.text.startswith('"') else node.text.upper()
+    if isinstance(node, Name):
+        return node.text.lower()
+    if isinstance(node, Reference):
+        return node.table_name.lower(), node.column_name.lower()
+    if isinstance(node, Call):
+        return node.name
+    if isinstance(node, (Unary, Binary)):
+        return node.op
+    if isinstance(node, VarBlock):
+        return tuple(name.lower() for name, _ in node.variables)
+    return None
+
+
+class _Parser:
+    """Parser descendente con precedencia de operadores sobre los tokens de una expresión"""
+
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> Optional[Token]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def next(self) -> Token:
+        token = self.peek()
+        if token is None:
+            raise DaxSyntaxError("Fin inesperado de la expresión")
+        self.position += 1
+        return token
+
+    def expect(self, kind: str, text: Optional[str] = None) -> Token:
+        token = self.next()
+        if token.kind != kind or (text is not None and token.text != text):
+            raise DaxSyntaxError(f"Se esperaba {text or kind} y se encontró {token.text!r}")
+        return token
+
+    def at(self, kind: str, text: Optional[str] = None, offset: int = 0) -> bool:
+        token = self.peek(offset)
+        return token is not None and token.kind == kind and (text is None or token.text.upper() == text)
+
+    def parse(self) -> Node:
+        node = self.expression()
+        if self.peek() is not None:
+            raise DaxSyntaxError(f"Token inesperado: {self.peek().text!r}")
+        return node
+
+    def expression(self, min_precedence: int = 0) -> Node:
+        left = self.prefix()
+        while True:
+            token = self.peek()
+            if token is None:
+                return left
+            if token.kind == TOKEN_OPERATOR:
+                op = token.text
+            elif token.kind == TOKEN_KEYWORD and token.text.upper() == 'IN':
+                op = 'IN'
+            else:
+                return left
+            precedence = BINARY_PRECEDENCE.get(op)
+            if precedence is None or precedence <= min_precedence:
+                return left
+            self.position += 1
+            left = Binary(op, left, self.expression(precedence))
+
+    def prefix(self) -> Node:
+        token = self.next()
+        kind, text, upper = token.kind, token.text, token.text.upper()
+
+        if kind == TOKEN_OPERATOR and text in ('-', '+'):
+            return Unary(text, self.expression(_SIGN_PRECEDENCE))
+        if kind == TOKEN_KEYWORD and upper == 'VAR':
+            return self.var_block()
+        if (kind in (TOKEN_IDENTIFIER, TOKEN_KEYWORD)) and self.at(TOKEN_PAREN_OPEN):
+            return self.call(upper)
+        if kind == TOKEN_KEYWORD and upper == 'NOT':
+            return Unary('NOT', self.expression(_NOT_PRECEDENCE))
+        if kind in (TOKEN_IDENTIFIER, TOKEN_QUOTED_NAME):
+            if self.at(TOKEN_BRACKET):
+                return Reference(text, self.next().text)
+            return Name(text)
+        if kind == TOKEN_KEYWORD:
+            return Literal(upper) if upper in ('TRUE', 'FALSE') else Name(upper)
+        if kind == TOKEN_BRACKET:
+            return Reference('', text)
+        if kind in (TOKEN_NUMBER, TOKEN_STRING):
+            return Literal(text)
+        if kind == TOKEN_PAREN_OPEN:
+            items = self.items(TOKEN_PAREN_CLOSE, ')')
+            if len(items) == 1 and not isinstance(items[0], Empty):
+                return items[0]
+            return Row(tuple(items))
+        if kind == TOKEN_UNKNOWN and text == '{':
+            return TableConstructor(tuple(self.items(TOKEN_UNKNOWN, '}')))
+        raise DaxSyntaxError(f"Token inesperado: {text!r}")
+
+    def items(self, close_kind: str, close_text: str) -> List[Node]:
+        """Lista separada por comas hasta el cierre (argumentos omitidos como Empty)"""
+        items: List[Node] = []
+        if self.at(close_kind, close_text):
+            self.position += 1
+            return items
+        while True:
+            if self.at(TOKEN_COMMA) or self.at(close_kind, close_text):
+                items.append(Empty())
+            else:
+                items.append(self.expression())
+            token = self.next()
+            if token.kind == close_kind and token.text == close_text:
+                return items
+            if token.kind != TOKEN_COMMA:
+                raise DaxSyntaxError(f"Se esperaba ',' o {close_text!r} y se encontró {token.text!r}")
+
+    def call(self, name: str) -> Call:
+        self.expect(TOKEN_PAREN_OPEN)
+        return Call(name, tuple(self.items(TOKEN_PAREN_CLOSE, ')')))
+
+    def var_block(self) -> VarBlock:
+        variables = []
+        while True:
+            name = self.next()
+            if name.kind not in (TOKEN_IDENTIFIER, TOKEN_QUOTED_NAME):
+                raise DaxSyntaxError(f"Nombre de variable inválido: {name.text!r}")
+            self.expect(TOKEN_OPERATOR, '=')
+            variables.append((name.text, self.expression()))
+            if self.at(TOKEN_KEYWORD, 'VAR'):
+                self.position += 1
+                continue
+            if not self.at(TOKEN_KEYWORD, 'RETURN'):
+                raise DaxSyntaxError("Se esperaba VAR o RETURN")
+            self.position += 1
+            return VarBlock(tuple(variables), self.expression())
+
+
+def _significant_tokens(code: str) -> List[Token]:
+    """Tokens sin espacios ni comentarios; un texto o nombre que sigue en otra línea se une en uno"""
+    tokens: List[Token] = []
+    previous_line = -1
+    open_multiline = False
+    for line_index, token in tokenize(code):
+        if token.kind in (TOKEN_WHITESPACE, TOKEN_COMMENT):
+            open_multiline = False
+            continue
+        if open_multiline and line_index != previous_line and token.column == 0 and tokens[-1].kind == token.kind:
+            tokens[-1] = Token(token.kind, tokens[-1].text + '\n' + token.text, tokens[-1].column)
+        else:
+            tokens.append(token)
+        # Un token de varias líneas llega hasta el final de la suya sin cerrar
+        open_multiline = token.kind in _MULTILINE_KINDS and not _is_closed(token)
+        previous_line = line_index
+    return tokens
+
+
+def _is_closed(token: Token) -> bool:
+    closing = {TOKEN_STRING: '"', TOKEN_BRACKET: ']', TOKEN_QUOTED_NAME: "'"}[token.kind]
+    return len(token.text) > 1 and token.text.endswith(closing)
+
+
+def parse_dax_ast(code: str) -> Node:
+    """
+    Convierte una expresión DAX en un árbol de sintaxis
+
+    Args:
+        code: Expresión DAX (sin 'Nombre =' de definición)
+
+    Returns:
+        Nodo raíz
+
+    Raises:
+        DaxSyntaxError: Si la expresión no es válida o está demasiado anidada
+    """
+    tokens = _significant_tokens(code)
+    if not tokens:
+        raise DaxSyntaxError("Expresión vacía")
+    try:
+        return _Parser(tokens).parse()
+    except RecursionError:
+        raise DaxSyntaxError("Expresión demasiado anidada") from None
+
+
+def _precedence(node: Node) -> int:
+    if isinstance(node, Binary):
+        return BINARY_PRECEDENCE[node.op]
+    if isinstance(node, Unary):
+        return _NOT_PRECEDENCE if node.op == 'NOT' else _SIGN_PRECEDENCE
+    if isinstance(node, VarBlock):
+        return 0
+    return 100
+
+
+def _operand(node: Node, indent: int, min_precedence: int) -> str:
+    text = _format(node, indent)
+    if _precedence(node) < min_precedence:
+        return f"({text})"
+    return text
+
+
+def _format(node: Node, indent: int) -> str:
+    if isinstance(node, (Literal, Name)):
+        return node.text
+    if isinstance(node, Reference):
+        return node.table + node.name
+    if isinstance(node, Empty):
+        return ''
+    if isinstance(node, Binary):
+        precedence = BINARY_PRECEDENCE[node.op]
+        # Asociatividad a la izquierda: el lado derecho con la misma precedencia necesita paréntesis
+        return f"{_operand(node.left, indent, precedence)} {node.op} {_operand(node.right, indent, precedence + 1)}"
+    if isinstance(node, Unary):
+        precedence = _precedence(node)
+        operand = _operand(node.operand, indent, precedence + (1 if node.op != 'NOT' else 0))
+        return f"NOT {operand}" if node.op == 'NOT' else f"{node.op}{operand}"
+    if isinstance(node, Call):
+        return _format_list(f"{node.name}(", node.args, ')', indent)
+    if isinstance(node, TableConstructor):
+        return _format_list('{', node.rows, '}', indent)
+    if isinstance(node, Row):
+        return _format_list('(', node.items, ')', indent)
+    if isinstance(node, VarBlock):
+        pad = ' ' * indent
+        inner = ' ' * (indent + INDENT)
+        lines = []
+        for name, value in node.variables:
+            text = _format(value, indent + INDENT)
+            if '\n' in text or indent + len(name) + len(text) + 7 > MAX_LINE_WIDTH:
+                lines.append(f"VAR {name} =\n{inner}{text}")
+            else:
+                lines.append(f"VAR {name} = {text}")
+        body = _format(node.body, indent + INDENT)
+        return f"\n{pad}".join(lines) + f"\n{pad}RETURN\n{inner}{body}"
+    raise TypeError(f"Nodo desconocido: {node!r}")
+
+
+def _format_list(opening: str, items: Tuple[Node, ...], closing: str, indent: int) -> str:
+    """Elementos en una línea si entran; si no, uno por línea con indentación"""
+    texts = [_format(item, indent + INDENT) for item in items]
+    flat = opening + ', '.join(texts) + closing
+    if '\n' not in flat and indent + len(flat) <= MAX_LINE_WIDTH:
+        return flat
+    inner = ' ' * (indent + INDENT)
+    return opening + '\n' + ',\n'.join(inner + text for text in texts) + '\n' + ' ' * indent + closing
+
+
+def format_dax(node: Node) -> str:
+    """
+    Imprime un árbol como código DAX
+
+    Args:
+        node: Nodo raíz (parse_dax_ast o un árbol reescrito)
+
+    Returns:
+        Código DAX formateado
+
+    Raises:
+        DaxSyntaxError: Si el árbol está demasiado anidado para imprimirlo
+    """
+    try:
+        return _format(node, 0)
+    except RecursionError:
+        raise DaxSyntaxError("Expresión demasiado anidada") from None
+
+
+def format_inline(node: Node, max_length: int = 80) -> str:
+    """Expresión en una sola línea para títulos y descripciones (recortada a max_length con '…')"""
+    text = ' '.join(format_dax(node).split()).replace('( ', '(').replace(' )', ')')
+    return text if len(text) <= max_length else text[:max_length - 1] + '…'
@@ -0,0 +1,161 @@
+"""
+Lexer de código DAX por líneas
+Tokeniza una línea a la vez a partir del estado con que terminó la anterior
+(dentro de un comentario de bloque, un texto, un [nombre] o un 'nombre'), de
+modo que un editor puede re-tokenizar solo las líneas modificadas.
+"""
+
+import re
+from typing import List, Tuple
+
+from .dataclass_slots import slotted_dataclass
+
+
+# Estados al final de una línea
+STATE_DEFAULT = 0
+STATE_BLOCK_COMMENT = 1   # /* ... sin cerrar
+STATE_STRING = 2          # "... sin cerrar
+STATE_BRACKET = 3         # [... sin cerrar
+STATE_QUOTED_NAME = 4     # '... sin cerrar
+
+# Tipos de token
+TOKEN_WHITESPACE = 'whitespace'
+TOKEN_COMMENT = 'comment'
+TOKEN_STRING = 'string'
+TOKEN_BRACKET = 'bracket'           # [Columna] o [Medida]
+TOKEN_QUOTED_NAME = 'quoted_name'   # 'Tabla con espacios'
+TOKEN_NUMBER = 'number'
+TOKEN_KEYWORD = 'keyword'           # VAR, RETURN, IN, NOT, TRUE, FALSE...
+TOKEN_IDENTIFIER = 'identifier'     # Funciones, tablas y variables
+TOKEN_OPERATOR = 'operator'
+TOKEN_PAREN_OPEN = 'paren_open'
+TOKEN_PAREN_CLOSE = 'paren_close'
+TOKEN_COMMA = 'comma'
+TOKEN_UNKNOWN = 'unknown'
+
+KEYWORDS = frozenset({'VAR', 'RETURN', 'IN', 'NOT', 'AND', 'OR', 'TRUE', 'FALSE', 'DEFINE', 'EVALUATE',
+                      'MEASURE', 'ORDER', 'BY', 'ASC', 'DESC', 'START', 'AT'})
+
+# Token a partir de una posición en estado por defecto (el orden de las alternativas importa)
+_DEFAULT_TOKEN = re.compile(r"""
+    (?P<whitespace>\s+)
+  | (?P<line_comment>(?://|--).*)
+  | (?P<block_comment>/\*)
+  | (?P<string>")
+  | (?P<bracket>\[)
+  | (?P<quoted_name>')
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)
+  | (?P<identifier>[^\W\d]\w*(?:\.\w+)*)
+  | (?P<operator><=|>=|<>|==|&&|\|\||[-+*/^=<>&])
+  | (?P<paren_open>\()
+  | (?P<paren_close>\))
+  | (?P<comma>[,;])
+""", re.VERBOSE)
+
+_BLOCK_COMMENT_END = re.compile(r'\*/')
+_STRING_END = re.compile(r'(?:[^"]|"")*"(?!")')
+_BRACKET_END = re.compile(r'(?:[^\]]|\]\])*\](?!\])')
+_QUOTED_NAME_END = re.compile(r"(?:[^']|'')*'(?!')")
+
+# Estado -> (regex del cierre, tipo de token)
+_CONTINUATIONS = {
+    STATE_BLOCK_COMMENT: (_BLOCK_COMMENT_END, TOKEN_COMMENT),
+    STATE_STRING: (_STRING_END, TOKEN_STRING),
+    STATE_BRACKET: (_BRACKET_END, TOKEN_BRACKET),
+    STATE_QUOTED_NAME: (_QUOTED_NAME_END, TOKEN_QUOTED_NAME),
+}
+
+# Apertura -> (estado si no cierra en la línea, cierre, tipo de token)
+_OPENINGS = {
+    'block_comment': (STATE_BLOCK_COMMENT, _BLOCK_COMMENT_END, TOKEN_COMMENT),
+    'string': (STATE_STRING, _STRING_END, TOKEN_STRING),
+    'bracket': (STATE_BRACKET, _BRACKET_END, TOKEN_BRACKET),
+    'quoted_name': (STATE_QUOTED_NAME, _QUOTED_NAME_END, TOKEN_QUOTED_NAME),
+}
+
+
+@slotted_dataclass(frozen=True)
+class Token:
+    """Token de una línea (columna base 0)"""
+    kind: str
+    text: str
+    column: int
+
+    @property
+    def end_column(self) -> int:
+        return self.column + len(self.text)
+
+
+def lex_line(line: str, state: int = STATE_DEFAULT) -> Tuple[List[Token], int]:
+    """
+    Tokeniza una línea (sin el salto de línea)
+
+    Args:
+        line: Texto de la línea
+        state: Estado con que terminó la línea anterior
+
+    Returns:
+        Tupla (tokens, estado al final de la línea)
+    """
+    tokens: List[Token] = []
+    position = 0
+    length = len(line)
+
+    # Continuación de un token abierto en líneas anteriores
+    if state != STATE_DEFAULT:
+        end_pattern, kind = _CONTINUATIONS[state]
+        match = end_pattern.match(line)
+        if match is None:
+            if line:
+                tokens.append(Token(kind, line, 0))
+            return tokens, state
+        tokens.append(Token(kind, match.group(0), 0))
+        position = match.end()
+
+    while position < length:
+        match = _DEFAULT_TOKEN.match(line, position)
+        if match is None:
+            tokens.append(Token(TOKEN_UNKNOWN, line[position], position))
+            position += 1
+            continue
+
+        group = match.lastgroup
+        if group in _OPENINGS:
+            open_state, end_pattern, kind = _OPENINGS[group]
+            end = end_pattern.match(line, match.end())
+            if end is None:
+                tokens.append(Token(kind, line[position:], position))
+                return tokens, open_state
+            tokens.append(Token(kind, line[position:end.end()], position))
+            position = end.end()
+            continue
+
+        text = match.group(0)
+        if group == 'line_comment':
+            kind = TOKEN_COMMENT
+        elif group == 'identifier':
+            kind = TOKEN_KEYWORD if text.upper() in KEYWORDS else TOKEN_IDENTIFIER
+        else:
+            kind = group
+        tokens.append(Token(kind, text, position))
+        position = match.end()
+
+    return tokens, STATE_DEFAULT
+
+
+def tokenize(code: str) -> List[Tuple[int, Token]]:
+    """
+    Tokeniza un código completo
+
+    Args:
+        code: Código DAX
+
+    Returns:
+        Lista de (línea base 0, token)
+    """
+    result = []
+    state = STATE_DEFAULT
+    for line_index, line in enumerate(code.split('\n')):
+        tokens, state = lex_line(line, state)
+        result.extend((line_index, token) for token in tokens)
+    return result
@@ -4,8 +4,12 @@ Extrae información estructural del código DAX
 """
 
 import re
+from collections import Counter
 from typing import List, Dict, Set, Optional, Tuple
 from dataclasses import dataclass, field
+from .dataclass_slots import slotted_dataclass
+from .analysis_budget import TimeBudget
+from . import instrumentation
 
 # Funciones comunes de DAX
 DAX_FUNCTIONS = [
@@ -31,8 +35,34 @@ ITERATOR_FUNCTIONS = [
     'CONCATENATEX', 'RANKX', 'PRODUCTX', 'MEDIANX', 'PERCENTILX.INC', 'PERCENTILX.EXC'
 ]
 
+_ITERATOR_NAME_PATTERN = re.compile('|'.join(re.escape(f) for f in ITERATOR_FUNCTIONS), re.IGNORECASE)
 
-@dataclass
+_WORD_PATTERN = re.compile(r'\w+')
+
+# Todas las llamadas a DAX_FUNCTIONS en una sola pasada: dos llamadas nunca se
+# solapan y en cada posición coincide a lo sumo un nombre (el nombre debe ir
+# seguido de espacios o del paréntesis)
+_FUNCTION_CALL_PATTERN = re.compile(rf"\b({'|'.join(DAX_FUNCTIONS)})\s*\(", re.IGNORECASE)
+_FUNCTION_ORDER = {name: index for index, name in enumerate(DAX_FUNCTIONS)}
+
+_TABLE_PATTERN = re.compile(
+    r'^\s*[\w\s]+\s*=\s*(FILTER|SUMMARIZE|ADDCOLUMNS|SELECTCOLUMNS|CROSSJOIN|CALENDAR|CALENDARAUTO|GENERATE|DISTINCT|VALUES|ALL)',
+    re.IGNORECASE
+)
+_COLUMN_INDICATORS = re.compile(r'\b(EARLIER|EARLIEST|PATH|PATHITEM)\b', re.IGNORECASE)
+_NAME_PATTERN = re.compile(r'^\s*(\[?[\w\s]+\]?)\s*=')
+_MEASURE_PATTERN = re.compile(r'\[([^\]]+)\]')
+
+_VAR_PATTERN = re.compile(r'\bVAR\s+([\w_]+)\s*=', re.IGNORECASE)
+
+# Tipos de objeto DAX (ParsedDaxExpression.object_type)
+OBJECT_TYPES = ('measure', 'calculated-column', 'calculated-table')
+
+# Patrón para Tabla[Columna] o 'Tabla'[Columna] (nunca cruza un salto de línea)
+TABLE_COLUMN_PATTERN = re.compile(r"['\"]?(\w+)['\"]?\[(\w+)\]")
+
+
+@slotted_dataclass(frozen=True)
 class FunctionCall:
     """Representa una llamada a función en el código"""
     name: str
@@ -42,7 +72,7 @@ class FunctionCall:
     parent: Optional[str] = None
 
 
-@dataclass
+@slotted_dataclass(frozen=True)
 class Variable:
     """Representa una variable DAX"""
     name: str
@@ -63,35 +93,64 @@ class ParsedDaxExpression:
     variables: List[Variable] = field(default_factory=list)
 
 
-def parse_dax_code(code: str) -> ParsedDaxExpression:
+def parse_dax_code(code: str, budget: Optional[TimeBudget] = None,
+                   object_type: Optional[str] = None) -> ParsedDaxExpression:
     """
     Parsea código DAX y extrae información estructural
 
     Args:
         code: Código DAX a parsear
+        budget: Presupuesto de tiempo opcional (se verifica entre etapas)
+        object_type: Tipo de objeto conocido (uno de OBJECT_TYPES, p. ej. desde los
+            metadatos del modelo); None = deducirlo del código con detect_object_type
 
     Returns:
         ParsedDaxExpression con toda la información extraída
+
+    Raises:
+        AnalysisTimeoutError: Si se supera el presupuesto de tiempo
+        ValueError: Si object_type no es un tipo conocido
     """
+    if object_type is not None and object_type not in OBJECT_TYPES:
+        raise ValueError(f"Tipo de objeto desconocido: {object_type}")
+
+    check = budget.check if budget is not None else _no_check
     trimmed_code = code.strip()
 
+    if instrumentation.is_enabled():
+        instrumentation.count('expressions')
+        instrumentation.count('expression_bytes', len(trimmed_code))
+        instrumentation.count('tokens', len(_WORD_PATTERN.findall(trimmed_code)))
+
     # Detectar tipo de objeto
-    object_type = detect_object_type(trimmed_code)
+    if object_type is None:
+        with instrumentation.stage('parse.detect_object_type'):
+            object_type = detect_object_type(trimmed_code)
 
     # Extraer nombre
-    name = extract_name(trimmed_code, object_type)
+    with instrumentation.stage('parse.extract_name'):
+        name = extract_name(trimmed_code, object_type)
 
     # Extraer variables
-    variables = extract_variables(trimmed_code)
+    check('extract_variables')
+    with instrumentation.stage('parse.extract_variables'):
+        variables = extract_variables(trimmed_code)
 
     # Extraer funciones con posición
-    functions = extract_functions(trimmed_code)
+    check('extract_functions')
+    with instrumentation.stage('parse.extract_functions'):
+        functions = extract_functions(trimmed_code)
 
     # Extraer referencias a tablas y columnas
-    tables, columns = extract_table_column_references(trimmed_code)
+    check('extract_table_column_references')
+    with instrumentation.stage('parse.extract_table_column_references'):
+        tables, columns = extract_table_column_references(trimmed_code)
 
     # Extraer referencias a medidas
-    measures = extract_measure_references(trimmed_code)
+    check('extract_measure_references')
+    with instrumentation.stage('parse.extract_measure_references'):
+        measures = extract_measure_references(trimmed_code)
+    check('parse_dax_code')
 
     return ParsedDaxExpression(
         raw=code,
@@ -106,21 +165,18 @@ def parse_dax_code(code: str) -> ParsedDaxExpression:
     )
 
 
+def _no_check(stage: str = "") -> None:
+    """Verificación vacía cuando no hay presupuesto de tiempo"""
+
+
 def detect_object_type(code: str) -> str:
     """Detecta si es medida, columna calculada o tabla calculada"""
     # Tabla calculada: generalmente empieza con nombre = FUNCION_TABLA
-    table_pattern = re.compile(
-        r'^\s*[\w\s]+\s*=\s*(FILTER|SUMMARIZE|ADDCOLUMNS|SELECTCOLUMNS|CROSSJOIN|CALENDAR|CALENDARAUTO|GENERATE|DISTINCT|VALUES|ALL)',
-        re.IGNORECASE
-    )
-
-    # Columna calculada: usa EARLIER o RELATED
-    column_indicators = re.compile(r'\b(EARLIER|EARLIEST|PATH|PATHITEM)\b', re.IGNORECASE)
-
-    if table_pattern.search(code):
+    if _TABLE_PATTERN.search(code):
         return 'calculated-table'
 
-    if column_indicators.search(code):
+    # Columna calculada: usa EARLIER o RELATED
+    if _COLUMN_INDICATORS.search(code):
         return 'calculated-column'
 
     # Por defecto es medida (caso más común)
@@ -130,8 +186,7 @@ def detect_object_type(code: str) -> str:
 def extract_name(code: str, object_type: str) -> Optional[str]:
     """Extrae el nombre del objeto DAX"""
     # Patrón: Nombre = ...
-    name_pattern = re.compile(r'^\s*(\[?[\w\s]+\]?)\s*=')
-    match = name_pattern.search(code)
+    match = _NAME_PATTERN.search(code)
     if match:
         return match.group(1).strip().replace('[', '').replace(']', '')
     return None
@@ -139,22 +194,32 @@ def extract_name(code: str, object_type: str) -> Optional[str]:
 
 def extract_variables(code: str) -> List[Variable]:
     """Extrae variables VAR del código"""
-    var_pattern = re.compile(r'\bVAR\s+([\w_]+)\s*=', re.IGNORECASE)
-    variables = {}
-
     # Encontrar todas las declaraciones VAR
-    for match in var_pattern.finditer(code):
-        var_name = match.group(1)
-        variables[var_name] = 0
+    var_names = find_variable_names(code)
+
+    if not var_names:
+        return []
+
+    # Contar usos en una sola pasada: \bnombre\b equivale a una palabra completa
+    word_counts = Counter(word.lower() for word in _WORD_PATTERN.findall(code))
+    return count_variable_usages(var_names, word_counts)
 
-    # Contar usos (excluyendo la declaración)
-    for var_name in variables.keys():
-        usage_pattern = re.compile(rf'\b{var_name}\b', re.IGNORECASE)
-        matches = usage_pattern.findall(code)
-        # -1 porque no contamos la declaración
-        variables[var_name] = max(0, len(matches) - 1)
 
-    return [Variable(name=name, usage_count=count) for name, count in variables.items()]
+def find_variable_names(code: str) -> List[str]:
+    """Nombres de las variables declaradas con VAR (sin repetir, en orden)"""
+    return list(dict.fromkeys(match.group(1) for match in _VAR_PATTERN.finditer(code)))
+
+
+def count_variable_usages(var_names: List[str], word_counts: Counter) -> List[Variable]:
+    """
+    Variables con su cantidad de usos
+
+    Args:
+        var_names: Nombres declarados (find_variable_names)
+        word_counts: Conteo de palabras en minúsculas de todo el código
+    """
+    # -1 porque no contamos la declaración
+    return [Variable(name=name, usage_count=max(0, word_counts[name.lower()] - 1)) for name in var_names]
 
 
 def extract_functions(code: str) -> List[FunctionCall]:
@@ -163,43 +228,45 @@ def extract_functions(code: str) -> List[FunctionCall]:
     lines = code.split('\n')
 
     for line_idx, line in enumerate(lines):
-        for func_name in DAX_FUNCTIONS:
-            pattern = re.compile(rf'\b{func_name}\s*\(', re.IGNORECASE)
-            for match in pattern.finditer(line):
-                functions.append(FunctionCall(
-                    name=func_name.upper(),
-                    line=line_idx + 1,
-                    column=match.start(),
-                    nested=False
-                ))
-
-    # Detectar iteradores anidados
-    for func in functions:
-        if func.name in ITERATOR_FUNCTIONS:
-            func_line = lines[func.line - 1]
-            after_func = func_line[func.column:]
-
-            # Verificar si hay otro iterador dentro
-            has_nested_iterator = any(
-                iter_func in after_func.upper()
-                for iter_func in ITERATOR_FUNCTIONS
-            )
-
-            if has_nested_iterator:
-                func.nested = True
+        functions.extend(extract_line_functions(line, line_idx + 1))
+
+    return functions
+
+
+def extract_line_functions(line: str, line_number: int) -> List[FunctionCall]:
+    """Llamadas a funciones DAX de una línea (las llamadas no cruzan saltos de línea)"""
+    functions = []
 
+    for match in _FUNCTION_CALL_PATTERN.finditer(line):
+        func_name = match.group(1).upper()
+        functions.append(FunctionCall(
+            name=func_name,
+            line=line_number,
+            column=match.start(),
+            nested=is_nested_iterator(func_name, line, match.start())
+        ))
+
+    # Mismo orden que buscando función por función (orden de DAX_FUNCTIONS, luego columna)
+    if len(functions) > 1:
+        functions.sort(key=lambda call: _FUNCTION_ORDER[call.name])
     return functions
 
 
+def is_nested_iterator(func_name: str, line: str, start: int) -> bool:
+    """Indica si un iterador contiene otro iterador en el resto de su línea"""
+    if func_name not in ITERATOR_FUNCTIONS:
+        return False
+
+    # Verificar si hay otro iterador dentro (búsqueda desde la posición, sin copiar la línea)
+    return _ITERATOR_NAME_PATTERN.search(line, start) is not None
+
+
 def extract_table_column_references(code: str) -> Tuple[List[str], List[str]]:
     """Extrae referencias a tablas y columnas (Tabla[Columna])"""
     tables = set()
     columns = set()
 
-    # Patrón para Tabla[Columna] o 'Tabla'[Columna]
-    table_column_pattern = re.compile(r"['\"]?(\w+)['\"]?\[(\w+)\]")
-
-    for match in table_column_pattern.finditer(code):
+    for match in TABLE_COLUMN_PATTERN.finditer(code):
         tables.add(match.group(1))
         columns.add(f"{match.group(1)}[{match.group(2)}]")
 
@@ -211,18 +278,31 @@ def extract_measure_references(code: str) -> List[str]:
     measures = set()
 
     # Patrón para [Medida]
-    measure_pattern = re.compile(r'\[([^\]]+)\]')
-
-    for match in measure_pattern.finditer(code):
-        # Excluir si es parte de Tabla[Columna]
-        start = max(0, match.start() - 10)
-        before_bracket = code[start:match.start()]
-        if not re.search(r"['\"]?\w+['\"]?$", before_bracket):
+    for match in _MEASURE_PATTERN.finditer(code):
+        # Excluir si es parte de Tabla[Columna] o 'Tabla'[Columna]
+        if not is_column_reference_at(code, match.start()):
             measures.add(match.group(1))
 
     return list(measures)
 
 
+def is_column_reference_at(code: str, bracket_pos: int) -> bool:
+    """Indica si el corchete en bracket_pos sigue a un nombre de tabla (Tabla[ o 'Tabla'[)"""
+    end = bracket_pos
+
+    # Se admite un salto de línea entre la tabla y el corchete (como el $ de la regex original)
+    if end > 0 and code[end - 1] == '\n':
+        end -= 1
+
+    if end == 0:
+        return False
+
+    if code[end - 1] in '\'"':
+        end -= 1
+
+    return end > 0 and _WORD_PATTERN.match(code, end - 1, end) is not None
+
+
 def calculate_complexity(parsed: ParsedDaxExpression) -> int:
     """
     Calcula un score de complejidad (0-100)
@@ -0,0 +1,428 @@
+"""
+Motor de reescritura de expresiones DAX
+Reglas de transformación sobre el árbol de dax_ast que producen la expresión
+optimizada del usuario (no un ejemplo genérico):
+
+- FILTER(ALL(T), predicado) como filtro de CALCULATE -> predicado + REMOVEFILTERS(T)
+- FILTER(T, ...) como filtro de CALCULATE -> KEEPFILTERS(FILTER(T, ...))
+- CALCULATE(CALCULATE(e, f1), f2) -> CALCULATE(e, f1, f2) si los filtros son independientes
+- Subexpresiones repetidas en el mismo contexto de evaluación -> VAR
+
+Cada regla solo reescribe cuando el resultado es equivalente; si no aplica
+retorna None y la sugerencia conserva el ejemplo del catálogo. El árbol no
+guarda los comentarios: las expresiones comentadas no se reescriben.
+"""
+
+import re
+import functools
+from collections import Counter
+from typing import Dict, List, Optional, Callable, Iterable, Set, Tuple
+
+from .dax_ast import (
+    Node,
+    Literal,
+    Name,
+    Reference,
+    Call,
+    Unary,
+    Binary,
+    VarBlock,
+    TableConstructor,
+    Row,
+    DaxSyntaxError,
+    SubtreeIndex,
+    parse_dax_ast,
+    format_dax,
+    format_inline,
+    children,
+    with_children,
+    transform,
+    walk,
+    is_call
+)
+from .dax_lexer import TOKEN_COMMENT, tokenize
+
+
+# Funciones cuyos argumentos desde el segundo son filtros
+FILTER_ARGUMENT_FUNCTIONS = ('CALCULATE', 'CALCULATETABLE')
+
+# Funciones que devuelven todas las filas sin filtros (FILTER sobre ellas no necesita KEEPFILTERS)
+_REMOVE_FILTER_FUNCTIONS = ('ALL', 'ALLNOBLANKROW', 'ALLSELECTED', 'ALLEXCEPT', 'REMOVEFILTERS')
+
+# Funciones escalares que evalúan sus argumentos en el mismo contexto que la llamada:
+# una subexpresión dentro de ellas se puede mover a una VAR del nivel superior
+CONTEXT_PRESERVING_FUNCTIONS = frozenset({
+    'IF', 'IF.EAGER', 'SWITCH', 'DIVIDE', 'COALESCE', 'AND', 'OR', 'NOT', 'ISBLANK', 'IFERROR',
+    'ABS', 'ROUND', 'ROUNDUP', 'ROUNDDOWN', 'INT', 'TRUNC', 'SIGN', 'SQRT', 'POWER', 'EXP', 'LN', 'LOG',
+    'FORMAT', 'CONCATENATE', 'VALUE', 'CONVERT', 'CURRENCY', 'FIXED'
+})
+
+# Funciones cuyo resultado cambia entre evaluaciones o que no vale la pena guardar en una VAR
+_NOT_HOISTED = frozenset({'NOW', 'TODAY', 'UTCNOW', 'UTCTODAY', 'RAND', 'RANDBETWEEN', 'BLANK', 'TRUE',
+                          'FALSE', 'PI'})
+
+# Funciones escalares sin contexto con argumentos constantes (DATE(2024, 1, 1), BLANK())
+_CONSTANT_FUNCTIONS = frozenset({'DATE', 'TIME', 'DATEVALUE', 'TIMEVALUE', 'BLANK', 'TRUE', 'FALSE'})
+
+_COMPARISON_OPERATORS = frozenset({'=', '==', '<>', '<', '>', '<=', '>=', 'IN'})
+
+_VARIABLE_WORD = re.compile(r'\w+')
+
+# Encabezado de una definición escrita a mano ('Ventas Totales = ...', '[Margen] := ...')
+_DEFINITION_HEADER = re.compile(r"^\s*(\[[^\]]+\]|[^\W\d][\w ]*?)\s*:?=(?!=)")
+
+# Variables introducidas por el motor
+VARIABLE_PREFIX = '_'
+
+
+def is_constant(node: Node) -> bool:
+    """True si el valor no depende del contexto (literal, variable, constructor de constantes)"""
+    if isinstance(node, (Literal, Name)):
+        return True
+    if isinstance(node, Unary):
+        return node.op in ('-', '+') and is_constant(node.operand)
+    if isinstance(node, Call):
+        return node.name in _CONSTANT_FUNCTIONS and all(is_constant(arg) for arg in node.args)
+    if isinstance(node, (TableConstructor, Row)):
+        return all(is_constant(item) for item in children(node))
+    return False
+
+
+def predicate_columns(node: Node) -> Optional[Set[Tuple[str, str]]]:
+    """
+    Columnas de un predicado de columna ('tabla', 'columna' en minúsculas)
+
+    Un predicado compara columnas Tabla[Columna] con valores constantes
+    (combinados con &&, || y NOT), de modo que se evalúa igual como filtro de
+    CALCULATE que dentro de FILTER.
+
+    Returns:
+        Columnas filtradas, o None si no es un predicado de columna
+    """
+    if isinstance(node, Unary) and node.op == 'NOT':
+        return predicate_columns(node.operand)
+    if is_call(node, 'NOT') and len(node.args) == 1:
+        return predicate_columns(node.args[0])
+    if isinstance(node, Binary) and node.op in ('&&', '||'):
+        left, right = predicate_columns(node.left), predicate_columns(node.right)
+        return left | right if left is not None and right is not None else None
+    if isinstance(node, Binary) and node.op in _COMPARISON_OPERATORS:
+        column, value = node.left, node.right
+        if not isinstance(column, Reference) and node.op != 'IN':
+            column, value = value, column
+        if isinstance(column, Reference) and column.table and is_constant(value):
+            return {(column.table_name.lower(), column.column_name.lower())}
+    return None
+
+
+def _filter_table(node: Node) -> Optional[Name]:
+    """Tabla de FILTER(ALL(Tabla), ...) (None si no tiene esa forma)"""
+    if is_call(node, 'FILTER') and len(node.args) == 2:
+        source = node.args[0]
+        if is_call(source, 'ALL') and len(source.args) == 1 and isinstance(source.args[0], Name):
+            return source.args[0]
+    return None
+
+
+def rewrite_all_in_filter(root: Node) -> Optional[Node]:
+    """
+    FILTER(ALL(T), predicado) como filtro de CALCULATE -> predicado, REMOVEFILTERS(T)
+
+    El predicado debe usar solo columnas de T con valores constantes; REMOVEFILTERS
+    conserva el efecto de ALL(T) sobre las demás columnas de la tabla.
+    """
+    def rewrite(node: Node) -> Node:
+        if not is_call(node, *FILTER_ARGUMENT_FUNCTIONS):
+            return node
+        args = list(node.args[:1])
+        removed: List[Node] = []
+        for arg in node.args[1:]:
+            table = _filter_table(arg)
+            columns = predicate_columns(arg.args[1]) if table is not None else None
+            if columns and {name for name, _ in columns} == {_table_key(table.text)}:
+                args.append(arg.args[1])
+                if Call('REMOVEFILTERS', (table,)) not in removed:
+                    removed.append(Call('REMOVEFILTERS', (table,)))
+            else:
+                args.append(arg)
+        if not removed:
+            return node
+        return Call(node.name, tuple(args + removed))
+
+    return _changed(root, transform(root, rewrite))
+
+
+def rewrite_keepfilters(root: Node) -> Optional[Node]:
+    """FILTER(T, ...) como filtro de CALCULATE -> KEEPFILTERS(FILTER(T, ...)) (no sobre ALL/REMOVEFILTERS)"""
+    def rewrite(node: Node) -> Node:
+        if not is_call(node, *FILTER_ARGUMENT_FUNCTIONS):
+            return node
+        args = list(node.args)
+        for index in range(1, len(args)):
+            arg = args[index]
+            if is_call(arg, 'FILTER') and arg.args and not is_call(arg.args[0], *_REMOVE_FILTER_FUNCTIONS):
+                args[index] = Call('KEEPFILTERS', (arg,))
+        return Call(node.name, tuple(args)) if args != list(node.args) else node
+
+    return _changed(root, transform(root, rewrite))
+
+
+def rewrite_nested_calculate(root: Node) -> Optional[Node]:
+    """
+    CALCULATE(CALCULATE(e, f1), f2) -> CALCULATE(e, f1, f2)
+
+    Solo si todos los filtros son predicados de columna y los de adentro y los
+    de afuera filtran columnas distintas: con la misma columna, el filtro
+    interno reemplaza al externo y combinarlos cambiaría el resultado.
+    """
+    def rewrite(node: Node) -> Node:
+        if not is_call(node, *FILTER_ARGUMENT_FUNCTIONS) or not node.args:
+            return node
+        inner = node.args[0]
+        if not is_call(inner, node.name) or not inner.args:
+            return node
+
+        inner_columns = _filter_columns(inner.args[1:])
+        outer_columns = _filter_columns(node.args[1:])
+        if inner_columns is None or outer_columns is None or inner_columns & outer_columns:
+            return node
+        return Call(node.name, inner.args + node.args[1:])
+
+    return _changed(root, transform(root, rewrite))
+
+
+def _filter_columns(filters: Iterable[Node]) -> Optional[Set[Tuple[str, str]]]:
+    columns: Set[Tuple[str, str]] = set()
+    for node in filters:
+        found = predicate_columns(node)
+        if not found:
+            return None
+        columns |= found
+    return columns
+
+
+def _is_hoistable(node: Node) -> bool:
+    """Subexpresiones que vale la pena guardar en una VAR: llamadas y referencias a medidas"""
+    if isinstance(node, Call):
+        return node.name not in _NOT_HOISTED and bool(node.args)
+    return isinstance(node, Reference) and not node.table
+
+
+def _preserves_context(node: Node) -> bool:
+    return isinstance(node, (Binary, Unary)) or is_call(node, *CONTEXT_PRESERVING_FUNCTIONS)
+
+
+def hoisting_candidates(body: Node, index: SubtreeIndex) -> Counter:
+    """
+    Subexpresiones del cuerpo evaluadas en el contexto de la medida, con su cantidad de apariciones
+
+    Se recorre solo a través de operadores y de CONTEXT_PRESERVING_FUNCTIONS: dentro
+    de un iterador (contexto de fila) o de CALCULATE (otro contexto de filtro) la
+    misma subexpresión puede dar otro valor y no se puede mover a una VAR.
+
+    Returns:
+        Counter {id estructural (index): apariciones}
+    """
+    index.add(body)
+    counts: Counter = Counter()
+    stack = [body]
+    while stack:
+        node = stack.pop()
+        if _is_hoistable(node):
+            counts[index.id_of(node)] += 1
+        if _preserves_context(node):
+            stack.extend(children(node))
+    return counts
+
+
+def repeated_subexpressions(root: Node, index: Optional[SubtreeIndex] = None) -> List[Tuple[Node, int]]:
+    """
+    Subexpresiones repetidas en el contexto de la medida (candidatas a VAR)
+
+    Args:
+        root: Árbol de la expresión (de un VAR / RETURN se revisa el cuerpo)
+        index: Índice de subárboles a reutilizar (None = uno nuevo)
+
+    Returns:
+        (subexpresión, apariciones), de la más grande a la más chica
+    """
+    index = index if index is not None else SubtreeIndex()
+    body = root.body if isinstance(root, VarBlock) else root
+    repeated = [(subtree_id, count) for subtree_id, count in hoisting_candidates(body, index).items() if count > 1]
+    repeated.sort(key=lambda item: -index.sizes[item[0]])
+    return [(index.nodes[subtree_id], count) for subtree_id, count in repeated]
+
+
+def _replace_in_context(node: Node, target_id: int, replacement: Node, index: SubtreeIndex) -> Node:
+    """Reemplaza el subárbol target_id solo en las posiciones que recorre hoisting_candidates"""
+    if index.id_of(node) == target_id:
+        return replacement
+    if _preserves_context(node):
+        original = children(node)
+        updated = [_replace_in_context(child, target_id, replacement, index) for child in original]
+        if any(new is not old for new, old in zip(updated, original)):
+            return with_children(node, updated)
+    return node
+
+
+def _variable_name(node: Node, used: Set[str]) -> str:
+    """Nombre para una VAR nueva: _NombreMedida o _Funcion, con número si ya existe"""
+    if isinstance(node, Reference):
+        base = ''.join(word[:1].upper() + word[1:] for word in _VARIABLE_WORD.findall(node.column_name))
+    else:
+        base = node.name.title().replace('.', '')
+    if not base or base[0].isdigit():
+        base = 'Valor'
+    name = VARIABLE_PREFIX + base
+    suffix = 1
+    while name.lower() in used:
+        suffix += 1
+        name = f"{VARIABLE_PREFIX}{base}{suffix}"
+    used.add(name.lower())
+    return name
+
+
+def hoist_repeated_expressions(root: Node) -> Optional[Node]:
+    """
+    Mueve a VAR las subexpresiones repetidas en el contexto de la medida
+
+    Se repite desde la subexpresión más grande: al reemplazarla, sus partes
+    solo quedan repetidas si también aparecen fuera de ella. Las VAR nuevas se
+    agregan después de las existentes (pueden usarlas). Las subexpresiones se
+    comparan por id estructural (SubtreeIndex), así que cada pasada es lineal.
+    """
+    if isinstance(root, VarBlock):
+        variables, body = list(root.variables), root.body
+    else:
+        variables, body = [], root
+
+    used = {name.lower() for name, _ in variables}
+    used.update(node.text.lower() for node in walk(root) if isinstance(node, Name))
+    index = SubtreeIndex()
+    added = False
+
+    while True:
+        repeated = [subtree_id for subtree_id, count in hoisting_candidates(body, index).items() if count > 1]
+        if not repeated:
+            break
+        target_id = max(repeated, key=lambda subtree_id: index.sizes[subtree_id])
+        target = index.nodes[target_id]
+        name = _variable_name(target, used)
+        variables.append((name, target))
+        body = _replace_in_context(body, target_id, Name(name), index)
+        added = True
+
+    if not added:
+        return None
+    return VarBlock(tuple(variables), body)
+
+
+def _table_key(text: str) -> str:
+    return (text[1:-1].replace("''", "'") if text.startswith("'") else text).lower()
+
+
+def _changed(original: Node, rewritten: Node) -> Optional[Node]:
+    return rewritten if rewritten is not original else None
+
+
+# Reglas por plantilla de sugerencia (rule_catalog.SUGGESTION_TEMPLATES)
+REWRITE_RULES: Dict[str, Callable[[Node], Optional[Node]]] = {
+    'optimize-all-filter': rewrite_all_in_filter,
+    'add-keepfilters': rewrite_keepfilters,
+    'flatten-calculate': rewrite_nested_calculate,
+    'add-variables': hoist_repeated_expressions,
+    'add-variables-generic': hoist_repeated_expressions,
+}
+
+
+def rewrite_dax(code: str, template_ids: Iterable[str]) -> Dict[str, str]:
+    """
+    Expresión reescrita por la regla de cada plantilla de sugerencia
+
+    Args:
+        code: Expresión DAX original
+        template_ids: Plantillas de las sugerencias generadas (las que no tienen regla se ignoran)
+
+    Returns:
+        {plantilla: código DAX formateado} solo para las reglas que cambiaron la
+        expresión; vacío si la expresión no se pudo parsear o tiene comentarios
+        (el código formateado los perdería)
+    """
+    rules = [template_id for template_id in dict.fromkeys(template_ids) if template_id in REWRITE_RULES]
+    if not rules or has_comments(code):
+        return {}
+
+    root = parse_expression(code)
+    if root is None:
+        return {}
+
+    header = split_definition(code)[0]
+    try:
+        rewritten = {}
+        for template_id in rules:
+            node = REWRITE_RULES[template_id](root)
+            if node is not None:
+                rewritten[template_id] = join_definition(header, format_dax(node))
+        return rewritten
+    except RecursionError:
+        return {}
+
+
+@functools.lru_cache(maxsize=64)
+def parse_expression(code: str) -> Optional[Node]:
+    """
+    Árbol de una expresión o definición ('Nombre = ...' sin el encabezado)
+
+    En el worker, las reglas de dax_analyzer y rewrite_dax parsean la misma
+    expresión: la caché (los nodos son inmutables) evita construir el árbol dos veces.
+
+    Returns:
+        Raíz del árbol, o None si la expresión no se pudo parsear
+    """
+    try:
+        return parse_dax_ast(split_definition(code)[1])
+    except (DaxSyntaxError, RecursionError):
+        return None
+
+
+def largest_repeated_call(code: str) -> Optional[Tuple[str, int]]:
+    """
+    Llamada más grande que se repite en el contexto de la medida
+
+    Returns:
+        (llamada en una línea, apariciones), o None si no hay o la expresión no se pudo parsear
+    """
+    root = parse_expression(code)
+    if root is None:
+        return None
+    for node, count in repeated_subexpressions(root):
+        if isinstance(node, Call):
+            return format_inline(node), count
+    return None
+
+
+def has_comments(code: str) -> bool:
+    """True si el código tiene comentarios // -- o /* */ (fuera de textos y nombres)"""
+    if '//' not in code and '--' not in code and '/*' not in code:
+        return False
+    return any(token.kind == TOKEN_COMMENT for _, token in tokenize(code))
+
+
+def split_definition(code: str) -> Tuple[Optional[str], str]:
+    """
+    Separa el encabezado 'Nombre =' de una definición de su expresión
+
+    Returns:
+        (nombre o None si el código es solo la expresión, expresión)
+    """
+    match = _DEFINITION_HEADER.match(code)
+    if match is None or match.group(1).split(' ', 1)[0].upper() in ('VAR', 'DEFINE', 'EVALUATE'):
+        return None, code
+    return match.group(1).strip(), code[match.end():]
+
+
+def join_definition(header: Optional[str], code: str) -> str:
+    """Inversa de split_definition: antepone 'Nombre =' a la expresión (si hay nombre)"""
+    if header is None:
+        return code
+    return f"{header} =\n{code}" if '\n' in code else f"{header} = {code}"
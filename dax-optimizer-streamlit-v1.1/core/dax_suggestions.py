@@ -2,25 +2,72 @@
 Generador de sugerencias de optimización para código DAX
 """
 
-import re
-from typing import List
-from dataclasses import dataclass
+from typing import List, Dict, Tuple, Optional, Iterable
+from .dataclass_slots import slotted_dataclass
 from .dax_parser import ParsedDaxExpression
 from .dax_analyzer import Issue
+# SuggestionTemplate y SUGGESTION_TEMPLATES se siguen importando desde este módulo
+from .rule_catalog import SUGGESTION_TEMPLATES, SuggestionTemplate, get_rule, get_suggestion_template, get_text
+from .instrumentation import timed
 
 
-@dataclass
+@slotted_dataclass(frozen=True)
 class Suggestion:
-    """Sugerencia de optimización para código DAX"""
+    """
+    Sugerencia de optimización para código DAX (referencia a una plantilla del catálogo)
+
+    Con los parámetros 'original' y 'rewritten' el código de la sugerencia es la
+    expresión del usuario y su reescritura; sin ellos, el ejemplo de la plantilla.
+    El parámetro 'comments_removed' marca las reescrituras que no conservan los
+    comentarios del original.
+    """
     id: str
-    title: str
-    description: str
-    original_code: str
-    suggested_code: str
-    impact: str  # 'high', 'medium', 'low'
-    reason: str
+    template_id: str
+    params: Tuple[Tuple[str, object], ...] = ()
+
+    @property
+    def template(self) -> SuggestionTemplate:
+        return get_suggestion_template(self.template_id)
+
+    @property
+    def title(self) -> str:
+        return get_text(self.template_id, 'title', self.params)
+
+    @property
+    def description(self) -> str:
+        return get_text(self.template_id, 'description', self.params)
+
+    @property
+    def original_code(self) -> str:
+        return self._code('original') or get_text(self.template_id, 'original_code', self.params)
 
+    @property
+    def suggested_code(self) -> str:
+        return self._code('rewritten') or get_text(self.template_id, 'suggested_code', self.params)
 
+    @property
+    def is_rewrite(self) -> bool:
+        """True si el código sugerido es la expresión del usuario reescrita (no un ejemplo)"""
+        return self._code('rewritten') is not None
+
+    @property
+    def comments_removed(self) -> bool:
+        """True si la reescritura omite comentarios de la expresión original"""
+        return bool(self._code('comments_removed'))
+
+    @property
+    def impact(self) -> str:
+        return self.template.impact
+
+    @property
+    def reason(self) -> str:
+        return get_text(self.template_id, 'reason', self.params)
+
+    def _code(self, name: str) -> Optional[str]:
+        return next((value for key, value in self.params if key == name), None)
+
+
+@timed('suggestions.generate_suggestions')
 def generate_suggestions(parsed: ParsedDaxExpression, issues: List[Issue]) -> List[Suggestion]:
     """
     Genera sugerencias de optimización basadas en los problemas detectados
@@ -32,151 +79,70 @@ def generate_suggestions(parsed: ParsedDaxExpression, issues: List[Issue]) -> Li
     Returns:
         Lista de sugerencias de optimización
     """
-    suggestions = []
+    template_ids = []
 
-    # Generar sugerencias basadas en los issues
+    # Generar sugerencias basadas en los issues (la regla indica su plantilla)
     for issue in issues:
-        if issue.id == 'nested-iterators':
-            suggestions.append(generate_nested_iterator_suggestion(parsed))
-        elif issue.id == 'filter-without-keepfilters':
-            suggestions.append(generate_keepfilters_suggestion(parsed))
-        elif issue.id in ['missing-variables', 'no-variables-complex']:
-            suggestions.append(generate_variable_suggestion(parsed))
-        elif issue.id == 'nested-calculate':
-            suggestions.append(generate_flatten_calculate_suggestion(parsed))
-        elif issue.id == 'all-in-filter':
-            suggestions.append(generate_all_in_filter_suggestion(parsed))
+        template_id = get_rule(issue.id).suggestion
+        if template_id:
+            template_ids.append(template_id)
 
     # Sugerencia genérica de variables si hay expresiones repetidas
     if len(parsed.variables) == 0 and len(parsed.functions) > 3:
         var_suggestion = generate_generic_variable_suggestion(parsed)
-        if var_suggestion and not any(s.id == 'add-variables' for s in suggestions):
-            suggestions.append(var_suggestion)
+        if var_suggestion and not any(get_suggestion_template(t).id == 'add-variables' for t in template_ids):
+            template_ids.append(var_suggestion.template_id)
 
-    return suggestions
+    if not template_ids:
+        return []
 
+    # Varias reglas pueden pedir la misma plantilla (p. ej. add-variables): una sugerencia por plantilla
+    template_ids = list(dict.fromkeys(template_ids))
 
-def generate_nested_iterator_suggestion(parsed: ParsedDaxExpression) -> Suggestion:
-    """Sugerencia para eliminar iteradores anidados"""
-    example = """-- ❌ Original (nested iterators):
-SUMX(
-    Tabla1,
-    SUMX(
-        FILTER(Tabla2, Tabla2[ID] = Tabla1[ID]),
-        Tabla2[Valor]
-    )
-)
-
--- ✅ Optimizado (usando variables y relaciones):
-SUMX(
-    Tabla1,
-    VAR TablaFiltrada =
-        FILTER(Tabla2, Tabla2[ID] = Tabla1[ID])
-    RETURN
-        CALCULATE(SUM(Tabla2[Valor]), TablaFiltrada)
-)
-
--- ✅ Mejor aún (si existe relación):
-SUMX(
-    Tabla1,
-    CALCULATE(SUM(Tabla2[Valor]))
-)"""
+    # Con la expresión reescrita por el motor de reescritura, el código es el del usuario
+    # (se importa al primer uso: el árbol sintáctico no forma parte del arranque)
+    from .dax_rewriter import rewrite_dax
+    rewritten = rewrite_dax(parsed.raw, template_ids)
+    original = parsed.raw.strip()
+    return [
+        create_suggestion(template_id, (('original', original), ('rewritten', rewritten[template_id])))
+        if template_id in rewritten else create_suggestion(template_id)
+        for template_id in template_ids
+    ]
 
+
+def create_suggestion(template_id: str, params: Tuple[Tuple[str, object], ...] = ()) -> Suggestion:
+    """Crea una sugerencia a partir de una plantilla del catálogo"""
     return Suggestion(
-        id='optimize-nested-iterators',
-        title='Eliminar iteradores anidados',
-        description='Refactoriza para evitar iterar múltiples veces',
-        original_code='Patrón detectado: SUMX(..., SUMX(...))',
-        suggested_code=example,
-        impact='high',
-        reason='Reduce complejidad de O(n²) a O(n), mejorando drásticamente la performance en tablas grandes.'
+        id=get_suggestion_template(template_id).id,
+        template_id=template_id,
+        params=params
     )
 
 
+def generate_nested_iterator_suggestion(parsed: ParsedDaxExpression) -> Suggestion:
+    """Sugerencia para eliminar iteradores anidados"""
+    return create_suggestion('optimize-nested-iterators')
+
+
 def generate_keepfilters_suggestion(parsed: ParsedDaxExpression) -> Suggestion:
     """Sugerencia para usar KEEPFILTERS"""
-    return Suggestion(
-        id='add-keepfilters',
-        title='Usar KEEPFILTERS para mantener contexto',
-        description='Envuelve FILTER con KEEPFILTERS',
-        original_code='CALCULATE([Medida], FILTER(...))',
-        suggested_code='CALCULATE([Medida], KEEPFILTERS(FILTER(...)))',
-        impact='medium',
-        reason='KEEPFILTERS respeta los filtros existentes en lugar de sobrescribirlos, evitando resultados inesperados.'
-    )
+    return create_suggestion('add-keepfilters')
 
 
 def generate_variable_suggestion(parsed: ParsedDaxExpression) -> Suggestion:
     """Sugerencia para usar variables"""
-    # Ejemplo genérico de uso de variables
-    example = """-- ✅ Patrón recomendado:
-VAR Ventas = SUM(Tabla[Ventas])
-VAR Costos = SUM(Tabla[Costos])
-VAR Margen = Ventas - Costos
-RETURN
-    DIVIDE(Margen, Ventas)
-
--- O para cálculos complejos:
-VAR MiCalculo = CALCULATE(...)
-RETURN
-    IF(MiCalculo > 0, MiCalculo, BLANK())"""
-
-    return Suggestion(
-        id='add-variables',
-        title='Introducir variables (VAR)',
-        description='Almacena cálculos intermedios en variables',
-        original_code='Expresiones repetidas o código sin variables',
-        suggested_code=example,
-        impact='medium',
-        reason='Las variables se evalúan una sola vez y se reutilizan, mejorando performance y legibilidad.'
-    )
+    return create_suggestion('add-variables')
 
 
 def generate_flatten_calculate_suggestion(parsed: ParsedDaxExpression) -> Suggestion:
     """Sugerencia para aplanar CALCULATEs anidados"""
-    return Suggestion(
-        id='flatten-calculate',
-        title='Aplanar CALCULATEs anidados',
-        description='Combina múltiples CALCULATE en uno solo',
-        original_code="""CALCULATE(
-    CALCULATE([Medida], Filtro1),
-    Filtro2
-)""",
-        suggested_code="""CALCULATE(
-    [Medida],
-    Filtro1,
-    Filtro2
-)""",
-        impact='medium',
-        reason='Elimina transiciones de contexto innecesarias, reduciendo overhead de evaluación.'
-    )
+    return create_suggestion('flatten-calculate')
 
 
 def generate_all_in_filter_suggestion(parsed: ParsedDaxExpression) -> Suggestion:
     """Sugerencia para optimizar ALL en FILTER"""
-    return Suggestion(
-        id='optimize-all-filter',
-        title='Optimizar uso de ALL en FILTER',
-        description='Usa CALCULATE en lugar de FILTER(ALL(...))',
-        original_code="""FILTER(
-    ALL(Tabla),
-    Tabla[Columna] = Valor
-)""",
-        suggested_code="""CALCULATE(
-    VALUES(Tabla),
-    Tabla[Columna] = Valor,
-    REMOVEFILTERS(Tabla)
-)
-
--- O mejor, si solo filtras una columna:
-CALCULATETABLE(
-    VALUES(Tabla),
-    Tabla[Columna] = Valor,
-    REMOVEFILTERS(Tabla)
-)""",
-        impact='high',
-        reason='CALCULATE puede aprovechar índices y optimizaciones del motor, mientras que FILTER(ALL(...)) itera todas las filas.'
-    )
+    return create_suggestion('optimize-all-filter')
 
 
 def generate_generic_variable_suggestion(parsed: ParsedDaxExpression) -> Suggestion:
@@ -185,22 +151,14 @@ def generate_generic_variable_suggestion(parsed: ParsedDaxExpression) -> Suggest
     if not parsed.measures:
         return None
 
-    return Suggestion(
-        id='add-variables',
-        title='Considerar uso de variables',
-        description='Tu código tiene múltiples funciones. Variables pueden mejorar la legibilidad y potencialmente la performance.',
-        original_code='Código actual sin variables',
-        suggested_code="""-- Patrón recomendado:
-VAR Paso1 = CALCULATE(...)
-VAR Paso2 = FILTER(...)
-VAR Resultado = SUMX(Paso2, ...)
-RETURN
-    Resultado""",
-        impact='low',
-        reason='Variables hacen el código más mantenible y pueden prevenir recálculos innecesarios.'
-    )
+    return create_suggestion('add-variables-generic')
+
+
+# Puntos que resta cada issue según su severidad
+SEVERITY_PENALTIES = {'critical': 25, 'warning': 10, 'info': 5}
 
 
+@timed('score.calculate_score')
 def calculate_score(parsed: ParsedDaxExpression, issues: List[Issue]) -> int:
     """
     Calcula un score de calidad del código (0-100)
@@ -209,6 +167,21 @@ def calculate_score(parsed: ParsedDaxExpression, issues: List[Issue]) -> int:
         parsed: Expresión DAX parseada
         issues: Lista de problemas detectados
 
+    Returns:
+        Score entre 0 y 100
+    """
+    return score_issues(issues, bool(parsed.variables), len(parsed.functions))
+
+
+def score_issues(issues: Iterable[Issue], has_variables: bool = False, function_count: int = 0) -> int:
+    """
+    Score (0-100) a partir de los issues y de los datos de la expresión que usa calculate_score
+
+    Args:
+        issues: Problemas detectados
+        has_variables: La expresión usa VAR (bonus)
+        function_count: Llamadas a funciones de la expresión (más de 10 penaliza)
+
     Returns:
         Score entre 0 y 100
     """
@@ -216,19 +189,34 @@ def calculate_score(parsed: ParsedDaxExpression, issues: List[Issue]) -> int:
 
     # Restar puntos por problemas
     for issue in issues:
-        if issue.severity == 'critical':
-            score -= 25
-        elif issue.severity == 'warning':
-            score -= 10
-        elif issue.severity == 'info':
-            score -= 5
+        score -= SEVERITY_PENALTIES.get(issue.severity, 0)
 
     # Bonus por buenas prácticas
-    if parsed.variables:
+    if has_variables:
         score += 5
 
     # Penalizar alta complejidad
-    if len(parsed.functions) > 10:
+    if function_count > 10:
         score -= 10
 
     return max(0, min(100, score))
+
+
+def recalculate_score(analyzed: Dict) -> int:
+    """
+    Score de un objeto analizado con su lista de issues actual
+
+    Para las pasadas que agregan o quitan issues después del análisis (p. ej.
+    relationship_graph): el score se recalcula desde los issues y las métricas,
+    no se ajusta sobre el score anterior (que ya está acotado a 0-100).
+
+    Args:
+        analyzed: Resultado de analysis_runner.analyze_measures ('issues', 'metrics')
+
+    Returns:
+        Score entre 0 y 100
+    """
+    metrics = analyzed.get('metrics')
+    if metrics is None:
+        return score_issues(analyzed['issues'])
+    return score_issues(analyzed['issues'], metrics.variables_used > 0, metrics.function_count)
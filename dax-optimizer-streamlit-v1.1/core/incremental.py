@@ -0,0 +1,406 @@
+"""
+Análisis incremental de una expresión DAX en edición (estilo language server)
+La sesión guarda por línea los tokens y los datos que extrae el parser
+(funciones, palabras, referencias Tabla[Columna]); al aplicar una edición solo
+se re-tokenizan y re-parsean las líneas afectadas, y solo se vuelven a ejecutar
+las reglas cuyas entradas cambiaron. Los diagnósticos son los mismos que
+devuelve analysis_runner.analyze_expression sobre el texto completo.
+"""
+
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from typing import List, Dict, Optional, Iterable, Tuple
+
+from .dataclass_slots import slotted_dataclass
+from .analysis_budget import TimeBudget
+from .dax_lexer import Token, lex_line, STATE_DEFAULT
+from .dax_parser import (
+    ParsedDaxExpression,
+    FunctionCall,
+    TABLE_COLUMN_PATTERN,
+    detect_object_type,
+    extract_name,
+    extract_line_functions,
+    extract_measure_references,
+    find_variable_names,
+    count_variable_usages
+)
+from .dax_analyzer import ANALYSIS_RULES, Issue, PerformanceMetrics, calculate_metrics
+from .dax_suggestions import Suggestion, generate_suggestions, calculate_score
+
+
+# Campos de ParsedDaxExpression que lee cada regla: si ninguno cambió desde el
+# último diagnóstico, se reutilizan sus issues
+RULE_INPUTS: Dict[str, Tuple[str, ...]] = {
+    'check_nested_iterators': ('raw',),
+    'check_filter_without_keepfilters': ('raw',),
+    'check_missing_variables': ('raw', 'functions', 'variables'),
+    'check_calculate_nesting': ('raw',),
+    'check_all_in_filter': ('raw',),
+    'check_expensive_functions': ('raw',),
+    'check_context_transitions': ('object_type', 'measures'),
+    'check_calculated_column_refresh_cost': ('object_type', 'raw'),
+    'check_calculated_table_refresh_cost': ('object_type', 'raw'),
+    'check_calculated_columns_in_measures': ('object_type', 'raw'),
+    'check_repeated_expressions': ('raw', 'measures', 'variables'),
+    'check_repeated_subexpressions': ('raw', 'functions'),
+}
+
+# Entradas de calculate_metrics
+_METRICS_INPUTS = ('functions', 'variables', 'tables')
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+# Primer carácter que no es palabra ni espacio (el '=' de "Nombre = ..." en tablas calculadas)
+_FIRST_SYMBOL = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s*')
+
+# Palabras que detect_object_type usa para reconocer columnas calculadas
+_COLUMN_INDICATORS = ('earlier', 'earliest', 'path', 'pathitem')
+
+# Largo del nombre de función más largo que reconoce detect_object_type (SELECTCOLUMNS)
+_TABLE_FUNCTION_MAX_LENGTH = 13
+
+
+@slotted_dataclass(frozen=True)
+class TextEdit:
+    """
+    Reemplazo de un rango del documento (como en LSP)
+
+    Líneas y columnas en base 0; el rango va de (start_line, start_column) a
+    (end_line, end_column) sin incluir el final. Las columnas cuentan
+    caracteres de Python (no unidades UTF-16).
+    """
+    start_line: int
+    start_column: int
+    end_line: int
+    end_column: int
+    text: str
+
+
+@dataclass
+class Diagnostics:
+    """Resultado del análisis de la sesión"""
+    version: int
+    issues: List[Issue]
+    metrics: PerformanceMetrics
+    suggestions: List[Suggestion]
+    base_score: int
+    parsed: ParsedDaxExpression
+    reparsed_lines: int = 0     # Líneas re-parseadas desde el diagnóstico anterior
+    rules_run: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def to_result(self) -> Dict:
+        """Mismo formato que analysis_runner.analyze_expression"""
+        return {
+            'issues': self.issues,
+            'metrics': self.metrics,
+            'suggestions': self.suggestions,
+            'base_score': self.base_score
+        }
+
+
+class _Line:
+    """Datos de una línea del documento"""
+
+    __slots__ = ('text', 'start_state', 'end_state', 'tokens', 'functions', 'words', 'references', '_placed')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.start_state = -1  # Sin tokenizar
+        self.end_state = STATE_DEFAULT
+        self.tokens: List[Token] = []
+        # Datos del parser, calculados sobre la línea sin recortar
+        self.functions = extract_line_functions(text, 0)
+        self.words = Counter(word.lower() for word in _WORD_PATTERN.findall(text))
+        self.references = [(m.group(1), f"{m.group(1)}[{m.group(2)}]") for m in TABLE_COLUMN_PATTERN.finditer(text)]
+        self._placed: Tuple[int, int, List[FunctionCall]] = (0, 0, self.functions)
+
+    def placed_functions(self, line_number: int, indent: int) -> List[FunctionCall]:
+        """Funciones con la línea (base 1) y el desplazamiento de columna del texto recortado"""
+        if self._placed[:2] != (line_number, indent):
+            functions = [replace(call, line=line_number, column=call.column - indent) for call in self.functions]
+            self._placed = (line_number, indent, functions)
+        return self._placed[2]
+
+    def lex(self, state: int) -> None:
+        self.tokens, self.end_state = lex_line(self.text, state)
+        self.start_state = state
+
+
+class AnalysisSession:
+    """
+    Documento DAX en edición con análisis incremental
+
+    Ejemplo:
+        session = AnalysisSession(codigo)
+        session.apply_edit(TextEdit(3, 4, 3, 4, 'KEEPFILTERS('))
+        diagnostics = session.diagnostics()
+
+    Args:
+        text: Contenido inicial
+        timeout: Presupuesto de tiempo por diagnóstico en segundos (None = sin límite)
+    """
+
+    def __init__(self, text: str = '', timeout: Optional[float] = None):
+        self.timeout = timeout
+        self.version = 0
+        self._lines: List[_Line] = []
+        self._word_counts: Counter = Counter()
+        self._dirty_lines = 0
+        self._previous: Optional[Diagnostics] = None
+        self._rule_issues: Dict[str, List[Issue]] = {}
+        self._set_lines(text.split('\n'))
+
+    # ------------------------------------------------------------------
+    # Documento
+    # ------------------------------------------------------------------
+
+    @property
+    def text(self) -> str:
+        return '\n'.join(line.text for line in self._lines)
+
+    @property
+    def line_count(self) -> int:
+        return len(self._lines)
+
+    def line(self, index: int) -> str:
+        return self._lines[index].text
+
+    def _set_lines(self, texts: List[str]) -> None:
+        self._lines = [_Line(text) for text in texts]
+        self._word_counts = Counter()
+        for line in self._lines:
+            self._word_counts.update(line.words)
+        self._dirty_lines += len(texts)
+        self._relex_from(0)
+
+    def set_text(self, text: str) -> None:
+        """Reemplaza todo el documento"""
+        self._set_lines(text.split('\n'))
+        self.version += 1
+
+    def update_text(self, text: str) -> Optional[TextEdit]:
+        """
+        Reemplaza el documento aplicando solo la diferencia con el texto actual
+
+        Útil cuando el editor entrega el texto completo en cada cambio (p. ej.
+        st.text_area): el prefijo y el sufijo comunes no se re-parsean.
+
+        Returns:
+            La edición aplicada, o None si el texto no cambió
+        """
+        current = self.text
+        if text == current:
+            return None
+
+        prefix = 0
+        limit = min(len(current), len(text))
+        while prefix < limit and current[prefix] == text[prefix]:
+            prefix += 1
+
+        suffix = 0
+        limit -= prefix
+        while suffix < limit and current[-1 - suffix] == text[-1 - suffix]:
+            suffix += 1
+
+        start_line, start_column = self.position_at(prefix)
+        end_line, end_column = self.position_at(len(current) - suffix)
+        edit = TextEdit(start_line, start_column, end_line, end_column, text[prefix:len(text) - suffix])
+        self.apply_edit(edit)
+        return edit
+
+    def position_at(self, offset: int) -> Tuple[int, int]:
+        """Convierte un offset del documento en (línea, columna) base 0"""
+        for index, line in enumerate(self._lines):
+            if offset <= len(line.text):
+                return index, offset
+            offset -= len(line.text) + 1
+        last = len(self._lines) - 1
+        return last, len(self._lines[last].text)
+
+    def apply_edits(self, edits: Iterable[TextEdit]) -> None:
+        """Aplica varias ediciones en orden (cada una sobre el resultado de la anterior)"""
+        for edit in edits:
+            self.apply_edit(edit)
+
+    def apply_edit(self, edit: TextEdit) -> None:
+        """
+        Aplica una edición y re-tokeniza solo las líneas afectadas
+
+        Raises:
+            ValueError: Si el rango no existe en el documento
+        """
+        if not (0 <= edit.start_line <= edit.end_line < len(self._lines)):
+            raise ValueError(f"Rango de líneas inválido: {edit.start_line}-{edit.end_line}")
+        first = self._lines[edit.start_line].text
+        last = self._lines[edit.end_line].text
+        if (not 0 <= edit.start_column <= len(first) or not 0 <= edit.end_column <= len(last)
+                or (edit.start_line == edit.end_line and edit.start_column > edit.end_column)):
+            raise ValueError(f"Rango de columnas inválido: {edit.start_column}-{edit.end_column}")
+
+        replaced = self._lines[edit.start_line:edit.end_line + 1]
+        new_text = first[:edit.start_column] + edit.text + last[edit.end_column:]
+        new_lines = [_Line(text) for text in new_text.split('\n')]
+
+        for line in replaced:
+            self._word_counts.subtract(line.words)
+        for line in new_lines:
+            self._word_counts.update(line.words)
+
+        self._lines[edit.start_line:edit.end_line + 1] = new_lines
+        self._dirty_lines += len(new_lines)
+        self._relex_from(edit.start_line, edit.start_line + len(new_lines))
+        self.version += 1
+
+    def _relex_from(self, start: int, changed_end: Optional[int] = None) -> None:
+        """
+        Re-tokeniza desde la línea start; pasadas las líneas cambiadas, se
+        detiene en cuanto una línea empieza en el mismo estado que antes
+        """
+        state = self._lines[start - 1].end_state if start > 0 else STATE_DEFAULT
+        for index in range(start, len(self._lines)):
+            line = self._lines[index]
+            if changed_end is not None and index >= changed_end and line.start_state == state:
+                return
+            line.lex(state)
+            state = line.end_state
+
+    # ------------------------------------------------------------------
+    # Tokens
+    # ------------------------------------------------------------------
+
+    def tokens(self, line: Optional[int] = None) -> List[Token]:
+        """Tokens de una línea (o de todo el documento si line es None)"""
+        if line is not None:
+            return list(self._lines[line].tokens)
+        return [token for item in self._lines for token in item.tokens]
+
+    def token_at(self, line: int, column: int) -> Optional[Token]:
+        """Token que contiene la posición (línea, columna), o None"""
+        for token in self._lines[line].tokens:
+            if token.column <= column < token.end_column:
+                return token
+        return None
+
+    # ------------------------------------------------------------------
+    # Parseo y diagnósticos
+    # ------------------------------------------------------------------
+
+    def parse(self) -> ParsedDaxExpression:
+        """
+        Expresión parseada, igual a parse_dax_code(self.text)
+
+        Funciones, palabras y referencias Tabla[Columna] salen de los datos por
+        línea; variables, nombre y referencias a medidas (que pueden cruzar
+        líneas) se recalculan sobre el texto, que es mucho más barato.
+        """
+        code = self.text
+        trimmed = code.strip()
+
+        # parse_dax_code trabaja con el texto recortado: líneas y columna de la primera línea se desplazan
+        first_line = next((i for i, line in enumerate(self._lines) if line.text.strip()), len(self._lines))
+        first_indent = 0
+        if first_line < len(self._lines):
+            first_text = self._lines[first_line].text
+            first_indent = len(first_text) - len(first_text.lstrip())
+
+        functions: List[FunctionCall] = []
+        tables: Dict[str, None] = {}
+        columns: Dict[str, None] = {}
+        for index in range(first_line, len(self._lines)):
+            line = self._lines[index]
+            line_number = index - first_line + 1
+            indent = first_indent if index == first_line else 0
+            functions.extend(line.placed_functions(line_number, indent))
+            for table, column in line.references:
+                tables[table] = None
+                columns[column] = None
+
+        object_type = self._detect_object_type(trimmed)
+        var_names = find_variable_names(trimmed)
+
+        return ParsedDaxExpression(
+            raw=code,
+            object_type=object_type,
+            name=extract_name(trimmed, object_type),
+            functions=functions,
+            tables=list(set(tables)),
+            columns=list(set(columns)),
+            measures=extract_measure_references(trimmed),
+            has_variables=len(var_names) > 0,
+            variables=count_variable_usages(var_names, self._word_counts) if var_names else []
+        )
+
+    def _detect_object_type(self, trimmed: str) -> str:
+        """
+        detect_object_type sin recorrer todo el texto
+
+        La regex de tabla calculada solo puede coincidir si el primer símbolo es
+        el '=' seguido del nombre de la función; las palabras EARLIER/PATH salen
+        del conteo de palabras.
+        """
+        symbol = _FIRST_SYMBOL.search(trimmed)
+        if symbol is not None and symbol.group(0) == '=':
+            function_start = _WHITESPACE.match(trimmed, symbol.end()).end()
+            prefix = trimmed[:function_start + _TABLE_FUNCTION_MAX_LENGTH]
+            if detect_object_type(prefix) == 'calculated-table':
+                return 'calculated-table'
+
+        if any(self._word_counts[word] > 0 for word in _COLUMN_INDICATORS):
+            return 'calculated-column'
+        return 'measure'
+
+    def diagnostics(self) -> Diagnostics:
+        """
+        Analiza el documento actual re-ejecutando solo las reglas cuyas entradas cambiaron
+
+        Raises:
+            AnalysisTimeoutError: Si se supera el presupuesto de tiempo
+        """
+        if self._previous is not None and self._previous.version == self.version:
+            return self._previous
+
+        started = time.perf_counter()
+        budget = TimeBudget(self.timeout)
+        parsed = self.parse()
+        previous = self._previous.parsed if self._previous is not None else None
+
+        def changed(fields: Tuple[str, ...]) -> bool:
+            return previous is None or any(getattr(parsed, f) != getattr(previous, f) for f in fields)
+
+        issues: List[Issue] = []
+        rules_run = []
+        for rule in ANALYSIS_RULES:
+            name = rule.__name__
+            inputs = RULE_INPUTS.get(name)
+            if inputs is None or name not in self._rule_issues or changed(inputs):
+                budget.check(name)
+                rule_issues: List[Issue] = []
+                rule(parsed, rule_issues)
+                self._rule_issues[name] = rule_issues
+                rules_run.append(name)
+            issues.extend(self._rule_issues[name])
+
+        if self._previous is not None and not changed(_METRICS_INPUTS):
+            metrics = self._previous.metrics
+        else:
+            metrics = calculate_metrics(parsed)
+
+        diagnostics = Diagnostics(
+            version=self.version,
+            issues=issues,
+            metrics=metrics,
+            suggestions=generate_suggestions(parsed, issues),
+            base_score=calculate_score(parsed, issues),
+            parsed=parsed,
+            reparsed_lines=self._dirty_lines,
+            rules_run=rules_run,
+            seconds=time.perf_counter() - started
+        )
+        self._dirty_lines = 0
+        self._previous = diagnostics
+        return diagnostics
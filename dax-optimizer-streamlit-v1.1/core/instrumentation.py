@@ -0,0 +1,296 @@
+"""
+Instrumentación del pipeline de análisis
+Timers por etapa, contadores y captura opcional de cProfile / tracemalloc
+
+Las funciones de core llaman a stage() y count(); si no hay una instrumentación
+activa (instrumented()), ambas son no-ops de costo despreciable.
+"""
+
+import io
+import time
+import functools
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import List, Dict, Optional, Iterator
+
+
+# Categoría de cada etapa = prefijo antes del primer punto
+STAGE_CATEGORIES = {
+    'io': 'Lectura de archivos',
+    'extract': 'Extracción de medidas',
+    'parse': 'Parseo DAX',
+    'rules': 'Reglas del analizador',
+    'metrics': 'Métricas',
+    'suggestions': 'Sugerencias',
+    'score': 'Scoring',
+    'rank': 'Ranking',
+    'export': 'Exportación'
+}
+
+_NULL_STAGE = nullcontext()
+_active: Optional['Instrumentation'] = None
+
+
+class Instrumentation:
+    """
+    Acumula tiempos por etapa y contadores de una ejecución
+
+    Args:
+        profile: Capturar un perfil cProfile mientras esté activa
+        trace_memory: Medir memoria pico con tracemalloc
+    """
+
+    def __init__(self, profile: bool = False, trace_memory: bool = False):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, Dict] = {}
+        self.counters: Dict[str, int] = {}
+        self.wall_seconds = 0.0
+        self.memory_peak_mb: Optional[float] = None
+        self._profiler = None
+        self._started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        if self.trace_memory:
+            import tracemalloc  # Solo al medir memoria
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        if self.profile:
+            import cProfile  # Solo al perfilar
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self.trace_memory:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.memory_peak_mb = peak / (1024 * 1024)
+        if self._started is not None:
+            self.wall_seconds += time.perf_counter() - self._started
+            self._started = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Mide el tiempo del bloque y lo acumula en la etapa indicada"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float, calls: int = 1) -> None:
+        with self._lock:
+            data = self.stages.get(name)
+            if data is None:
+                self.stages[name] = {'calls': calls, 'seconds': seconds, 'max_seconds': seconds}
+            else:
+                data['calls'] += calls
+                data['seconds'] += seconds
+                data['max_seconds'] = max(data['max_seconds'], seconds)
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self) -> Dict:
+        """Etapas y contadores en un diccionario serializable (para enviar desde workers)"""
+        with self._lock:
+            return {
+                'stages': {name: dict(data) for name, data in self.stages.items()},
+                'counters': dict(self.counters)
+            }
+
+    def merge(self, snapshot: Dict) -> None:
+        """Suma etapas y contadores de otra instrumentación (p. ej. de un proceso worker)"""
+        with self._lock:
+            for name, data in snapshot.get('stages', {}).items():
+                current = self.stages.get(name)
+                if current is None:
+                    self.stages[name] = dict(data)
+                else:
+                    current['calls'] += data['calls']
+                    current['seconds'] += data['seconds']
+                    current['max_seconds'] = max(current['max_seconds'], data['max_seconds'])
+            for name, value in snapshot.get('counters', {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def profile_stats(self, top: int = 25, sort_by: str = 'cumulative') -> List[Dict]:
+        """Funciones más costosas del perfil cProfile (vacío si no se perfiló)"""
+        if self._profiler is None:
+            return []
+
+        import pstats
+        stats = pstats.Stats(self._profiler, stream=io.StringIO())
+        stats.sort_stats(sort_by)
+        rows = []
+        for func in stats.fcn_list[:top]:
+            primitive_calls, total_calls, own_seconds, cumulative_seconds, _ = stats.stats[func]
+            filename, line, function = func
+            rows.append({
+                'function': f"{function} ({filename}:{line})" if line else function,
+                'calls': total_calls,
+                'own_seconds': round(own_seconds, 6),
+                'cumulative_seconds': round(cumulative_seconds, 6)
+            })
+        return rows
+
+    def report(self, profile_top: int = 25) -> Dict:
+        """
+        Reporte estructurado de la ejecución
+
+        Returns:
+            Diccionario con 'wall_seconds', 'stages' (ordenadas por tiempo),
+            'categories' (tiempo por categoría), 'counters', 'memory_peak_mb'
+            y 'profile'
+        """
+        with self._lock:
+            stages = {name: dict(data) for name, data in self.stages.items()}
+            counters = dict(self.counters)
+
+        total = sum(data['seconds'] for data in stages.values()) or 1.0
+
+        stage_rows = [
+            {
+                'stage': name,
+                'category': name.split('.', 1)[0],
+                'calls': data['calls'],
+                'seconds': round(data['seconds'], 6),
+                'mean_ms': round(data['seconds'] * 1000 / data['calls'], 4) if data['calls'] else 0.0,
+                'max_ms': round(data['max_seconds'] * 1000, 4),
+                'share': round(data['seconds'] / total, 4)
+            }
+            for name, data in stages.items()
+        ]
+        stage_rows.sort(key=lambda row: row['seconds'], reverse=True)
+
+        categories: Dict[str, float] = {}
+        for row in stage_rows:
+            categories[row['category']] = categories.get(row['category'], 0.0) + row['seconds']
+
+        category_rows = [
+            {
+                'category': category,
+                'label': STAGE_CATEGORIES.get(category, category),
+                'seconds': round(seconds, 6),
+                'share': round(seconds / total, 4)
+            }
+            for category, seconds in sorted(categories.items(), key=lambda item: item[1], reverse=True)
+        ]
+
+        return {
+            'wall_seconds': round(self.wall_seconds, 6),
+            'stages': stage_rows,
+            'categories': category_rows,
+            'counters': counters,
+            'memory_peak_mb': round(self.memory_peak_mb, 3) if self.memory_peak_mb is not None else None,
+            'profile': self.profile_stats(profile_top)
+        }
+
+
+@contextmanager
+def instrumented(profile: bool = False, trace_memory: bool = False) -> Iterator[Instrumentation]:
+    """
+    Activa la instrumentación dentro del bloque
+
+    Ejemplo:
+        with instrumented(profile=True) as inst:
+            extract_measures_from_pbip(path)
+        print(format_report(inst.report()))
+    """
+    global _active
+    previous = _active
+    instrumentation = Instrumentation(profile=profile, trace_memory=trace_memory)
+    _active = instrumentation
+    instrumentation.start()
+    try:
+        yield instrumentation
+    finally:
+        instrumentation.stop()
+        _active = previous
+
+
+def get_active() -> Optional[Instrumentation]:
+    """Instrumentación activa (None si está deshabilitada)"""
+    return _active
+
+
+def is_enabled() -> bool:
+    return _active is not None
+
+
+def stage(name: str):
+    """Context manager que mide una etapa si hay instrumentación activa"""
+    if _active is None:
+        return _NULL_STAGE
+    return _active.stage(name)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Incrementa un contador si hay instrumentación activa"""
+    if _active is not None:
+        _active.count(name, value)
+
+
+def timed(name: str):
+    """Decorador: mide cada llamada de la función como la etapa indicada"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return func(*args, **kwargs)
+            with _active.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def format_report(report: Dict, max_stages: int = 30) -> str:
+    """
+    Formatea el reporte de instrumentación como texto (para la CLI)
+
+    Args:
+        report: Resultado de Instrumentation.report()
+        max_stages: Máximo de etapas a listar
+
+    Returns:
+        Texto con tablas de categorías, etapas, contadores y perfil
+    """
+    lines = [f"Tiempo total: {report['wall_seconds']:.3f} s"]
+    if report.get('memory_peak_mb') is not None:
+        lines.append(f"Memoria pico: {report['memory_peak_mb']:.1f} MB")
+
+    lines.append("")
+    lines.append(f"{'Categoría':<26} {'seg':>10} {'%':>7}")
+    for row in report['categories']:
+        lines.append(f"{row['label']:<26} {row['seconds']:>10.4f} {row['share'] * 100:>6.1f}%")
+
+    lines.append("")
+    lines.append(f"{'Etapa':<48} {'llamadas':>9} {'seg':>10} {'media ms':>10} {'máx ms':>10} {'%':>7}")
+    for row in report['stages'][:max_stages]:
+        lines.append(
+            f"{row['stage']:<48} {row['calls']:>9} {row['seconds']:>10.4f} "
+            f"{row['mean_ms']:>10.3f} {row['max_ms']:>10.3f} {row['share'] * 100:>6.1f}%"
+        )
+
+    if report['counters']:
+        lines.append("")
+        lines.append("Contadores:")
+        for name, value in sorted(report['counters'].items()):
+            lines.append(f"  {name:<24} {value:>14,}")
+
+    if report['profile']:
+        lines.append("")
+        lines.append(f"{'Perfil (cProfile)':<70} {'llamadas':>9} {'propio s':>10} {'acum s':>10}")
+        for row in report['profile']:
+            lines.append(
+                f"{row['function'][:70]:<70} {row['calls']:>9} "
+                f"{row['own_seconds']:>10.4f} {row['cumulative_seconds']:>10.4f}"
+            )
+
+    return "\n".join(lines)
@@ -0,0 +1,146 @@
+"""
+Deduplicación de expresiones DAX antes del análisis
+Agrupa medidas con la misma expresión normalizada para analizarla una sola vez
+(la misma expresión en una medida y en una columna calculada se analiza por
+separado: las reglas dependen del tipo de objeto)
+"""
+
+import re
+import hashlib
+from bisect import bisect_left
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field
+
+
+# Tokens que se copian tal cual (textos "...", nombres '...' y [...], comentarios) o bloques de espacios
+# en blanco. Un token sin cierre llega hasta el final de la expresión.
+_VERBATIM_OR_WHITESPACE = re.compile(r"""
+    "(?:[^"]|"")*"?
+  | '(?:[^']|'')*'?
+  | \[(?:[^\]]|\]\])*\]?
+  | (?P<line_comment>(?://|--)[^\n]*)
+  | /\*.*?(?:\*/|\Z)
+  | (?P<whitespace>\s+)
+""", re.VERBOSE | re.DOTALL)
+
+
+@dataclass
+class ExpressionGroup:
+    """Grupo de medidas que comparten la misma expresión normalizada"""
+    expression_hash: str
+    expression: str  # Expresión de la primera medida del grupo (representante)
+    measures: List[Dict] = field(default_factory=list)
+    object_type: Optional[str] = None  # Tipo de objeto de las medidas del grupo (None = deducirlo del código)
+
+
+def normalize_expression(expression: str) -> str:
+    """
+    Normaliza una expresión DAX para compararla con otras
+
+    Colapsa los espacios en blanco entre tokens, de modo que copias que solo
+    difieren en indentación o saltos de línea se consideren iguales. Los
+    textos, los nombres entre comillas o corchetes y los comentarios se
+    conservan tal cual, y un comentario de línea conserva su salto de línea
+    (lo que sigue en la línea siguiente no es parte del comentario).
+
+    Args:
+        expression: Código DAX
+
+    Returns:
+        Expresión normalizada
+    """
+    def _replace(match: re.Match) -> str:
+        if match.group('whitespace') is not None:
+            return ' '
+        if match.group('line_comment') is not None:
+            return match.group(0) + '\n'
+        return match.group(0)
+
+    return _VERBATIM_OR_WHITESPACE.sub(_replace, expression).strip()
+
+
+def significant_offsets(expression: str) -> List[int]:
+    """Offsets de los caracteres que conserva normalize_expression (todos menos los espacios entre tokens)"""
+    offsets: List[int] = []
+    position = 0
+    for match in _VERBATIM_OR_WHITESPACE.finditer(expression):
+        if match.group('whitespace') is not None:
+            offsets.extend(range(position, match.start()))
+            position = match.end()
+    offsets.extend(range(position, len(expression)))
+    return offsets
+
+
+def map_offset(source_offsets: List[int], target_offsets: List[int], offset: int, target_length: int) -> int:
+    """
+    Offset equivalente en otra expresión con la misma normalización
+
+    Args:
+        source_offsets: significant_offsets de la expresión de origen
+        target_offsets: significant_offsets de la expresión de destino
+        offset: Offset en la expresión de origen (si cae en espacios, se usa el token siguiente)
+        target_length: Longitud de la expresión de destino
+
+    Returns:
+        Offset en la expresión de destino
+    """
+    index = bisect_left(source_offsets, offset)
+    return target_offsets[index] if index < len(target_offsets) else target_length
+
+
+def expression_hash(expression: str) -> str:
+    """
+    Calcula el hash de la expresión normalizada
+
+    Args:
+        expression: Código DAX
+
+    Returns:
+        Hash hexadecimal (SHA-1) de la expresión normalizada
+    """
+    normalized = normalize_expression(expression)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def group_measures_by_expression(measures: List[Dict]) -> List[ExpressionGroup]:
+    """
+    Agrupa medidas por tipo de objeto y hash de expresión normalizada
+
+    Args:
+        measures: Medidas extraídas por extract_measures_from_pbip
+
+    Returns:
+        Lista de grupos en el orden de primera aparición
+    """
+    groups: Dict[Tuple[Optional[str], str], ExpressionGroup] = {}
+
+    for measure in measures:
+        object_type = measure.get('object_type')
+        key = expression_hash(measure['expression'])
+        group = groups.get((object_type, key))
+        if group is None:
+            group = ExpressionGroup(expression_hash=key, expression=measure['expression'], object_type=object_type)
+            groups[(object_type, key)] = group
+        group.measures.append(measure)
+
+    return list(groups.values())
+
+
+def get_dedup_stats(groups: List[ExpressionGroup]) -> Dict:
+    """
+    Estadísticas de deduplicación
+
+    Args:
+        groups: Grupos generados por group_measures_by_expression
+
+    Returns:
+        Diccionario con total de medidas, expresiones únicas y duplicadas
+    """
+    total = sum(len(g.measures) for g in groups)
+    unique = len(groups)
+
+    return {
+        'total_measures': total,
+        'unique_expressions': unique,
+        'duplicated_measures': total - unique
+    }
@@ -0,0 +1,147 @@
+"""
+Grafo de dependencias entre medidas y detección de medidas muertas
+Cada medida apunta a las medidas que referencia ([Medida], o Tabla[Medida]
+con el nombre de tabla delante, que DAX también acepta). Partiendo de las
+medidas que usan los visuales del reporte, las que no se alcanzan por ese
+grafo no afectan al reporte: se pueden listar para revisión y excluir del
+análisis.
+
+Las columnas y tablas calculadas se evalúan en cada actualización del modelo:
+las medidas que referencian también son raíces, y ellas nunca se consideran
+muertas.
+
+Solo se conoce el reporte del PBIP: un modelo publicado y usado por otros
+reportes, Analyze in Excel o consultas externas puede usar medidas que aquí
+aparecen como muertas.
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Container, List, Dict, Iterable, Set, TYPE_CHECKING
+
+from .dax_parser import OBJECT_TYPES
+from . import instrumentation
+
+if TYPE_CHECKING:
+    from .report_usage import ReportUsage
+
+
+# Objetos DAX que se evalúan al actualizar el modelo (sus referencias son raíces)
+CALCULATED_OBJECT_TYPES = tuple(object_type for object_type in OBJECT_TYPES if object_type != 'measure')
+
+# Nombre entre corchetes, solo o calificado con la tabla ([Medida], Tabla[Medida], 'Tabla'[Medida])
+_BRACKETED_NAME_PATTERN = re.compile(r'\[([^\]]+)\]')
+
+
+@dataclass
+class Reachability:
+    """Resultado del análisis de alcanzabilidad (nombres en minúsculas)"""
+    roots: Set[str] = field(default_factory=set)
+    reachable: Set[str] = field(default_factory=set)
+    unreachable: List[Dict] = field(default_factory=list)  # Medidas muertas, en el orden del modelo
+
+    def is_reachable(self, name: str) -> bool:
+        return name.lower() in self.reachable
+
+
+@instrumentation.timed('extract.measure_graph')
+def build_dependency_graph(measures: List[Dict]) -> Dict[str, List[str]]:
+    """
+    Grafo medida -> medidas que referencia
+
+    Args:
+        measures: Medidas ({'name', 'expression', ...}); se ignoran las columnas y
+            tablas calculadas ('object_type')
+
+    Returns:
+        Diccionario nombre en minúsculas -> nombres en minúsculas de las medidas
+        del modelo que referencia (las referencias a columnas u objetos
+        inexistentes se descartan)
+    """
+    measures = [measure for measure in measures if _is_measure(measure)]
+    names = {measure['name'].lower() for measure in measures}
+    graph: Dict[str, List[str]] = {}
+
+    for measure in measures:
+        key = measure['name'].lower()
+        graph[key] = sorted(_measure_references(measure['expression'], names) - {key})
+
+    return graph
+
+
+def find_reachable(graph: Dict[str, List[str]], roots: Iterable[str]) -> Set[str]:
+    """
+    Medidas alcanzables desde las raíces siguiendo las referencias
+
+    Args:
+        graph: Grafo de build_dependency_graph
+        roots: Nombres de medidas raíz (se ignoran las que no están en el grafo)
+
+    Returns:
+        Nombres en minúsculas alcanzables (incluye las raíces)
+    """
+    reachable = {root.lower() for root in roots if root.lower() in graph}
+    pending = deque(reachable)
+
+    while pending:
+        for reference in graph[pending.popleft()]:
+            if reference not in reachable:
+                reachable.add(reference)
+                pending.append(reference)
+
+    return reachable
+
+
+def find_dead_measures(measures: List[Dict], report_usage: 'ReportUsage',
+                       extra_roots: Iterable[str] = ()) -> Reachability:
+    """
+    Medidas que ningún visual ni objeto calculado usa ni directa ni indirectamente
+
+    Args:
+        measures: Medidas del modelo ({'name', 'expression', ...}), incluidas las
+            columnas y tablas calculadas (sus referencias son raíces)
+        report_usage: Uso de medidas en el reporte (report_usage.load_report_usage)
+        extra_roots: Otras medidas a conservar (p. ej. usadas fuera del reporte)
+
+    Returns:
+        Reachability con las raíces, las alcanzables y las medidas muertas
+    """
+    graph = build_dependency_graph(measures)
+    roots = {name for name in report_usage.measures if name in graph}
+    roots.update(name.lower() for name in extra_roots if name.lower() in graph)
+    for calculated in measures:
+        if calculated.get('object_type') in CALCULATED_OBJECT_TYPES:
+            roots.update(_measure_references(calculated['expression'], graph))
+
+    reachable = find_reachable(graph, roots)
+    unreachable = [
+        measure for measure in measures
+        if _is_measure(measure) and measure['name'].lower() not in reachable
+    ]
+    instrumentation.count('dead_measures', len(unreachable))
+
+    return Reachability(roots=roots, reachable=reachable, unreachable=unreachable)
+
+
+def exclude_dead_measures(measures: List[Dict], reachability: Reachability) -> List[Dict]:
+    """Medidas alcanzables y los demás objetos (sin las medidas muertas), en el mismo orden"""
+    return [
+        measure for measure in measures
+        if not _is_measure(measure) or reachability.is_reachable(measure['name'])
+    ]
+
+
+def _measure_references(expression: str, names: Container[str]) -> Set[str]:
+    """
+    Nombres en minúsculas de las medidas del modelo que referencia una expresión
+
+    Una referencia calificada (Tabla[Nombre]) cuenta como medida si el nombre
+    coincide con una: una columna no puede llamarse como una medida del modelo.
+    """
+    references = {match.group(1).lower() for match in _BRACKETED_NAME_PATTERN.finditer(expression)}
+    return {reference for reference in references if reference in names}
+
+
+def _is_measure(measure: Dict) -> bool:
+    return measure.get('object_type', 'measure') == 'measure'
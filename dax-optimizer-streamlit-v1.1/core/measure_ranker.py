@@ -3,11 +3,34 @@ Sistema de ranking y priorización de medidas DAX
 Calcula scores de impacto y prioriza medidas problemáticas
 """
 
-from typing import List, Dict
-from dataclasses import dataclass
-
-
-@dataclass
+import math
+from typing import List, Dict, Optional, TYPE_CHECKING
+from .dataclass_slots import slotted_dataclass
+from .instrumentation import timed
+from .tracing import traced
+from .model_metadata import MODEL_OBJECT_TYPES
+
+if TYPE_CHECKING:
+    from .vpax_importer import ModelStatistics
+    from .performance_trace import MeasureTiming
+    from .server_timings import MeasureServerTiming
+    from .report_usage import ReportUsage, MeasureUsage
+
+
+# Escala de filas para ponderar penalizaciones con estadísticas VertiPaq:
+# a REFERENCE_ROWS el peso es 1 (igual que sin estadísticas), cada 10x más filas
+# suma 0.5 y cada 10x menos resta 0.5, dentro de [MIN_ROW_WEIGHT, MAX_ROW_WEIGHT]
+REFERENCE_ROWS = 1_000_000
+MIN_ROW_WEIGHT = 0.25
+MAX_ROW_WEIGHT = 3.0
+
+# Peso por uso en el reporte: medidas que ningún visual usa directamente pesan
+# la mitad; con uso, 1 + 0.5 * log2(1 + exposición), hasta MAX_USAGE_WEIGHT
+UNUSED_WEIGHT = 0.5
+MAX_USAGE_WEIGHT = 3.0
+
+
+@slotted_dataclass(frozen=True)
 class RankedMeasure:
     """Medida con información de ranking"""
     name: str
@@ -22,9 +45,64 @@ class RankedMeasure:
     issues: List
     metrics: any
     suggestions: List
+    estimated_rows: Optional[int] = None  # Filas recorridas por el peor patrón (con estadísticas .vpax)
+    observed_ms: Optional[float] = None  # Tiempo DAX observado en el Performance Analyzer
+    observed_visual_ms: Optional[float] = None  # Tiempo de los visuales que la usan (consulta + render)
+    observed_queries: int = 0
+    server_timings: Optional['MeasureServerTiming'] = None  # SE/FE de DAX Studio (consultas que la usan)
+    usage: Optional['MeasureUsage'] = None  # Visuales y páginas del reporte que la usan
+    usage_weight: Optional[float] = None  # Solo si se analizó el reporte
+    reachable: Optional[bool] = None  # False: ningún visual la usa ni directa ni indirectamente
+    object_type: str = 'measure'  # 'measure', 'calculated-column', 'calculated-table', 'column' o 'relationship'
+
+    @property
+    def is_measure(self) -> bool:
+        return self.object_type == 'measure'
+
+    @property
+    def is_model_object(self) -> bool:
+        """True si es un hallazgo de las reglas del modelo (columna o relación), no un objeto DAX"""
+        return self.object_type in MODEL_OBJECT_TYPES
+
+    @property
+    def weighted_score(self) -> float:
+        """impact_score ponderado por el uso en el reporte (igual a impact_score sin reporte)"""
+        return self.impact_score * (self.usage_weight if self.usage_weight is not None else 1.0)
+
+
+def get_row_weight(rows: Optional[int]) -> float:
+    """
+    Peso de una penalización según las filas que recorre el patrón
+
+    Args:
+        rows: Filas estimadas (None = sin estadísticas)
+
+    Returns:
+        Multiplicador (1.0 sin estadísticas o con REFERENCE_ROWS filas)
+    """
+    if rows is None:
+        return 1.0
+    weight = 1 + 0.5 * math.log10(max(rows, 1) / REFERENCE_ROWS)
+    return max(MIN_ROW_WEIGHT, min(MAX_ROW_WEIGHT, weight))
+
+
+def get_usage_weight(usage: Optional['MeasureUsage']) -> float:
+    """
+    Peso de una medida según su exposición en el reporte
+
+    Args:
+        usage: Uso de la medida (None si ningún visual la usa)
+
+    Returns:
+        UNUSED_WEIGHT sin uso; 1.5 con un visual en una página normal, hasta MAX_USAGE_WEIGHT
+    """
+    if usage is None or usage.exposure <= 0:
+        return UNUSED_WEIGHT
+    return min(MAX_USAGE_WEIGHT, 1 + 0.5 * math.log2(1 + usage.exposure))
 
 
-def calculate_impact_score(issues: List, metrics: any, base_score: int) -> int:
+def calculate_impact_score(issues: List, metrics: any, base_score: int,
+                           issue_rows: Optional[List[Optional[int]]] = None) -> int:
     """
     Calcula el score de riesgo de una medida (0-100)
     MAYOR score = MAYOR riesgo de performance
@@ -38,6 +116,8 @@ def calculate_impact_score(issues: List, metrics: any, base_score: int) -> int:
         issues: Lista de problemas detectados
         metrics: Métricas de performance (puede ser None si el análisis falló)
         base_score: Score base calculado por dax_suggestions (0-100, menor=peor)
+        issue_rows: Filas estimadas por issue (alineada con issues; ver
+            dax_analyzer.estimate_rows_iterated). Escala las penalizaciones por patrón
 
     Returns:
         Score de riesgo entre 0 y 100 (mayor=peor)
@@ -49,15 +129,27 @@ def calculate_impact_score(issues: List, metrics: any, base_score: int) -> int:
     critical_count = sum(1 for i in issues if i.severity == 'critical')
     warning_count = sum(1 for i in issues if i.severity == 'warning')
 
+    weights = [get_row_weight(rows) for rows in issue_rows] if issue_rows is not None else [1.0] * len(issues)
+    nested_weight = max(
+        (weight for issue, weight in zip(issues, weights) if issue.id == 'nested-iterators'), default=1.0
+    )
+
     # Penalizaciones adicionales por patrones específicos
-    for issue in issues:
+    for issue, weight in zip(issues, weights):
         # Problemas críticos de performance
         if issue.id == 'nested-iterators':
-            risk_score += 20  # Penalización extra por iteradores anidados
+            risk_score += 20 * weight  # Penalización extra por iteradores anidados
         elif issue.id == 'all-in-filter':
-            risk_score += 15  # ALL en FILTER es muy costoso
+            risk_score += 15 * weight  # ALL en FILTER es muy costoso
         elif issue.id == 'measure-in-calculated-column':
-            risk_score += 20  # Transición de contexto en cada fila
+            risk_score += 20 * weight  # Transición de contexto en cada fila
+        elif issue.id == 'table-scan-in-calculated-column':
+            risk_score += 20 * weight  # Recorre una tabla por cada fila en cada actualización
+        # Reglas del modelo: afectan a todas las consultas que usan el objeto
+        elif issue.id in ('bidirectional-relationship', 'many-to-many-relationship', 'auto-date-table'):
+            risk_score += 20 * weight
+        elif issue.id == 'high-precision-datetime':
+            risk_score += 15 * weight  # Cardinalidad del diccionario
 
     # Solo aplicar penalizaciones basadas en metrics si está disponible
     if metrics is not None:
@@ -69,9 +161,9 @@ def calculate_impact_score(issues: List, metrics: any, base_score: int) -> int:
 
         # Penalizar por múltiples iteradores anidados
         if metrics.nested_iterators > 1:
-            risk_score += 15
+            risk_score += 15 * nested_weight
         elif metrics.nested_iterators == 1:
-            risk_score += 10
+            risk_score += 10 * nested_weight
 
         # Penalizar por muchas transiciones de contexto
         if metrics.context_transitions > 5:
@@ -82,7 +174,7 @@ def calculate_impact_score(issues: List, metrics: any, base_score: int) -> int:
             risk_score -= 5
 
     # Asegurar que esté en rango 0-100
-    return max(0, min(100, risk_score))
+    return max(0, min(100, round(risk_score)))
 
 
 def get_priority_label(impact_score: int) -> str:
@@ -125,33 +217,83 @@ def get_priority_color(impact_score: int) -> str:
         return "#2ed573"  # Verde
 
 
-def rank_measures(analyzed_measures: List[Dict]) -> List[RankedMeasure]:
+@traced('rank')
+@timed('rank.rank_measures')
+def rank_measures(analyzed_measures: List[Dict],
+                  statistics: Optional['ModelStatistics'] = None,
+                  observed: Optional[Dict[str, 'MeasureTiming']] = None,
+                  server_timings: Optional[Dict[str, 'MeasureServerTiming']] = None,
+                  report_usage: Optional['ReportUsage'] = None) -> List[RankedMeasure]:
     """
     Rankea medidas por impacto en performance
 
+    Con estadísticas VertiPaq (vpax_importer.load_vpax) las penalizaciones por
+    patrón se escalan según las filas que recorre cada uno. Con tiempos
+    observados (performance_trace.join_trace_to_measures) primero van las
+    medidas que más tiempo consumen y el score estático desempata. Con el uso
+    en el reporte (report_usage.load_report_usage) se ordena por weighted_score
+    y se marcan las medidas que ningún visual alcanza (measure_graph).
+
+    Las columnas y tablas calculadas ('object_type') se rankean junto con las
+    medidas: su costo se paga en cada actualización, así que con estadísticas
+    los patrones de una columna calculada se escalan por las filas de su tabla.
+    No tienen tiempos observados ni uso en el reporte.
+
+    Los hallazgos de las reglas del modelo (model_analyzer.analyze_model:
+    columnas y relaciones) también se rankean aquí; traen sus filas por issue
+    en 'issue_rows'.
+
     Args:
         analyzed_measures: Lista de medidas analizadas con formato:
         {
             'name': str,
             'table': str,
             'expression': str,
+            'object_type': str (opcional, 'measure' por defecto),
             'issues': List[Issue],
             'metrics': PerformanceMetrics,
             'suggestions': List[Suggestion],
-            'base_score': int
+            'base_score': int,
+            'issue_rows': List[Optional[int]] (opcional, ya estimadas)
         }
+        statistics: Filas y cardinalidades del modelo (opcional)
+        observed: Tiempos observados por nombre de medida en minúsculas (opcional)
+        server_timings: Server timings de DAX Studio por nombre de medida en minúsculas
+            (server_timings.join_server_timings_to_measures; opcional, no cambia el orden)
+        report_usage: Visuales y páginas que usan cada medida (opcional)
 
     Returns:
         Lista de RankedMeasure ordenadas por impacto (peores primero)
     """
+    if statistics is not None:
+        # Import diferido: dax_analyzer no se carga si no hay estadísticas
+        from .dax_analyzer import estimate_rows_iterated
+
+    reachability = None
+    if report_usage is not None:
+        from .measure_graph import find_dead_measures
+        reachability = find_dead_measures(analyzed_measures, report_usage)
+
     ranked = []
 
     for measure_data in analyzed_measures:
+        object_type = measure_data.get('object_type', 'measure')
+        is_measure = object_type == 'measure'
+
+        issue_rows = measure_data.get('issue_rows')
+        if issue_rows is None and statistics is not None:
+            row_table = measure_data['table'] if object_type == 'calculated-column' else None
+            issue_rows = [
+                estimate_rows_iterated(measure_data['expression'], issue, statistics, row_table)
+                for issue in measure_data['issues']
+            ]
+
         # Calcular score de impacto
         impact_score = calculate_impact_score(
             measure_data['issues'],
             measure_data['metrics'],
-            measure_data['base_score']
+            measure_data['base_score'],
+            issue_rows
         )
 
         # Contar issues por tipo
@@ -162,6 +304,9 @@ def rank_measures(analyzed_measures: List[Dict]) -> List[RankedMeasure]:
         # Obtener complejidad (0 si no hay metrics)
         complexity = measure_data['metrics'].complexity if measure_data['metrics'] is not None else 0
 
+        timing = observed.get(measure_data['name'].lower()) if observed and is_measure else None
+        usage = report_usage.usage(measure_data['name']) if report_usage is not None and is_measure else None
+
         # Crear objeto rankeado
         ranked_measure = RankedMeasure(
             name=measure_data['name'],
@@ -175,13 +320,26 @@ def rank_measures(analyzed_measures: List[Dict]) -> List[RankedMeasure]:
             complexity=complexity,
             issues=measure_data['issues'],
             metrics=measure_data['metrics'],
-            suggestions=measure_data['suggestions']
+            suggestions=measure_data['suggestions'],
+            estimated_rows=max((rows for rows in issue_rows or () if rows is not None), default=None),
+            observed_ms=round(timing.dax_ms, 1) if timing is not None else None,
+            observed_visual_ms=round(timing.visual_ms, 1) if timing is not None else None,
+            observed_queries=timing.query_count if timing is not None else 0,
+            server_timings=server_timings.get(measure_data['name'].lower()) if server_timings and is_measure else None,
+            usage=usage,
+            usage_weight=get_usage_weight(usage) if report_usage is not None and is_measure else None,
+            reachable=reachability.is_reachable(measure_data['name']) if reachability is not None and is_measure else None,
+            object_type=object_type
         )
 
         ranked.append(ranked_measure)
 
     # Ordenar por score de riesgo (mayor score primero = mayor riesgo)
-    ranked.sort(key=lambda m: (-m.impact_score, -m.complexity))
+    # (sin tiempos observados ni reporte, weighted_score es el impact_score)
+    if observed:
+        ranked.sort(key=lambda m: (-(m.observed_ms or 0), -m.weighted_score, -m.impact_score, -m.complexity))
+    else:
+        ranked.sort(key=lambda m: (-m.weighted_score, -m.impact_score, -m.complexity))
 
     return ranked
 
@@ -206,7 +364,9 @@ def get_summary_stats(ranked_measures: List[RankedMeasure]) -> Dict:
             'avg_score': 0,
             'total_critical_issues': 0,
             'total_warnings': 0,
-            'avg_complexity': 0
+            'avg_complexity': 0,
+            'calculated_objects': 0,
+            'model_objects': 0
         }
 
     total = len(ranked_measures)
@@ -229,7 +389,9 @@ def get_summary_stats(ranked_measures: List[RankedMeasure]) -> Dict:
         'avg_score': round(avg_score, 1),
         'total_critical_issues': total_critical_issues,
         'total_warnings': total_warnings,
-        'avg_complexity': round(avg_complexity, 1)
+        'avg_complexity': round(avg_complexity, 1),
+        'calculated_objects': sum(1 for m in ranked_measures if not m.is_measure and not m.is_model_object),
+        'model_objects': sum(1 for m in ranked_measures if m.is_model_object)
     }
 
 
@@ -0,0 +1,243 @@
+"""
+Reglas de performance a nivel de modelo
+Analiza la estructura del modelo (relaciones, tipos de columna, columnas
+ocultas, tablas de Fecha/hora automática) en lugar de una expresión DAX. Los
+hallazgos se agrupan por objeto ('column', 'relationship') en el mismo
+formato que analysis_runner.analyze_measures, para rankearse junto con las
+medidas.
+
+Con estadísticas VertiPaq (.vpax) las cardinalidades reales reemplazan a las
+heurísticas de metadatos y las penalizaciones se escalan por filas.
+"""
+
+import re
+from typing import List, Dict, Optional, Iterator, Tuple, TYPE_CHECKING
+
+from .dataclass_slots import slotted_dataclass
+from .dax_analyzer import Issue
+from .dax_suggestions import create_suggestion, score_issues
+from .model_metadata import ModelMetadata, TableInfo, ColumnInfo, RelationshipInfo, is_auto_date_table
+from .rule_catalog import get_rule
+from . import instrumentation
+
+if TYPE_CHECKING:
+    from .vpax_importer import ModelStatistics
+
+
+# Valores distintos a partir de los cuales una columna de fecha guarda también la hora (100 años de días)
+DATE_ONLY_MAX_CARDINALITY = 36_525
+
+# Formatos de fecha que muestran la hora (sin estadísticas, indican que la columna la guarda)
+_TIME_FORMAT = re.compile(r'general date|long time|short time|h:|:nn|:ss|am/pm', re.IGNORECASE)
+
+# Columnas internas de model.bim (RowNumber-<guid>): no son columnas del usuario
+_ROW_NUMBER_PREFIX = 'RowNumber-'
+
+
+@slotted_dataclass(frozen=True)
+class ModelFinding:
+    """Problema detectado en un objeto del modelo"""
+    object_type: str  # 'column' o 'relationship' (ver model_metadata.MODEL_OBJECT_TYPES)
+    table: str
+    name: str
+    definition: str  # Resumen del objeto (ocupa el lugar de la expresión en el ranking)
+    issue: Issue
+    rows: Optional[int] = None  # Filas o valores distintos involucrados (con estadísticas)
+
+
+def describe_column(table: TableInfo, column: ColumnInfo) -> str:
+    """Resumen de una columna en formato de propiedades TMDL"""
+    lines = [f"{table.name}[{column.name}]", f"dataType: {column.data_type or '?'}"]
+    if column.format_string:
+        lines.append(f"formatString: {column.format_string}")
+    if column.is_hidden:
+        lines.append("isHidden")
+    return '\n'.join(lines)
+
+
+def describe_relationship(relationship: RelationshipInfo) -> str:
+    """Resumen de una relación en formato de propiedades TMDL"""
+    lines = [
+        f"fromColumn: {relationship.from_table}[{relationship.from_column}]",
+        f"toColumn: {relationship.to_table}[{relationship.to_column}]",
+        f"fromCardinality: {relationship.from_cardinality}",
+        f"toCardinality: {relationship.to_cardinality}",
+        f"crossFilteringBehavior: {relationship.cross_filtering}"
+    ]
+    if not relationship.is_active:
+        lines.append("isActive: false")
+    return '\n'.join(lines)
+
+
+def _relationship_rows(relationship: RelationshipInfo,
+                       statistics: Optional['ModelStatistics']) -> Optional[int]:
+    """Filas de la tabla más grande de la relación (None sin estadísticas)"""
+    if statistics is None:
+        return None
+    rows = [statistics.table_rows(relationship.from_table), statistics.table_rows(relationship.to_table)]
+    return max((count for count in rows if count is not None), default=None)
+
+
+def check_auto_date_tables(metadata: ModelMetadata,
+                           statistics: Optional['ModelStatistics']) -> Iterator[ModelFinding]:
+    """Columnas de fecha con su propia tabla LocalDateTable_ (Fecha/hora automática)"""
+    for relationship in metadata.relationships:
+        if is_auto_date_table(relationship.to_table) and not is_auto_date_table(relationship.from_table):
+            table = metadata.table(relationship.from_table) or TableInfo(relationship.from_table)
+            column = next((column for column in table.columns
+                           if column.name.lower() == relationship.from_column.lower()),
+                          ColumnInfo(relationship.from_column, data_type='dateTime'))
+            yield ModelFinding(
+                'column', table.name, column.name, describe_column(table, column),
+                Issue('auto-date-table', params=(('table', relationship.to_table),))
+            )
+
+
+def check_bidirectional_relationships(metadata: ModelMetadata,
+                                      statistics: Optional['ModelStatistics']) -> Iterator[ModelFinding]:
+    """Relaciones con filtro cruzado en ambas direcciones"""
+    for relationship in metadata.relationships:
+        if relationship.is_bidirectional:
+            yield ModelFinding(
+                'relationship', relationship.from_table, relationship.label, describe_relationship(relationship),
+                Issue('bidirectional-relationship', params=(('from_table', relationship.from_table),
+                                                            ('to_table', relationship.to_table))),
+                _relationship_rows(relationship, statistics)
+            )
+
+
+def check_many_to_many_relationships(metadata: ModelMetadata,
+                                     statistics: Optional['ModelStatistics']) -> Iterator[ModelFinding]:
+    """Relaciones con cardinalidad muchos a muchos"""
+    for relationship in metadata.relationships:
+        if relationship.is_many_to_many:
+            yield ModelFinding(
+                'relationship', relationship.from_table, relationship.label, describe_relationship(relationship),
+                Issue('many-to-many-relationship', params=(('from_table', relationship.from_table),
+                                                           ('to_table', relationship.to_table))),
+                _relationship_rows(relationship, statistics)
+            )
+
+
+def check_high_precision_datetime(metadata: ModelMetadata,
+                                  statistics: Optional['ModelStatistics']) -> Iterator[ModelFinding]:
+    """
+    Columnas dateTime que guardan la hora
+
+    Con estadísticas decide la cardinalidad real; sin ellas, la anotación
+    UnderlyingDateTimeDataType de Power BI o un formato que muestra la hora.
+    """
+    for table in metadata.tables:
+        if table.is_auto_date:
+            continue
+        for column in table.columns:
+            if not column.is_datetime or column.date_type.lower() == 'time':
+                continue
+
+            cardinality = statistics.column_cardinality(table.name, column.name) if statistics is not None else None
+            if cardinality is not None:
+                precise = cardinality > DATE_ONLY_MAX_CARDINALITY
+            elif column.date_type:
+                precise = column.date_type.lower() == 'datetime'
+            else:
+                precise = _TIME_FORMAT.search(column.format_string) is not None
+
+            if precise:
+                yield ModelFinding(
+                    'column', table.name, column.name, describe_column(table, column),
+                    Issue('high-precision-datetime', params=(('column', f"{table.name}[{column.name}]"),)),
+                    cardinality
+                )
+
+
+def check_unused_hidden_columns(metadata: ModelMetadata,
+                                statistics: Optional['ModelStatistics']) -> Iterator[ModelFinding]:
+    """
+    Columnas ocultas que nada usa
+
+    Se considera usada una columna cuyo nombre aparece como [Nombre] en alguna
+    expresión del modelo (sin distinguir la tabla), en un nivel de jerarquía,
+    en sortByColumn o en una relación. Las columnas de tablas calculadas salen
+    de su expresión y no se reportan.
+    """
+    related = set()
+    for relationship in metadata.relationships:
+        related.add((relationship.from_table.lower(), relationship.from_column.lower()))
+        related.add((relationship.to_table.lower(), relationship.to_column.lower()))
+
+    for table in metadata.tables:
+        if table.is_auto_date or table.is_calculated:
+            continue
+        for column in table.columns:
+            if (not column.is_hidden
+                    or column.name.startswith(_ROW_NUMBER_PREFIX)
+                    or column.name.lower() in metadata.column_references
+                    or (table.name.lower(), column.name.lower()) in related):
+                continue
+            yield ModelFinding(
+                'column', table.name, column.name, describe_column(table, column),
+                Issue('unused-hidden-column', params=(('column', f"{table.name}[{column.name}]"),)),
+                statistics.column_cardinality(table.name, column.name) if statistics is not None else None
+            )
+
+
+# Reglas del modelo, en orden de reporte
+MODEL_RULES = [
+    check_auto_date_tables,
+    check_bidirectional_relationships,
+    check_many_to_many_relationships,
+    check_high_precision_datetime,
+    check_unused_hidden_columns,
+]
+
+
+def calculate_model_score(issues: List[Issue]) -> int:
+    """Score de calidad de un objeto del modelo (0-100, como dax_suggestions.calculate_score)"""
+    return score_issues(issues)
+
+
+@instrumentation.timed('rules.model')
+def analyze_model(metadata: ModelMetadata,
+                  statistics: Optional['ModelStatistics'] = None) -> List[Dict]:
+    """
+    Ejecuta las reglas del modelo y agrupa los hallazgos por objeto
+
+    Args:
+        metadata: Metadatos del modelo (pbip_extractor.extract_model_from_pbip)
+        statistics: Estadísticas VertiPaq (opcional)
+
+    Returns:
+        Objetos con problemas en el formato de analysis_runner.analyze_measures
+        ({'name', 'table', 'expression', 'object_type', 'issues', 'metrics': None,
+        'suggestions', 'base_score'}) más 'issue_rows' (filas por issue, para
+        measure_ranker.rank_measures)
+    """
+    objects: Dict[Tuple[str, str, str], Dict] = {}
+
+    for rule in MODEL_RULES:
+        for finding in rule(metadata, statistics):
+            key = (finding.object_type, finding.table.lower(), finding.name.lower())
+            analyzed = objects.get(key)
+            if analyzed is None:
+                analyzed = objects[key] = {
+                    'name': finding.name,
+                    'table': finding.table,
+                    'expression': finding.definition,
+                    'object_type': finding.object_type,
+                    'issues': [],
+                    'metrics': None,
+                    'suggestions': [],
+                    'issue_rows': []
+                }
+            analyzed['issues'].append(finding.issue)
+            analyzed['issue_rows'].append(finding.rows)
+
+            template_id = get_rule(finding.issue.id).suggestion
+            if template_id and not any(s.template_id == template_id for s in analyzed['suggestions']):
+                analyzed['suggestions'].append(create_suggestion(template_id))
+
+    for analyzed in objects.values():
+        analyzed['base_score'] = calculate_model_score(analyzed['issues'])
+
+    instrumentation.count('model_findings', sum(len(analyzed['issues']) for analyzed in objects.values()))
+    return list(objects.values())
@@ -0,0 +1,284 @@
+"""
+Índice persistente de modelos PBIP
+Guarda por archivo del modelo (model.bim o cada .tmdl) su tamaño, mtime, hash de
+contenido, las medidas extraídas y su fragmento de metadatos estructurales; en
+la siguiente carga solo se releen y reparsean los archivos que cambiaron.
+
+El índice vive en la caché del usuario (no dentro del proyecto, que suele estar
+en git o en una carpeta compartida): un archivo JSON por carpeta definition.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple
+
+from . import instrumentation
+from . import tracing
+from .model_metadata import ModelMetadata, build_model_metadata
+from .pbip_extractor import (
+    DEFAULT_TMDL_READ_WORKERS,
+    get_model_source,
+    find_tmdl_files,
+    get_tmdl_table_name,
+    parse_tmdl_content,
+    parse_model_bim_data,
+    get_tmdl_metadata,
+    get_bim_metadata
+)
+
+
+# Cambiar si cambia el formato del índice o la extracción de medidas
+INDEX_VERSION = 4
+
+# Variable de entorno para ubicar la caché en otra carpeta
+CACHE_DIR_ENV = 'DAX_OPTIMIZER_CACHE_DIR'
+
+# Un archivo modificado hasta 2 s antes de guardar el índice puede volver a
+# cambiar sin que cambie su mtime (resolución de FAT/SMB): se verifica por hash
+RACY_WINDOW_NS = 2_000_000_000
+
+
+@dataclass
+class IndexStats:
+    """Resultado de una carga con índice"""
+    files_total: int = 0
+    files_reused: int = 0      # Sin cambios (tamaño y mtime iguales)
+    files_verified: int = 0    # Releídos pero con el mismo hash
+    files_parsed: int = 0      # Nuevos o modificados
+    files_removed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def reuse_rate(self) -> float:
+        if self.files_total == 0:
+            return 0.0
+        return (self.files_reused + self.files_verified) / self.files_total
+
+
+def get_cache_dir() -> str:
+    """Carpeta de caché del usuario (DAX_OPTIMIZER_CACHE_DIR si está definida)"""
+    configured = os.environ.get(CACHE_DIR_ENV)
+    if configured:
+        return configured
+
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'dax-optimizer')
+
+
+def get_index_path(definition_path: str, cache_dir: Optional[str] = None) -> str:
+    """Ruta del índice de una carpeta definition"""
+    definition_path = os.path.abspath(definition_path)
+    key = hashlib.sha1(os.path.normcase(definition_path).encode('utf-8')).hexdigest()[:16]
+    model_name = os.path.basename(os.path.dirname(definition_path)) or 'model'
+    return os.path.join(cache_dir or get_cache_dir(), 'model-index', f"{model_name}-{key}.json")
+
+
+def load_index(index_path: str, definition_path: str) -> Dict:
+    """
+    Lee un índice; si no existe, es de otra versión o está corrupto retorna uno vacío
+
+    Returns:
+        {'version', 'definition_path', 'written_ns', 'files': {ruta relativa: entrada}}
+    """
+    empty = {
+        'version': INDEX_VERSION,
+        'definition_path': os.path.abspath(definition_path),
+        'written_ns': 0,
+        'files': {}
+    }
+
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return empty
+
+    if (not isinstance(index, dict)
+            or index.get('version') != INDEX_VERSION
+            or index.get('definition_path') != empty['definition_path']
+            or not isinstance(index.get('files'), dict)):
+        return empty
+    return index
+
+
+def save_index(index_path: str, index: Dict) -> bool:
+    """Escribe el índice de forma atómica (archivo temporal + rename)"""
+    index['written_ns'] = time.time_ns()
+    directory = os.path.dirname(index_path)
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix='.index-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, index_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError as e:
+        print(f"No se pudo guardar el índice del modelo: {e}")
+        return False
+
+    return True
+
+
+def clear_model_index(definition_path: str, cache_dir: Optional[str] = None) -> bool:
+    """Elimina el índice de un modelo (retorna False si no existía)"""
+    try:
+        os.remove(get_index_path(definition_path, cache_dir))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _read_source(path: str, model_format: str) -> Tuple[bytes, str]:
+    """Lee un archivo del modelo y calcula el hash de su contenido"""
+    with instrumentation.stage('io.read_model_bim' if model_format == 'bim' else 'io.read_tmdl'):
+        with open(path, 'rb') as f:
+            data = f.read()
+    instrumentation.count('bytes_read', len(data))
+    instrumentation.count('files_read')
+    return data, hashlib.sha256(data).hexdigest()
+
+
+def _parse_source(path: str, model_format: str, data: bytes) -> Tuple[List[Dict], Dict]:
+    """Extrae las medidas y el fragmento de metadatos del contenido de un archivo del modelo"""
+    try:
+        if model_format == 'bim':
+            model_data = json.loads(data.decode('utf-8-sig'))
+            return parse_model_bim_data(model_data), get_bim_metadata(model_data)
+        # Mismos saltos de línea que la lectura en modo texto de parse_single_tmdl_file
+        content = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        table_name = get_tmdl_table_name(path)
+        return parse_tmdl_content(content, table_name), get_tmdl_metadata(content, table_name)
+    except Exception as e:
+        print(f"Error al parsear {path}: {e}")
+        return [], {}
+
+
+def load_measures_indexed(definition_path: str, cache_dir: Optional[str] = None,
+                          max_workers: Optional[int] = None) -> Tuple[List[Dict], IndexStats]:
+    """
+    Extrae las medidas de una carpeta definition reutilizando el índice persistente
+
+    Args:
+        definition_path: Carpeta definition del modelo
+        cache_dir: Carpeta de caché (None = get_cache_dir())
+        max_workers: Lecturas simultáneas de archivos modificados
+
+    Returns:
+        Tupla (medidas, estadísticas de la carga)
+    """
+    measures, _, stats = load_model_indexed(definition_path, cache_dir, max_workers)
+    return measures, stats
+
+
+def load_model_indexed(definition_path: str, cache_dir: Optional[str] = None,
+                       max_workers: Optional[int] = None) -> Tuple[List[Dict], ModelMetadata, IndexStats]:
+    """
+    Extrae las medidas y los metadatos de una carpeta definition reutilizando el índice persistente
+
+    Un archivo con el mismo tamaño y mtime que en el índice no se abre; si
+    cambió el mtime pero no el contenido (hash igual) se reutilizan sus
+    medidas y metadatos; solo los nuevos o modificados se parsean. El resultado
+    es el mismo que load_model_bim / load_tmdl_files, en el mismo orden.
+
+    Args:
+        definition_path: Carpeta definition del modelo
+        cache_dir: Carpeta de caché (None = get_cache_dir())
+        max_workers: Lecturas simultáneas de archivos modificados
+
+    Returns:
+        Tupla (medidas, metadatos del modelo, estadísticas de la carga)
+    """
+    started = time.perf_counter()
+    stats = IndexStats()
+    index_path = get_index_path(definition_path, cache_dir)
+
+    with instrumentation.stage('io.model_index'):
+        index = load_index(index_path, definition_path)
+        model_format, source_path = get_model_source(definition_path)
+        source_files = [source_path] if model_format == 'bim' else find_tmdl_files(source_path)
+
+    previous = index['files']
+    racy_limit = index['written_ns'] - RACY_WINDOW_NS
+    entries: Dict[str, Dict] = {}
+    to_read: List[Tuple[str, str, os.stat_result]] = []
+
+    for path in source_files:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+
+        relative = os.path.relpath(path, definition_path)
+        entry = previous.get(relative)
+        if (entry is not None
+                and entry.get('format') == model_format
+                and entry['size'] == stat.st_size
+                and entry['mtime_ns'] == stat.st_mtime_ns
+                and stat.st_mtime_ns < racy_limit):
+            entries[relative] = entry
+            stats.files_reused += 1
+        else:
+            to_read.append((relative, path, stat))
+
+    changed = bool(to_read)
+    if to_read:
+        workers = max(1, min(max_workers or DEFAULT_TMDL_READ_WORKERS, len(to_read)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='model-index') as executor:
+            contents = list(executor.map(lambda item: _read_source(item[1], model_format), to_read))
+
+        for (relative, path, stat), (data, digest) in zip(to_read, contents):
+            entry = previous.get(relative)
+            if entry is not None and entry.get('format') == model_format and entry.get('sha256') == digest:
+                measures, metadata = entry['measures'], entry['metadata']
+                stats.files_verified += 1
+            else:
+                measures, metadata = _parse_source(path, model_format, data)
+                stats.files_parsed += 1
+
+            entries[relative] = {
+                'format': model_format,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': digest,
+                'measures': measures,
+                'metadata': metadata
+            }
+
+    stats.files_total = len(entries)
+    stats.files_removed = len(set(previous) - set(entries))
+    if changed or stats.files_removed:
+        index['files'] = entries
+        save_index(index_path, index)
+
+    # Mismo orden que el escaneo (os.walk), no el del índice
+    measures = []
+    fragments = []
+    for path in source_files:
+        entry = entries.get(os.path.relpath(path, definition_path))
+        if entry is not None:
+            measures.extend(entry['measures'])
+            fragments.append(entry['metadata'])
+
+    stats.seconds = time.perf_counter() - started
+    instrumentation.count('index_files_reused', stats.files_reused + stats.files_verified)
+    instrumentation.count('index_files_parsed', stats.files_parsed)
+    tracing.current_span().set_attributes({
+        'dax.index.files': stats.files_total,
+        'dax.index.files_parsed': stats.files_parsed,
+        'dax.index.reuse_rate': round(stats.reuse_rate, 4)
+    })
+
+    return measures, build_model_metadata(fragments), stats
@@ -0,0 +1,136 @@
+"""
+Metadatos estructurales del modelo: tablas, columnas y relaciones
+pbip_extractor los lee en la misma pasada que las medidas: de cada archivo
+(model.bim o cada .tmdl) obtiene sus objetos DAX y un fragmento de metadatos,
+un diccionario serializable que el índice del modelo guarda junto a las
+medidas del archivo. build_model_metadata combina los fragmentos en un
+ModelMetadata para las reglas de model_analyzer.
+"""
+
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Optional, Iterable, Set
+
+from .dataclass_slots import slotted_dataclass
+
+
+# Tablas ocultas que crea la opción Fecha/hora automática de Power BI (una por columna de fecha)
+AUTO_DATE_TABLE_PREFIXES = ('LocalDateTable_', 'DateTableTemplate_')
+
+# Tipos de los objetos del modelo que se rankean junto con medidas y objetos calculados
+MODEL_OBJECT_TYPES = ('column', 'relationship')
+
+
+@slotted_dataclass()
+class ColumnInfo:
+    """Columna de una tabla del modelo"""
+    name: str
+    data_type: str = ''  # 'string', 'int64', 'double', 'decimal', 'dateTime', 'boolean', ...
+    is_hidden: bool = False
+    is_calculated: bool = False
+    format_string: str = ''
+    date_type: str = ''  # Anotación UnderlyingDateTimeDataType ('Date', 'DateTime', 'Time')
+
+    @property
+    def is_datetime(self) -> bool:
+        return self.data_type.lower() == 'datetime'
+
+
+@slotted_dataclass()
+class TableInfo:
+    """Tabla del modelo con sus columnas"""
+    name: str
+    is_hidden: bool = False
+    is_calculated: bool = False
+    columns: List[ColumnInfo] = field(default_factory=list)
+
+    @property
+    def is_auto_date(self) -> bool:
+        return is_auto_date_table(self.name)
+
+
+@slotted_dataclass(frozen=True)
+class RelationshipInfo:
+    """Relación entre dos columnas (del lado 'from', normalmente muchos, al lado 'to')"""
+    from_table: str
+    from_column: str
+    to_table: str
+    to_column: str
+    from_cardinality: str = 'many'
+    to_cardinality: str = 'one'
+    cross_filtering: str = 'oneDirection'  # 'bothDirections', 'automatic'
+    is_active: bool = True
+
+    @property
+    def is_bidirectional(self) -> bool:
+        return self.cross_filtering.lower() == 'bothdirections'
+
+    @property
+    def is_many_to_many(self) -> bool:
+        return self.from_cardinality.lower() == 'many' and self.to_cardinality.lower() == 'many'
+
+    @property
+    def label(self) -> str:
+        return f"{self.from_table}[{self.from_column}] -> {self.to_table}[{self.to_column}]"
+
+
+@dataclass
+class ModelMetadata:
+    """Estructura del modelo combinada de todos sus archivos"""
+    tables: List[TableInfo] = field(default_factory=list)
+    relationships: List[RelationshipInfo] = field(default_factory=list)
+    auto_date_time: Optional[bool] = None  # Anotación __PBI_TimeIntelligenceEnabled (None = sin anotación)
+    column_references: Set[str] = field(default_factory=set)  # Columnas usadas fuera de su definición (minúsculas)
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def table(self, name: str) -> Optional[TableInfo]:
+        name = name.lower()
+        return next((table for table in self.tables if table.name.lower() == name), None)
+
+    @property
+    def auto_date_tables(self) -> List[TableInfo]:
+        return [table for table in self.tables if table.is_auto_date]
+
+
+def is_auto_date_table(name: str) -> bool:
+    """True si la tabla la creó la opción Fecha/hora automática (LocalDateTable_..., DateTableTemplate_...)"""
+    return name.startswith(AUTO_DATE_TABLE_PREFIXES)
+
+
+def metadata_fragment(tables: Iterable[TableInfo] = (), relationships: Iterable[RelationshipInfo] = (),
+                      auto_date_time: Optional[bool] = None, column_references: Iterable[str] = ()) -> Dict:
+    """Fragmento serializable (JSON) con los metadatos de un archivo del modelo"""
+    return {
+        'tables': [asdict(table) for table in tables],
+        'relationships': [asdict(relationship) for relationship in relationships],
+        'auto_date_time': auto_date_time,
+        'column_references': sorted(set(column_references))
+    }
+
+
+def build_model_metadata(fragments: Iterable[Dict]) -> ModelMetadata:
+    """
+    Combina los fragmentos de metadatos de los archivos del modelo
+
+    Args:
+        fragments: Fragmentos de metadata_fragment (en el orden de los archivos)
+
+    Returns:
+        ModelMetadata
+    """
+    metadata = ModelMetadata()
+
+    for fragment in fragments:
+        if not fragment:
+            continue
+        for table in fragment.get('tables', []):
+            columns = [ColumnInfo(**column) for column in table.get('columns', [])]
+            metadata.tables.append(TableInfo(**{**table, 'columns': columns}))
+        metadata.relationships.extend(RelationshipInfo(**relationship)
+                                      for relationship in fragment.get('relationships', []))
+        if fragment.get('auto_date_time') is not None:
+            metadata.auto_date_time = fragment['auto_date_time']
+        metadata.column_references.update(fragment.get('column_references', []))
+
+    return metadata
@@ -0,0 +1,254 @@
+"""
+Modo watch: re-análisis incremental al guardar archivos del modelo
+Observa la carpeta definition (polling de tamaño y mtime de los .tmdl y
+model.bim) y, ante un cambio, relee solo los archivos modificados (índice del
+modelo) y analiza solo las expresiones que no estaban en la caché. Las
+subexpresiones compartidas y las reescrituras por relación también se
+recalculan solo para las expresiones que cambiaron (SharedExpressionCache,
+RelationshipRewriteCache).
+"""
+
+import os
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Callable, Tuple, TYPE_CHECKING
+
+from .analysis_budget import DEFAULT_MEASURE_TIMEOUT, DEFAULT_MEMORY_LIMIT_MB
+from .analysis_runner import AnalysisCache, analyze_measures
+from .measure_ranker import rank_measures
+from .model_index import load_model_indexed
+from .model_analyzer import analyze_model
+from .relationship_graph import RelationshipRewriteCache, apply_relationship_rewrites
+from .shared_expressions import SharedExpressionCache, apply_shared_expressions
+from .performance_trace import join_trace_to_measures
+from .server_timings import join_server_timings_to_measures
+from .measure_graph import find_dead_measures, exclude_dead_measures
+from .pbip_extractor import find_definition_path, is_measure
+from . import tracing
+
+if TYPE_CHECKING:
+    from .measure_ranker import RankedMeasure
+    from .vpax_importer import ModelStatistics
+    from .performance_trace import PerformanceTrace
+    from .server_timings import ServerTiming
+    from .report_usage import ReportUsage
+
+
+# Intervalo de polling: un cambio se detecta en menos de medio segundo
+DEFAULT_POLL_INTERVAL = 0.5
+
+# Espera hasta que los archivos dejan de cambiar (los editores guardan en varios pasos)
+DEBOUNCE_SECONDS = 0.1
+
+_WATCHED_EXTENSIONS = ('.tmdl', '.bim')
+
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+@dataclass
+class WatchUpdate:
+    """Resultado de un ciclo del modo watch"""
+    cycle: int
+    ranked_measures: List['RankedMeasure']
+    failed_measures: List[Dict]
+    changed_files: List[str] = field(default_factory=list)  # Vacío en el primer análisis
+    analyzed_expressions: int = 0  # Expresiones que no estaban en la caché
+    seconds: float = 0.0
+    dead_measures: List[Dict] = field(default_factory=list)  # Excluidas del análisis (exclude_dead)
+
+
+def snapshot_model_files(definition_path: str) -> Snapshot:
+    """
+    Tamaño y mtime de los archivos del modelo
+
+    Args:
+        definition_path: Carpeta definition
+
+    Returns:
+        {ruta relativa: (tamaño, mtime_ns)}
+    """
+    snapshot: Snapshot = {}
+    for root, dirs, files in os.walk(definition_path):
+        for name in files:
+            if not name.endswith(_WATCHED_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Borrado entre el listado y el stat
+            snapshot[os.path.relpath(path, definition_path)] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+def diff_snapshots(previous: Snapshot, current: Snapshot) -> List[str]:
+    """Archivos nuevos, modificados o borrados entre dos snapshots (ordenados)"""
+    changed = {path for path, state in current.items() if previous.get(path) != state}
+    changed.update(path for path in previous if path not in current)
+    return sorted(changed)
+
+
+class ModelWatcher:
+    """
+    Analiza un modelo PBIP y lo re-analiza de forma incremental cuando cambia
+
+    Args:
+        file_path: Ruta al .pbip o a la carpeta del proyecto / .SemanticModel
+        timeout: Segundos máximos por expresión
+        memory_limit_mb: Memoria máxima por worker en MB
+        workers: Procesos worker (0 = en el proceso actual)
+        cache: Caché de análisis (se crea una si no se indica)
+        index_dir: Carpeta del índice del modelo (None = caché del usuario)
+        statistics: Estadísticas VertiPaq para ponderar el ranking (vpax_importer.load_vpax)
+        performance_trace: Sesión del Performance Analyzer para ordenar por tiempo observado
+        server_timings: Server timings de DAX Studio (desglose SE/FE por medida)
+        report_usage: Uso de las medidas en el reporte (pondera el ranking por exposición)
+        exclude_dead: No analizar las medidas que ningún visual usa ni directa ni indirectamente
+            (requiere report_usage; se recalcula en cada ciclo con las medidas actuales)
+        include_calculated: Incluir columnas y tablas calculadas (False = solo medidas)
+        model_rules: Incluir las reglas del modelo (relaciones, columnas, Fecha/hora automática)
+
+    Raises:
+        ValueError: Si la ruta no tiene una carpeta definition (p. ej. un ZIP)
+    """
+
+    def __init__(self, file_path: str,
+                 timeout: Optional[float] = DEFAULT_MEASURE_TIMEOUT,
+                 memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+                 workers: Optional[int] = None,
+                 cache: Optional[AnalysisCache] = None,
+                 index_dir: Optional[str] = None,
+                 statistics: Optional['ModelStatistics'] = None,
+                 performance_trace: Optional['PerformanceTrace'] = None,
+                 server_timings: Optional[List['ServerTiming']] = None,
+                 report_usage: Optional['ReportUsage'] = None,
+                 exclude_dead: bool = False,
+                 include_calculated: bool = True,
+                 model_rules: bool = True):
+        definition_path = find_definition_path(file_path)
+        if definition_path is None:
+            raise ValueError(
+                "El modo watch necesita la ruta a un .pbip o a una carpeta .SemanticModel "
+                "(no se puede observar un ZIP)"
+            )
+
+        self.file_path = file_path
+        self.definition_path = definition_path
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.workers = workers
+        self.cache = cache if cache is not None else AnalysisCache()
+        self.shared_expressions = SharedExpressionCache()
+        self.relationship_rewrites = RelationshipRewriteCache()
+        self.index_dir = index_dir
+        self.statistics = statistics
+        self.performance_trace = performance_trace
+        self.server_timings = server_timings
+        self.report_usage = report_usage
+        self.exclude_dead = exclude_dead
+        self.include_calculated = include_calculated
+        self.model_rules = model_rules
+        self.snapshot: Snapshot = {}
+        self.cycle = 0
+
+    def poll(self) -> List[str]:
+        """
+        Archivos que cambiaron desde el último análisis (sin analizar)
+
+        Returns:
+            Rutas relativas a definition; vacío si no hubo cambios
+        """
+        current = snapshot_model_files(self.definition_path)
+        if not diff_snapshots(self.snapshot, current):
+            return []
+
+        # Esperar a que termine de guardarse antes de reportar el cambio
+        while True:
+            time.sleep(DEBOUNCE_SECONDS)
+            settled = snapshot_model_files(self.definition_path)
+            if settled == current:
+                break
+            current = settled
+
+        return diff_snapshots(self.snapshot, current)
+
+    def refresh(self, changed_files: Optional[List[str]] = None) -> WatchUpdate:
+        """
+        Re-extrae (solo archivos modificados) y re-analiza (solo expresiones nuevas)
+
+        Args:
+            changed_files: Archivos que dispararon el ciclo (solo informativo)
+
+        Returns:
+            WatchUpdate con el ranking actualizado
+        """
+        started = time.perf_counter()
+        # El snapshot se toma antes de leer: lo que cambie durante el análisis dispara otro ciclo
+        self.snapshot = snapshot_model_files(self.definition_path)
+        misses_before = self.cache.misses
+
+        with tracing.span('watch.refresh', {'dax.watch.cycle': self.cycle,
+                                            'dax.watch.changed_files': len(changed_files or [])}):
+            measures, metadata, _ = load_model_indexed(self.definition_path, cache_dir=self.index_dir)
+            dead_measures = []
+            if self.exclude_dead and self.report_usage is not None:
+                # Con las columnas y tablas calculadas: sus referencias también son raíces
+                reachability = find_dead_measures(measures, self.report_usage)
+                measures = exclude_dead_measures(measures, reachability)
+                dead_measures = reachability.unreachable
+            if not self.include_calculated:
+                measures = [measure for measure in measures if is_measure(measure)]
+            analyzed_measures, failed_measures = analyze_measures(
+                measures, self.timeout, self.memory_limit_mb, self.workers, cache=self.cache
+            )
+            apply_relationship_rewrites(analyzed_measures, metadata, self.relationship_rewrites)
+            apply_shared_expressions(analyzed_measures, self.shared_expressions)
+            if self.model_rules:
+                analyzed_measures.extend(analyze_model(metadata, self.statistics))
+            observed = None
+            if self.performance_trace is not None:
+                observed = join_trace_to_measures(self.performance_trace, measures)
+            measure_timings = None
+            if self.server_timings:
+                measure_timings = join_server_timings_to_measures(self.server_timings, measures)
+            ranked_measures = rank_measures(analyzed_measures, self.statistics, observed, measure_timings,
+                                            self.report_usage)
+
+        update = WatchUpdate(
+            cycle=self.cycle,
+            ranked_measures=ranked_measures,
+            failed_measures=failed_measures,
+            changed_files=list(changed_files or []),
+            analyzed_expressions=self.cache.misses - misses_before,
+            seconds=time.perf_counter() - started,
+            dead_measures=dead_measures
+        )
+        self.cycle += 1
+        return update
+
+    def run(self, on_update: Callable[[WatchUpdate], None],
+            interval: float = DEFAULT_POLL_INTERVAL,
+            stop_event: Optional[threading.Event] = None,
+            max_cycles: Optional[int] = None) -> None:
+        """
+        Analiza el modelo y vuelve a analizarlo cada vez que cambia
+
+        Args:
+            on_update: Función llamada con cada WatchUpdate (el primero es el análisis completo)
+            interval: Segundos entre cada verificación de cambios
+            stop_event: Evento para detener el bucle desde otro thread
+            max_cycles: Detenerse tras esta cantidad de análisis (None = sin límite)
+        """
+        on_update(self.refresh())
+
+        while max_cycles is None or self.cycle < max_cycles:
+            if stop_event is not None:
+                if stop_event.wait(interval):
+                    return
+            else:
+                time.sleep(interval)
+
+            changed_files = self.poll()
+            if changed_files:
+                on_update(self.refresh(changed_files))
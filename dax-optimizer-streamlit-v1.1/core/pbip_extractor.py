@@ -1,23 +1,98 @@
 """
 Extractor de medidas DAX desde archivos PBIP
 Soporta tanto archivos model.bim (JSON) como formato TMDL
+
+Además de las medidas se extraen las columnas calculadas y las tablas
+calculadas (particiones de tipo calculated), con su tipo de objeto real
+según los metadatos del modelo.
+
+En la misma lectura de cada archivo se obtienen los metadatos estructurales
+del modelo (tablas, columnas, relaciones; ver model_metadata) para las
+reglas de model_analyzer.
 """
 
 import json
+import re
 import zipfile
 import os
-from typing import List, Dict, Optional
+import itertools
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, Optional, Iterator, Tuple, Callable, Any
 from pathlib import Path
 import tempfile
 import shutil
 
+from . import instrumentation
+from . import tracing
+from .model_metadata import (
+    ColumnInfo,
+    TableInfo,
+    RelationshipInfo,
+    ModelMetadata,
+    is_auto_date_table,
+    metadata_fragment,
+    build_model_metadata
+)
+
+
+# Lecturas TMDL simultáneas: el trabajo es mayormente I/O (carpetas de red)
+DEFAULT_TMDL_READ_WORKERS = 8
+
+# Nombre de objeto TMDL: entre comillas simples ('' escapa la comilla) o sin comillas
+_TMDL_NAME = r"('(?:[^']|'')+'|[^\s'=]+)"
+
+# Encabezado de medida TMDL: measure Nombre = (la expresión sigue en la línea o en las siguientes)
+_TMDL_MEASURE_HEADER = re.compile(rf"^([ \t]*)measure[ \t]+{_TMDL_NAME}[ \t]*=[ \t]*", re.IGNORECASE | re.MULTILINE)
+
+# Columna calculada: column Nombre = (una columna sin '=' es una columna de datos)
+_TMDL_COLUMN_HEADER = re.compile(rf"^([ \t]*)column[ \t]+{_TMDL_NAME}[ \t]*=[ \t]*", re.IGNORECASE | re.MULTILINE)
+
+# Partición de tabla calculada: partition Nombre = calculated, con su expresión en source =
+_TMDL_CALCULATED_PARTITION = re.compile(
+    rf"^([ \t]*)partition[ \t]+{_TMDL_NAME}[ \t]*=[ \t]*calculated\b", re.IGNORECASE | re.MULTILINE
+)
+_TMDL_SOURCE_PROPERTY = re.compile(r"^([ \t]*)source[ \t]*=[ \t]*", re.IGNORECASE | re.MULTILINE)
+
+# Objetos TMDL cuyos metadatos se leen: table, column (de datos o calculada), relationship y model
+_TMDL_TABLE_HEADER = re.compile(rf"^([ \t]*)table[ \t]+{_TMDL_NAME}", re.IGNORECASE | re.MULTILINE)
+_TMDL_ANY_COLUMN_HEADER = re.compile(rf"^([ \t]*)column[ \t]+{_TMDL_NAME}([ \t]*=)?", re.IGNORECASE | re.MULTILINE)
+_TMDL_RELATIONSHIP_HEADER = re.compile(rf"^([ \t]*)relationship[ \t]+{_TMDL_NAME}", re.IGNORECASE | re.MULTILINE)
+_TMDL_MODEL_HEADER = re.compile(rf"^([ \t]*)model[ \t]+{_TMDL_NAME}", re.IGNORECASE | re.MULTILINE)
+
+# Propiedad TMDL: clave y valor ('dataType: dateTime', 'isHidden', 'annotation Nombre = Valor')
+_TMDL_PROPERTY = re.compile(r"(\w+)(?:[ \t]*:[ \t]*|[ \t]+|$)(.*)")
+
+# Referencia a columna de una relación TMDL: Tabla.Columna (cada parte puede ir entre comillas)
+_TMDL_COLUMN_REFERENCE = re.compile(r"('(?:[^']|'')+'|[^.']+)\.('(?:[^']|'')+'|[^']+)$")
+
+# Propiedades que usan una columna por nombre (niveles de jerarquía y ordenar por columna)
+_TMDL_COLUMN_PROPERTY = re.compile(r"^[ \t]*(?:column|sortByColumn)[ \t]*:[ \t]*(.+?)[ \t]*$", re.MULTILINE)
+
+# Referencia [Nombre] en una expresión (columna o medida)
+_BRACKET_NAME = re.compile(r"\[([^\[\]]+)\]")
+
+# Anotaciones de Power BI usadas por las reglas del modelo
+TIME_INTELLIGENCE_ANNOTATION = '__PBI_TimeIntelligenceEnabled'
+DATE_TYPE_ANNOTATION = 'UnderlyingDateTimeDataType'
+
+# Tipos de objeto extraídos (ver dax_parser.OBJECT_TYPES)
+MEASURE = 'measure'
+CALCULATED_COLUMN = 'calculated-column'
+CALCULATED_TABLE = 'calculated-table'
 
-def extract_measures_from_pbip(file_path: str) -> List[Dict]:
+
+def extract_measures_from_pbip(file_path: str, use_index: bool = False,
+                               index_dir: Optional[str] = None,
+                               include_calculated: bool = True) -> List[Dict]:
     """
     Extrae todas las medidas DAX de un archivo/carpeta PBIP
 
     Args:
         file_path: Ruta al archivo PBIP (.pbip puede ser carpeta o ZIP)
+        use_index: Reutilizar el índice persistente del modelo (ver model_index);
+            no aplica a ZIP, que se extraen a una carpeta temporal
+        index_dir: Carpeta del índice (None = caché del usuario)
+        include_calculated: Incluir columnas y tablas calculadas (False = solo medidas)
 
     Returns:
         Lista de diccionarios con información de cada medida:
@@ -26,8 +101,31 @@ def extract_measures_from_pbip(file_path: str) -> List[Dict]:
             'expression': str,
             'table': str,
             'description': str (opcional),
-            'format': str (opcional)
+            'format': str (opcional),
+            'object_type': 'measure', 'calculated-column' o 'calculated-table'
         }
+        En las tablas calculadas 'name' y 'table' son el nombre de la tabla.
+        No incluye las tablas de Fecha/hora automática (ver model_analyzer).
+    """
+    measures, _ = extract_model_from_pbip(file_path, use_index, index_dir, include_calculated)
+    return measures
+
+
+@tracing.traced('extract')
+def extract_model_from_pbip(file_path: str, use_index: bool = False,
+                            index_dir: Optional[str] = None,
+                            include_calculated: bool = True) -> Tuple[List[Dict], ModelMetadata]:
+    """
+    Extrae las medidas y los metadatos estructurales de un archivo/carpeta PBIP en una sola lectura
+
+    Args:
+        file_path: Ruta al archivo PBIP (.pbip puede ser carpeta o ZIP)
+        use_index: Reutilizar el índice persistente del modelo (ver model_index)
+        index_dir: Carpeta del índice (None = caché del usuario)
+        include_calculated: Incluir columnas y tablas calculadas (False = solo medidas)
+
+    Returns:
+        Tupla (medidas como en extract_measures_from_pbip, ModelMetadata)
     """
     measures = []
     temp_dir = None
@@ -103,25 +201,42 @@ def extract_measures_from_pbip(file_path: str) -> List[Dict]:
             if not found:
                 raise ValueError("No se encontró la carpeta 'definition' en el archivo PBIP. Asegúrate de proporcionar la ruta al archivo .pbip o a la carpeta .SemanticModel que contiene los archivos del modelo.")
 
-        # Verificar si existe model.bim (formato JSON)
-        model_bim_path = os.path.join(definition_path, 'model.bim')
-        if os.path.exists(model_bim_path):
-            measures = parse_model_bim(model_bim_path)
+        if use_index and not temp_dir:
+            # Solo se releen los archivos que cambiaron desde el último análisis
+            from .model_index import load_model_indexed
+            measures, metadata, _ = load_model_indexed(definition_path, cache_dir=index_dir)
         else:
-            # Intentar con formato TMDL
-            tmdl_path = os.path.join(definition_path, '.tmdl')
-            if os.path.exists(tmdl_path):
-                measures = parse_tmdl_files(tmdl_path)
+            model_format, source_path = get_model_source(definition_path)
+            if model_format == 'bim':
+                measures, fragment = load_model_bim(source_path)
+                fragments = [fragment]
             else:
-                # Buscar archivos .tmdl directamente en definition
-                measures = parse_tmdl_files(definition_path)
+                measures, fragments = load_tmdl_files(source_path)
+            metadata = build_model_metadata(fragments)
 
     finally:
         # Limpiar archivos temporales solo si se creó temp_dir
         if cleanup_needed and temp_dir:
             shutil.rmtree(temp_dir, ignore_errors=True)
 
-    return measures
+    if not include_calculated:
+        measures = [measure for measure in measures if is_measure(measure)]
+
+    calculated_count = sum(1 for measure in measures if not is_measure(measure))
+    instrumentation.count('measures', len(measures) - calculated_count)
+    instrumentation.count('calculated_objects', calculated_count)
+    tracing.current_span().set_attributes({
+        'dax.measure_count': len(measures) - calculated_count,
+        'dax.calculated_count': calculated_count,
+        'dax.table_count': len(metadata.tables),
+        'dax.relationship_count': len(metadata.relationships)
+    })
+    return measures, metadata
+
+
+def is_measure(measure: Dict) -> bool:
+    """True si el objeto extraído es una medida (no una columna o tabla calculada)"""
+    return measure.get('object_type', MEASURE) == MEASURE
 
 
 def parse_model_bim(file_path: str) -> List[Dict]:
@@ -134,53 +249,324 @@ def parse_model_bim(file_path: str) -> List[Dict]:
     Returns:
         Lista de medidas encontradas
     """
+    measures, _ = load_model_bim(file_path)
+    return measures
+
+
+def load_model_bim(file_path: str) -> Tuple[List[Dict], Dict]:
+    """
+    Lee un model.bim una vez y extrae sus objetos DAX y sus metadatos
+
+    Args:
+        file_path: Ruta al archivo model.bim
+
+    Returns:
+        Tupla (objetos como en parse_model_bim_data, fragmento de metadatos; ver get_bim_metadata)
+    """
     measures = []
+    fragment = {}
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            model_data = json.load(f)
+        with instrumentation.stage('io.read_model_bim'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                model_data = json.load(f)
+                instrumentation.count('bytes_read', os.fstat(f.fileno()).st_size)
+                instrumentation.count('files_read')
 
-        # Navegar por la estructura del model.bim
-        # Estructura típica: model -> tables -> measures
-        if 'model' in model_data:
-            model = model_data['model']
-        else:
-            model = model_data
+        measures = parse_model_bim_data(model_data)
+        fragment = get_bim_metadata(model_data)
 
-        # Obtener tablas
-        tables = model.get('tables', [])
+    except Exception as e:
+        print(f"Error al parsear model.bim: {e}")
 
-        for table in tables:
-            table_name = table.get('name', 'Unknown Table')
+    return measures, fragment
 
-            # Obtener medidas de la tabla
-            table_measures = table.get('measures', [])
 
-            for measure in table_measures:
-                measure_info = {
-                    'name': measure.get('name', 'Unnamed Measure'),
-                    'expression': measure.get('expression', ''),
-                    'table': table_name,
-                    'description': measure.get('description', ''),
-                    'format': measure.get('formatString', '')
-                }
+def parse_model_bim_data(model_data: Dict) -> List[Dict]:
+    """
+    Extrae las medidas, columnas calculadas y tablas calculadas de un model.bim ya cargado
 
-                # Solo agregar si tiene expresión
-                if measure_info['expression']:
-                    measures.append(measure_info)
+    Args:
+        model_data: Contenido JSON del model.bim
 
-    except Exception as e:
-        print(f"Error al parsear model.bim: {e}")
+    Returns:
+        Lista de objetos encontrados (ver extract_measures_from_pbip)
+    """
+    measures = []
+
+    # Navegar por la estructura del model.bim
+    # Estructura típica: model -> tables -> measures
+    if 'model' in model_data:
+        model = model_data['model']
+    else:
+        model = model_data
+
+    # Obtener tablas
+    tables = model.get('tables', [])
+
+    for table in tables:
+        table_name = table.get('name', 'Unknown Table')
+
+        # Obtener medidas de la tabla
+        table_measures = table.get('measures', [])
+
+        for measure in table_measures:
+            measure_info = {
+                'name': measure.get('name', 'Unnamed Measure'),
+                'expression': get_bim_expression(measure.get('expression')),
+                'table': table_name,
+                'description': measure.get('description', ''),
+                'format': measure.get('formatString', ''),
+                'object_type': MEASURE
+            }
+
+            # Solo agregar si tiene expresión
+            if measure_info['expression']:
+                measures.append(measure_info)
+
+        # Las tablas de Fecha/hora automática las reporta model_analyzer (una por columna de fecha)
+        if is_auto_date_table(table_name):
+            continue
+
+        # Columnas calculadas (las de datos y las de tablas calculadas no tienen expresión propia)
+        for column in table.get('columns', []):
+            expression = get_bim_expression(column.get('expression'))
+            if column.get('type') == 'calculated' and expression:
+                measures.append({
+                    'name': column.get('name', 'Unnamed Column'),
+                    'expression': expression,
+                    'table': table_name,
+                    'description': column.get('description', ''),
+                    'format': column.get('formatString', ''),
+                    'object_type': CALCULATED_COLUMN
+                })
+
+        # Tabla calculada: la expresión está en la partición
+        for partition in table.get('partitions', []):
+            source = partition.get('source') or {}
+            expression = get_bim_expression(source.get('expression'))
+            if source.get('type') == 'calculated' and expression:
+                measures.append({
+                    'name': table_name,
+                    'expression': expression,
+                    'table': table_name,
+                    'description': table.get('description', ''),
+                    'format': '',
+                    'object_type': CALCULATED_TABLE
+                })
 
     return measures
 
 
-def parse_tmdl_files(tmdl_folder: str) -> List[Dict]:
+def get_bim_expression(expression) -> str:
+    """Expresión de un objeto de model.bim (las de varias líneas se guardan como lista)"""
+    if isinstance(expression, list):
+        return '\n'.join(str(line) for line in expression)
+    return expression or ''
+
+
+def get_bim_metadata(model_data: Dict) -> Dict:
+    """
+    Metadatos estructurales de un model.bim ya cargado
+
+    Args:
+        model_data: Contenido JSON del model.bim
+
+    Returns:
+        Fragmento de metadatos (model_metadata.metadata_fragment)
+    """
+    model = model_data.get('model', model_data)
+    tables = []
+    references = set()
+
+    for table in model.get('tables', []):
+        columns = []
+        for column in table.get('columns', []):
+            columns.append(ColumnInfo(
+                name=column.get('name', ''),
+                data_type=column.get('dataType', ''),
+                is_hidden=bool(column.get('isHidden', False)),
+                is_calculated=column.get('type') == 'calculated',
+                format_string=column.get('formatString', ''),
+                date_type=get_bim_annotation(column, DATE_TYPE_ANNOTATION) or ''
+            ))
+        tables.append(TableInfo(
+            name=table.get('name', ''),
+            is_hidden=bool(table.get('isHidden', False)),
+            is_calculated=any((partition.get('source') or {}).get('type') == 'calculated'
+                              for partition in table.get('partitions', [])),
+            columns=columns
+        ))
+        # Las particiones tienen código M: solo cuentan las referencias de objetos DAX
+        references.update(iter_bim_column_references({key: value for key, value in table.items()
+                                                      if key != 'partitions'}))
+
+    references.update(iter_bim_column_references(model.get('roles', [])))
+
+    relationships = [
+        RelationshipInfo(
+            from_table=relationship.get('fromTable', ''),
+            from_column=relationship.get('fromColumn', ''),
+            to_table=relationship.get('toTable', ''),
+            to_column=relationship.get('toColumn', ''),
+            from_cardinality=relationship.get('fromCardinality', 'many'),
+            to_cardinality=relationship.get('toCardinality', 'one'),
+            cross_filtering=relationship.get('crossFilteringBehavior', 'oneDirection'),
+            is_active=relationship.get('isActive', True) is not False
+        )
+        for relationship in model.get('relationships', [])
+    ]
+
+    time_intelligence = get_bim_annotation(model, TIME_INTELLIGENCE_ANNOTATION)
+    return metadata_fragment(
+        tables, relationships,
+        auto_date_time=time_intelligence.strip() == '1' if time_intelligence is not None else None,
+        column_references=references
+    )
+
+
+def get_bim_annotation(bim_object: Dict, name: str) -> Optional[str]:
+    """Valor de una anotación de un objeto de model.bim (None si no la tiene)"""
+    for annotation in bim_object.get('annotations', []):
+        if annotation.get('name') == name:
+            return str(annotation.get('value', ''))
+    return None
+
+
+def iter_bim_column_references(node) -> Iterator[str]:
+    """
+    Nombres de columna (en minúsculas) que usa una parte de un model.bim
+
+    Cuenta las referencias [Nombre] de las expresiones DAX (expression,
+    filterExpression) y las columnas de niveles de jerarquía y de
+    sortByColumn. Los nombres no distinguen la tabla: una columna cuenta como
+    usada si alguna expresión usa ese nombre.
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                if key in ('expression', 'filterExpression'):
+                    for match in _BRACKET_NAME.finditer(get_bim_expression(value)):
+                        yield match.group(1).lower()
+                elif key in ('column', 'sortByColumn') and isinstance(value, str):
+                    yield value.lower()
+                elif isinstance(value, (dict, list)):
+                    stack.append(value)
+
+
+def find_definition_path(file_path: str) -> Optional[str]:
+    """
+    Carpeta definition de un .pbip o de una carpeta del proyecto (sin extraer ZIP)
+
+    Args:
+        file_path: Ruta al .pbip, a la carpeta .SemanticModel o a la carpeta del proyecto
+
+    Returns:
+        Ruta a la carpeta definition, o None si no se encuentra o es un ZIP
+    """
+    if os.path.isfile(file_path):
+        if not file_path.endswith('.pbip'):
+            return None
+        semantic_model_path = os.path.join(os.path.dirname(file_path), f"{Path(file_path).stem}.SemanticModel")
+        definition_path = os.path.join(semantic_model_path, 'definition')
+        return definition_path if os.path.isdir(definition_path) else None
+
+    if not os.path.isdir(file_path):
+        return None
+
+    definition_path = os.path.join(file_path, 'definition')
+    if os.path.isdir(definition_path):
+        return definition_path
+
+    for item in sorted(os.listdir(file_path)):
+        if item.endswith('.SemanticModel'):
+            definition_path = os.path.join(file_path, item, 'definition')
+            if os.path.isdir(definition_path):
+                return definition_path
+
+    return None
+
+
+def find_report_path(file_path: str) -> Optional[str]:
+    """
+    Carpeta .Report de un .pbip o de una carpeta del proyecto (sin extraer ZIP)
+
+    Usa la ruta declarada en el .pbip ('artifacts' -> 'report' -> 'path') y, si
+    no está, la carpeta <Nombre>.Report o la primera .Report del proyecto.
+
+    Args:
+        file_path: Ruta al .pbip, a la carpeta .SemanticModel o a la carpeta del proyecto
+
+    Returns:
+        Ruta a la carpeta .Report, o None si no se encuentra
+    """
+    if os.path.isfile(file_path):
+        if not file_path.endswith('.pbip'):
+            return None
+        try:
+            with open(file_path, 'r', encoding='utf-8-sig') as f:
+                artifacts = json.load(f).get('artifacts') or []
+        except (OSError, ValueError, AttributeError):
+            artifacts = []
+        for artifact in artifacts:
+            report_path = (artifact.get('report') or {}).get('path') if isinstance(artifact, dict) else None
+            if report_path:
+                report_path = os.path.join(os.path.dirname(file_path), report_path)
+                if os.path.isdir(report_path):
+                    return report_path
+        report_path = os.path.join(os.path.dirname(file_path), f"{Path(file_path).stem}.Report")
+        return report_path if os.path.isdir(report_path) else None
+
+    if not os.path.isdir(file_path):
+        return None
+
+    if file_path.rstrip('/\\').endswith('.SemanticModel'):
+        # La carpeta .Report es hermana de la .SemanticModel
+        report_path = file_path.rstrip('/\\')[:-len('.SemanticModel')] + '.Report'
+        return report_path if os.path.isdir(report_path) else None
+
+    for item in sorted(os.listdir(file_path)):
+        if item.endswith('.Report') and os.path.isdir(os.path.join(file_path, item)):
+            return os.path.join(file_path, item)
+
+    return None
+
+
+def get_model_source(definition_path: str) -> Tuple[str, str]:
+    """
+    Formato del modelo y ruta a parsear dentro de la carpeta definition
+
+    Returns:
+        ('bim', ruta al model.bim) o ('tmdl', carpeta con los archivos .tmdl)
+    """
+    # Verificar si existe model.bim (formato JSON)
+    model_bim_path = os.path.join(definition_path, 'model.bim')
+    if os.path.exists(model_bim_path):
+        return 'bim', model_bim_path
+
+    # Intentar con formato TMDL
+    tmdl_path = os.path.join(definition_path, '.tmdl')
+    if os.path.exists(tmdl_path):
+        return 'tmdl', tmdl_path
+
+    # Buscar archivos .tmdl directamente en definition
+    return 'tmdl', definition_path
+
+
+def parse_tmdl_files(tmdl_folder: str, max_workers: Optional[int] = None) -> List[Dict]:
     """
     Parsea archivos .tmdl (formato de texto) y extrae medidas
 
+    Los archivos se leen en paralelo (ver iter_tmdl_file_measures); el resultado
+    mantiene el orden de os.walk, igual que la lectura secuencial.
+
     Args:
         tmdl_folder: Carpeta que contiene archivos .tmdl
+        max_workers: Lecturas simultáneas (1 = secuencial)
 
     Returns:
         Lista de medidas encontradas
@@ -188,22 +574,111 @@ def parse_tmdl_files(tmdl_folder: str) -> List[Dict]:
     measures = []
 
     try:
-        # Buscar archivos .tmdl recursivamente
-        tmdl_files = []
+        tmdl_files = find_tmdl_files(tmdl_folder)
+        position = {path: index for index, path in enumerate(tmdl_files)}
+
+        # Se reordena por posición de archivo para que el resultado sea determinista
+        by_file = sorted(
+            iter_tmdl_file_measures(tmdl_files, max_workers),
+            key=lambda item: position[item[0]]
+        )
+        for _, file_measures in by_file:
+            measures.extend(file_measures)
+
+    except Exception as e:
+        print(f"Error al parsear archivos TMDL: {e}")
+
+    return measures
+
+
+def load_tmdl_files(tmdl_folder: str, max_workers: Optional[int] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Como parse_tmdl_files, pero cada archivo leído entrega también su fragmento de metadatos
+
+    Args:
+        tmdl_folder: Carpeta que contiene archivos .tmdl
+        max_workers: Lecturas simultáneas (1 = secuencial)
+
+    Returns:
+        Tupla (medidas, fragmentos de metadatos en el orden de los archivos)
+    """
+    measures = []
+    fragments = []
+
+    try:
+        tmdl_files = find_tmdl_files(tmdl_folder)
+        position = {path: index for index, path in enumerate(tmdl_files)}
+
+        by_file = sorted(
+            iter_tmdl_file_measures(tmdl_files, max_workers, parse_file=read_tmdl_file),
+            key=lambda item: position[item[0]]
+        )
+        for _, (file_measures, fragment) in by_file:
+            measures.extend(file_measures)
+            fragments.append(fragment)
+
+    except Exception as e:
+        print(f"Error al parsear archivos TMDL: {e}")
+
+    return measures, fragments
+
+
+def find_tmdl_files(tmdl_folder: str) -> List[str]:
+    """Archivos .tmdl de la carpeta (recursivo, en orden de os.walk)"""
+    tmdl_files = []
+    with instrumentation.stage('io.scan_tmdl_files'):
         for root, dirs, files in os.walk(tmdl_folder):
             for file in files:
                 if file.endswith('.tmdl'):
                     tmdl_files.append(os.path.join(root, file))
+    return tmdl_files
+
+
+def iter_tmdl_file_measures(tmdl_files: List[str],
+                            max_workers: Optional[int] = None,
+                            parse_file: Optional[Callable[[str], Any]] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Lee y parsea archivos TMDL con un pool de threads, a medida que terminan
+
+    Un proyecto TMDL tiene un archivo por tabla (a veces cientos) y suele estar
+    en carpetas de red donde cada apertura cuesta milisegundos: con varias
+    lecturas en vuelo esa latencia se solapa. Como máximo hay 2 * max_workers
+    archivos pendientes, así que la memoria no crece con el tamaño del proyecto.
+
+    Args:
+        tmdl_files: Rutas de los archivos .tmdl
+        max_workers: Lecturas simultáneas (None = DEFAULT_TMDL_READ_WORKERS, 1 = secuencial)
+        parse_file: Función que lee y parsea un archivo (None = parse_single_tmdl_file;
+            read_tmdl_file entrega también los metadatos)
 
-        # Parsear cada archivo .tmdl
+    Yields:
+        (ruta del archivo, resultado de parse_file) en orden de finalización
+    """
+    if parse_file is None:
+        parse_file = parse_single_tmdl_file
+    if max_workers is None:
+        max_workers = DEFAULT_TMDL_READ_WORKERS
+    max_workers = max(1, min(max_workers, len(tmdl_files)))
+
+    if max_workers == 1:
         for tmdl_file in tmdl_files:
-            file_measures = parse_single_tmdl_file(tmdl_file)
-            measures.extend(file_measures)
+            yield tmdl_file, parse_file(tmdl_file)
+        return
 
-    except Exception as e:
-        print(f"Error al parsear archivos TMDL: {e}")
+    pending_files = iter(tmdl_files)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tmdl-reader') as executor:
+        in_flight = {}
+        for tmdl_file in itertools.islice(pending_files, 2 * max_workers):
+            in_flight[executor.submit(parse_file, tmdl_file)] = tmdl_file
 
-    return measures
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                tmdl_file = in_flight.pop(future)
+                next_file = next(pending_files, None)
+                if next_file is not None:
+                    in_flight[executor.submit(parse_file, next_file)] = next_file
+                yield tmdl_file, future.result()
 
 
 def parse_single_tmdl_file(file_path: str) -> List[Dict]:
@@ -223,39 +698,71 @@ def parse_single_tmdl_file(file_path: str) -> List[Dict]:
     measures = []
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        with instrumentation.stage('io.read_tmdl'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+                instrumentation.count('bytes_read', os.fstat(f.fileno()).st_size)
+                instrumentation.count('files_read')
 
-        # Detectar tabla del nombre del archivo
-        file_name = os.path.basename(file_path)
-        table_name = file_name.replace('.tmdl', '').strip()
+        measures = parse_tmdl_content(content, get_tmdl_table_name(file_path))
 
-        # Patrón para detectar medidas en TMDL
-        # Formato: measure 'Nombre' = <expresión>
-        import re
+    except Exception as e:
+        print(f"Error al parsear {file_path}: {e}")
 
-        # Pattern para capturar medidas
-        measure_pattern = re.compile(
-            r"measure\s+'([^']+)'\s*=\s*((?:.*?\n)*?)(?=\n\s*(?:measure|column|table|$))",
-            re.IGNORECASE | re.MULTILINE
-        )
+    return measures
 
-        for match in measure_pattern.finditer(content):
-            measure_name = match.group(1)
-            measure_expression = match.group(2).strip()
 
-            # Limpiar la expresión (remover comentarios y líneas vacías)
-            lines = measure_expression.split('\n')
-            cleaned_lines = []
-            for line in lines:
-                # Remover comentarios //
-                if '//' in line:
-                    line = line[:line.index('//')]
-                line = line.strip()
-                if line:
-                    cleaned_lines.append(line)
+def read_tmdl_file(file_path: str) -> Tuple[List[Dict], Dict]:
+    """
+    Lee un archivo .tmdl una vez y extrae sus objetos DAX y sus metadatos
 
-            measure_expression = '\n'.join(cleaned_lines)
+    Args:
+        file_path: Ruta al archivo .tmdl
+
+    Returns:
+        Tupla (objetos como en parse_tmdl_content, fragmento de metadatos; ver get_tmdl_metadata)
+    """
+    measures = []
+    fragment = {}
+
+    try:
+        with instrumentation.stage('io.read_tmdl'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+                instrumentation.count('bytes_read', os.fstat(f.fileno()).st_size)
+                instrumentation.count('files_read')
+
+        table_name = get_tmdl_table_name(file_path)
+        measures = parse_tmdl_content(content, table_name)
+        fragment = get_tmdl_metadata(content, table_name)
+
+    except Exception as e:
+        print(f"Error al parsear {file_path}: {e}")
+
+    return measures, fragment
+
+
+def get_tmdl_table_name(file_path: str) -> str:
+    """Tabla de un archivo TMDL (se deriva del nombre del archivo)"""
+    return os.path.basename(file_path).replace('.tmdl', '').strip()
+
+
+def parse_tmdl_content(content: str, table_name: str) -> List[Dict]:
+    """
+    Extrae las medidas, columnas calculadas y tablas calculadas del contenido de un archivo TMDL ya leído
+
+    Args:
+        content: Texto del archivo .tmdl
+        table_name: Tabla a la que pertenecen los objetos
+
+    Returns:
+        Lista de objetos en el contenido (primero las medidas; ver extract_measures_from_pbip)
+    """
+    measures = []
+
+    with instrumentation.stage('extract.tmdl_measures'):
+        for measure_name, measure_expression, properties in iter_tmdl_measure_blocks(content):
+            measure_expression = clean_tmdl_expression(measure_expression)
 
             if measure_expression:
                 measures.append({
@@ -263,16 +770,294 @@ def parse_single_tmdl_file(file_path: str) -> List[Dict]:
                     'expression': measure_expression,
                     'table': table_name,
                     'description': '',
-                    'format': ''
+                    'format': properties.get('formatString', ''),
+                    'object_type': MEASURE
                 })
 
-    except Exception as e:
-        print(f"Error al parsear {file_path}: {e}")
+    # Las tablas de Fecha/hora automática las reporta model_analyzer (una por columna de fecha)
+    if is_auto_date_table(table_name):
+        return measures
+
+    with instrumentation.stage('extract.tmdl_calculated'):
+        for object_type, name, expression in iter_tmdl_calculated_blocks(content):
+            expression = clean_tmdl_expression(expression)
+
+            if expression:
+                measures.append({
+                    'name': name if object_type == CALCULATED_COLUMN else table_name,
+                    'expression': expression,
+                    'table': table_name,
+                    'description': '',
+                    'format': '',
+                    'object_type': object_type
+                })
 
     return measures
 
 
-def validate_pbip_file(file_path: str) -> tuple[bool, str]:
+def clean_tmdl_expression(expression: str) -> str:
+    """Limpia una expresión TMDL (remueve comentarios //, indentación y líneas vacías)"""
+    cleaned_lines = []
+    for line in expression.strip().split('\n'):
+        # Remover comentarios //
+        if '//' in line:
+            line = line[:line.index('//')]
+        line = line.strip()
+        if line:
+            cleaned_lines.append(line)
+
+    return '\n'.join(cleaned_lines)
+
+
+def iter_tmdl_calculated_blocks(content: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    Recorre las columnas calculadas y las particiones de tablas calculadas de un archivo TMDL
+
+    Una columna es calculada si su encabezado tiene '=' (column Nombre = ...);
+    una tabla es calculada si tiene una partición 'partition Nombre = calculated'
+    cuya propiedad source = tiene la expresión.
+
+    Args:
+        content: Contenido del archivo .tmdl
+
+    Yields:
+        (tipo de objeto, nombre, expresión sin limpiar)
+    """
+    for header in _TMDL_COLUMN_HEADER.finditer(content):
+        yield CALCULATED_COLUMN, unquote_tmdl_name(header.group(2)), read_tmdl_expression(content, header.end())
+
+    for partition in _TMDL_CALCULATED_PARTITION.finditer(content):
+        body_end = find_tmdl_block_end(content, partition.end(), len(partition.group(1)))
+        source = _TMDL_SOURCE_PROPERTY.search(content, partition.end(), body_end)
+        if source is not None:
+            yield CALCULATED_TABLE, unquote_tmdl_name(partition.group(2)), read_tmdl_expression(content, source.end())
+
+
+def get_tmdl_metadata(content: str, table_name: str) -> Dict:
+    """
+    Metadatos estructurales del contenido de un archivo TMDL ya leído
+
+    Un archivo puede definir una tabla con sus columnas (tables/*.tmdl), las
+    relaciones (relationships.tmdl) o las propiedades del modelo (model.tmdl).
+
+    Args:
+        content: Texto del archivo .tmdl
+        table_name: Tabla que se asume si el archivo no tiene encabezado 'table'
+
+    Returns:
+        Fragmento de metadatos (model_metadata.metadata_fragment)
+    """
+    tables = []
+    relationships = []
+    auto_date_time = None
+
+    with instrumentation.stage('extract.tmdl_metadata'):
+        table_header = _TMDL_TABLE_HEADER.search(content)
+        if table_header is not None:
+            table_end = find_tmdl_block_end(content, table_header.end(), len(table_header.group(1)))
+            properties = dict(iter_tmdl_properties(content, table_header.end(), table_end))
+            columns = [
+                get_tmdl_column(content, header)
+                for header in _TMDL_ANY_COLUMN_HEADER.finditer(content, table_header.end(), table_end)
+            ]
+            tables.append(TableInfo(
+                name=unquote_tmdl_name(table_header.group(2)) or table_name,
+                is_hidden=properties.get('isHidden', None) in ('', 'true'),
+                is_calculated=_TMDL_CALCULATED_PARTITION.search(content, table_header.end(), table_end) is not None,
+                columns=columns
+            ))
+
+        for header in _TMDL_RELATIONSHIP_HEADER.finditer(content):
+            end = find_tmdl_block_end(content, header.end(), len(header.group(1)))
+            relationship = get_tmdl_relationship(dict(iter_tmdl_properties(content, header.end(), end)))
+            if relationship is not None:
+                relationships.append(relationship)
+
+        model_header = _TMDL_MODEL_HEADER.search(content)
+        if model_header is not None:
+            end = find_tmdl_block_end(content, model_header.end(), len(model_header.group(1)))
+            for key, value in iter_tmdl_properties(content, model_header.end(), end):
+                name, _, annotation = value.partition('=')
+                if key == 'annotation' and name.strip() == TIME_INTELLIGENCE_ANNOTATION:
+                    auto_date_time = annotation.strip() == '1'
+
+        references = {match.group(1).lower() for match in _BRACKET_NAME.finditer(content)}
+        references.update(unquote_tmdl_name(match.group(1)).lower() for match in _TMDL_COLUMN_PROPERTY.finditer(content))
+
+    return metadata_fragment(tables, relationships, auto_date_time, references)
+
+
+def get_tmdl_column(content: str, header: re.Match) -> ColumnInfo:
+    """Columna TMDL a partir de su encabezado (_TMDL_ANY_COLUMN_HEADER)"""
+    end = find_tmdl_block_end(content, header.end(), len(header.group(1)))
+    # Las propiedades empiezan en la línea siguiente al encabezado (la expresión puede seguir en la misma)
+    line_end = content.find('\n', header.end())
+    properties = {}
+    date_type = ''
+    if line_end != -1 and line_end < end:
+        for key, value in iter_tmdl_properties(content, line_end + 1, end):
+            if key == 'annotation':
+                name, _, annotation = value.partition('=')
+                if name.strip() == DATE_TYPE_ANNOTATION:
+                    date_type = annotation.strip()
+            else:
+                properties.setdefault(key, value)
+
+    return ColumnInfo(
+        name=unquote_tmdl_name(header.group(2)),
+        data_type=properties.get('dataType', ''),
+        is_hidden=properties.get('isHidden', None) in ('', 'true'),
+        is_calculated=header.group(3) is not None,
+        format_string=properties.get('formatString', ''),
+        date_type=date_type
+    )
+
+
+def get_tmdl_relationship(properties: Dict[str, str]) -> Optional[RelationshipInfo]:
+    """Relación TMDL a partir de sus propiedades (None si le falta fromColumn o toColumn)"""
+    from_column = _TMDL_COLUMN_REFERENCE.match(properties.get('fromColumn', ''))
+    to_column = _TMDL_COLUMN_REFERENCE.match(properties.get('toColumn', ''))
+    if from_column is None or to_column is None:
+        return None
+
+    return RelationshipInfo(
+        from_table=unquote_tmdl_name(from_column.group(1)),
+        from_column=unquote_tmdl_name(from_column.group(2)),
+        to_table=unquote_tmdl_name(to_column.group(1)),
+        to_column=unquote_tmdl_name(to_column.group(2)),
+        from_cardinality=properties.get('fromCardinality', 'many'),
+        to_cardinality=properties.get('toCardinality', 'one'),
+        cross_filtering=properties.get('crossFilteringBehavior', 'oneDirection'),
+        is_active=properties.get('isActive', 'true') != 'false'
+    )
+
+
+def iter_tmdl_properties(content: str, start: int, end: int) -> Iterator[Tuple[str, str]]:
+    """
+    Propiedades de un bloque TMDL: las líneas entre start y end con la menor indentación
+
+    Los objetos hijos (column, measure, partition...) también aparecen, con su
+    nombre como valor; las líneas más indentadas (expresiones, propiedades de
+    los hijos) se ignoran.
+
+    Yields:
+        (clave, valor) p. ej. ('dataType', 'dateTime'), ('isHidden', ''),
+        ('annotation', 'Nombre = Valor')
+    """
+    lines = [line for line in content[start:end].split('\n') if line.strip()]
+    if not lines:
+        return
+
+    indent = min(len(line) - len(line.lstrip(' \t')) for line in lines)
+    for line in lines:
+        if len(line) - len(line.lstrip(' \t')) == indent:
+            match = _TMDL_PROPERTY.match(line.strip())
+            if match is not None:
+                yield match.group(1), match.group(2).strip()
+
+
+def unquote_tmdl_name(name: str) -> str:
+    """Nombre de objeto TMDL sin las comillas simples ni el escape ''"""
+    if len(name) > 1 and name.startswith("'") and name.endswith("'"):
+        return name[1:-1].replace("''", "'")
+    return name
+
+
+def find_tmdl_block_end(content: str, start: int, indent: int) -> int:
+    """Inicio de la primera línea después de start con indentación <= indent (fin del bloque del objeto)"""
+    position = content.find('\n', start)
+    while position != -1:
+        line_start = position + 1
+        line_end = content.find('\n', line_start)
+        line = content[line_start:line_end if line_end != -1 else len(content)]
+        if line.strip() and len(line) - len(line.lstrip(' \t')) <= indent:
+            return line_start
+        position = line_end
+    return len(content)
+
+
+def read_tmdl_expression(content: str, start: int) -> str:
+    """
+    Expresión DAX de una propiedad TMDL que empieza en start (después del '=')
+
+    La expresión ocupa el resto de la línea o, si la línea termina en el '=',
+    las líneas siguientes indentadas al menos como la primera (las propiedades
+    del objeto van menos indentadas). También admite expresiones entre ```.
+
+    Returns:
+        Expresión sin limpiar
+    """
+    line_end = content.find('\n', start)
+    if line_end == -1:
+        line_end = len(content)
+    first_line = content[start:line_end].strip()
+
+    if first_line.startswith('```'):
+        fence_end = content.find('```', start + 3)
+        return content[start + 3:fence_end if fence_end != -1 else len(content)]
+
+    if first_line:
+        return first_line
+
+    # Expresión en las líneas siguientes, hasta la primera menos indentada
+    expression_start = line_end + 1
+    expression_indent = None
+    position = expression_start
+    while position < len(content):
+        next_line = content.find('\n', position)
+        if next_line == -1:
+            next_line = len(content)
+        line = content[position:next_line]
+        if line.strip():
+            indent = len(line) - len(line.lstrip(' \t'))
+            if expression_indent is None:
+                expression_indent = indent
+            elif indent < expression_indent:
+                break
+        position = next_line + 1
+
+    return content[expression_start:position]
+
+
+def iter_tmdl_measure_blocks(content: str) -> Iterator[Tuple[str, str, Dict[str, str]]]:
+    """
+    Recorre las medidas de un archivo TMDL
+
+    La expresión se lee con read_tmdl_expression, igual que la de las columnas
+    calculadas: termina en la primera línea menos indentada, de modo que las
+    propiedades de la medida (formatString, displayFolder...) no forman parte
+    de ella. Cada medida se lee solo hasta el fin de su bloque, así que el
+    recorrido es lineal aunque el archivo no tenga líneas en blanco.
+
+    Args:
+        content: Contenido del archivo .tmdl
+
+    Yields:
+        (nombre de la medida, expresión sin limpiar, propiedades de la medida)
+    """
+    for header in _TMDL_MEASURE_HEADER.finditer(content):
+        end = find_tmdl_block_end(content, header.end(), len(header.group(1)))
+        # Las propiedades empiezan en la línea siguiente al encabezado (la expresión puede seguir en la misma)
+        line_end = content.find('\n', header.end())
+        properties = {}
+        if line_end != -1 and line_end < end:
+            for key, value in iter_tmdl_properties(content, line_end + 1, end):
+                properties.setdefault(key, value)
+
+        yield unquote_tmdl_name(header.group(2)), read_tmdl_expression(content, header.end()), properties
+
+
+def get_model_name(file_path: str) -> str:
+    """Nombre del modelo a partir de la ruta (.pbip, carpeta .SemanticModel o ZIP)"""
+    name = os.path.basename(os.path.normpath(file_path))
+    for suffix in ('.pbip', '.SemanticModel', '.zip'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+@tracing.traced('resolve')
+def validate_pbip_file(file_path: str) -> Tuple[bool, str]:
     """
     Valida que el archivo/carpeta sea un PBIP válido
 
@@ -369,12 +1154,14 @@ def validate_pbip_file(file_path: str) -> tuple[bool, str]:
         return False, f"Error al validar: {str(e)}"
 
 
-def get_pbip_info(file_path: str) -> Dict:
+def get_pbip_info(file_path: str, use_index: bool = False, index_dir: Optional[str] = None) -> Dict:
     """
     Obtiene información general del archivo/carpeta PBIP
 
     Args:
         file_path: Ruta al archivo o carpeta PBIP
+        use_index: Contar las medidas TMDL con el índice persistente del modelo
+        index_dir: Carpeta del índice (None = caché del usuario)
 
     Returns:
         Diccionario con información del modelo
@@ -384,7 +1171,8 @@ def get_pbip_info(file_path: str) -> Dict:
         'file_size': os.path.getsize(file_path) if os.path.isfile(file_path) else 0,
         'format': 'unknown',
         'tables_count': 0,
-        'measures_count': 0
+        'measures_count': 0,
+        'calculated_count': 0
     }
 
     temp_dir = None
@@ -463,8 +1251,9 @@ def get_pbip_info(file_path: str) -> Dict:
             tables = model.get('tables', [])
             info['tables_count'] = len(tables)
 
-            for table in tables:
-                info['measures_count'] += len(table.get('measures', []))
+            measures = parse_model_bim_data(model_data)
+            info['measures_count'] = sum(1 for measure in measures if is_measure(measure))
+            info['calculated_count'] = len(measures) - info['measures_count']
 
         else:
             # Formato TMDL
@@ -484,8 +1273,13 @@ def get_pbip_info(file_path: str) -> Dict:
             info['tables_count'] = len(tmdl_files)
 
             # Estimar medidas (parsear archivos)
-            measures = parse_tmdl_files(tmdl_path)
-            info['measures_count'] = len(measures)
+            if use_index and not temp_dir:
+                from .model_index import load_measures_indexed
+                measures, _ = load_measures_indexed(definition_path, cache_dir=index_dir)
+            else:
+                measures = parse_tmdl_files(tmdl_path)
+            info['measures_count'] = sum(1 for measure in measures if is_measure(measure))
+            info['calculated_count'] = len(measures) - info['measures_count']
 
     except Exception as e:
         info['error'] = str(e)
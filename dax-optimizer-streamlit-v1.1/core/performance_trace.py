@@ -0,0 +1,220 @@
+"""
+Ingesta de sesiones del Performance Analyzer de Power BI Desktop
+El JSON exportado (PowerBIPerformanceData.json) tiene un evento por etapa de
+cada visual: 'Visual Container Lifecycle' (el visual completo), 'Query' (con
+el texto DAX generado) y 'Execute DAX Query' (tiempo del motor). Se agregan
+los milisegundos observados de cada medida referenciada en las consultas para
+rankear por costo real además del score estático.
+"""
+
+import io
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Dict, Optional, Union, TextIO, Iterable
+
+from .dataclass_slots import slotted_dataclass
+
+
+VISUAL_EVENT = 'Visual Container Lifecycle'
+QUERY_EVENT = 'Query'
+DAX_QUERY_EVENT = 'Execute DAX Query'
+
+# Referencia a medida o columna en el DAX generado: [Nombre] o 'Tabla'[Nombre]
+_BRACKET_NAME = re.compile(r"\[((?:[^\]]|\]\])+)\]")
+
+
+@slotted_dataclass(frozen=True)
+class QueryTiming:
+    """Consulta DAX observada de un visual"""
+    query_text: str
+    dax_ms: float  # Tiempo del motor (Execute DAX Query)
+    visual_id: str = ''
+    visual_title: str = ''
+    visual_ms: float = 0.0  # Duración total del visual (solo en su primera consulta, para no duplicarla)
+
+
+@dataclass
+class PerformanceTrace:
+    """Consultas de una sesión del Performance Analyzer"""
+    queries: List[QueryTiming] = field(default_factory=list)
+    source: str = ''
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_dax_ms(self) -> float:
+        return sum(query.dax_ms for query in self.queries)
+
+
+@slotted_dataclass()
+class MeasureTiming:
+    """Tiempo observado de una medida (suma de las consultas que la referencian)"""
+    name: str
+    table: str
+    dax_ms: float = 0.0
+    visual_ms: float = 0.0
+    query_count: int = 0
+    visuals: List[str] = field(default_factory=list)
+
+
+def _timestamp(value) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def _duration_ms(event: Dict) -> float:
+    start, end = _timestamp(event.get('start')), _timestamp(event.get('end'))
+    if start is None or end is None:
+        return 0.0
+    return max(0.0, (end - start).total_seconds() * 1000)
+
+
+def parse_performance_data(data: Dict, source: str = '') -> PerformanceTrace:
+    """
+    Convierte el JSON del Performance Analyzer en PerformanceTrace
+
+    Cada consulta toma el tiempo del 'Execute DAX Query' hijo; en exportaciones
+    sin ese evento, la duración del propio 'Query'.
+
+    Args:
+        data: JSON exportado (clave 'events')
+        source: Origen (solo informativo)
+
+    Returns:
+        PerformanceTrace
+
+    Raises:
+        ValueError: Si el JSON no tiene la lista de eventos
+    """
+    events = data.get('events') if isinstance(data, dict) else None
+    if not isinstance(events, list):
+        raise ValueError("El archivo no es una exportación del Performance Analyzer (falta 'events')")
+
+    events = [event for event in events if isinstance(event, dict)]
+    by_id = {event['id']: event for event in events if event.get('id')}
+
+    dax_ms_by_query: Dict[str, float] = {}
+    for event in events:
+        if event.get('name') == DAX_QUERY_EVENT and event.get('parentId') in by_id:
+            parent_id = event['parentId']
+            dax_ms_by_query[parent_id] = dax_ms_by_query.get(parent_id, 0.0) + _duration_ms(event)
+
+    trace = PerformanceTrace(source=source)
+    timed_visuals = set()
+    for event in events:
+        metrics = event.get('metrics') or {}
+        query_text = metrics.get('QueryText')
+        if event.get('name') != QUERY_EVENT or not isinstance(query_text, str):
+            continue
+
+        visual = by_id.get(event.get('parentId'))
+        if visual is not None and visual.get('name') != VISUAL_EVENT:
+            visual = None
+        visual_metrics = (visual or {}).get('metrics') or {}
+        visual_ms = 0.0
+        if visual is not None and visual.get('id') not in timed_visuals:
+            timed_visuals.add(visual.get('id'))
+            visual_ms = _duration_ms(visual)
+
+        trace.queries.append(QueryTiming(
+            query_text=query_text,
+            dax_ms=dax_ms_by_query.get(event.get('id'), _duration_ms(event)),
+            visual_id=str(visual_metrics.get('visualId') or (visual or {}).get('id') or ''),
+            visual_title=str(visual_metrics.get('visualTitle') or visual_metrics.get('visualType') or ''),
+            visual_ms=visual_ms
+        ))
+
+    return trace
+
+
+def load_performance_trace(source: Union[str, TextIO]) -> PerformanceTrace:
+    """
+    Carga una sesión exportada desde el Performance Analyzer
+
+    Args:
+        source: Ruta al .json o archivo abierto (texto o binario, p. ej. un upload de Streamlit)
+
+    Returns:
+        PerformanceTrace
+
+    Raises:
+        ValueError: Si no es un JSON del Performance Analyzer
+    """
+    name = source if isinstance(source, str) else getattr(source, 'name', 'PowerBIPerformanceData.json')
+
+    try:
+        if isinstance(source, str):
+            with open(source, 'r', encoding='utf-8-sig') as f:
+                data = json.load(f)
+        else:
+            if isinstance(source, (io.RawIOBase, io.BufferedIOBase)):
+                source = io.TextIOWrapper(source, encoding='utf-8-sig')
+            data = json.load(source)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"El archivo no es un JSON válido: {e}")
+
+    return parse_performance_data(data, source=str(name))
+
+
+def find_measure_references(query_text: str, measure_names: Iterable[str]) -> List[str]:
+    """
+    Medidas del modelo referenciadas en una consulta DAX generada
+
+    Args:
+        query_text: Texto de la consulta
+        measure_names: Nombres de medidas en minúsculas (únicos en el modelo)
+
+    Returns:
+        Nombres (en minúsculas) referenciados, sin repetir
+    """
+    names = measure_names if isinstance(measure_names, (set, frozenset, dict)) else set(measure_names)
+    referenced = dict.fromkeys(
+        name for name in (match.group(1).replace(']]', ']').lower() for match in _BRACKET_NAME.finditer(query_text))
+        if name in names
+    )
+    return list(referenced)
+
+
+def join_trace_to_measures(trace: PerformanceTrace, measures: List[Dict]) -> Dict[str, MeasureTiming]:
+    """
+    Agrega el tiempo observado de cada medida del modelo
+
+    Cada medida suma el tiempo completo de las consultas que la referencian
+    directamente (una consulta con varias medidas cuenta para todas: no se
+    puede separar qué parte del tiempo es de cada una).
+
+    Args:
+        trace: Sesión del Performance Analyzer
+        measures: Medidas de extract_measures_from_pbip ({'name', 'table', ...})
+
+    Returns:
+        Diccionario nombre en minúsculas -> MeasureTiming (solo medidas observadas)
+    """
+    # Solo medidas: las columnas y tablas calculadas se evalúan al actualizar, no en la consulta
+    measures_by_name = {
+        measure['name'].lower(): measure for measure in measures
+        if measure.get('object_type', 'measure') == 'measure'
+    }
+    timings: Dict[str, MeasureTiming] = {}
+
+    for query in trace.queries:
+        for key in find_measure_references(query.query_text, measures_by_name):
+            timing = timings.get(key)
+            if timing is None:
+                measure = measures_by_name[key]
+                timing = timings[key] = MeasureTiming(name=measure['name'], table=measure['table'])
+            timing.dax_ms += query.dax_ms
+            timing.visual_ms += query.visual_ms
+            timing.query_count += 1
+            visual = query.visual_title or query.visual_id
+            if visual and visual not in timing.visuals:
+                timing.visuals.append(visual)
+
+    return timings
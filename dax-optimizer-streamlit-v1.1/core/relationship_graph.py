@@ -0,0 +1,495 @@
+"""
+Grafo de relaciones del modelo y reescritura de búsquedas
+Con las relaciones de model.bim/TMDL decide si un LOOKUPVALUE o un
+FILTER(Tabla, Tabla[Clave] = Otra[Clave]) se puede reemplazar por RELATED,
+RELATEDTABLE o TREATAS y genera la expresión reescrita.
+
+Se ejecuta en el proceso principal sobre el resultado de
+analysis_runner.analyze_measures: los workers analizan cada expresión sin
+conocer el modelo. En el modo watch, RelationshipRewriteCache conserva las
+reescrituras de cada expresión mientras las relaciones no cambien.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple, Iterable
+
+from .dataclass_slots import slotted_dataclass
+from .dax_analyzer import Issue, get_location
+from .dax_lexer import (
+    tokenize,
+    TOKEN_WHITESPACE,
+    TOKEN_COMMENT,
+    TOKEN_IDENTIFIER,
+    TOKEN_PAREN_OPEN,
+    TOKEN_PAREN_CLOSE,
+    TOKEN_COMMA,
+    TOKEN_UNKNOWN
+)
+from .dax_parser import ITERATOR_FUNCTIONS
+from .dax_suggestions import create_suggestion, recalculate_score
+from .model_metadata import ModelMetadata, RelationshipInfo
+from .rule_catalog import get_rule
+from . import instrumentation
+
+
+# Funciones cuyos argumentos (después del primero) se evalúan en un contexto de fila sobre el primero
+ROW_CONTEXT_FUNCTIONS = frozenset(ITERATOR_FUNCTIONS) | {'FILTER', 'ADDCOLUMNS', 'SELECTCOLUMNS', 'GENERATE',
+                                                        'GENERATEALL'}
+
+# Funciones que recorren las filas completas de la tabla de su primer argumento
+_TABLE_WRAPPERS = frozenset({'ALL', 'ALLNOBLANKROW', 'ALLSELECTED', 'FILTER', 'CALCULATETABLE', 'KEEPFILTERS',
+                             'RELATEDTABLE'})
+
+# Funciones cuyos argumentos desde el segundo son filtros
+_FILTER_ARGUMENT_FUNCTIONS = frozenset({'CALCULATE', 'CALCULATETABLE'})
+
+# Modificadores de CALCULATE que quitan filtros: cambian el resultado de un filtro de tabla expandida
+_REMOVE_FILTER_MODIFIERS = frozenset({'ALL', 'ALLEXCEPT', 'ALLNOBLANKROW', 'ALLSELECTED', 'ALLCROSSFILTERED',
+                                      'REMOVEFILTERS'})
+
+_TABLE_NAME = r"('(?:[^']|'')+'|[^\W\d]\w*)"
+_COLUMN = rf"{_TABLE_NAME}\s*\[((?:[^\]]|\]\])+)\]"
+_TABLE_ARGUMENT = re.compile(rf"\s*{_TABLE_NAME}\s*")
+_COLUMN_ARGUMENT = re.compile(rf"\s*{_COLUMN}\s*")
+_KEY_EQUALITY = re.compile(rf"\s*({_COLUMN})\s*=\s*({_COLUMN})\s*")
+
+# Prefiltro: expresiones sin estas llamadas no se tokenizan (sin relaciones solo FILTER -> TREATAS)
+_LOOKUP_CALL = re.compile(r'\b(LOOKUPVALUE|FILTER)\s*\(', re.IGNORECASE)
+_FILTER_CALL = re.compile(r'\bFILTER\s*\(', re.IGNORECASE)
+_LOOKUPVALUE_CALL = re.compile(r'\bLOOKUPVALUE\s*\(', re.IGNORECASE)
+
+# Reglas de las reescrituras (ver rule_catalog)
+LOOKUPVALUE_RULE = 'lookupvalue-with-relationship'
+RELATEDTABLE_RULE = 'filter-on-related-key'
+TREATAS_RULE = 'filter-key-equality'
+
+
+@dataclass
+class RelationshipGraph:
+    """Relaciones del modelo indexadas por par de columnas (claves en minúsculas: 'tabla[columna]')"""
+    columns: Dict[Tuple[str, str], RelationshipInfo] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(set(self.columns.values()))
+
+    def add(self, relationship: RelationshipInfo) -> None:
+        """Indexa una relación en ambos sentidos (una activa no se reemplaza por una inactiva)"""
+        start = f"{relationship.from_table}[{relationship.from_column}]".lower()
+        end = f"{relationship.to_table}[{relationship.to_column}]".lower()
+        for key in ((start, end), (end, start)):
+            current = self.columns.get(key)
+            if current is None or (relationship.is_active and not current.is_active):
+                self.columns[key] = relationship
+
+    def find(self, table_a: str, column_a: str, table_b: str, column_b: str) -> Optional[RelationshipInfo]:
+        """Relación entre Tabla_a[Columna_a] y Tabla_b[Columna_b] en cualquier sentido (None si no hay)"""
+        return self.columns.get((f"{table_a}[{column_a}]".lower(), f"{table_b}[{column_b}]".lower()))
+
+
+def build_relationship_graph(relationships: Iterable[RelationshipInfo]) -> RelationshipGraph:
+    """Indexa las relaciones del modelo (ModelMetadata.relationships)"""
+    graph = RelationshipGraph()
+    for relationship in relationships:
+        graph.add(relationship)
+    return graph
+
+
+def leads_to_one(relationship: RelationshipInfo, table: str) -> bool:
+    """True si desde una fila de table la relación lleva a una sola fila de la otra tabla (RELATED)"""
+    if relationship.from_table.lower() == table.lower():
+        return relationship.to_cardinality.lower() == 'one'
+    return relationship.from_cardinality.lower() == 'one'
+
+
+@slotted_dataclass(frozen=True)
+class LookupRewrite:
+    """Reemplazo de una búsqueda (offsets en la expresión original)"""
+    rule_id: str  # LOOKUPVALUE_RULE, RELATEDTABLE_RULE o TREATAS_RULE
+    start: int
+    end: int
+    original: str
+    replacement: Optional[str]  # None: la regla aplica pero no hay una reescritura equivalente
+    params: Tuple[Tuple[str, object], ...] = ()
+
+
+@dataclass
+class _Call:
+    """Llamada a función: nombre en mayúsculas, offsets y argumentos"""
+    name: str
+    start: int
+    end: int = -1  # Después del ')' (-1 si no se cierra)
+    arguments: List[Tuple[int, int]] = field(default_factory=list)
+    parent: Optional[int] = None  # Índice de la llamada que la contiene
+    argument_index: int = 0  # Argumento de parent en que está
+
+
+def parse_calls(code: str) -> List['_Call']:
+    """
+    Llamadas a función de una expresión con los límites de sus argumentos
+
+    Usa el lexer, de modo que paréntesis y comas dentro de textos, nombres o
+    comentarios no cuentan; las llaves de un constructor de tabla agrupan
+    como un paréntesis.
+    """
+    line_offsets = [0]
+    for line in code.split('\n')[:-1]:
+        line_offsets.append(line_offsets[-1] + len(line) + 1)
+
+    calls: List[_Call] = []
+    stack: List[Optional[int]] = []  # Por cada apertura: índice de la llamada o None (agrupación)
+    argument_starts: Dict[int, int] = {}
+    previous = None
+
+    for line_index, token in tokenize(code):
+        if token.kind in (TOKEN_WHITESPACE, TOKEN_COMMENT):
+            continue
+        offset = line_offsets[line_index] + token.column
+
+        if token.kind == TOKEN_PAREN_OPEN or (token.kind == TOKEN_UNKNOWN and token.text == '{'):
+            if token.kind == TOKEN_PAREN_OPEN and previous is not None and previous[0].kind == TOKEN_IDENTIFIER:
+                parent = next((index for index in reversed(stack) if index is not None), None)
+                call = _Call(previous[0].text.upper(), previous[1], parent=parent,
+                             argument_index=len(calls[parent].arguments) if parent is not None else 0)
+                calls.append(call)
+                stack.append(len(calls) - 1)
+                argument_starts[len(calls) - 1] = offset + 1
+            else:
+                stack.append(None)
+        elif token.kind == TOKEN_PAREN_CLOSE or (token.kind == TOKEN_UNKNOWN and token.text == '}'):
+            if stack:
+                index = stack.pop()
+                if index is not None:
+                    calls[index].arguments.append((argument_starts.pop(index), offset))
+                    calls[index].end = offset + 1
+        elif token.kind == TOKEN_COMMA and stack and stack[-1] is not None:
+            index = stack[-1]
+            calls[index].arguments.append((argument_starts[index], offset))
+            argument_starts[index] = offset + 1
+
+        previous = (token, offset)
+
+    return calls
+
+
+def _unquote_table(name: str) -> str:
+    return name[1:-1].replace("''", "'") if name.startswith("'") else name
+
+
+def _unquote_column(name: str) -> str:
+    return name.replace(']]', ']')
+
+
+def _call_table(code: str, calls: List[_Call], index: int) -> Optional[str]:
+    """Tabla cuyas filas completas recorre el primer argumento de una llamada (None si no es una tabla)"""
+    call = calls[index]
+    if not call.arguments:
+        return None
+    start, end = call.arguments[0]
+
+    match = _TABLE_ARGUMENT.fullmatch(code, start, end)
+    if match is not None:
+        return _unquote_table(match.group(1))
+
+    # FILTER(ALL(Tabla), ...), RELATEDTABLE(Tabla)...: la tabla de la función interna
+    for inner_index in range(index + 1, len(calls)):
+        inner = calls[inner_index]
+        if inner.start >= end:
+            break
+        if inner.parent == index and inner.argument_index == 0:
+            if (inner.name in _TABLE_WRAPPERS and inner.end > 0
+                    and not code[start:inner.start].strip() and not code[inner.end:end].strip()):
+                return _call_table(code, calls, inner_index)
+            return None
+    return None
+
+
+def _row_context_tables(code: str, calls: List[_Call], index: int) -> List[str]:
+    """Tablas (en minúsculas) con un contexto de fila sobre sus filas completas alrededor de una llamada"""
+    tables = []
+    child = calls[index]
+    while child.parent is not None:
+        parent_index = child.parent
+        parent = calls[parent_index]
+        if parent.name in ROW_CONTEXT_FUNCTIONS and child.argument_index >= 1:
+            table = _call_table(code, calls, parent_index)
+            if table is not None:
+                tables.append(table.lower())
+        child = parent
+    return tables
+
+
+def _is_whole_argument(code: str, call: _Call, parent: _Call) -> bool:
+    """True si la llamada ocupa todo su argumento en parent"""
+    start, end = parent.arguments[call.argument_index]
+    return not code[start:call.start].strip() and not code[call.end:end].strip()
+
+
+def _filter_argument_target(code: str, calls: List[_Call], index: int) -> Optional[_Call]:
+    """
+    Llamada a reemplazar si la llamada es un argumento de filtro de CALCULATE/CALCULATETABLE
+
+    Returns:
+        La propia llamada, o su KEEPFILTERS(...) si ya está envuelta; None si no es un filtro
+    """
+    call = calls[index]
+    if call.parent is None or not _is_whole_argument(code, call, calls[call.parent]):
+        return None
+
+    parent = calls[call.parent]
+    if parent.name in _FILTER_ARGUMENT_FUNCTIONS and call.argument_index >= 1:
+        return call
+    if (parent.name == 'KEEPFILTERS' and parent.parent is not None and parent.argument_index >= 1
+            and calls[parent.parent].name in _FILTER_ARGUMENT_FUNCTIONS
+            and _is_whole_argument(code, parent, calls[parent.parent])):
+        return parent
+    return None
+
+
+def _has_remove_filter_modifier(calls: List[_Call], target: _Call) -> bool:
+    """True si otro argumento de filtro del CALCULATE de target es ALL*/REMOVEFILTERS"""
+    parent = target.parent
+    return any(
+        call.parent == parent and call.argument_index >= 1 and call.argument_index != target.argument_index
+        and call.name in _REMOVE_FILTER_MODIFIERS
+        for call in calls
+    )
+
+
+def _lookupvalue_rewrite(code: str, calls: List[_Call], index: int, graph: RelationshipGraph,
+                         row_tables: List[str]) -> Optional[LookupRewrite]:
+    """LOOKUPVALUE(T[Resultado], T[Clave], O[Clave]) -> RELATED(T[Resultado]) si O -> T es una relación activa"""
+    call = calls[index]
+    if len(call.arguments) != 3:
+        return None
+
+    columns = [_COLUMN_ARGUMENT.fullmatch(code, start, end) for start, end in call.arguments]
+    if any(match is None for match in columns):
+        return None
+    result, search, value = columns
+
+    table = _unquote_table(result.group(1))
+    other = _unquote_table(value.group(1))
+    if _unquote_table(search.group(1)).lower() != table.lower() or other.lower() == table.lower():
+        return None
+    if other.lower() not in row_tables:
+        return None
+
+    relationship = graph.find(other, _unquote_column(value.group(2)), table, _unquote_column(search.group(2)))
+    if relationship is None or not relationship.is_active or not leads_to_one(relationship, other):
+        return None
+
+    column = code[result.start(1):result.end()].strip()
+    return LookupRewrite(
+        LOOKUPVALUE_RULE, call.start, call.end, code[call.start:call.end], f"RELATED({column})",
+        (('relationship', relationship.label), ('column', column))
+    )
+
+
+def _filter_rewrite(code: str, calls: List[_Call], index: int, graph: RelationshipGraph,
+                    row_tables: List[str]) -> Optional[LookupRewrite]:
+    """
+    FILTER(T, T[Clave] = O[Clave]) -> KEEPFILTERS(TREATAS({O[Clave]}, T[Clave])) como filtro de
+    CALCULATE, o RELATEDTABLE(T) en un contexto de fila sobre O si O -> T es uno a muchos
+
+    FILTER(T, ...) filtra la tabla expandida de T y TREATAS solo la columna: la
+    reescritura a TREATAS se genera solo con un contexto de fila sobre O y sin
+    modificadores ALL*/REMOVEFILTERS en el mismo CALCULATE. Si no, la regla se
+    informa sin código reescrito (replacement None).
+    """
+    call = calls[index]
+    if len(call.arguments) != 2:
+        return None
+
+    table_match = _TABLE_ARGUMENT.fullmatch(code, *call.arguments[0])
+    condition = _KEY_EQUALITY.fullmatch(code, *call.arguments[1])
+    if table_match is None or condition is None:
+        return None
+
+    table = _unquote_table(table_match.group(1))
+    left = (condition.group(1), _unquote_table(condition.group(2)), _unquote_column(condition.group(3)))
+    right = (condition.group(4), _unquote_table(condition.group(5)), _unquote_column(condition.group(6)))
+    if left[1].lower() != table.lower():
+        left, right = right, left
+    key, value = left, right
+    if key[1].lower() != table.lower() or value[1].lower() == table.lower():
+        return None
+
+    target = _filter_argument_target(code, calls, index)
+    if target is not None:
+        replacement = None
+        if value[1].lower() in row_tables and not _has_remove_filter_modifier(calls, target):
+            replacement = f"KEEPFILTERS(TREATAS({{{value[0]}}}, {key[0]}))"
+        return LookupRewrite(
+            TREATAS_RULE, target.start, target.end, code[target.start:target.end], replacement,
+            (('table', table), ('column', key[0]))
+        )
+
+    relationship = graph.find(table, key[2], value[1], value[2])
+    if (relationship is not None and relationship.is_active and leads_to_one(relationship, table)
+            and value[1].lower() in row_tables):
+        table_text = table_match.group(1)
+        return LookupRewrite(
+            RELATEDTABLE_RULE, call.start, call.end, code[call.start:call.end], f"RELATEDTABLE({table_text})",
+            (('table', table), ('relationship', relationship.label))
+        )
+    return None
+
+
+def find_lookup_rewrites(code: str, graph: RelationshipGraph, object_type: str = 'measure',
+                         table: Optional[str] = None) -> List[LookupRewrite]:
+    """
+    Reescrituras por relación de los LOOKUPVALUE y FILTER de una expresión
+
+    RELATED y RELATEDTABLE requieren una relación activa entre las columnas
+    exactas de la búsqueda y un contexto de fila sobre la tabla de origen
+    (la tabla de la columna calculada o un iterador sobre sus filas
+    completas). TREATAS no requiere relación: solo reemplaza un FILTER usado
+    como filtro de CALCULATE/CALCULATETABLE, con un contexto de fila sobre la
+    tabla del valor y sin ALL*/REMOVEFILTERS en el mismo CALCULATE.
+
+    Args:
+        code: Expresión DAX
+        graph: Relaciones del modelo (build_relationship_graph)
+        object_type: Tipo de objeto ('measure', 'calculated-column', 'calculated-table')
+        table: Tabla del objeto (contexto de fila de una columna calculada)
+
+    Returns:
+        Reescrituras en orden de aparición, sin solaparse
+    """
+    if not (_LOOKUP_CALL if graph.columns else _FILTER_CALL).search(code):
+        return []
+
+    calls = parse_calls(code)
+    rewrites: List[LookupRewrite] = []
+    for index, call in enumerate(calls):
+        if call.end < 0 or call.name not in ('LOOKUPVALUE', 'FILTER'):
+            continue
+        row_tables = _row_context_tables(code, calls, index)
+        if object_type == 'calculated-column' and table:
+            row_tables.append(table.lower())
+
+        if call.name == 'LOOKUPVALUE':
+            rewrite = _lookupvalue_rewrite(code, calls, index, graph, row_tables)
+        else:
+            rewrite = _filter_rewrite(code, calls, index, graph, row_tables)
+        if rewrite is not None and (not rewrites or rewrite.start >= rewrites[-1].end):
+            rewrites.append(rewrite)
+
+    return rewrites
+
+
+def rewrite_expression(code: str, rewrites: List[LookupRewrite]) -> str:
+    """Aplica las reescrituras (de find_lookup_rewrites) a la expresión (las sin replacement se omiten)"""
+    for rewrite in sorted(rewrites, key=lambda r: r.start, reverse=True):
+        if rewrite.replacement is None:
+            continue
+        code = code[:rewrite.start] + rewrite.replacement + code[rewrite.end:]
+    return code
+
+
+class RelationshipRewriteCache:
+    """
+    Reescrituras por expresión que se conservan entre ciclos del modo watch
+
+    La clave es (expresión, tipo de objeto, tabla). Todas dependen de las
+    relaciones: si la huella del grafo (las relaciones del modelo en orden)
+    cambia, la caché se vacía. En cada llamada solo se conservan las
+    expresiones del modelo actual.
+    """
+
+    def __init__(self):
+        self.fingerprint: Optional[Tuple[RelationshipInfo, ...]] = None
+        self.graph = RelationshipGraph()
+        self.hits = 0
+        self.misses = 0
+        self._rewrites: Dict[Tuple[str, str, Optional[str]], List[LookupRewrite]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rewrites)
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def update_graph(self, relationships: Iterable[RelationshipInfo]) -> RelationshipGraph:
+        """Grafo de las relaciones (se reconstruye y vacía la caché solo si cambiaron)"""
+        fingerprint = tuple(relationships)
+        if fingerprint != self.fingerprint:
+            self.fingerprint = fingerprint
+            self.graph = build_relationship_graph(fingerprint)
+            self._rewrites = {}
+        return self.graph
+
+    def rewrites(self, code: str, object_type: str, table: Optional[str]) -> List[LookupRewrite]:
+        """find_lookup_rewrites con el grafo actual, desde la caché si la expresión ya se vio"""
+        key = (code, object_type, table)
+        rewrites = self._rewrites.get(key)
+        if rewrites is None:
+            self.misses += 1
+            rewrites = self._rewrites[key] = find_lookup_rewrites(code, self.graph, object_type, table)
+        else:
+            self.hits += 1
+        return rewrites
+
+    def retain(self, keys: Iterable[Tuple[str, str, Optional[str]]]) -> None:
+        """Descarta las expresiones que ya no están en el modelo"""
+        self._rewrites = {key: self._rewrites[key] for key in keys if key in self._rewrites}
+
+
+@instrumentation.timed('rules.relationships')
+def apply_relationship_rewrites(analyzed_measures: List[Dict], metadata: ModelMetadata,
+                                cache: Optional[RelationshipRewriteCache] = None) -> int:
+    """
+    Agrega a los objetos analizados las reescrituras por relación de sus búsquedas
+
+    Cada reescritura agrega un issue ubicado en la llamada y una sugerencia con
+    la expresión completa reescrita (sin reescritura equivalente, la sugerencia
+    muestra el patrón de la plantilla). Si todos los LOOKUPVALUE de la expresión
+    se reescriben, el issue genérico 'expensive-lookupvalue' se reemplaza.
+    Las listas de issues y sugerencias se copian: las medidas con la misma
+    expresión comparten las del análisis.
+
+    Args:
+        analyzed_measures: Resultado de analysis_runner.analyze_measures (se modifica)
+        metadata: Metadatos del modelo (pbip_extractor.extract_model_from_pbip)
+        cache: Reescrituras de ciclos anteriores del modo watch (None = se buscan todas)
+
+    Returns:
+        Cantidad de objetos con alguna reescritura
+    """
+    cache = cache if cache is not None else RelationshipRewriteCache()
+    cache.update_graph(metadata.relationships)
+    keys = [(analyzed.get('expression') or '', analyzed.get('object_type', 'measure'), analyzed.get('table'))
+            for analyzed in analyzed_measures]
+    cache.retain(keys)
+    rewritten = 0
+
+    for analyzed, key in zip(analyzed_measures, keys):
+        rewrites = cache.rewrites(*key)
+        if not rewrites:
+            continue
+
+        code = key[0]
+
+        issues = list(analyzed['issues'])
+        lookups = sum(1 for rewrite in rewrites if rewrite.rule_id == LOOKUPVALUE_RULE)
+        if lookups and lookups == len(_LOOKUPVALUE_CALL.findall(code)):
+            issues = [issue for issue in issues if issue.id != 'expensive-lookupvalue']
+
+        for rewrite in rewrites:
+            line, column = get_location(code, rewrite.start)
+            issues.append(Issue(rewrite.rule_id, line, column, snippet=rewrite.original[:100], params=rewrite.params))
+
+        suggestions = list(analyzed['suggestions'])
+        params = (('original', code), ('rewritten', rewrite_expression(code, rewrites)))
+        for rule_id in dict.fromkeys(rewrite.rule_id for rewrite in rewrites):
+            applied = any(rewrite.rule_id == rule_id and rewrite.replacement is not None for rewrite in rewrites)
+            suggestions.append(create_suggestion(get_rule(rule_id).suggestion, params if applied else params[:1]))
+
+        analyzed['issues'] = issues
+        analyzed['suggestions'] = suggestions
+        analyzed['base_score'] = recalculate_score(analyzed)
+        rewritten += 1
+
+    instrumentation.count('relationship_rewrites', rewritten)
+    return rewritten
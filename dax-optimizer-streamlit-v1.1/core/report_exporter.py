@@ -0,0 +1,113 @@
+"""
+Exportación de resultados del análisis
+Genera reportes CSV y HTML a partir de las medidas rankeadas
+"""
+
+import time
+from typing import List
+
+from .measure_ranker import RankedMeasure
+from .instrumentation import timed
+from .tracing import traced
+
+
+# Nombre de cada tipo de objeto en los reportes
+OBJECT_TYPE_NAMES = {
+    'measure': 'Medida',
+    'calculated-column': 'Columna calculada',
+    'calculated-table': 'Tabla calculada',
+    'column': 'Columna',
+    'relationship': 'Relación'
+}
+
+
+@traced('export.csv')
+@timed('export.csv')
+def export_measures_to_csv(ranked_measures: List[RankedMeasure]) -> bytes:
+    """Exporta las medidas analizadas a un archivo CSV"""
+    # pandas solo se necesita al exportar: no penalizar la importación de core
+    import pandas as pd
+
+    data = []
+    for measure in ranked_measures:
+        row = {
+            'Nombre': measure.name,
+            'Tabla': measure.table,
+            'Tipo': OBJECT_TYPE_NAMES.get(measure.object_type, measure.object_type),
+            'Score de Riesgo': measure.impact_score,
+            'Prioridad': measure.priority_label,
+            'Complejidad': measure.complexity,
+            'Issues Críticos': measure.critical_issues,
+            'Warnings': measure.warnings,
+            'Total Issues': measure.critical_issues + measure.warnings,
+            'Funciones': measure.metrics.function_count if measure.metrics else 0,
+            'Variables': measure.metrics.variables_used if measure.metrics else 0,
+            'Iteradores Anidados': measure.metrics.nested_iterators if measure.metrics else 0,
+            'Transiciones de Contexto': measure.metrics.context_transitions if measure.metrics else 0,
+            'Impacto Estimado': measure.metrics.estimated_impact if measure.metrics else 'N/A',
+            'Tiempo DAX Observado (ms)': measure.observed_ms,
+            'Expresión DAX': measure.expression
+        }
+        data.append(row)
+
+    df = pd.DataFrame(data)
+    return df.to_csv(index=False).encode('utf-8')
+
+
+@traced('export.html')
+@timed('export.html')
+def export_measures_to_html(ranked_measures: List[RankedMeasure]) -> bytes:
+    """Exporta las medidas analizadas a un archivo HTML con formato"""
+    import pandas as pd
+
+    data = []
+    for measure in ranked_measures:
+        row = {
+            'Nombre': measure.name,
+            'Tabla': measure.table,
+            'Tipo': OBJECT_TYPE_NAMES.get(measure.object_type, measure.object_type),
+            'Score de Riesgo': measure.impact_score,
+            'Prioridad': measure.priority_label,
+            'Complejidad': measure.complexity,
+            'Issues Críticos': measure.critical_issues,
+            'Warnings': measure.warnings,
+            'Total Issues': measure.critical_issues + measure.warnings,
+            'Funciones': measure.metrics.function_count if measure.metrics else 0,
+            'Variables': measure.metrics.variables_used if measure.metrics else 0,
+            'Iteradores Anidados': measure.metrics.nested_iterators if measure.metrics else 0,
+            'Transiciones de Contexto': measure.metrics.context_transitions if measure.metrics else 0,
+            'Impacto Estimado': measure.metrics.estimated_impact if measure.metrics else 'N/A',
+            'Tiempo DAX Observado (ms)': measure.observed_ms
+        }
+        data.append(row)
+
+    df = pd.DataFrame(data)
+
+    # Crear HTML con estilos
+    html = df.to_html(index=False, escape=False, classes='table table-striped')
+
+    # Agregar estilos CSS
+    styled_html = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <title>Análisis DAX - Reporte</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 20px; background: #f8f9fa; }}
+            h1 {{ color: #0066cc; }}
+            .table {{ width: 100%; border-collapse: collapse; background: white; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
+            .table th {{ background: #0066cc; color: white; padding: 12px; text-align: left; }}
+            .table td {{ padding: 10px; border-bottom: 1px solid #dee2e6; }}
+            .table tr:hover {{ background: #f1f3f5; }}
+        </style>
+    </head>
+    <body>
+        <h1>⚡ DAX Optimizer - Análisis de Medidas</h1>
+        <p>Fecha: {time.strftime('%Y-%m-%d %H:%M:%S')}</p>
+        {html}
+    </body>
+    </html>
+    """
+
+    return styled_html.encode('utf-8')
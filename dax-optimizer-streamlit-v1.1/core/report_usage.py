@@ -0,0 +1,207 @@
+"""
+Uso de las medidas en el reporte (.Report de un PBIP)
+Recorre una sola vez los archivos del reporte y registra qué visuales y
+páginas usan cada medida. Soporta el formato PBIR
+(definition/pages/<página>/visuals/<visual>/visual.json) y el formato
+anterior (report.json con 'sections' y la configuración de cada visual
+serializada como texto JSON).
+
+La exposición de una medida suma el peso de la página de cada visual que la
+usa: la página inicial pesa más y las páginas ocultas menos.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Iterator, Set
+
+from .dataclass_slots import slotted_dataclass
+from . import instrumentation
+
+
+# Peso de un visual según su página
+LANDING_PAGE_WEIGHT = 2.0
+PAGE_WEIGHT = 1.0
+HIDDEN_PAGE_WEIGHT = 0.5
+
+# Campos del formato anterior que guardan JSON serializado como texto
+_EMBEDDED_JSON_KEYS = frozenset({'config', 'filters', 'query', 'dataTransforms'})
+
+
+@slotted_dataclass()
+class MeasureUsage:
+    """Visuales y páginas del reporte que usan una medida"""
+    name: str
+    visual_count: int = 0
+    pages: List[str] = field(default_factory=list)
+    on_landing_page: bool = False
+    exposure: float = 0.0  # Suma de pesos de página de los visuales que la usan
+
+
+@dataclass
+class ReportUsage:
+    """Uso de medidas en un reporte (claves en minúsculas)"""
+    measures: Dict[str, MeasureUsage] = field(default_factory=dict)
+    pages: List[str] = field(default_factory=list)
+    visual_count: int = 0
+    source: str = ''
+
+    def __len__(self) -> int:
+        return len(self.measures)
+
+    def usage(self, name: str) -> Optional[MeasureUsage]:
+        return self.measures.get(name.lower())
+
+
+def iter_measure_references(node) -> Iterator[str]:
+    """
+    Nombres de medida referenciados en la definición de un visual
+
+    Busca objetos {'Measure': {'Property': nombre, ...}} en cualquier nivel
+    (proyecciones, filtros, formato condicional) y abre el JSON serializado
+    como texto del formato anterior.
+
+    Args:
+        node: JSON del visual (dict, lista o valor)
+
+    Yields:
+        Nombre de cada medida referenciada (puede repetirse)
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            measure = node.get('Measure')
+            if isinstance(measure, dict) and isinstance(measure.get('Property'), str):
+                yield measure['Property']
+            for key, value in node.items():
+                if isinstance(value, str) and key in _EMBEDDED_JSON_KEYS and value[:1] in ('{', '['):
+                    try:
+                        stack.append(json.loads(value))
+                    except ValueError:
+                        pass
+                elif isinstance(value, (dict, list)):
+                    stack.append(value)
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    """Objeto JSON de un archivo del reporte, o None si falta, no es JSON o no es un objeto"""
+    instrumentation.count('report_files')
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _add_visual(usage: ReportUsage, measure_names: Set[str], page: str, weight: float, landing: bool) -> None:
+    usage.visual_count += 1
+    for name in measure_names:
+        key = name.lower()
+        measure = usage.measures.get(key)
+        if measure is None:
+            measure = usage.measures[key] = MeasureUsage(name=name)
+        measure.visual_count += 1
+        measure.exposure += weight
+        measure.on_landing_page = measure.on_landing_page or landing
+        if page not in measure.pages:
+            measure.pages.append(page)
+
+
+def _page_weight(hidden: bool, landing: bool) -> float:
+    if landing:
+        return LANDING_PAGE_WEIGHT
+    return HIDDEN_PAGE_WEIGHT if hidden else PAGE_WEIGHT
+
+
+def _scan_pbir(usage: ReportUsage, pages_path: str) -> None:
+    """Formato PBIR: un archivo por página y por visual, en una sola pasada (os.walk de arriba hacia abajo)"""
+    pages_index = _read_json(os.path.join(pages_path, 'pages.json')) or {}
+    page_order = pages_index.get('pageOrder') or []
+    landing_page = page_order[0] if page_order else pages_index.get('activePageName')
+
+    # os.walk lista page.json (carpeta de la página) antes que las carpetas de sus visuales
+    pages: Dict[str, tuple] = {}
+    for folder, subfolders, files in os.walk(pages_path):
+        subfolders.sort()
+        relative = os.path.relpath(folder, pages_path).replace('\\', '/').split('/')
+
+        if len(relative) == 1 and relative[0] != '.' and 'page.json' in files:
+            page_id = relative[0]
+            page = _read_json(os.path.join(folder, 'page.json')) or {}
+            landing = page_id == landing_page or (landing_page is None and not pages)
+            hidden = page.get('visibility') == 'HiddenInViewMode'
+            pages[page_id] = (page.get('displayName') or page_id, _page_weight(hidden, landing), landing)
+            usage.pages.append(pages[page_id][0])
+
+        elif len(relative) == 3 and relative[1] == 'visuals' and 'visual.json' in files:
+            visual = _read_json(os.path.join(folder, 'visual.json'))
+            if visual is None or 'visual' not in visual:
+                continue  # Grupos de visuales: no consultan datos
+            page_name, weight, landing = pages.get(relative[0], (relative[0], PAGE_WEIGHT, False))
+            # El archivo completo: los filtros del visual (filterConfig) están fuera de 'visual'
+            _add_visual(usage, set(iter_measure_references(visual)), page_name, weight, landing)
+
+
+def _scan_legacy(usage: ReportUsage, report_json_path: str) -> None:
+    """Formato anterior: report.json con las páginas ('sections') y sus visuales"""
+    report = _read_json(report_json_path) or {}
+    sections = [section for section in report.get('sections') or [] if isinstance(section, dict)]
+    landing_ordinal = min((section.get('ordinal', 0) for section in sections), default=0)
+
+    for section in sections:
+        page_name = section.get('displayName') or section.get('name') or ''
+        landing = section.get('ordinal', 0) == landing_ordinal
+        try:
+            config = json.loads(section.get('config') or '{}')
+        except ValueError:
+            config = {}
+        hidden = isinstance(config, dict) and config.get('visibility') == 1
+        weight = _page_weight(hidden, landing)
+        usage.pages.append(page_name)
+
+        for container in section.get('visualContainers') or []:
+            if isinstance(container, dict):
+                _add_visual(usage, set(iter_measure_references(container)), page_name, weight, landing)
+
+
+@instrumentation.timed('extract.report_usage')
+def parse_report_usage(report_path: str) -> ReportUsage:
+    """
+    Visuales y páginas que usan cada medida de un reporte PBIP
+
+    Args:
+        report_path: Carpeta .Report (pbip_extractor.find_report_path)
+
+    Returns:
+        ReportUsage (vacío si la carpeta no tiene un formato conocido)
+    """
+    usage = ReportUsage(source=report_path)
+
+    pages_path = os.path.join(report_path, 'definition', 'pages')
+    if os.path.isdir(pages_path):
+        _scan_pbir(usage, pages_path)
+    elif os.path.isfile(os.path.join(report_path, 'report.json')):
+        _scan_legacy(usage, os.path.join(report_path, 'report.json'))
+
+    instrumentation.count('report_visuals', usage.visual_count)
+    return usage
+
+
+def load_report_usage(file_path: str) -> Optional[ReportUsage]:
+    """
+    Uso de medidas del reporte asociado a un PBIP
+
+    Args:
+        file_path: Ruta al .pbip, a la carpeta .SemanticModel o a la carpeta del proyecto
+
+    Returns:
+        ReportUsage, o None si el proyecto no tiene carpeta .Report (o es un ZIP)
+    """
+    from .pbip_extractor import find_report_path
+
+    report_path = find_report_path(file_path)
+    return parse_report_usage(report_path) if report_path is not None else None
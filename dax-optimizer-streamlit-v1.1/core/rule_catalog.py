@@ -0,0 +1,642 @@
+"""
+Catálogo versionado de reglas y plantillas de sugerencias
+Los resultados por medida guardan solo el id de la regla, la ubicación y los
+parámetros; los textos se resuelven aquí (con soporte de idioma)
+"""
+
+from typing import Dict, Optional, Tuple
+
+from .dataclass_slots import slotted_dataclass
+
+# Incrementar cuando cambien ids, severidades o parámetros de las reglas
+# (invalida resultados serializados con una versión anterior)
+CATALOG_VERSION = '1.4.0'
+
+DEFAULT_LANGUAGE = 'es'
+
+_current_language = DEFAULT_LANGUAGE
+
+
+@slotted_dataclass(frozen=True)
+class RuleDefinition:
+    """Definición de una regla de análisis"""
+    id: str
+    severity: str  # 'critical', 'warning', 'info'
+    category: str
+    title: str  # Puede contener {parametros}
+    description: str  # Puede contener {parametros}
+    learn_more: str = ""
+    suggestion: Optional[str] = None  # Id de plantilla en SUGGESTION_TEMPLATES
+
+
+@slotted_dataclass(frozen=True)
+class SuggestionTemplate:
+    """Plantilla compartida de una sugerencia (textos y ejemplos de código)"""
+    id: str  # Id público de la sugerencia generada
+    title: str
+    description: str
+    original_code: str
+    suggested_code: str
+    impact: str  # 'high', 'medium', 'low'
+    reason: str
+
+
+def _rule(rule_id: str, severity: str, category: str, title: str, description: str,
+          learn_more: str = "", suggestion: Optional[str] = None) -> Tuple[str, RuleDefinition]:
+    return rule_id, RuleDefinition(rule_id, severity, category, title, description, learn_more, suggestion)
+
+
+RULES: Dict[str, RuleDefinition] = dict([
+    _rule(
+        'nested-iterators', 'critical', 'Performance',
+        'Iteradores anidados detectados',
+        'Se detectó {inner} dentro de {outer}. Esto causa que cada fila de la tabla externa evalúe todas las filas de la tabla interna, resultando en complejidad O(n²) o mayor.',
+        'https://www.sqlbi.com/articles/optimizing-nested-iterators-in-dax/',
+        'optimize-nested-iterators'
+    ),
+    _rule(
+        'filter-without-keepfilters', 'warning', 'Filter Context',
+        'FILTER en CALCULATE sin KEEPFILTERS',
+        'Usar FILTER directamente en CALCULATE puede sobrescribir filtros existentes. Considera usar KEEPFILTERS(FILTER(...)) para mantener el contexto de filtro existente.',
+        'https://www.sqlbi.com/articles/using-keepfilters-in-dax/',
+        'add-keepfilters'
+    ),
+    _rule(
+        'missing-variables', 'warning', 'Code Quality',
+        'Múltiples CALCULATE sin variables',
+        'Se detectaron múltiples llamadas a CALCULATE. Usar VAR para almacenar cálculos intermedios mejora la performance y legibilidad.',
+        'https://www.sqlbi.com/articles/using-variables-in-dax/',
+        'add-variables'
+    ),
+    _rule(
+        'no-variables-complex', 'info', 'Code Quality',
+        'Código complejo sin variables',
+        'Tu código tiene múltiples funciones pero no usa variables. Considera usar VAR para mejorar legibilidad y potencialmente performance.',
+        'https://www.sqlbi.com/articles/using-variables-in-dax/',
+        'add-variables'
+    ),
+    _rule(
+        'nested-calculate', 'warning', 'Context Transition',
+        'CALCULATE anidado detectado',
+        'CALCULATE anidado causa múltiples transiciones de contexto innecesarias. Considera combinar los filtros en un solo CALCULATE.',
+        'https://www.sqlbi.com/articles/understanding-context-transition/',
+        'flatten-calculate'
+    ),
+    _rule(
+        'all-in-filter', 'critical', 'Performance',
+        'ALL() usado en FILTER sobre tabla completa',
+        'FILTER(ALL(Tabla), ...) itera sobre todas las filas sin aprovechar índices. Considera usar CALCULATE con filtros o FILTER solo sobre columnas específicas.',
+        'https://www.sqlbi.com/articles/best-practices-using-filter-and-all/',
+        'optimize-all-filter'
+    ),
+    _rule(
+        'expensive-crossjoin', 'warning', 'Performance',
+        'Función costosa: CROSSJOIN',
+        'CROSSJOIN genera producto cartesiano de tablas. Evalúa si hay una alternativa más eficiente.',
+        'https://www.sqlbi.com/articles/optimizing-dax-expressions/'
+    ),
+    _rule(
+        'expensive-generate', 'warning', 'Performance',
+        'Función costosa: GENERATE',
+        'GENERATE itera y genera filas para cada fila de entrada. Evalúa si hay una alternativa más eficiente.',
+        'https://www.sqlbi.com/articles/optimizing-dax-expressions/'
+    ),
+    _rule(
+        'expensive-summarize', 'warning', 'Performance',
+        'Función costosa: SUMMARIZE',
+        'SUMMARIZE puede ser reemplazado por SUMMARIZECOLUMNS (más eficiente). Evalúa si hay una alternativa más eficiente.',
+        'https://www.sqlbi.com/articles/optimizing-dax-expressions/'
+    ),
+    _rule(
+        'expensive-lookupvalue', 'warning', 'Performance',
+        'Función costosa: LOOKUPVALUE',
+        'LOOKUPVALUE hace búsquedas lineales, considera usar RELATED si hay relación. Evalúa si hay una alternativa más eficiente.',
+        'https://www.sqlbi.com/articles/optimizing-dax-expressions/'
+    ),
+    _rule(
+        'measure-in-calculated-column', 'critical', 'Context Transition',
+        'Medida usada en columna calculada',
+        'Usar medidas en columnas calculadas causa transición de contexto en cada fila, lo cual es muy costoso. Considera reescribir la lógica usando funciones de columna calculada.',
+        'https://www.sqlbi.com/articles/understanding-context-transition/'
+    ),
+    _rule(
+        'table-scan-in-calculated-column', 'critical', 'Refresh',
+        '{function} recorre una tabla en una columna calculada',
+        'La columna calculada evalúa {function} una vez por cada fila de su tabla en cada actualización del modelo: el costo crece con filas de la tabla × filas recorridas. Considera calcularla en Power Query o en la fuente, usar RELATED/RELATEDTABLE sobre una relación, o reemplazarla por una medida.',
+        'https://www.sqlbi.com/articles/comparing-dax-calculated-columns-with-power-query-computed-columns/'
+    ),
+    _rule(
+        'derived-calculated-table', 'warning', 'Refresh',
+        'Tabla calculada derivada con {function}',
+        'La tabla calculada se vuelve a materializar completa con {function} en cada actualización, no admite actualización incremental y se comprime peor que una tabla importada. Si la tabla de origen es grande, considera generarla en Power Query o en la fuente.',
+        'https://www.sqlbi.com/articles/comparing-dax-calculated-columns-with-power-query-computed-columns/'
+    ),
+    _rule(
+        'earlier-in-measure', 'warning', 'Code Quality',
+        'EARLIER detectado en medida',
+        'EARLIER se usa típicamente en columnas calculadas. Si estás intentando usar lógica de columna calculada en una medida, considera crear la columna calculada por separado o usar variables.',
+        'https://www.sqlbi.com/articles/row-context-and-filter-context-in-dax/'
+    ),
+    _rule(
+        'repeated-measure-reference', 'info', 'Code Quality',
+        'Referencia a medida repetida',
+        'La medida [{measure}] se usa {count} veces. Considera almacenarla en una variable para evaluar solo una vez.',
+        'https://www.sqlbi.com/articles/using-variables-in-dax/',
+        'add-variables'
+    ),
+    _rule(
+        'repeated-subexpression', 'warning', 'Performance',
+        'Subexpresión repetida',
+        '{expression} se evalúa {count} veces en el mismo contexto de filtro. Guárdala en una variable (VAR) para calcularla una sola vez.',
+        'https://www.sqlbi.com/articles/using-variables-in-dax/',
+        'add-variables'
+    ),
+    # Regla entre medidas (shared_expressions): se evalúa sobre todas las medidas del modelo
+    _rule(
+        'shared-subexpression', 'info', 'Code Quality',
+        'Expresión repetida en otras medidas',
+        '{expression} también aparece en {count} medida(s) más ({measures}). Defínela una vez en la medida base [{base}] y referénciala desde las demás.',
+        'https://www.sqlbi.com/articles/using-variables-in-dax/',
+        'use-base-measure'
+    ),
+    # Reglas del modelo (model_analyzer): se evalúan sobre los metadatos, no sobre una expresión
+    _rule(
+        'auto-date-table', 'warning', 'Model',
+        'Tabla de fecha automática ({table})',
+        'La opción Fecha/hora automática crea una tabla oculta {table} con todos los días del rango de esta columna, con sus columnas calculadas y una relación. Con muchas columnas de fecha esas tablas ocupan memoria y alargan la actualización. Desactívala y usa una tabla de fechas propia marcada como tabla de fechas.',
+        'https://learn.microsoft.com/power-bi/transform-model/desktop-auto-date-time',
+        'disable-auto-date-time'
+    ),
+    _rule(
+        'bidirectional-relationship', 'warning', 'Model',
+        'Relación bidireccional entre {from_table} y {to_table}',
+        'El filtro cruzado en ambas direcciones propaga cada filtro de {from_table} hacia {to_table} en todas las consultas, lo que agrega joins al storage engine y puede generar ambigüedad entre caminos de filtro. Deja la relación en una dirección y activa la bidireccionalidad solo en las medidas que la necesitan con CROSSFILTER.',
+        'https://www.sqlbi.com/articles/bidirectional-relationships-and-ambiguity-in-dax/',
+        'use-crossfilter'
+    ),
+    _rule(
+        'many-to-many-relationship', 'warning', 'Model',
+        'Relación de muchos a muchos entre {from_table} y {to_table}',
+        'Una relación de cardinalidad muchos a muchos no puede usar el índice de la columna clave del lado uno: cada consulta resuelve la relación con un join entre los valores de ambas columnas. Si la columna de un lado es única, cambia la cardinalidad; si no, considera una tabla puente.',
+        'https://learn.microsoft.com/power-bi/transform-model/desktop-many-to-many-relationships'
+    ),
+    _rule(
+        'high-precision-datetime', 'warning', 'Memory',
+        'Columna de fecha y hora con alta precisión: {column}',
+        'La columna {column} guarda fecha y hora: cada instante distinto es un valor del diccionario, así que su cardinalidad (y su tamaño) crece con la precisión. Si solo se analiza por día, guarda solo la fecha; si la hora importa, sepárala en una columna de fecha y otra de hora redondeada.',
+        'https://www.sqlbi.com/articles/optimizing-high-cardinality-columns-in-vertipaq/'
+    ),
+    _rule(
+        'unused-hidden-column', 'info', 'Memory',
+        'Columna oculta sin uso: {column}',
+        'La columna {column} está oculta y ninguna expresión DAX, relación, jerarquía ni orden por columna la usa. Ocupa memoria y tiempo de actualización sin que el reporte pueda mostrarla: considera quitarla del modelo (verifica antes que no la usen otros reportes conectados al modelo).',
+        'https://learn.microsoft.com/power-bi/guidance/import-modeling-data-reduction'
+    ),
+    _rule(
+        'lookupvalue-with-relationship', 'warning', 'Performance',
+        'LOOKUPVALUE sobre la relación {relationship}',
+        'La relación activa {relationship} ya une las dos tablas por las columnas de la búsqueda: RELATED({column}) lee el valor siguiendo la relación en lugar de buscarlo en la tabla para cada fila.',
+        'https://learn.microsoft.com/dax/related-function-dax',
+        'use-related'
+    ),
+    _rule(
+        'filter-on-related-key', 'warning', 'Performance',
+        'FILTER recorre {table} para seguir una relación',
+        'FILTER compara la clave de cada fila de {table} con la fila actual aunque la relación activa {relationship} ya las une: RELATEDTABLE({table}) obtiene las mismas filas por la relación sin evaluar la condición fila por fila.',
+        'https://learn.microsoft.com/dax/relatedtable-function-dax',
+        'use-relatedtable'
+    ),
+    _rule(
+        'filter-key-equality', 'warning', 'Performance',
+        'FILTER sobre la tabla {table} como filtro de CALCULATE',
+        'FILTER recorre todas las filas de {table} para comparar {column} con un valor de la fila actual y filtra la tabla completa. TREATAS filtra solo esa columna con el mismo valor (KEEPFILTERS conserva los filtros existentes sobre ella) y no necesita una relación entre las tablas.',
+        'https://www.sqlbi.com/articles/propagate-filters-using-treatas-in-dax/',
+        'use-treatas'
+    ),
+])
+
+
+SUGGESTION_TEMPLATES: Dict[str, SuggestionTemplate] = {
+    'optimize-nested-iterators': SuggestionTemplate(
+        id='optimize-nested-iterators',
+        title='Eliminar iteradores anidados',
+        description='Refactoriza para evitar iterar múltiples veces',
+        original_code='Patrón detectado: SUMX(..., SUMX(...))',
+        suggested_code="""-- ❌ Original (nested iterators):
+SUMX(
+    Tabla1,
+    SUMX(
+        FILTER(Tabla2, Tabla2[ID] = Tabla1[ID]),
+        Tabla2[Valor]
+    )
+)
+
+-- ✅ Optimizado (usando variables y relaciones):
+SUMX(
+    Tabla1,
+    VAR TablaFiltrada =
+        FILTER(Tabla2, Tabla2[ID] = Tabla1[ID])
+    RETURN
+        CALCULATE(SUM(Tabla2[Valor]), TablaFiltrada)
+)
+
+-- ✅ Mejor aún (si existe relación):
+SUMX(
+    Tabla1,
+    CALCULATE(SUM(Tabla2[Valor]))
+)""",
+        impact='high',
+        reason='Reduce complejidad de O(n²) a O(n), mejorando drásticamente la performance en tablas grandes.'
+    ),
+    'add-keepfilters': SuggestionTemplate(
+        id='add-keepfilters',
+        title='Usar KEEPFILTERS para mantener contexto',
+        description='Envuelve FILTER con KEEPFILTERS',
+        original_code='CALCULATE([Medida], FILTER(...))',
+        suggested_code='CALCULATE([Medida], KEEPFILTERS(FILTER(...)))',
+        impact='medium',
+        reason='KEEPFILTERS respeta los filtros existentes en lugar de sobrescribirlos, evitando resultados inesperados.'
+    ),
+    'add-variables': SuggestionTemplate(
+        id='add-variables',
+        title='Introducir variables (VAR)',
+        description='Almacena cálculos intermedios en variables',
+        original_code='Expresiones repetidas o código sin variables',
+        suggested_code="""-- ✅ Patrón recomendado:
+VAR Ventas = SUM(Tabla[Ventas])
+VAR Costos = SUM(Tabla[Costos])
+VAR Margen = Ventas - Costos
+RETURN
+    DIVIDE(Margen, Ventas)
+
+-- O para cálculos complejos:
+VAR MiCalculo = CALCULATE(...)
+RETURN
+    IF(MiCalculo > 0, MiCalculo, BLANK())""",
+        impact='medium',
+        reason='Las variables se evalúan una sola vez y se reutilizan, mejorando performance y legibilidad.'
+    ),
+    'add-variables-generic': SuggestionTemplate(
+        id='add-variables',
+        title='Considerar uso de variables',
+        description='Tu código tiene múltiples funciones. Variables pueden mejorar la legibilidad y potencialmente la performance.',
+        original_code='Código actual sin variables',
+        suggested_code="""-- Patrón recomendado:
+VAR Paso1 = CALCULATE(...)
+VAR Paso2 = FILTER(...)
+VAR Resultado = SUMX(Paso2, ...)
+RETURN
+    Resultado""",
+        impact='low',
+        reason='Variables hacen el código más mantenible y pueden prevenir recálculos innecesarios.'
+    ),
+    'flatten-calculate': SuggestionTemplate(
+        id='flatten-calculate',
+        title='Aplanar CALCULATEs anidados',
+        description='Combina múltiples CALCULATE en uno solo',
+        original_code="""CALCULATE(
+    CALCULATE([Medida], Filtro1),
+    Filtro2
+)""",
+        suggested_code="""CALCULATE(
+    [Medida],
+    Filtro1,
+    Filtro2
+)""",
+        impact='medium',
+        reason='Elimina transiciones de contexto innecesarias, reduciendo overhead de evaluación.'
+    ),
+    'optimize-all-filter': SuggestionTemplate(
+        id='optimize-all-filter',
+        title='Optimizar uso de ALL en FILTER',
+        description='Usa CALCULATE en lugar de FILTER(ALL(...))',
+        original_code="""FILTER(
+    ALL(Tabla),
+    Tabla[Columna] = Valor
+)""",
+        suggested_code="""CALCULATE(
+    VALUES(Tabla),
+    Tabla[Columna] = Valor,
+    REMOVEFILTERS(Tabla)
+)
+
+-- O mejor, si solo filtras una columna:
+CALCULATETABLE(
+    VALUES(Tabla),
+    Tabla[Columna] = Valor,
+    REMOVEFILTERS(Tabla)
+)""",
+        impact='high',
+        reason='CALCULATE puede aprovechar índices y optimizaciones del motor, mientras que FILTER(ALL(...)) itera todas las filas.'
+    ),
+    'disable-auto-date-time': SuggestionTemplate(
+        id='disable-auto-date-time',
+        title='Desactivar Fecha/hora automática',
+        description='Usa una tabla de fechas propia en lugar de una tabla oculta por columna',
+        original_code="""-- model.tmdl
+annotation __PBI_TimeIntelligenceEnabled = 1""",
+        suggested_code="""-- Archivo > Opciones > Carga de datos > Fecha/hora automática: desactivado
+-- y una tabla de fechas propia, marcada como tabla de fechas:
+Fechas =
+ADDCOLUMNS(
+    CALENDARAUTO(),
+    "Año", YEAR([Date]),
+    "Mes", FORMAT([Date], "MMMM")
+)""",
+        impact='medium',
+        reason='Una sola tabla de fechas relacionada con las columnas de fecha reemplaza a todas las tablas ocultas y sus relaciones.'
+    ),
+    'use-crossfilter': SuggestionTemplate(
+        id='use-crossfilter',
+        title='Usar CROSSFILTER en lugar de la relación bidireccional',
+        description='Deja la relación en una dirección y habilita ambas solo donde hace falta',
+        original_code="""-- relationships.tmdl
+crossFilteringBehavior: bothDirections""",
+        suggested_code="""-- Relación en una dirección (crossFilteringBehavior: oneDirection)
+-- y la bidireccionalidad solo en la medida que la necesita:
+Clientes con ventas =
+CALCULATE(
+    DISTINCTCOUNT(Clientes[ClienteKey]),
+    CROSSFILTER(Ventas[ClienteKey], Clientes[ClienteKey], Both)
+)""",
+        impact='high',
+        reason='Las demás consultas dejan de propagar filtros en ambas direcciones, evitando joins extra y ambigüedad.'
+    ),
+    'use-base-measure': SuggestionTemplate(
+        id='use-base-measure',
+        title='Usar una medida base',
+        description='Reemplaza la expresión repetida por una referencia a la medida base',
+        original_code='{original}',
+        suggested_code='{rewritten}',
+        impact='low',
+        reason='El cálculo queda definido en un solo lugar: un cambio se aplica a todas las medidas que lo usan y no aparecen versiones que divergen.'
+    ),
+    # Reescrituras por relación (relationship_graph): el código es la expresión original y la reescrita
+    'use-related': SuggestionTemplate(
+        id='use-related',
+        title='Usar RELATED en lugar de LOOKUPVALUE',
+        description='Lee el valor por la relación existente entre las tablas',
+        original_code='{original}',
+        suggested_code='{rewritten}',
+        impact='high',
+        reason='RELATED sigue la relación del modelo desde la fila actual; LOOKUPVALUE busca el valor en la tabla por cada fila evaluada.'
+    ),
+    'use-relatedtable': SuggestionTemplate(
+        id='use-relatedtable',
+        title='Usar RELATEDTABLE en lugar de FILTER sobre la clave',
+        description='Obtiene las filas relacionadas por la relación existente',
+        original_code='{original}',
+        suggested_code='{rewritten}',
+        impact='high',
+        reason='RELATEDTABLE filtra la tabla por la relación en el storage engine en lugar de comparar la clave en cada fila.'
+    ),
+    'use-treatas': SuggestionTemplate(
+        id='use-treatas',
+        title='Filtrar la columna con TREATAS',
+        description='Reemplaza el FILTER sobre la tabla por un filtro de columna',
+        original_code='{original}',
+        # Sin una reescritura equivalente (ALL*/REMOVEFILTERS o sin contexto de fila) se muestra el patrón
+        suggested_code="""-- Dentro de un iterador sobre Otra, sin ALL/REMOVEFILTERS en el mismo CALCULATE:
+CALCULATE(
+    [Medida],
+    KEEPFILTERS(TREATAS(VALUES(Otra[Clave]), Tabla[Clave]))
+)""",
+        impact='medium',
+        reason='Un filtro sobre una columna se resuelve en el storage engine; FILTER sobre la tabla la materializa y evalúa la condición fila por fila.'
+    ),
+}
+
+
+# Traducciones: idioma -> id (regla o plantilla) -> campo -> texto
+# Los campos ausentes usan el texto del idioma por defecto
+TRANSLATIONS: Dict[str, Dict[str, Dict[str, str]]] = {
+    'en': {
+        'nested-iterators': {
+            'title': 'Nested iterators detected',
+            'description': '{inner} was found inside {outer}. Every row of the outer table evaluates every row of the inner table, giving O(n²) or worse complexity.',
+        },
+        'filter-without-keepfilters': {
+            'title': 'FILTER in CALCULATE without KEEPFILTERS',
+            'description': 'Using FILTER directly in CALCULATE can overwrite existing filters. Consider KEEPFILTERS(FILTER(...)) to keep the existing filter context.',
+        },
+        'missing-variables': {
+            'title': 'Multiple CALCULATE without variables',
+            'description': 'Several CALCULATE calls were found. Storing intermediate results in VAR improves performance and readability.',
+        },
+        'no-variables-complex': {
+            'title': 'Complex code without variables',
+            'description': 'Your code uses many functions but no variables. Consider VAR to improve readability and potentially performance.',
+        },
+        'nested-calculate': {
+            'title': 'Nested CALCULATE detected',
+            'description': 'Nested CALCULATE causes several unnecessary context transitions. Consider merging the filters into a single CALCULATE.',
+        },
+        'all-in-filter': {
+            'title': 'ALL() used in FILTER over a full table',
+            'description': 'FILTER(ALL(Table), ...) iterates every row without using indexes. Consider CALCULATE with filter arguments or FILTER over specific columns only.',
+        },
+        'expensive-crossjoin': {
+            'title': 'Expensive function: CROSSJOIN',
+            'description': 'CROSSJOIN produces a cartesian product of tables. Check whether a cheaper alternative exists.',
+        },
+        'expensive-generate': {
+            'title': 'Expensive function: GENERATE',
+            'description': 'GENERATE iterates and produces rows for every input row. Check whether a cheaper alternative exists.',
+        },
+        'expensive-summarize': {
+            'title': 'Expensive function: SUMMARIZE',
+            'description': 'SUMMARIZE can usually be replaced by SUMMARIZECOLUMNS (more efficient). Check whether a cheaper alternative exists.',
+        },
+        'expensive-lookupvalue': {
+            'title': 'Expensive function: LOOKUPVALUE',
+            'description': 'LOOKUPVALUE performs linear lookups; consider RELATED if a relationship exists. Check whether a cheaper alternative exists.',
+        },
+        'measure-in-calculated-column': {
+            'title': 'Measure used in calculated column',
+            'description': 'Measures in calculated columns trigger a context transition on every row, which is very expensive. Consider rewriting the logic with row-level functions.',
+        },
+        'table-scan-in-calculated-column': {
+            'title': '{function} scans a table in a calculated column',
+            'description': 'The calculated column evaluates {function} once per row of its table on every model refresh: the cost grows with table rows × rows scanned. Consider computing it in Power Query or at the source, using RELATED/RELATEDTABLE over a relationship, or replacing it with a measure.',
+        },
+        'derived-calculated-table': {
+            'title': 'Calculated table derived with {function}',
+            'description': 'The calculated table is fully rematerialized with {function} on every refresh, cannot be refreshed incrementally and compresses worse than an imported table. If the source table is large, consider building it in Power Query or at the source.',
+        },
+        'earlier-in-measure': {
+            'title': 'EARLIER detected in measure',
+            'description': 'EARLIER is typically used in calculated columns. If you are porting calculated-column logic into a measure, consider a separate calculated column or variables.',
+        },
+        'repeated-measure-reference': {
+            'title': 'Repeated measure reference',
+            'description': 'Measure [{measure}] is used {count} times. Consider storing it in a variable so it is evaluated once.',
+        },
+        'repeated-subexpression': {
+            'title': 'Repeated subexpression',
+            'description': '{expression} is evaluated {count} times in the same filter context. Store it in a variable (VAR) so it is computed once.',
+        },
+        'shared-subexpression': {
+            'title': 'Expression repeated in other measures',
+            'description': '{expression} also appears in {count} other measure(s) ({measures}). Define it once in the base measure [{base}] and reference it from the others.',
+        },
+        'optimize-nested-iterators': {
+            'title': 'Remove nested iterators',
+            'description': 'Refactor to avoid iterating several times',
+            'reason': 'Reduces complexity from O(n²) to O(n), dramatically improving performance on large tables.',
+        },
+        'add-keepfilters': {
+            'title': 'Use KEEPFILTERS to keep the context',
+            'description': 'Wrap FILTER with KEEPFILTERS',
+            'reason': 'KEEPFILTERS respects existing filters instead of overwriting them, avoiding unexpected results.',
+        },
+        'add-variables': {
+            'title': 'Introduce variables (VAR)',
+            'description': 'Store intermediate results in variables',
+            'reason': 'Variables are evaluated once and reused, improving performance and readability.',
+        },
+        'add-variables-generic': {
+            'title': 'Consider using variables',
+            'description': 'Your code uses many functions. Variables can improve readability and potentially performance.',
+            'reason': 'Variables make code easier to maintain and can prevent unnecessary recalculation.',
+        },
+        'flatten-calculate': {
+            'title': 'Flatten nested CALCULATEs',
+            'description': 'Merge several CALCULATE into one',
+            'reason': 'Removes unnecessary context transitions, reducing evaluation overhead.',
+        },
+        'optimize-all-filter': {
+            'title': 'Optimize ALL inside FILTER',
+            'description': 'Use CALCULATE instead of FILTER(ALL(...))',
+            'reason': 'CALCULATE can use engine indexes and optimizations, while FILTER(ALL(...)) iterates every row.',
+        },
+        'auto-date-table': {
+            'title': 'Automatic date table ({table})',
+            'description': 'The Auto date/time option creates a hidden {table} table with every day in the range of this column, plus its calculated columns and a relationship. With many date columns those tables use memory and lengthen refresh. Turn it off and use your own table marked as a date table.',
+        },
+        'bidirectional-relationship': {
+            'title': 'Bi-directional relationship between {from_table} and {to_table}',
+            'description': 'Cross-filtering in both directions propagates every filter from {from_table} to {to_table} in every query, adding storage engine joins and possibly ambiguity between filter paths. Keep the relationship single-direction and enable both directions only in the measures that need it with CROSSFILTER.',
+        },
+        'many-to-many-relationship': {
+            'title': 'Many-to-many relationship between {from_table} and {to_table}',
+            'description': 'A many-to-many cardinality relationship cannot use the key column index of a one side: every query resolves it with a join between the values of both columns. If one column is unique, change the cardinality; otherwise consider a bridge table.',
+        },
+        'high-precision-datetime': {
+            'title': 'High-precision date/time column: {column}',
+            'description': 'Column {column} stores date and time: every distinct instant is a dictionary value, so its cardinality (and size) grows with the precision. If analysis is by day, store only the date; if the time matters, split it into a date column and a rounded time column.',
+        },
+        'unused-hidden-column': {
+            'title': 'Unused hidden column: {column}',
+            'description': 'Column {column} is hidden and no DAX expression, relationship, hierarchy or sort-by-column uses it. It costs memory and refresh time while reports cannot show it: consider removing it from the model (first check that other reports connected to the model do not use it).',
+        },
+        'disable-auto-date-time': {
+            'title': 'Turn off Auto date/time',
+            'description': 'Use your own date table instead of one hidden table per column',
+            'reason': 'A single date table related to the date columns replaces all the hidden tables and their relationships.',
+        },
+        'use-crossfilter': {
+            'title': 'Use CROSSFILTER instead of the bi-directional relationship',
+            'description': 'Keep the relationship single-direction and enable both directions only where needed',
+            'reason': 'Other queries stop propagating filters both ways, avoiding extra joins and ambiguity.',
+        },
+        'lookupvalue-with-relationship': {
+            'title': 'LOOKUPVALUE over the relationship {relationship}',
+            'description': 'The active relationship {relationship} already joins both tables on the lookup columns: RELATED({column}) reads the value by following the relationship instead of searching the table for every row.',
+        },
+        'filter-on-related-key': {
+            'title': 'FILTER scans {table} to follow a relationship',
+            'description': 'FILTER compares the key of every row of {table} with the current row even though the active relationship {relationship} already joins them: RELATEDTABLE({table}) returns the same rows through the relationship without evaluating the condition row by row.',
+        },
+        'filter-key-equality': {
+            'title': 'FILTER over table {table} as a CALCULATE filter',
+            'description': 'FILTER scans every row of {table} to compare {column} with a value of the current row and filters the whole table. TREATAS filters only that column with the same value (KEEPFILTERS keeps the existing filters on it) and needs no relationship between the tables.',
+        },
+        'use-related': {
+            'title': 'Use RELATED instead of LOOKUPVALUE',
+            'description': 'Read the value through the existing relationship between the tables',
+            'reason': 'RELATED follows the model relationship from the current row; LOOKUPVALUE searches the table for every evaluated row.',
+        },
+        'use-relatedtable': {
+            'title': 'Use RELATEDTABLE instead of FILTER on the key',
+            'description': 'Get the related rows through the existing relationship',
+            'reason': 'RELATEDTABLE filters the table through the relationship in the storage engine instead of comparing the key on every row.',
+        },
+        'use-treatas': {
+            'title': 'Filter the column with TREATAS',
+            'description': 'Replace the FILTER over the table with a column filter',
+            'reason': 'A filter on a column is resolved by the storage engine; FILTER over the table materializes it and evaluates the condition row by row.',
+        },
+        'use-base-measure': {
+            'title': 'Use a base measure',
+            'description': 'Replace the repeated expression with a reference to the base measure',
+            'reason': 'The calculation is defined in a single place: a change applies to every measure that uses it and no diverging copies appear.',
+        },
+    },
+}
+
+
+def set_language(language: str) -> None:
+    """
+    Define el idioma de los textos del catálogo
+
+    Args:
+        language: Código de idioma ('es', 'en', ...)
+    """
+    global _current_language
+    if language != DEFAULT_LANGUAGE and language not in TRANSLATIONS:
+        raise ValueError(f"Idioma no soportado: {language}")
+    _current_language = language
+
+
+def get_language() -> str:
+    """Retorna el idioma actual del catálogo"""
+    return _current_language
+
+
+def get_rule(rule_id: str) -> RuleDefinition:
+    """
+    Obtiene la definición de una regla
+
+    Args:
+        rule_id: Id de la regla
+
+    Returns:
+        RuleDefinition del catálogo
+    """
+    return RULES[rule_id]
+
+
+def get_suggestion_template(template_id: str) -> SuggestionTemplate:
+    """
+    Obtiene una plantilla de sugerencia
+
+    Args:
+        template_id: Id de la plantilla
+
+    Returns:
+        SuggestionTemplate del catálogo
+    """
+    return SUGGESTION_TEMPLATES[template_id]
+
+
+def get_text(entry_id: str, field_name: str, params: Tuple[Tuple[str, object], ...] = ()) -> str:
+    """
+    Resuelve un texto del catálogo en el idioma actual y aplica los parámetros
+
+    Args:
+        entry_id: Id de la regla o de la plantilla de sugerencia
+        field_name: Campo a resolver ('title', 'description', 'reason', ...)
+        params: Parámetros para las plantillas {nombre}
+
+    Returns:
+        Texto localizado
+    """
+    text = TRANSLATIONS.get(_current_language, {}).get(entry_id, {}).get(field_name)
+
+    if text is None:
+        entry = RULES.get(entry_id) or SUGGESTION_TEMPLATES[entry_id]
+        text = getattr(entry, field_name)
+
+    if params:
+        return text.format(**dict(params))
+    return text
@@ -0,0 +1,339 @@
+"""
+Importador de server timings de DAX Studio
+Un server timings exportado (.json, o ServerTimings.json dentro de un .daxx)
+separa la duración de una consulta en storage engine (SE) y formula engine
+(FE) y lista cada consulta al SE. Se resumen en SE/FE, cantidad de consultas
+al SE, aciertos de caché y callbacks (CallbackDataID: el SE le devuelve
+trabajo fila a fila al FE), y se asocian a las medidas que usa la consulta.
+
+Las trazas pesadas (decenas de miles de eventos) se leen en streaming: los
+eventos del SE se procesan de a uno sin cargar el archivo completo.
+"""
+
+import io
+import json
+import os
+import re
+import zipfile
+from dataclasses import field
+from typing import List, Dict, TextIO, BinaryIO, Iterator, Tuple
+
+from .dataclass_slots import slotted_dataclass
+from .performance_trace import find_measure_references
+
+
+SERVER_TIMINGS_FILE = 'ServerTimings.json'
+QUERY_FILE = 'Query.dax'
+SE_EVENTS_KEY = 'StorageEngineEvents'
+
+# Proporción de la duración en el formula engine a partir de la cual la consulta es FE-bound
+FE_BOUND_RATIO = 0.5
+
+# Tamaño de lectura del parser en streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+
+
+@slotted_dataclass(frozen=True)
+class ServerTiming:
+    """Server timings de una consulta"""
+    query_text: str
+    total_ms: float
+    se_ms: float
+    fe_ms: float
+    se_cpu_ms: float = 0.0
+    se_queries: int = 0
+    se_cache_hits: int = 0
+    callbacks: int = 0  # Consultas al SE con CallbackDataID
+    source: str = ''
+
+    @property
+    def fe_ratio(self) -> float:
+        return self.fe_ms / self.total_ms if self.total_ms > 0 else 0.0
+
+    @property
+    def is_fe_bound(self) -> bool:
+        return self.fe_ratio >= FE_BOUND_RATIO
+
+
+@slotted_dataclass()
+class MeasureServerTiming:
+    """Server timings sumados de las consultas que usan una medida"""
+    name: str
+    table: str
+    total_ms: float = 0.0
+    se_ms: float = 0.0
+    fe_ms: float = 0.0
+    se_queries: int = 0
+    callbacks: int = 0
+    query_count: int = 0
+    sources: List[str] = field(default_factory=list)
+
+    @property
+    def fe_ratio(self) -> float:
+        return self.fe_ms / self.total_ms if self.total_ms > 0 else 0.0
+
+    @property
+    def is_fe_bound(self) -> bool:
+        return self.fe_ratio >= FE_BOUND_RATIO
+
+
+class _JsonStream:
+    """Lector JSON incremental: valores de a uno sobre un buffer acotado"""
+
+    def __init__(self, stream: TextIO, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Descartar lo ya consumido para que el buffer no crezca con el archivo
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("JSON incompleto")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"JSON inválido: se esperaba {char!r} en la posición {self.pos}")
+        self.pos += 1
+
+    def accept(self, char: str) -> bool:
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Un número al final del buffer puede estar cortado: leer más antes de aceptarlo
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def members(self) -> Iterator[Tuple[str, '_JsonStream']]:
+        """Recorre un objeto: entrega cada clave con el lector posicionado en su valor"""
+        self.expect('{')
+        if self.accept('}'):
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key, self
+            if not self.accept(','):
+                self.expect('}')
+                return
+
+    def items(self) -> Iterator:
+        """Recorre un array entregando sus elementos de a uno"""
+        self.expect('[')
+        if self.accept(']'):
+            return
+        while True:
+            yield self.value()
+            if not self.accept(','):
+                self.expect(']')
+                return
+
+
+def _number(value) -> float:
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_server_timings(stream: TextIO, query_text: str = '', source: str = '') -> ServerTiming:
+    """
+    Lee un server timings de DAX Studio en streaming
+
+    Los totales del archivo (TotalDuration, FormulaEngineDuration, ...) tienen
+    prioridad; si faltan se calculan desde los eventos del SE.
+
+    Args:
+        stream: Archivo de texto con el JSON
+        query_text: Texto de la consulta si no está en el JSON (Query.dax del .daxx)
+        source: Origen (solo informativo)
+
+    Returns:
+        ServerTiming
+
+    Raises:
+        ValueError: Si no es un JSON de server timings
+    """
+    reader = _JsonStream(stream)
+    totals: Dict = {}
+    se_ms = se_cpu_ms = 0.0
+    se_queries = se_cache_hits = callbacks = 0
+    has_events = False
+
+    try:
+        for key, value_reader in reader.members():
+            if key != SE_EVENTS_KEY or value_reader.peek() != '[':
+                totals[key] = value_reader.value()
+                continue
+
+            has_events = True
+            for event in value_reader.items():
+                if not isinstance(event, dict) or event.get('IsInternalEvent'):
+                    continue
+                # Class VertiPaqSEQueryCacheMatch, Subclass VertiPaqCacheExactMatch
+                event_class = f"{event.get('Class') or ''} {event.get('Subclass') or ''}"
+                if 'CacheMatch' in event_class or 'CacheExactMatch' in event_class:
+                    se_cache_hits += 1
+                    continue
+                text = str(event.get('Query') or event.get('TextData') or '')
+                se_queries += 1
+                se_ms += _number(event.get('Duration'))
+                se_cpu_ms += _number(event.get('CpuTime'))
+                if 'CALLBACKDATAID' in text.upper():
+                    callbacks += 1
+    except json.JSONDecodeError as e:
+        raise ValueError(f"El archivo no es un JSON válido: {e}")
+
+    if not has_events and not any(key in totals for key in ('TotalDuration', 'StorageEngineDuration',
+                                                            'FormulaEngineDuration')):
+        raise ValueError("El archivo no es un server timings de DAX Studio")
+
+    total_ms = _number(totals.get('TotalDuration'))
+    se_ms = _number(totals.get('StorageEngineDuration', se_ms))
+    fe_ms = _number(totals.get('FormulaEngineDuration', max(0.0, total_ms - se_ms)))
+
+    return ServerTiming(
+        query_text=str(totals.get('QueryText') or totals.get('Query') or query_text),
+        total_ms=total_ms or se_ms + fe_ms,
+        se_ms=se_ms,
+        fe_ms=fe_ms,
+        se_cpu_ms=_number(totals.get('StorageEngineCpu', se_cpu_ms)),
+        se_queries=int(_number(totals.get('StorageEngineQueryCount', se_queries))),
+        se_cache_hits=int(_number(totals.get('VertipaqCacheMatches', se_cache_hits))),
+        callbacks=callbacks,
+        source=source
+    )
+
+
+def _read_daxx(file: BinaryIO, name: str) -> ServerTiming:
+    try:
+        with zipfile.ZipFile(file) as archive:
+            names = {info.filename.replace('\\', '/').rsplit('/', 1)[-1].lower(): info for info in archive.infolist()}
+            if SERVER_TIMINGS_FILE.lower() not in names:
+                raise ValueError(f"{name} no contiene {SERVER_TIMINGS_FILE} (¿se guardó con Server Timings activo?)")
+
+            query_text = ''
+            if QUERY_FILE.lower() in names:
+                query_text = archive.read(names[QUERY_FILE.lower()]).decode('utf-8-sig', errors='replace')
+
+            with archive.open(names[SERVER_TIMINGS_FILE.lower()]) as raw:
+                return parse_server_timings(io.TextIOWrapper(raw, encoding='utf-8-sig'), query_text, source=name)
+    except zipfile.BadZipFile:
+        raise ValueError(f"{name} no es un .daxx válido")
+
+
+def read_server_timings(file: BinaryIO, name: str) -> ServerTiming:
+    """
+    Lee un server timings desde un archivo binario abierto (p. ej. un upload de Streamlit)
+
+    Args:
+        file: Contenido del .json o .daxx
+        name: Nombre del archivo (la extensión decide el formato)
+
+    Returns:
+        ServerTiming
+
+    Raises:
+        ValueError: Si el archivo no tiene el formato esperado
+    """
+    if name.lower().endswith('.daxx'):
+        return _read_daxx(file, name)
+    try:
+        return parse_server_timings(io.TextIOWrapper(file, encoding='utf-8-sig'), source=name)
+    except UnicodeDecodeError as e:
+        raise ValueError(f"{name} no es un JSON válido: {e}")
+
+
+def load_server_timings(path: str) -> List[ServerTiming]:
+    """
+    Carga server timings exportados desde DAX Studio
+
+    Args:
+        path: Archivo .json (Export Server Timings), .daxx (consulta guardada con
+            sus timings) o carpeta con varios de ellos
+
+    Returns:
+        Un ServerTiming por consulta
+
+    Raises:
+        ValueError: Si un archivo no tiene el formato esperado
+    """
+    if os.path.isdir(path):
+        return [
+            timing
+            for name in sorted(os.listdir(path))
+            if name.lower().endswith(('.json', '.daxx'))
+            for timing in load_server_timings(os.path.join(path, name))
+        ]
+
+    with open(path, 'rb') as f:
+        return [read_server_timings(f, path)]
+
+
+def join_server_timings_to_measures(timings: List[ServerTiming],
+                                    measures: List[Dict]) -> Dict[str, MeasureServerTiming]:
+    """
+    Suma los server timings de las consultas que usa cada medida
+
+    Args:
+        timings: Server timings (load_server_timings)
+        measures: Medidas de extract_measures_from_pbip ({'name', 'table', ...})
+
+    Returns:
+        Diccionario nombre en minúsculas -> MeasureServerTiming (solo medidas referenciadas)
+    """
+    # Solo medidas: las columnas y tablas calculadas se evalúan al actualizar, no en la consulta
+    measures_by_name = {
+        measure['name'].lower(): measure for measure in measures
+        if measure.get('object_type', 'measure') == 'measure'
+    }
+    joined: Dict[str, MeasureServerTiming] = {}
+
+    for timing in timings:
+        for key in find_measure_references(timing.query_text, measures_by_name):
+            measure_timing = joined.get(key)
+            if measure_timing is None:
+                measure = measures_by_name[key]
+                measure_timing = joined[key] = MeasureServerTiming(name=measure['name'], table=measure['table'])
+            measure_timing.total_ms += timing.total_ms
+            measure_timing.se_ms += timing.se_ms
+            measure_timing.fe_ms += timing.fe_ms
+            measure_timing.se_queries += timing.se_queries
+            measure_timing.callbacks += timing.callbacks
+            measure_timing.query_count += 1
+            if timing.source and timing.source not in measure_timing.sources:
+                measure_timing.sources.append(timing.source)
+
+    return joined
@@ -0,0 +1,496 @@
+"""
+Subexpresiones compartidas entre medidas
+Numera los árboles de todas las medidas del modelo en un mismo SubtreeIndex
+(hash-consing): una subexpresión que aparece en varias medidas tiene el mismo
+id estructural en todas, sin importar formato ni mayúsculas. Las más grandes
+se reportan como candidatas a una medida base que las demás referencian.
+
+Se ejecuta en el proceso principal sobre el resultado de
+analysis_runner.analyze_measures (los workers analizan cada expresión por
+separado). El costo es lineal en el tamaño total de los árboles del modelo;
+en el modo watch, SharedExpressionCache conserva los árboles entre ciclos y
+solo parsea las expresiones que cambiaron.
+"""
+
+import hashlib
+from typing import List, Dict, FrozenSet, Optional, Set, Tuple
+
+from .dataclass_slots import slotted_dataclass
+from .dax_analyzer import Issue
+from .dax_ast import (
+    Node,
+    Name,
+    Reference,
+    Call,
+    Unary,
+    Binary,
+    VarBlock,
+    SubtreeIndex,
+    format_dax,
+    format_inline,
+    children,
+    with_children,
+    walk
+)
+from .dax_rewriter import (
+    CONTEXT_PRESERVING_FUNCTIONS,
+    has_comments,
+    join_definition,
+    parse_expression,
+    split_definition
+)
+from .dax_suggestions import Suggestion, create_suggestion, recalculate_score
+from .rule_catalog import get_rule
+from . import instrumentation
+
+
+SHARED_EXPRESSION_RULE = 'shared-subexpression'
+
+# Funciones de tabla: su resultado no puede ser el de una medida
+TABLE_FUNCTIONS = frozenset({
+    'FILTER', 'ALL', 'ALLEXCEPT', 'ALLNOBLANKROW', 'ALLSELECTED', 'REMOVEFILTERS', 'KEEPFILTERS', 'VALUES',
+    'DISTINCT', 'SUMMARIZE', 'SUMMARIZECOLUMNS', 'ADDCOLUMNS', 'SELECTCOLUMNS', 'CROSSJOIN', 'GENERATE',
+    'GENERATEALL', 'CALCULATETABLE', 'RELATEDTABLE', 'TOPN', 'TREATAS', 'UNION', 'EXCEPT', 'INTERSECT',
+    'DATATABLE', 'GENERATESERIES', 'CALENDAR', 'CALENDARAUTO', 'DATESYTD', 'DATESQTD', 'DATESMTD',
+    'DATESBETWEEN', 'DATESINPERIOD', 'DATEADD', 'SAMEPERIODLASTYEAR', 'PARALLELPERIOD', 'PREVIOUSYEAR',
+    'PREVIOUSQUARTER', 'PREVIOUSMONTH', 'PREVIOUSDAY', 'NEXTYEAR', 'NEXTQUARTER', 'NEXTMONTH', 'NEXTDAY'
+})
+
+# Funciones sin contexto o volátiles que no vale la pena extraer
+_NOT_EXTRACTED = frozenset({'NOW', 'TODAY', 'UTCNOW', 'UTCTODAY', 'RAND', 'RANDBETWEEN', 'BLANK', 'TRUE',
+                            'FALSE', 'PI', 'DATE', 'TIME'})
+
+# Operadores cuyo resultado puede ser el de una medida base ([Ventas] - [Costos])
+_ARITHMETIC_OPERATORS = frozenset({'+', '-', '*', '/', '^', '&'})
+
+# Medidas nombradas en la descripción del issue
+_LISTED_MEASURES = 3
+
+
+@slotted_dataclass(frozen=True)
+class SharedExpression:
+    """Subexpresión que aparece en varias medidas"""
+    expression: Node
+    measures: Tuple[int, ...]  # Posiciones en analyzed_measures, en orden
+    base: Optional[int] = None  # Medida cuya expresión completa es la subexpresión
+
+
+@slotted_dataclass(frozen=True)
+class _ParsedExpression:
+    """Árbol de una expresión ya numerado en el SubtreeIndex de la caché"""
+    root: Node
+    root_id: int
+    context_ids: FrozenSet[int]  # Subárboles con hijos evaluados en el contexto de la medida
+    variables: FrozenSet[str]  # Variables que declara (minúsculas)
+
+
+def _in_measure_context(node: Node) -> bool:
+    """
+    True si los hijos se evalúan en el mismo contexto que el nodo y sin contexto de fila
+
+    A diferencia de las VAR (dax_rewriter), una medida base también se puede
+    usar como primer argumento de CALCULATE: la referencia a una medida se
+    evalúa en el contexto de filtro modificado igual que la expresión.
+    """
+    if isinstance(node, (Binary, Unary, VarBlock)):
+        return True
+    return isinstance(node, Call) and node.name in CONTEXT_PRESERVING_FUNCTIONS
+
+
+def _context_nodes(root: Node) -> List[Node]:
+    """Nodos de la expresión evaluados en el contexto de la medida (preorden)"""
+    nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        if _in_measure_context(node):
+            stack.extend(reversed(children(node)))
+        elif isinstance(node, Call) and node.name == 'CALCULATE' and node.args:
+            stack.append(node.args[0])
+    return nodes
+
+
+def _is_extractable(node: Node, has_call: bool, size: int) -> bool:
+    """
+    Subexpresiones que pueden ser una medida base: llamadas escalares con algún
+    argumento compuesto (CALCULATE(...), DIVIDE(SUM(...), ...)) y operaciones
+    aritméticas que incluyen alguna llamada
+
+    Una llamada cuyos argumentos son todos hojas (SUM(Ventas[Monto]),
+    COUNTROWS(Ventas)) no se reporta: es una agregación simple que casi todas
+    las medidas repiten y una medida base no la evita.
+    """
+    if isinstance(node, Call):
+        return (size > 1 + len(node.args)
+                and node.name not in TABLE_FUNCTIONS and node.name not in _NOT_EXTRACTED)
+    if isinstance(node, (Binary, Unary)):
+        return has_call and node.op in _ARITHMETIC_OPERATORS
+    return False
+
+
+def _expression_key(code: str) -> str:
+    """Clave de una medida: la misma que AnalysisCache.key (tipo de objeto y sha1 del texto)"""
+    return hashlib.sha1(f'measure\n{code}'.encode('utf-8')).hexdigest()
+
+
+def _expression_keys(analyzed_measures: List[Dict]) -> List[Optional[str]]:
+    """Clave de cada posición (None para columnas y tablas calculadas o expresiones vacías)"""
+    keys: List[Optional[str]] = []
+    for analyzed in analyzed_measures:
+        code = analyzed.get('expression') or ''
+        measure = analyzed.get('object_type', 'measure') == 'measure'
+        keys.append(_expression_key(code) if measure and code.strip() else None)
+    return keys
+
+
+class SharedExpressionCache:
+    """
+    Árboles y conteos de subexpresiones que se conservan entre ciclos del modo watch
+
+    Cada expresión se parsea y numera una sola vez. En cada llamada solo se
+    procesan las expresiones que aparecen o desaparecen del modelo y la
+    cantidad de medidas en las que aparece cada subárbol se actualiza con esa
+    diferencia. Si ninguna medida cambió, apply_shared_expressions repite el
+    resultado anterior sin recalcularlo.
+
+    Los ids del SubtreeIndex son estables mientras viva la caché: cuando las
+    expresiones descartadas superan a las vigentes se vacía (y la siguiente
+    llamada vuelve a parsear todo) para liberar los nodos que ya no se usan.
+
+    Args:
+        index: Índice de subárboles a reutilizar (None = uno nuevo)
+    """
+
+    def __init__(self, index: Optional[SubtreeIndex] = None):
+        self.index = index if index is not None else SubtreeIndex()
+        self.parsed = 0  # Expresiones parseadas desde que se creó o vació la caché
+        self._expressions: Dict[str, Optional[_ParsedExpression]] = {}  # None = no se pudo parsear
+        self._measure_counts: Dict[str, int] = {}  # Medidas con cada expresión
+        self._occurrences: Dict[int, int] = {}  # Medidas en las que aparece cada subárbol
+        self._keys_by_id: Dict[int, Set[str]] = {}  # Expresiones en las que aparece cada subárbol
+        self._shared: Set[int] = set()  # Subárboles que aparecen en más de una medida
+        self._variables: Dict[str, int] = {}  # Medidas que declaran cada variable
+        self._has_call: List[bool] = []  # Por id: el subárbol incluye una llamada
+        self._discarded = 0
+        # Firma de las medidas y lo que apply_shared_expressions agregó en cada posición
+        self._applied: Optional[Tuple[tuple, Dict[int, Tuple[Issue, Suggestion]]]] = None
+
+    def __len__(self) -> int:
+        return len(self._expressions)
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def find(self, analyzed_measures: List[Dict],
+             keys: Optional[List[Optional[str]]] = None) -> Tuple[List[SharedExpression], Dict[int, Node]]:
+        """
+        Actualiza la caché con las medidas actuales y devuelve sus subexpresiones compartidas
+
+        Args:
+            analyzed_measures: Resultado de analysis_runner.analyze_measures
+            keys: Claves de las expresiones (_expression_keys), si ya se calcularon
+
+        Returns:
+            Igual que find_shared_expressions
+        """
+        if keys is None:
+            keys = _expression_keys(analyzed_measures)
+        if self._discarded > len(self._measure_counts):
+            self.clear()
+
+        positions_by_key: Dict[str, List[int]] = {}
+        for position, key in enumerate(keys):
+            if key is not None:
+                positions_by_key.setdefault(key, []).append(position)
+
+        # Solo las expresiones que cambiaron de cantidad de medidas (nuevas, borradas o duplicadas)
+        parsed_before = self.parsed
+        for key in [key for key in self._measure_counts if key not in positions_by_key]:
+            self._update_count(key, None, 0)
+        for key, positions in positions_by_key.items():
+            if self._measure_counts.get(key) != len(positions):
+                self._update_count(key, analyzed_measures[positions[0]]['expression'], len(positions))
+        instrumentation.count('shared_expressions_parsed', self.parsed - parsed_before)
+
+        roots: Dict[int, Node] = {}
+        for key, positions in positions_by_key.items():
+            parsed = self._expressions[key]
+            if parsed is not None:
+                roots.update((position, parsed.root) for position in positions)
+
+        # Medidas en las que aparece cada subárbol compartido (cada medida una vez, en orden)
+        variable_names = set(self._variables)
+        uses_variable: Dict[int, bool] = {}
+        shared: Dict[int, List[int]] = {}
+        whole: Dict[int, int] = {}
+        for subtree_id in self._shared:
+            if self._uses_variable(subtree_id, variable_names, uses_variable):
+                continue
+            expression_keys = self._keys_by_id[subtree_id]
+            shared[subtree_id] = sorted(position for key in expression_keys for position in positions_by_key[key])
+            bases = [positions_by_key[key][0] for key in expression_keys
+                     if self._expressions[key].root_id == subtree_id]
+            if bases:
+                whole[subtree_id] = min(bases)
+
+        # Una subexpresión dentro de otra compartida por la misma cantidad de medidas no es
+        # maximal; se recorre de padres a hijos para propagarlo a través de los nodos que
+        # no se reportan (IF(SUM(a) - SUM(b) > 0, ...) cubre SUM(a) - SUM(b))
+        index = self.index
+        extractable: Set[int] = set()
+        dominated: Set[int] = set()
+        for subtree_id in sorted(shared, reverse=True):
+            positions = shared[subtree_id]
+            if _is_extractable(index.nodes[subtree_id], self._has_call[subtree_id], index.sizes[subtree_id]):
+                extractable.add(subtree_id)
+            elif subtree_id not in dominated:
+                continue
+            for child_id in index.children[subtree_id]:
+                if child_id in shared and len(shared[child_id]) == len(positions):
+                    dominated.add(child_id)
+
+        # El árbol de cada subexpresión se toma de la primera medida que la usa (no del primero
+        # numerado, que puede ser de un ciclo anterior): el resultado no depende de la historia
+        expressions = []
+        for subtree_id in extractable - dominated:
+            positions = shared[subtree_id]
+            node = next(node for node in _context_nodes(roots[positions[0]]) if index.id_of(node) == subtree_id)
+            expressions.append(SharedExpression(node, tuple(positions), whole.get(subtree_id)))
+        expressions.sort(key=lambda shared_expression: (-index.sizes[index.id_of(shared_expression.expression)],
+                                                        shared_expression.measures,
+                                                        format_dax(shared_expression.expression)))
+        return expressions, roots
+
+    def _parse(self, code: str) -> Optional[_ParsedExpression]:
+        self.parsed += 1
+        root = parse_expression(code)
+        if root is None:
+            return None
+        index = self.index
+        root_id = index.add(root)
+
+        # Los hijos tienen un id menor que el padre: solo se calculan los ids nuevos
+        for subtree_id in range(len(self._has_call), len(index)):
+            self._has_call.append(isinstance(index.nodes[subtree_id], Call)
+                                  or any(self._has_call[child_id] for child_id in index.children[subtree_id]))
+
+        return _ParsedExpression(
+            root=root,
+            root_id=root_id,
+            context_ids=frozenset(index.id_of(node) for node in _context_nodes(root) if children(node)),
+            variables=frozenset(name.lower() for node in walk(root) if isinstance(node, VarBlock)
+                                for name, _ in node.variables)
+        )
+
+    def _update_count(self, key: str, code: Optional[str], count: int) -> None:
+        """Cambia la cantidad de medidas con una expresión y actualiza los conteos por subárbol"""
+        if key not in self._expressions:
+            self._expressions[key] = self._parse(code)
+        parsed = self._expressions[key]
+        previous = self._measure_counts.get(key, 0)
+        delta = count - previous
+
+        if parsed is not None:
+            for subtree_id in parsed.context_ids:
+                occurrences = self._occurrences.get(subtree_id, 0) + delta
+                if occurrences:
+                    self._occurrences[subtree_id] = occurrences
+                else:
+                    del self._occurrences[subtree_id]
+                if occurrences > 1:
+                    self._shared.add(subtree_id)
+                else:
+                    self._shared.discard(subtree_id)
+                if not previous:
+                    self._keys_by_id.setdefault(subtree_id, set()).add(key)
+                elif not count:
+                    self._keys_by_id[subtree_id].discard(key)
+                    if not self._keys_by_id[subtree_id]:
+                        del self._keys_by_id[subtree_id]
+            for name in parsed.variables:
+                declared = self._variables.get(name, 0) + delta
+                if declared:
+                    self._variables[name] = declared
+                else:
+                    del self._variables[name]
+
+        if count:
+            self._measure_counts[key] = count
+        else:
+            del self._measure_counts[key]
+            del self._expressions[key]
+            self._discarded += 1
+
+    def _uses_variable(self, subtree_id: int, variable_names: Set[str], memo: Dict[int, bool]) -> bool:
+        """True si el subárbol menciona alguna variable declarada en el modelo (sin recursión)"""
+        stack = [subtree_id]
+        while stack:
+            current = stack[-1]
+            if current in memo:
+                stack.pop()
+                continue
+            child_ids = self.index.children[current]
+            pending = [child_id for child_id in child_ids if child_id not in memo]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            node = self.index.nodes[current]
+            memo[current] = ((isinstance(node, Name) and node.text.lower() in variable_names)
+                             or any(memo[child_id] for child_id in child_ids))
+        return memo[subtree_id]
+
+
+def find_shared_expressions(analyzed_measures: List[Dict],
+                            index: Optional[SubtreeIndex] = None,
+                            cache: Optional[SharedExpressionCache] = None
+                            ) -> Tuple[List[SharedExpression], Dict[int, Node]]:
+    """
+    Subexpresiones que aparecen en más de una medida
+
+    Solo se reportan las maximales: si una subexpresión compartida está dentro
+    de otra compartida por la misma cantidad de medidas, se reporta la de afuera.
+    Las subexpresiones que usan variables de la medida no se pueden extraer.
+
+    Args:
+        analyzed_measures: Resultado de analysis_runner.analyze_measures
+        index: Índice de subárboles a reutilizar (None = uno nuevo; se ignora con cache)
+        cache: Caché entre llamadas (None = se parsean todas las expresiones)
+
+    Returns:
+        Tupla (subexpresiones compartidas de la más grande a la más chica,
+        {posición: árbol} de las medidas que se pudieron parsear)
+    """
+    cache = cache if cache is not None else SharedExpressionCache(index)
+    return cache.find(analyzed_measures)
+
+
+def _replace_in_measure_context(node: Node, target_id: int, replacement: Node, index: SubtreeIndex) -> Node:
+    """Reemplaza el subárbol target_id en las posiciones que recorre _context_nodes"""
+    if index.id_of(node) == target_id:
+        return replacement
+    original = children(node)
+    if _in_measure_context(node):
+        updated = [_replace_in_measure_context(child, target_id, replacement, index) for child in original]
+    elif isinstance(node, Call) and node.name == 'CALCULATE' and original:
+        updated = [_replace_in_measure_context(original[0], target_id, replacement, index), *original[1:]]
+    else:
+        return node
+    if any(new is not old for new, old in zip(updated, original)):
+        return with_children(node, updated)
+    return node
+
+
+def _base_measure_name(node: Node, used: Set[str], suffixes: Dict[str, int]) -> str:
+    """
+    Nombre propuesto para una medida base nueva: función y primera columna
+    (Sum Monto, Divide Monto 2); suffixes guarda el último número de cada nombre
+    """
+    column = next((child for child in walk(node) if isinstance(child, Reference)), None)
+    base = node.name.title() if isinstance(node, Call) else 'Base'
+    if column is not None:
+        base = f"{base} {column.column_name}"
+    name = base
+    while name.lower() in used:
+        suffixes[base] = suffixes.get(base, 1) + 1
+        name = f"{base} {suffixes[base]}"
+    used.add(name.lower())
+    return name
+
+
+@instrumentation.timed('rules.shared_expressions')
+def apply_shared_expressions(analyzed_measures: List[Dict], cache: Optional[SharedExpressionCache] = None) -> int:
+    """
+    Agrega a las medidas las subexpresiones que comparten con otras medidas
+
+    Cada medida recibe a lo sumo un issue (su subexpresión compartida más
+    grande) y una sugerencia con la medida reescrita para usar la medida base:
+    una medida existente cuya expresión completa es la subexpresión, o una
+    nueva definida en la misma sugerencia. La medida base no recibe el issue.
+    Las listas de issues y sugerencias se copian: las medidas con la misma
+    expresión comparten las del análisis.
+
+    Args:
+        analyzed_measures: Resultado de analysis_runner.analyze_measures (se modifica)
+        cache: Caché entre ciclos del modo watch (None = se parsean todas las expresiones)
+
+    Returns:
+        Cantidad de medidas con alguna subexpresión compartida
+    """
+    cache = cache if cache is not None else SharedExpressionCache()
+    keys = _expression_keys(analyzed_measures)
+    # Los nombres entran en la firma: se usan en las medidas base propuestas y en la descripción
+    signature = (tuple(keys), tuple(str(analyzed.get('name', '')) for analyzed in analyzed_measures))
+    if cache._applied is None or cache._applied[0] != signature:
+        cache._applied = (signature, _shared_expression_findings(analyzed_measures, cache, keys))
+
+    findings = cache._applied[1]
+    for position, (issue, suggestion) in findings.items():
+        analyzed = analyzed_measures[position]
+        analyzed['issues'] = [*analyzed['issues'], issue]
+        analyzed['suggestions'] = [*analyzed['suggestions'], suggestion]
+        analyzed['base_score'] = recalculate_score(analyzed)
+
+    instrumentation.count('shared_expressions', len(findings))
+    return len(findings)
+
+
+def _shared_expression_findings(analyzed_measures: List[Dict], cache: SharedExpressionCache,
+                                keys: List[Optional[str]]) -> Dict[int, Tuple[Issue, Suggestion]]:
+    """Issue y sugerencia de cada posición con una subexpresión compartida"""
+    expressions, roots = cache.find(analyzed_measures, keys)
+    index = cache.index  # Después de find: si la caché se vació, el índice es otro
+    used_names = {str(analyzed.get('name', '')).lower() for analyzed in analyzed_measures}
+
+    # La subexpresión compartida más grande de cada medida (expressions está ordenada por tamaño)
+    largest: Dict[int, SharedExpression] = {}
+    for shared_expression in expressions:
+        for position in shared_expression.measures:
+            if position != shared_expression.base:
+                largest.setdefault(position, shared_expression)
+
+    findings: Dict[int, Tuple[Issue, Suggestion]] = {}
+    new_bases: Dict[int, str] = {}
+    suffixes: Dict[str, int] = {}
+    for position, shared_expression in sorted(largest.items()):
+        analyzed = analyzed_measures[position]
+        expression_id = index.id_of(shared_expression.expression)
+        if shared_expression.base is not None:
+            base = analyzed_measures[shared_expression.base]['name']
+            definition = ''
+        else:
+            if expression_id not in new_bases:
+                new_bases[expression_id] = _base_measure_name(shared_expression.expression, used_names, suffixes)
+            base = new_bases[expression_id]
+            definition = f"{base} = {format_dax(shared_expression.expression)}\n\n"
+
+        # Solo se leen los primeros nombres: una expresión puede estar en miles de medidas
+        others = []
+        for other in shared_expression.measures:
+            if other != position:
+                others.append(analyzed_measures[other]['name'])
+                if len(others) > _LISTED_MEASURES:
+                    break
+        listed = ', '.join(f"[{name}]" for name in others[:_LISTED_MEASURES])
+        if len(others) > _LISTED_MEASURES:
+            listed += ', …'
+
+        issue = Issue(SHARED_EXPRESSION_RULE, params=(
+            ('expression', format_inline(shared_expression.expression)),
+            ('count', len(shared_expression.measures) - 1),
+            ('measures', listed),
+            ('base', base)
+        ))
+        rewritten = _replace_in_measure_context(roots[position], expression_id,
+                                                Reference('', f"[{base.replace(']', ']]')}]"), index)
+        header = split_definition(analyzed['expression'])[0]
+        params = (('original', analyzed['expression'].strip()),
+                  ('rewritten', definition + join_definition(header, format_dax(rewritten))))
+        if has_comments(analyzed['expression']):
+            # El issue no tiene otra sugerencia: la reescritura se mantiene, marcada
+            params += (('comments_removed', True),)
+
+        findings[position] = (issue, create_suggestion(get_rule(SHARED_EXPRESSION_RULE).suggestion, params))
+
+    return findings
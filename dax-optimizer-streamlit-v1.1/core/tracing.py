@@ -0,0 +1,328 @@
+"""
+Trazas del pipeline de análisis (compatible con OpenTelemetry)
+Spans de resolve, extract, analyze (por chunk), rank y export exportados a un
+archivo OTLP-JSON local o a memoria, sin necesidad de un collector
+
+Sin trazas activas (enable_tracing / trace_to), span() y traced() no hacen nada.
+"""
+
+import os
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Optional, Iterator
+
+from .rule_catalog import CATALOG_VERSION
+
+
+SERVICE_NAME = 'dax-optimizer'
+SCOPE_NAME = 'dax_optimizer.core'
+
+# Variable de entorno para activar trazas a archivo (jobs programados, app)
+TRACE_FILE_ENV = 'DAX_OPTIMIZER_TRACE_FILE'
+
+# Códigos de estado OTLP
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# SPAN_KIND_INTERNAL
+_SPAN_KIND_INTERNAL = 1
+
+_tracer: Optional['Tracer'] = None
+_current_span: 'ContextVar[Optional[Span]]' = ContextVar('dax_optimizer_current_span', default=None)
+
+
+class Span:
+    """Span en curso o finalizado"""
+
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_span_id', 'start_ns', 'end_ns',
+                 'attributes', 'status_code', 'status_message')
+
+    def __init__(self, tracer: 'Tracer', name: str, parent: Optional['Span'], attributes: Optional[Dict]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, object] = dict(attributes) if attributes else {}
+        self.status_code = STATUS_UNSET
+        self.status_message = ''
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict) -> None:
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException) -> None:
+        self.status_code = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.status_code == STATUS_UNSET:
+            self.status_code = STATUS_OK
+        self.tracer.on_end(self)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict:
+        """Representación OTLP/JSON del span"""
+        data = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': _SPAN_KIND_INTERNAL,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns if self.end_ns is not None else self.start_ns),
+            'attributes': [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            'status': {'code': self.status_code}
+        }
+        if self.parent_span_id:
+            data['parentSpanId'] = self.parent_span_id
+        if self.status_message:
+            data['status']['message'] = self.status_message
+        return data
+
+
+class _NullSpan:
+    """Span vacío cuando las trazas están desactivadas"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+def _otlp_attribute(key: str, value) -> Dict:
+    """Atributo en formato OTLP/JSON (AnyValue)"""
+    if isinstance(value, bool):
+        any_value = {'boolValue': value}
+    elif isinstance(value, int):
+        any_value = {'intValue': str(value)}
+    elif isinstance(value, float):
+        any_value = {'doubleValue': value}
+    else:
+        any_value = {'stringValue': str(value)}
+    return {'key': key, 'value': any_value}
+
+
+class InMemorySpanExporter:
+    """Guarda los spans finalizados en memoria (tests, app, inspección)"""
+
+    def __init__(self):
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def flush(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+    def get_finished_spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class OTLPJsonFileExporter:
+    """
+    Escribe los spans en un archivo OTLP/JSON (una línea por traza)
+
+    Cada línea es un ExportTraceServiceRequest, el mismo formato que el file
+    exporter del OpenTelemetry Collector, por lo que puede importarse luego en
+    cualquier backend compatible.
+    """
+
+    def __init__(self, path: str, service_name: str = SERVICE_NAME, resource_attributes: Optional[Dict] = None):
+        self.path = path
+        self.service_name = service_name
+        self.resource_attributes = dict(resource_attributes or {})
+        self._pending: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._pending.append(span)
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self._pending = self._pending, []
+        if not spans:
+            return
+
+        request = build_otlp_request(spans, self.service_name, self.resource_attributes)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(request, ensure_ascii=False) + '\n')
+
+    def shutdown(self) -> None:
+        self.flush()
+
+
+def build_otlp_request(spans: List[Span], service_name: str = SERVICE_NAME,
+                       resource_attributes: Optional[Dict] = None) -> Dict:
+    """Arma un ExportTraceServiceRequest OTLP/JSON con los spans dados"""
+    attributes = {
+        'service.name': service_name,
+        'process.pid': os.getpid(),
+        'dax.catalog_version': CATALOG_VERSION
+    }
+    attributes.update(resource_attributes or {})
+
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attribute(k, v) for k, v in attributes.items()]},
+            'scopeSpans': [{
+                'scope': {'name': SCOPE_NAME},
+                'spans': [span.to_otlp() for span in spans]
+            }]
+        }]
+    }
+
+
+class Tracer:
+    """Crea spans y los entrega al exporter al finalizar"""
+
+    def __init__(self, exporter):
+        self.exporter = exporter
+
+    def start_span(self, name: str, attributes: Optional[Dict] = None,
+                   parent: Optional[Span] = None) -> Span:
+        """Inicia un span sin activarlo como span actual (hay que llamar a end())"""
+        return Span(self, name, parent if parent is not None else _current_span.get(), attributes)
+
+    def on_end(self, span: Span) -> None:
+        self.exporter.export(span)
+        # Al cerrar la raíz se escribe la traza completa
+        if span.parent_span_id is None:
+            self.exporter.flush()
+
+
+def enable_tracing(exporter) -> Tracer:
+    """Activa las trazas con el exporter indicado (InMemorySpanExporter u OTLPJsonFileExporter)"""
+    global _tracer
+    _tracer = Tracer(exporter)
+    return _tracer
+
+
+def disable_tracing() -> None:
+    """Desactiva las trazas y vacía el exporter"""
+    global _tracer
+    if _tracer is not None:
+        _tracer.exporter.shutdown()
+    _tracer = None
+
+
+def configure_tracing_from_env() -> Optional[Tracer]:
+    """Activa trazas a archivo si está definida DAX_OPTIMIZER_TRACE_FILE"""
+    path = os.environ.get(TRACE_FILE_ENV)
+    if not path:
+        return None
+    if _tracer is not None and getattr(_tracer.exporter, 'path', None) == path:
+        return _tracer
+    return enable_tracing(OTLPJsonFileExporter(path))
+
+
+@contextmanager
+def trace_to(exporter) -> Iterator[Tracer]:
+    """Activa las trazas dentro del bloque"""
+    global _tracer
+    previous = _tracer
+    tracer = Tracer(exporter)
+    _tracer = tracer
+    try:
+        yield tracer
+    finally:
+        exporter.shutdown()
+        _tracer = previous
+
+
+def is_tracing() -> bool:
+    return _tracer is not None
+
+
+def start_span(name: str, attributes: Optional[Dict] = None):
+    """Inicia un span hijo del actual sin activarlo (NULL_SPAN si no hay trazas)"""
+    if _tracer is None:
+        return NULL_SPAN
+    return _tracer.start_span(name, attributes)
+
+
+@contextmanager
+def _active_span(name: str, attributes: Optional[Dict]) -> Iterator[Span]:
+    span_obj = _tracer.start_span(name, attributes)
+    token = _current_span.set(span_obj)
+    try:
+        yield span_obj
+    except BaseException as e:
+        span_obj.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span_obj.end()
+
+
+def span(name: str, attributes: Optional[Dict] = None):
+    """Context manager que crea un span hijo del actual (no-op si no hay trazas)"""
+    if _tracer is None:
+        return NULL_SPAN
+    return _active_span(name, attributes)
+
+
+def current_span():
+    """Span actual (NULL_SPAN si no hay trazas o ningún span activo)"""
+    if _tracer is None:
+        return NULL_SPAN
+    return _current_span.get() or NULL_SPAN
+
+
+def traced(name: str):
+    """Decorador: cada llamada de la función se registra como un span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _active_span(name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
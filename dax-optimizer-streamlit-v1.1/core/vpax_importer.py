@@ -0,0 +1,165 @@
+"""
+Importador de estadísticas VertiPaq (.vpax)
+Un .vpax de VertiPaq Analyzer / DAX Studio es un ZIP con DaxVpaView.json:
+filas por tabla y cardinalidad y tamaño por columna. Se cargan en un lookup
+compacto (Tabla y Tabla[Columna], sin distinguir mayúsculas) para que el
+análisis estime cuántas filas recorre cada patrón costoso.
+"""
+
+import io
+import json
+import zipfile
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Union, BinaryIO
+
+from .dataclass_slots import slotted_dataclass
+
+
+VPA_VIEW_FILE = 'DaxVpaView.json'
+
+
+@slotted_dataclass(frozen=True)
+class TableStatistics:
+    """Estadísticas de una tabla del modelo"""
+    name: str
+    rows: int
+    size: int = 0  # Bytes (datos + diccionarios + jerarquías)
+
+
+@slotted_dataclass(frozen=True)
+class ColumnStatistics:
+    """Estadísticas de una columna del modelo"""
+    table: str
+    column: str
+    cardinality: int
+    size: int = 0
+
+
+@dataclass
+class ModelStatistics:
+    """Lookup de filas y cardinalidades (claves en minúsculas: 'tabla' y 'tabla[columna]')"""
+    tables: Dict[str, TableStatistics] = field(default_factory=dict)
+    columns: Dict[str, ColumnStatistics] = field(default_factory=dict)
+    source: str = ''
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def table(self, name: str) -> Optional[TableStatistics]:
+        return self.tables.get(name.lower())
+
+    def table_rows(self, name: str) -> Optional[int]:
+        """Filas de la tabla, o None si no está en las estadísticas"""
+        table = self.tables.get(name.lower())
+        return table.rows if table is not None else None
+
+    def column(self, table: str, column: str) -> Optional[ColumnStatistics]:
+        return self.columns.get(f"{table}[{column}]".lower())
+
+    def column_cardinality(self, table: str, column: str) -> Optional[int]:
+        """Valores distintos de Tabla[Columna], o None si no está en las estadísticas"""
+        stats = self.columns.get(f"{table}[{column}]".lower())
+        return stats.cardinality if stats is not None else None
+
+    @property
+    def max_rows(self) -> int:
+        return max((table.rows for table in self.tables.values()), default=0)
+
+
+def _value(record: Dict, *names: str, default=None):
+    """Primer campo presente entre varios nombres posibles (versiones de VertiPaq Analyzer)"""
+    for name in names:
+        if name in record and record[name] is not None:
+            return record[name]
+    return default
+
+
+def _int(value) -> int:
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_vpa_view(data: Dict, source: str = '') -> ModelStatistics:
+    """
+    Convierte el contenido de DaxVpaView.json en ModelStatistics
+
+    Args:
+        data: JSON de DaxVpaView (claves 'Tables' y 'Columns')
+        source: Origen (solo informativo)
+
+    Returns:
+        ModelStatistics
+
+    Raises:
+        ValueError: Si el JSON no tiene el formato esperado
+    """
+    if not isinstance(data, dict) or not isinstance(_value(data, 'Tables', 'tables'), list):
+        raise ValueError(f"{VPA_VIEW_FILE} no tiene la lista de tablas ('Tables')")
+
+    statistics = ModelStatistics(source=source)
+
+    for record in _value(data, 'Tables', 'tables'):
+        if not isinstance(record, dict):
+            continue
+        name = _value(record, 'TableName', 'Name')
+        if not name:
+            continue
+        statistics.tables[name.lower()] = TableStatistics(
+            name=name,
+            rows=_int(_value(record, 'RowsCount', 'RowCount', 'Rows')),
+            size=_int(_value(record, 'TableSize', 'TotalSize', 'ColumnsTotalSize'))
+        )
+
+    for record in _value(data, 'Columns', 'columns', default=[]):
+        if not isinstance(record, dict) or _value(record, 'IsRowNumber', default=False):
+            continue
+        table = _value(record, 'TableName')
+        column = _value(record, 'ColumnName', 'Name')
+        if not table or not column:
+            continue
+        statistics.columns[f"{table}[{column}]".lower()] = ColumnStatistics(
+            table=table,
+            column=column,
+            cardinality=_int(_value(record, 'ColumnCardinality', 'Cardinality')),
+            size=_int(_value(record, 'TotalSize', 'DataSize'))
+        )
+
+    return statistics
+
+
+def load_vpax(source: Union[str, BinaryIO]) -> ModelStatistics:
+    """
+    Carga las estadísticas de un archivo .vpax
+
+    Args:
+        source: Ruta al .vpax o archivo binario abierto (p. ej. un upload de Streamlit)
+
+    Returns:
+        ModelStatistics
+
+    Raises:
+        ValueError: Si no es un ZIP válido o no contiene DaxVpaView.json
+    """
+    name = source if isinstance(source, str) else getattr(source, 'name', '.vpax')
+
+    try:
+        with zipfile.ZipFile(source) as archive:
+            member = next(
+                (info for info in archive.infolist()
+                 if info.filename.replace('\\', '/').rsplit('/', 1)[-1].lower() == VPA_VIEW_FILE.lower()),
+                None
+            )
+            if member is None:
+                raise ValueError(f"El archivo no contiene {VPA_VIEW_FILE} (¿es un .vpax?)")
+
+            # Se decodifica directamente desde el ZIP, sin extraerlo a disco
+            with archive.open(member) as raw:
+                data = json.load(io.TextIOWrapper(raw, encoding='utf-8-sig'))
+    except zipfile.BadZipFile:
+        raise ValueError("El archivo .vpax no es un ZIP válido")
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"{VPA_VIEW_FILE} no es un JSON válido: {e}")
+
+    return parse_vpa_view(data, source=str(name))
@@ -4,55 +4,67 @@ Análisis completo de archivos PBIP con ranking de medidas
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
+from importlib.util import find_spec
 from pathlib import Path
 import sys
 import os
+import io
 import time
+from typing import TYPE_CHECKING
+
+# plotly, streamlit_extras, streamlit_lottie y requests se importan al primer uso
+# para que el arranque de la app no pague por componentes que quizás no se muestran
 
 # Streamlit extras para componentes visuales mejorados (OPCIONAL)
-try:
-    from streamlit_extras.metric_cards import style_metric_cards
-    from streamlit_extras.colored_header import colored_header
-    STREAMLIT_EXTRAS_AVAILABLE = True
-except ImportError:
-    STREAMLIT_EXTRAS_AVAILABLE = False
-    # Fallback: crear funciones dummy
-    def style_metric_cards(*args, **kwargs):
-        pass
-    def colored_header(label, description="", color_name="blue-70"):
-        st.markdown(f'<h1 class="main-header">{label}</h1>', unsafe_allow_html=True)
-        if description:
-            st.markdown(f'<p class="sub-header">{description}</p>', unsafe_allow_html=True)
+STREAMLIT_EXTRAS_AVAILABLE = find_spec("streamlit_extras") is not None
+
+
+def style_metric_cards(*args, **kwargs):
+    if not STREAMLIT_EXTRAS_AVAILABLE:
+        return
+    try:
+        from streamlit_extras.metric_cards import style_metric_cards as extras_style_metric_cards
+    except ImportError:
+        return
+    extras_style_metric_cards(*args, **kwargs)
+
+
+def colored_header(label, description="", color_name="blue-70"):
+    if STREAMLIT_EXTRAS_AVAILABLE:
+        try:
+            from streamlit_extras.colored_header import colored_header as extras_colored_header
+            extras_colored_header(label=label, description=description, color_name=color_name)
+            return
+        except ImportError:
+            pass
+    # Fallback sin streamlit_extras
+    st.markdown(f'<h1 class="main-header">{label}</h1>', unsafe_allow_html=True)
+    if description:
+        st.markdown(f'<p class="sub-header">{description}</p>', unsafe_allow_html=True)
+
 
 # Streamlit Lottie para animaciones profesionales (OPCIONAL)
-try:
-    from streamlit_lottie import st_lottie
-    import requests
-    LOTTIE_AVAILABLE = True
-except ImportError:
-    LOTTIE_AVAILABLE = False
+LOTTIE_AVAILABLE = find_spec("streamlit_lottie") is not None and find_spec("requests") is not None
 
 # Agregar path del core module
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Solo lo que usa la página antes de analizar: el pipeline, los importadores
+# (.vpax, Performance Analyzer, DAX Studio, reporte), el modo watch y las
+# trazas se importan en las funciones que los usan (core los carga al primer acceso)
 from core import (
-    extract_measures_from_pbip,
-    validate_pbip_file,
-    get_pbip_info,
-    parse_dax_code,
-    analyze_dax,
-    generate_suggestions,
-    calculate_score,
-    rank_measures,
     get_summary_stats,
     filter_measures_by_priority,
     get_top_issues,
-    get_priority_color
+    get_priority_color,
+    export_measures_to_csv,
+    export_measures_to_html,
+    DEFAULT_MEASURE_TIMEOUT
 )
 
+if TYPE_CHECKING:
+    from core import ModelWatcher
+
 
 # Configuración de página con ícono personalizado
 icon_path = Path(__file__).parent / "assets" / "dax_optimization.ico"
@@ -481,6 +493,7 @@ def load_lottie_url(url: str):
     if not LOTTIE_AVAILABLE:
         return None
     try:
+        import requests
         r = requests.get(url, timeout=5)
         if r.status_code != 200:
             return None
@@ -492,6 +505,7 @@ def load_lottie_url(url: str):
 def show_lottie_animation(lottie_json, height=200, key="lottie"):
     """Muestra una animación Lottie si está disponible"""
     if LOTTIE_AVAILABLE and lottie_json is not None:
+        from streamlit_lottie import st_lottie
         st_lottie(lottie_json, height=height, key=key)
 
 
@@ -607,83 +621,111 @@ def render_file_upload():
     return pbip_folder_path, uploaded_file
 
 
-def export_measures_to_csv(ranked_measures):
-    """Exporta las medidas analizadas a un archivo CSV"""
-    data = []
-    for measure in ranked_measures:
-        row = {
-            'Nombre': measure.name,
-            'Tabla': measure.table,
-            'Score de Riesgo': measure.impact_score,
-            'Prioridad': measure.priority_label,
-            'Complejidad': measure.complexity,
-            'Issues Críticos': measure.critical_issues,
-            'Warnings': measure.warnings,
-            'Total Issues': measure.critical_issues + measure.warnings,
-            'Funciones': measure.metrics.function_count if measure.metrics else 0,
-            'Variables': measure.metrics.variables_used if measure.metrics else 0,
-            'Iteradores Anidados': measure.metrics.nested_iterators if measure.metrics else 0,
-            'Transiciones de Contexto': measure.metrics.context_transitions if measure.metrics else 0,
-            'Impacto Estimado': measure.metrics.estimated_impact if measure.metrics else 'N/A',
-            'Expresión DAX': measure.expression
-        }
-        data.append(row)
-
-    df = pd.DataFrame(data)
-    return df.to_csv(index=False).encode('utf-8')
-
-
-def export_measures_to_html(ranked_measures):
-    """Exporta las medidas analizadas a un archivo HTML con formato"""
-    data = []
-    for measure in ranked_measures:
-        row = {
-            'Nombre': measure.name,
-            'Tabla': measure.table,
-            'Score de Riesgo': measure.impact_score,
-            'Prioridad': measure.priority_label,
-            'Complejidad': measure.complexity,
-            'Issues Críticos': measure.critical_issues,
-            'Warnings': measure.warnings,
-            'Total Issues': measure.critical_issues + measure.warnings,
-            'Funciones': measure.metrics.function_count if measure.metrics else 0,
-            'Variables': measure.metrics.variables_used if measure.metrics else 0,
-            'Iteradores Anidados': measure.metrics.nested_iterators if measure.metrics else 0,
-            'Transiciones de Contexto': measure.metrics.context_transitions if measure.metrics else 0,
-            'Impacto Estimado': measure.metrics.estimated_impact if measure.metrics else 'N/A'
-        }
-        data.append(row)
-
-    df = pd.DataFrame(data)
-
-    # Crear HTML con estilos
-    html = df.to_html(index=False, escape=False, classes='table table-striped')
-
-    # Agregar estilos CSS
-    styled_html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Análisis DAX - Reporte</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 20px; background: #f8f9fa; }}
-            h1 {{ color: #0066cc; }}
-            .table {{ width: 100%; border-collapse: collapse; background: white; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
-            .table th {{ background: #0066cc; color: white; padding: 12px; text-align: left; }}
-            .table td {{ padding: 10px; border-bottom: 1px solid #dee2e6; }}
-            .table tr:hover {{ background: #f1f3f5; }}
-        </style>
-    </head>
-    <body>
-        <h1>⚡ DAX Optimizer - Análisis de Medidas</h1>
-        <p>Fecha: {time.strftime('%Y-%m-%d %H:%M:%S')}</p>
-        {html}
-    </body>
-    </html>
+def render_vpax_upload():
+    """
+    Carga opcional de estadísticas VertiPaq (.vpax de DAX Studio / VertiPaq Analyzer)
+
+    Returns:
+        ModelStatistics o None si no se subió un archivo válido
+    """
+    with st.expander("📐 Estadísticas VertiPaq (opcional)", expanded=False):
+        st.markdown(
+            "Sube el `.vpax` exportado desde DAX Studio (**Advanced → Export Metrics**) para "
+            "ponderar el riesgo según las filas y cardinalidades reales del modelo."
+        )
+        uploaded_vpax = st.file_uploader("Archivo .vpax", type=['vpax'])
+
+    if uploaded_vpax is None:
+        st.session_state.pop('vpax_statistics', None)
+        return None
+
+    # Se parsea una sola vez por archivo subido (los reruns reutilizan el resultado)
+    key = (uploaded_vpax.name, uploaded_vpax.size)
+    cached = st.session_state.get('vpax_statistics')
+    if cached is None or cached[0] != key:
+        from core import load_vpax
+        try:
+            statistics = load_vpax(io.BytesIO(uploaded_vpax.getvalue()))
+        except ValueError as e:
+            st.error(f"⚠️ {e}")
+            return None
+        cached = st.session_state['vpax_statistics'] = (key, statistics)
+
+    statistics = cached[1]
+    st.caption(f"📐 {len(statistics)} tablas y {len(statistics.columns)} columnas cargadas de `{uploaded_vpax.name}`")
+    return statistics
+
+
+def render_performance_trace_upload():
+    """
+    Carga opcional de una sesión del Performance Analyzer de Power BI Desktop
+
+    Returns:
+        PerformanceTrace o None si no se subió un archivo válido
+    """
+    with st.expander("⏱️ Tiempos observados (opcional)", expanded=False):
+        st.markdown(
+            "Sube el `.json` exportado desde el **Performance Analyzer** de Power BI Desktop "
+            "(**Exportar**) para ordenar las medidas por el tiempo que realmente consumen."
+        )
+        uploaded_trace = st.file_uploader("Sesión del Performance Analyzer", type=['json'])
+
+    if uploaded_trace is None:
+        st.session_state.pop('performance_trace', None)
+        return None
+
+    key = (uploaded_trace.name, uploaded_trace.size)
+    cached = st.session_state.get('performance_trace')
+    if cached is None or cached[0] != key:
+        from core import load_performance_trace
+        try:
+            trace = load_performance_trace(io.BytesIO(uploaded_trace.getvalue()))
+        except ValueError as e:
+            st.error(f"⚠️ {e}")
+            return None
+        cached = st.session_state['performance_trace'] = (key, trace)
+
+    trace = cached[1]
+    st.caption(f"⏱️ {len(trace)} consultas ({trace.total_dax_ms:,.0f} ms de DAX) cargadas de `{uploaded_trace.name}`")
+    return trace
+
+
+def render_server_timings_upload():
     """
+    Carga opcional de server timings de DAX Studio (desglose storage engine / formula engine)
 
-    return styled_html.encode('utf-8')
+    Returns:
+        Lista de ServerTiming o None si no se subieron archivos válidos
+    """
+    with st.expander("🧮 Server timings de DAX Studio (opcional)", expanded=False):
+        st.markdown(
+            "Sube los server timings exportados desde DAX Studio (`.json`) o las consultas guardadas con "
+            "sus timings (`.daxx`) para ver qué medidas generan planes dominados por el formula engine."
+        )
+        uploaded_files = st.file_uploader("Server timings", type=['json', 'daxx'], accept_multiple_files=True)
+
+    if not uploaded_files:
+        st.session_state.pop('server_timings', None)
+        return None
+
+    key = tuple((uploaded.name, uploaded.size) for uploaded in uploaded_files)
+    cached = st.session_state.get('server_timings')
+    if cached is None or cached[0] != key:
+        from core import read_server_timings
+        timings = []
+        for uploaded in uploaded_files:
+            try:
+                timings.append(read_server_timings(io.BytesIO(uploaded.getvalue()), uploaded.name))
+            except ValueError as e:
+                st.error(f"⚠️ {e}")
+        cached = st.session_state['server_timings'] = (key, timings)
+
+    timings = cached[1]
+    if not timings:
+        return None
+    fe_bound = sum(1 for timing in timings if timing.is_fe_bound)
+    st.caption(f"🧮 {len(timings)} consulta(s) cargada(s), {fe_bound} dominada(s) por el formula engine")
+    return timings
 
 
 def render_summary_stats(stats: dict, tolerance: int = 50):
@@ -735,6 +777,8 @@ def render_summary_stats(stats: dict, tolerance: int = 50):
 
 def render_tolerance_gauge(avg_score: float, tolerance: int):
     """Renderiza un gauge mostrando el score promedio vs tolerancia"""
+    import plotly.graph_objects as go
+
     # Determinar color según si está dentro o fuera de tolerancia
     if avg_score <= tolerance * 0.5:
         gauge_color = "#2ed573"  # Verde
@@ -780,6 +824,8 @@ def render_tolerance_gauge(avg_score: float, tolerance: int):
 
 def render_top_risky_measures_with_influence(ranked_measures, tolerance: int, top_n=10):
     """Renderiza gráfico de top medidas mostrando su influencia en el score total"""
+    import plotly.graph_objects as go
+
     # Tomar las top N medidas con mayor riesgo
     top_measures = ranked_measures[:top_n]
 
@@ -881,12 +927,22 @@ def render_top_issues(ranked_measures):
                 st.write(f"... y {len(issue['measures']) - 5} más")
 
 
+# Opciones del filtro por tipo de objeto
+OBJECT_TYPE_FILTERS = {
+    "Medidas": 'measure',
+    "Columnas calculadas": 'calculated-column',
+    "Tablas calculadas": 'calculated-table',
+    "Columnas del modelo": 'column',
+    "Relaciones": 'relationship'
+}
+
+
 def render_measures_table(ranked_measures):
     """Renderiza tabla de medidas con ranking"""
     st.markdown("### 📋 Ranking de medidas")
 
     # Filtros
-    col1, col2, col3 = st.columns([2, 2, 3])
+    col1, col_type, col2, col3 = st.columns([2, 2, 2, 3])
 
     with col1:
         priority_filter = st.selectbox(
@@ -894,10 +950,17 @@ def render_measures_table(ranked_measures):
             ["Todas", "Crítico", "Alto", "Medio", "Bajo"]
         )
 
+    with col_type:
+        type_filter = st.selectbox(
+            "Tipo de objeto",
+            ["Todos", *OBJECT_TYPE_FILTERS]
+        )
+
     with col2:
         sort_by = st.selectbox(
             "Ordenar por",
-            ["Riesgo (mayor primero)", "Riesgo (menor primero)", "Nombre", "Complejidad"]
+            ["Riesgo (mayor primero)", "Riesgo (menor primero)", "Tiempo observado", "Formula engine",
+             "Uso en el reporte", "Nombre", "Complejidad"]
         )
 
     with col3:
@@ -906,6 +969,10 @@ def render_measures_table(ranked_measures):
     # Aplicar filtros
     filtered_measures = filter_measures_by_priority(ranked_measures, priority_filter)
 
+    object_type = OBJECT_TYPE_FILTERS.get(type_filter)
+    if object_type is not None:
+        filtered_measures = [m for m in filtered_measures if m.object_type == object_type]
+
     if search:
         filtered_measures = [
             m for m in filtered_measures
@@ -915,6 +982,12 @@ def render_measures_table(ranked_measures):
     # Aplicar ordenamiento
     if sort_by == "Riesgo (menor primero)":
         filtered_measures.sort(key=lambda m: m.impact_score)
+    elif sort_by == "Tiempo observado":
+        filtered_measures.sort(key=lambda m: (-(m.observed_ms or 0), -m.impact_score))
+    elif sort_by == "Formula engine":
+        filtered_measures.sort(key=lambda m: -(m.server_timings.fe_ms if m.server_timings is not None else 0))
+    elif sort_by == "Uso en el reporte":
+        filtered_measures.sort(key=lambda m: (-(m.usage.exposure if m.usage is not None else 0), -m.impact_score))
     elif sort_by == "Nombre":
         filtered_measures.sort(key=lambda m: m.name)
     elif sort_by == "Complejidad":
@@ -962,6 +1035,19 @@ def render_measure_row(measure, index):
             📊 Tabla: <strong>{measure.table}</strong>
         </div>
         """, unsafe_allow_html=True)
+        if measure.object_type == 'calculated-column':
+            st.caption("🧮 Columna calculada: se evalúa fila por fila en cada actualización del modelo")
+        elif measure.object_type == 'calculated-table':
+            st.caption("🧮 Tabla calculada: se materializa completa en cada actualización del modelo")
+        if measure.usage_weight is not None:
+            if measure.reachable is False:
+                st.caption("💀 Medida muerta: ningún visual la usa ni directa ni indirectamente")
+            elif measure.usage is None:
+                st.caption("🖼️ Ningún visual del reporte la usa directamente (sí a través de otras medidas)")
+            else:
+                landing = " · página inicial" if measure.usage.on_landing_page else ""
+                st.caption(f"🖼️ {measure.usage.visual_count} visual(es) en {len(measure.usage.pages)} "
+                           f"página(s){landing} · peso ×{measure.usage_weight:.1f}")
 
     with col2:
         # Badge de prioridad grande y claro
@@ -1055,6 +1141,37 @@ def render_measure_detail(measure):
                 st.metric("Iteradores anidados", measure.metrics.nested_iterators)
                 st.metric("Transiciones de contexto", measure.metrics.context_transitions)
                 st.metric("Impacto estimado", measure.metrics.estimated_impact.upper())
+
+            if measure.observed_ms is not None:
+                col3, col4 = st.columns(2)
+                with col3:
+                    st.metric("Tiempo DAX observado", f"{measure.observed_ms:,.0f} ms",
+                              help=f"Suma de {measure.observed_queries} consulta(s) del Performance Analyzer que la usan")
+                with col4:
+                    st.metric("Tiempo de visuales", f"{measure.observed_visual_ms:,.0f} ms",
+                              help="Duración total (consulta + render) de los visuales que la usan")
+
+            if measure.server_timings is not None:
+                timings = measure.server_timings
+                st.markdown("##### Server timings (DAX Studio)")
+                col5, col6, col7, col8 = st.columns(4)
+                with col5:
+                    st.metric("Formula engine", f"{timings.fe_ms:,.0f} ms", f"{timings.fe_ratio:.0%} del total",
+                              delta_color="off")
+                with col6:
+                    st.metric("Storage engine", f"{timings.se_ms:,.0f} ms")
+                with col7:
+                    st.metric("Consultas SE", timings.se_queries)
+                with col8:
+                    st.metric("Callbacks", timings.callbacks,
+                              help="Consultas al storage engine con CallbackDataID (el SE llama al FE fila a fila)")
+                if timings.is_fe_bound:
+                    st.warning("⚠️ Plan dominado por el formula engine: revisa iteradores, IF/SWITCH dentro de "
+                               "iteradores y callbacks (CallbackDataID)")
+
+            if measure.estimated_rows is not None:
+                st.metric("Filas recorridas (VertiPaq)", f"{measure.estimated_rows:,}",
+                          help="Estimación del patrón más costoso según las estadísticas del .vpax")
         else:
             st.warning("⚠️ No se pudieron calcular las métricas de performance para esta medida debido a un error en el análisis.")
 
@@ -1103,15 +1220,74 @@ def render_suggestion_card(suggestion):
             st.code(suggestion.original_code, language='dax')
 
         with col2:
-            st.markdown("**✅ Código sugerido:**")
+            st.markdown("**✅ Código optimizado:**" if suggestion.is_rewrite else "**✅ Código sugerido:**")
             st.code(suggestion.suggested_code, language='dax')
+            if suggestion.comments_removed:
+                st.caption("La reescritura no incluye los comentarios del código actual")
 
         st.info(f"**Por qué:** {suggestion.reason}")
         st.markdown("---")
 
 
-def analyze_pbip_file(file_path: str):
+def render_debug_panel(report: dict):
+    """Panel de instrumentación: tiempos por etapa, contadores y perfil"""
+    import plotly.express as px
+
+    with st.expander("🛠️ Debug: instrumentación del análisis", expanded=True):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Tiempo total", f"{report['wall_seconds']:.2f} s")
+        with col2:
+            st.metric("Expresiones analizadas", report['counters'].get('expressions', 0))
+        with col3:
+            peak = report.get('memory_peak_mb')
+            st.metric("Memoria pico", f"{peak:.1f} MB" if peak is not None else "N/A")
+
+        if report['categories']:
+            dominant = report['categories'][0]
+            st.caption(f"Domina: **{dominant['label']}** ({dominant['share'] * 100:.1f}% del tiempo medido)")
+            fig = px.bar(
+                report['categories'], x='seconds', y='label', orientation='h',
+                labels={'seconds': 'Segundos', 'label': ''}
+            )
+            fig.update_layout(height=260, margin=dict(l=10, r=10, t=10, b=10))
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.markdown("**Etapas**")
+        st.dataframe(report['stages'], use_container_width=True, hide_index=True)
+
+        st.markdown("**Contadores**")
+        st.json(report['counters'])
+
+        if report['profile']:
+            st.markdown("**Perfil (cProfile)**")
+            st.dataframe(report['profile'], use_container_width=True, hide_index=True)
+
+
+def analyze_pbip_file(file_path: str, workers: int = None, statistics=None, performance_trace=None,
+                      server_timings=None, report_usage=None, exclude_dead=False):
     """Analiza un archivo PBIP completo con animación de progreso"""
+    from core import span, get_model_name
+
+    with span('analyze_pbip_file', {'dax.model.name': get_model_name(file_path)}):
+        return run_pbip_analysis(file_path, workers, statistics, performance_trace, server_timings,
+                                 report_usage, exclude_dead)
+
+
+def run_pbip_analysis(file_path: str, workers: int = None, statistics=None, performance_trace=None,
+                      server_timings=None, report_usage=None, exclude_dead=False):
+    """Pasos del análisis de analyze_pbip_file (dentro de su span)"""
+    from core import (
+        validate_pbip_file,
+        get_pbip_info,
+        extract_model_from_pbip,
+        is_measure,
+        analyze_measures,
+        apply_relationship_rewrites,
+        apply_shared_expressions,
+        analyze_model,
+        rank_measures
+    )
 
     # Animación Lottie de inicio (si está disponible)
     lottie_analyzing = load_lottie_url("https://lottie.host/92769a14-9afe-4f06-b9a1-dfb8c16d88ab/IcWLmUNs9c.json")
@@ -1134,7 +1310,7 @@ def analyze_pbip_file(file_path: str):
 
     # Mostrar información del archivo
     with st.spinner("📂 Extrayendo información del archivo PBIP..."):
-        pbip_info = get_pbip_info(file_path)
+        pbip_info = get_pbip_info(file_path, use_index=True)
         time.sleep(0.5)
 
     st.success(f"✅ Archivo válido: {pbip_info['format']}")
@@ -1144,81 +1320,98 @@ def analyze_pbip_file(file_path: str):
         st.metric("Tablas", pbip_info['tables_count'])
     with col2:
         st.metric("Medidas encontradas", pbip_info['measures_count'])
+        if pbip_info.get('calculated_count'):
+            st.caption(f"🧮 + {pbip_info['calculated_count']} columna(s) y tabla(s) calculada(s)")
     with col3:
         file_size_mb = pbip_info['file_size'] / (1024 * 1024)
         st.metric("Tamaño", f"{file_size_mb:.2f} MB")
 
     # Extraer medidas
     with st.spinner("🔍 Extrayendo medidas DAX del modelo..."):
-        measures = extract_measures_from_pbip(file_path)
+        measures, metadata = extract_model_from_pbip(file_path, use_index=True)
         time.sleep(0.5)
 
     if not measures:
         st.warning("⚠️ No se encontraron medidas en el archivo PBIP")
         return None
 
-    st.info(f"✅ Se encontraron {len(measures)} medidas para analizar")
-
-    # Analizar cada medida
-    analyzed_measures = []
-    failed_measures = []
+    # Medidas muertas: ningún visual las usa ni directa ni indirectamente
+    if report_usage is not None and exclude_dead:
+        from core import find_dead_measures, exclude_dead_measures
+        reachability = find_dead_measures(measures, report_usage)
+        if reachability.unreachable:
+            measures = exclude_dead_measures(measures, reachability)
+            with st.expander(f"💀 {len(reachability.unreachable)} medida(s) muerta(s) excluida(s) del análisis",
+                             expanded=False):
+                st.caption("Ningún visual de este reporte las usa ni directa ni indirectamente. Pueden estar "
+                           "en uso por otros reportes del mismo modelo publicado o por Analyze in Excel.")
+                for measure in reachability.unreachable:
+                    st.markdown(f"- **{measure['name']}** (Tabla: {measure['table']})")
+
+    calculated_count = sum(1 for measure in measures if not is_measure(measure))
+    if calculated_count:
+        st.info(f"✅ Se encontraron {len(measures) - calculated_count} medidas y {calculated_count} "
+                f"columnas/tablas calculadas para analizar")
+    else:
+        st.info(f"✅ Se encontraron {len(measures)} medidas para analizar")
 
+    # Analizar cada expresión única en procesos aislados (límite de tiempo y memoria por medida)
     progress_bar = st.progress(0)
     status_text = st.empty()
 
-    for idx, measure in enumerate(measures):
-        status_text.text(f"Analizando medida {idx + 1} de {len(measures)}: {measure['name']}")
-
-        try:
-            # Parsear y analizar
-            parsed = parse_dax_code(measure['expression'])
-            issues, metrics = analyze_dax(parsed)
-            suggestions = generate_suggestions(parsed, issues)
-            base_score = calculate_score(parsed, issues)
-
-            analyzed_measures.append({
-                'name': measure['name'],
-                'table': measure['table'],
-                'expression': measure['expression'],
-                'issues': issues,
-                'metrics': metrics,
-                'suggestions': suggestions,
-                'base_score': base_score
-            })
-        except Exception as e:
-            # Si falla el análisis de una medida, registrarla y continuar
-            failed_measures.append({
-                'name': measure['name'],
-                'table': measure['table'],
-                'error': str(e)
-            })
-
-            # Agregar una entrada básica para que al menos aparezca en el reporte
-            analyzed_measures.append({
-                'name': measure['name'],
-                'table': measure['table'],
-                'expression': measure['expression'],
-                'issues': [],
-                'metrics': None,
-                'suggestions': [],
-                'base_score': 100  # Score neutral para medidas que no se pudieron analizar
-            })
-
-        progress_bar.progress((idx + 1) / len(measures))
+    def on_progress(done: int, total: int, name: str):
+        status_text.text(f"Analizando expresión {done} de {total}: {name}")
+        progress_bar.progress(done / total)
+
+    # Las medidas con expresiones idénticas se agrupan para analizar cada una una sola vez
+    dedup_stats = {}
+    analyzed_measures, failed_measures = analyze_measures(
+        measures,
+        timeout=DEFAULT_MEASURE_TIMEOUT,
+        workers=workers,
+        progress_callback=on_progress,
+        dedup_stats=dedup_stats
+    )
 
     progress_bar.empty()
     status_text.empty()
 
+    if dedup_stats['duplicated_measures'] > 0:
+        st.caption(
+            f"♻️ {dedup_stats['unique_expressions']} expresiones únicas "
+            f"({dedup_stats['duplicated_measures']} medidas duplicadas reutilizan el análisis)"
+        )
+
     # Mostrar advertencia si hubo medidas que fallaron
     if failed_measures:
         with st.expander(f"⚠️ {len(failed_measures)} medida(s) no se pudieron analizar completamente", expanded=False):
             for failed in failed_measures:
-                st.warning(f"**{failed['name']}** (Tabla: {failed['table']}): {failed['error']}")
+                label = f"⏱️ {failed['error']}" if failed.get('reason') == 'timeout' else failed['error']
+                st.warning(f"**{failed['name']}** (Tabla: {failed['table']}): {label}")
             st.info("Estas medidas fueron incluidas en el reporte con un score neutral. Puedes revisarlas manualmente.")
 
+    # LOOKUPVALUE/FILTER que se pueden reescribir con RELATED, RELATEDTABLE o TREATAS
+    apply_relationship_rewrites(analyzed_measures, metadata)
+
+    # Subexpresiones repetidas en varias medidas: candidatas a una medida base
+    apply_shared_expressions(analyzed_measures)
+
+    # Reglas del modelo: relaciones, tipos de columna, Fecha/hora automática
+    model_findings = analyze_model(metadata, statistics)
+    if model_findings:
+        analyzed_measures.extend(model_findings)
+        st.caption(f"🏗️ {len(model_findings)} columna(s) o relación(es) con problemas de modelo")
+
     # Rankear medidas con animación
     with st.spinner("📊 Calculando ranking de medidas y generando estadísticas..."):
-        ranked_measures = rank_measures(analyzed_measures)
+        observed = measure_timings = None
+        if performance_trace is not None:
+            from core import join_trace_to_measures
+            observed = join_trace_to_measures(performance_trace, measures)
+        if server_timings:
+            from core import join_server_timings_to_measures
+            measure_timings = join_server_timings_to_measures(server_timings, measures)
+        ranked_measures = rank_measures(analyzed_measures, statistics, observed, measure_timings, report_usage)
         time.sleep(0.7)
 
     # Mensaje de éxito con animación
@@ -1230,6 +1423,82 @@ def analyze_pbip_file(file_path: str):
     return ranked_measures
 
 
+def get_model_watcher(file_path: str, statistics=None, performance_trace=None, server_timings=None,
+                      report_usage=None, exclude_dead=False) -> 'ModelWatcher':
+    """Watcher del modelo guardado en la sesión (conserva la caché de análisis entre reruns)"""
+    watcher = st.session_state.get('model_watcher')
+    if watcher is None or watcher.file_path != file_path:
+        from core import ModelWatcher
+
+        watcher = ModelWatcher(file_path, timeout=DEFAULT_MEASURE_TIMEOUT, statistics=statistics,
+                               performance_trace=performance_trace, server_timings=server_timings,
+                               report_usage=report_usage, exclude_dead=exclude_dead)
+        st.session_state['model_watcher'] = watcher
+        st.session_state.pop('watch_update', None)
+    if (watcher.statistics is not statistics or watcher.performance_trace is not performance_trace
+            or watcher.server_timings is not server_timings or watcher.report_usage is not report_usage
+            or watcher.exclude_dead != exclude_dead):
+        # Otros datos observados u otras medidas excluidas: el análisis cacheado sigue valiendo
+        watcher.statistics = statistics
+        watcher.performance_trace = performance_trace
+        watcher.server_timings = server_timings
+        watcher.report_usage = report_usage
+        watcher.exclude_dead = exclude_dead
+        st.session_state.pop('watch_update', None)
+    return watcher
+
+
+def analyze_pbip_watch(file_path: str, statistics=None, performance_trace=None, server_timings=None,
+                       report_usage=None, exclude_dead=False):
+    """Modo watch: re-analiza solo si cambiaron archivos del modelo (incremental)"""
+    watcher = get_model_watcher(file_path, statistics, performance_trace, server_timings, report_usage,
+                                exclude_dead)
+    update = st.session_state.get('watch_update')
+
+    changed_files = watcher.poll() if update is not None else []
+    if update is None or changed_files:
+        with st.spinner("🔄 Analizando cambios del modelo..." if changed_files else "🔄 Analizando modelo..."):
+            update = watcher.refresh(changed_files)
+        st.session_state['watch_update'] = update
+
+    if update.changed_files:
+        st.caption(
+            f"🔁 Ciclo {update.cycle}: {', '.join(update.changed_files)} · "
+            f"{update.analyzed_expressions} expresión(es) re-analizada(s) en {update.seconds:.2f} s"
+        )
+    if update.dead_measures:
+        with st.expander(f"💀 {len(update.dead_measures)} medida(s) muerta(s) excluida(s) del análisis",
+                         expanded=False):
+            for measure in update.dead_measures:
+                st.markdown(f"- **{measure['name']}** (Tabla: {measure['table']})")
+    if update.failed_measures:
+        with st.expander(f"⚠️ {len(update.failed_measures)} medida(s) no se pudieron analizar completamente", expanded=False):
+            for failed in update.failed_measures:
+                st.warning(f"**{failed['name']}** (Tabla: {failed['table']}): {failed['error']}")
+
+    return update.ranked_measures
+
+
+def wait_for_model_change(file_path: str, statistics=None, performance_trace=None, server_timings=None,
+                          report_usage=None, exclude_dead=False) -> None:
+    """
+    Modo watch: espera a que cambie un archivo del modelo y vuelve a ejecutar la app
+
+    Actualiza un texto en cada verificación: así Streamlit puede interrumpir la
+    espera cuando el usuario cambia un control.
+    """
+    from core.model_watcher import DEFAULT_POLL_INTERVAL
+
+    watcher = get_model_watcher(file_path, statistics, performance_trace, server_timings, report_usage,
+                                exclude_dead)
+    status = st.empty()
+    while True:
+        status.caption(f"👀 Observando cambios en `{watcher.definition_path}` · {time.strftime('%H:%M:%S')}")
+        time.sleep(DEFAULT_POLL_INTERVAL)
+        if watcher.poll():
+            st.rerun()
+
+
 def main():
     """Función principal de la aplicación"""
 
@@ -1314,6 +1583,28 @@ def main():
 
         st.markdown("---")
 
+        # Modo debug: instrumentación del pipeline
+        debug_mode = st.checkbox("🛠️ Modo debug", value=False,
+                                 help="Muestra tiempos por etapa, contadores y, opcionalmente, un perfil cProfile")
+        debug_profile = debug_mode and st.checkbox("Capturar perfil cProfile", value=False,
+                                                   help="Analiza en el proceso principal (más lento) para perfilar cada función")
+
+        # Modo watch: re-análisis incremental al guardar .tmdl / model.bim
+        watch_mode = st.checkbox("👀 Re-analizar al guardar", value=False,
+                                 help="Observa la carpeta definition del modelo y actualiza el ranking "
+                                      "cuando se guarda un archivo (solo con ruta, no con ZIP subido)")
+
+        # Uso en el reporte: visuales y páginas de la carpeta .Report
+        usage_mode = st.checkbox("🖼️ Ponderar por uso en el reporte", value=False,
+                                 help="Lee los visuales del .Report y prioriza las medidas más expuestas "
+                                      "(página inicial, cantidad de visuales); solo con ruta, no con ZIP")
+
+        exclude_dead = usage_mode and st.checkbox("💀 Excluir medidas muertas", value=False,
+                                                  help="No analiza las medidas que ningún visual usa ni "
+                                                       "directa ni indirectamente (a través de otras medidas)")
+
+        st.markdown("---")
+
         # Versión
         st.markdown("""
         <div style="text-align: center; padding: 10px; background: #f8f9fa; border-radius: 8px;">
@@ -1325,6 +1616,9 @@ def main():
 
     # Upload de archivo o ruta de carpeta
     pbip_folder_path, uploaded_file = render_file_upload()
+    statistics = render_vpax_upload()
+    performance_trace = render_performance_trace_upload()
+    server_timings = render_server_timings_upload()
 
     # Determinar qué opción usar
     file_to_analyze = None
@@ -1353,10 +1647,42 @@ def main():
         file_to_analyze = temp_file_path
 
     if file_to_analyze:
+        # Trazas OTLP-JSON opcionales (variable de entorno DAX_OPTIMIZER_TRACE_FILE)
+        from core import configure_tracing_from_env
+        configure_tracing_from_env()
+
+        report_usage = None
+        if usage_mode and temp_file_path is None:
+            report_usage = st.session_state.get('report_usage')
+            if report_usage is None or report_usage[0] != file_to_analyze:
+                from core import load_report_usage
+                report_usage = st.session_state['report_usage'] = (file_to_analyze, load_report_usage(file_to_analyze))
+            report_usage = report_usage[1]
+            if report_usage is None:
+                st.warning("⚠️ No se encontró la carpeta .Report del proyecto: el ranking no se pondera por uso")
+
         try:
             # Analizar archivo
             with st.spinner('Analizando archivo PBIP...'):
-                ranked_measures = analyze_pbip_file(file_to_analyze)
+                if watch_mode and temp_file_path is None:
+                    ranked_measures = analyze_pbip_watch(file_to_analyze, statistics, performance_trace, server_timings,
+                                                         report_usage, exclude_dead)
+                elif debug_mode:
+                    from core import instrumented
+                    with instrumented(profile=debug_profile, trace_memory=debug_profile) as inst:
+                        ranked_measures = analyze_pbip_file(file_to_analyze, workers=0 if debug_profile else None,
+                                                            statistics=statistics,
+                                                            performance_trace=performance_trace,
+                                                            server_timings=server_timings,
+                                                            report_usage=report_usage,
+                                                            exclude_dead=exclude_dead)
+                    render_debug_panel(inst.report())
+                else:
+                    ranked_measures = analyze_pbip_file(file_to_analyze, statistics=statistics,
+                                                        performance_trace=performance_trace,
+                                                        server_timings=server_timings,
+                                                        report_usage=report_usage,
+                                                        exclude_dead=exclude_dead)
 
             if ranked_measures:
                 st.success(f"✅ Análisis completado: {len(ranked_measures)} medidas encontradas")
@@ -1453,6 +1779,11 @@ def main():
             if temp_file_path and os.path.exists(temp_file_path):
                 os.remove(temp_file_path)
 
+        watcher = st.session_state.get('model_watcher')
+        if watch_mode and temp_file_path is None and watcher is not None and watcher.file_path == file_to_analyze:
+            wait_for_model_change(file_to_analyze, statistics, performance_trace, server_timings, report_usage,
+                                  exclude_dead)
+
     else:
         # Mostrar instrucciones si no hay archivo
         st.info("""
@@ -0,0 +1,12 @@
+"""
+Configuración de pytest: permite importar core sin instalar el paquete
+
+Uso:
+    python -m pytest -q tests
+"""
+
+import sys
+from pathlib import Path
+
+# Agregar path del proyecto
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,94 @@
+"""
+Tests de analysis_runner: deduplicación, caché, atributos de las trazas y watchdog de los workers
+"""
+
+import time
+
+import pytest
+
+from core import tracing
+from core.analysis_runner import AnalysisCache, WorkerPool, analyze_measures
+
+
+# La primera etapa del parseo tarda más que el timeout: solo el watchdog puede cortarla
+PATHOLOGICAL = "SUM(Ventas[Monto]) + " * 400000 + "1"
+
+
+def _measures(*expressions):
+    return [{'name': f'M{i}', 'table': 'Ventas', 'expression': expression}
+            for i, expression in enumerate(expressions)]
+
+
+def _analyze_attributes(measures, **kwargs):
+    exporter = tracing.InMemorySpanExporter()
+    with tracing.trace_to(exporter):
+        analyze_measures(measures, workers=0, **kwargs)
+    span, = [span for span in exporter.get_finished_spans() if span.name == 'analyze']
+    return span.attributes
+
+
+def test_duplicate_ratio_counts_measures_with_repeated_expression():
+    attributes = _analyze_attributes(_measures("SUM(Ventas[Monto])", "SUM(Ventas[Monto])",
+                                               "SUM(Ventas[Monto])", "COUNTROWS(Ventas)"))
+    assert attributes['dax.measure_count'] == 4
+    assert attributes['dax.unique_expressions'] == 2
+    assert attributes['dax.duplicate_ratio'] == 0.5
+    assert 'dax.cache_hit_rate' not in attributes
+
+
+def test_cache_hit_rate_uses_cache_lookups_of_the_run():
+    cache = AnalysisCache()
+    first = _analyze_attributes(_measures("SUM(Ventas[Monto])", "COUNTROWS(Ventas)"), cache=cache)
+    assert first['dax.cache_hit_rate'] == 0.0
+    assert first['dax.analyzed_expressions'] == 2
+
+    second = _analyze_attributes(_measures("SUM(Ventas[Monto])", "COUNTROWS(Ventas)",
+                                           "AVERAGE(Ventas[Monto])", "MAX(Ventas[Monto])"), cache=cache)
+    assert second['dax.cache_hit_rate'] == 0.5
+    assert second['dax.duplicate_ratio'] == 0.0
+    assert second['dax.analyzed_expressions'] == 2
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(1, timeout=0.05, memory_limit_mb=None)
+    pool.start(wait_ready=True)
+    yield pool
+    pool.close()
+
+
+def _run(pool, expressions):
+    results = {}
+    pool.run(expressions, list(range(len(expressions))), lambda task_id: None,
+             lambda task_id, status, payload, stats: results.__setitem__(task_id, (status, payload)))
+    return results
+
+
+def test_worker_pool_timeout_replaces_worker(pool):
+    process = pool._workers[0].process
+
+    started = time.monotonic()
+    results = _run(pool, [PATHOLOGICAL, "SUM(Ventas[Monto])"])
+    assert time.monotonic() - started < 10
+
+    assert results[0] == ('timeout', 'Tiempo de análisis excedido (0.05 s)')
+    assert results[1][0] == 'ok'
+    assert not process.is_alive()
+    assert pool._workers[0].process is not process
+
+    # El worker nuevo sigue atendiendo en los análisis siguientes
+    results = _run(pool, ["SUMX(Ventas, SUMX(Productos, Productos[Precio]))"])
+    assert results[0][0] == 'ok'
+    assert [issue.id for issue in results[0][1]['issues']] == ['nested-iterators']
+
+
+def test_timed_out_measure_is_reported_and_the_rest_finish(pool):
+    analyzed, failed = analyze_measures(
+        [{'name': 'Lenta', 'table': 'Ventas', 'expression': PATHOLOGICAL},
+         {'name': 'Total', 'table': 'Ventas', 'expression': "SUM(Ventas[Monto])"}],
+        pool=pool
+    )
+    assert [(measure['name'], measure['reason']) for measure in failed] == [('Lenta', 'timeout')]
+    assert [measure['base_score'] for measure in analyzed] == [100, 100]
+    assert analyzed[1]['metrics'] is not None
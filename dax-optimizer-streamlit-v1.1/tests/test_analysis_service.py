@@ -0,0 +1,133 @@
+"""
+Tests del servicio HTTP de análisis (en el proceso, workers=0, puerto libre)
+"""
+
+import http.client
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.analysis_service import AnalysisServer, AnalysisService, NDJSON_CONTENT_TYPE
+
+
+SIMPLE = "SUM(Ventas[Monto])"
+NESTED = "SUMX(Ventas, SUMX(Productos, Productos[Precio]))"
+
+
+def _start(service):
+    server = AnalysisServer(service, port=0)
+    server.start_in_thread()
+    return server
+
+
+@pytest.fixture
+def server():
+    server = _start(AnalysisService(workers=0))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _request(server, method, path, data=None):
+    """(código, encabezados, cuerpo) de un pedido; sin data, POST no envía Content-Length"""
+    host, port = server.server_address[:2]
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        connection.putrequest(method, path)
+        if data is not None:
+            connection.putheader('Content-Type', 'application/json')
+            connection.putheader('Content-Length', str(len(data)))
+        connection.endheaders(data)
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read().decode('utf-8')
+    finally:
+        connection.close()
+
+
+def _post(server, path, body):
+    status, headers, text = _request(server, 'POST', path, json.dumps(body).encode('utf-8'))
+    return status, json.loads(text)
+
+
+def _post_batch(server, expressions):
+    status, headers, text = _request(server, 'POST', '/analyze/batch',
+                                     json.dumps({'expressions': expressions}).encode('utf-8'))
+    assert status == 200
+    assert headers['Content-Type'] == NDJSON_CONTENT_TYPE
+    assert headers['Transfer-Encoding'] == 'chunked'
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def test_health(server):
+    status, headers, text = _request(server, 'GET', '/health')
+    health = json.loads(text)
+    assert status == 200
+    assert health['status'] == 'ok'
+    assert health['workers'] == 0
+    assert health['workers_started'] is False
+
+
+def test_analyze(server):
+    status, result = _post(server, '/analyze', {'expression': NESTED})
+    assert status == 200
+    assert 'nested-iterators' in [issue['id'] for issue in result['issues']]
+    assert result['metrics']['nested_iterators'] >= 1
+    assert 0 <= result['base_score'] < 100
+
+
+def test_analyze_timeout_is_422():
+    server = _start(AnalysisService(workers=0, timeout=1e-6))
+    try:
+        status, result = _post(server, '/analyze', {'expression': NESTED})
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert status == 422
+    assert result['status'] == 'timeout'
+
+
+def test_analyze_batch_streams_results_and_summary(server):
+    lines = _post_batch(server, [SIMPLE, {'id': 'anidada', 'expression': NESTED}, SIMPLE])
+    summary = lines.pop()
+    assert summary['summary']['count'] == 3
+    assert summary['summary']['unique'] == 2
+    assert summary['summary']['cached'] == 0
+    assert summary['summary']['failed'] == 0
+
+    by_index = {line['index']: line for line in lines}
+    assert sorted(by_index) == [0, 1, 2]
+    assert all(line['status'] == 'ok' for line in lines)
+    assert by_index[1]['id'] == 'anidada'
+    # La expresión repetida se analiza una vez y se entrega en ambas posiciones
+    assert by_index[0]['result'] == by_index[2]['result']
+
+    # El segundo pedido sale de la caché
+    summary = _post_batch(server, [SIMPLE, NESTED])[-1]['summary']
+    assert summary['cached'] == 2
+    status, headers, text = _request(server, 'GET', '/health')
+    assert json.loads(text)['cache_hits'] == 2
+
+
+def test_bad_requests(server):
+    status, result = _post(server, '/analyze', {'expressions': [SIMPLE]})
+    assert status == 400
+    status, result = _post(server, '/analyze/batch', {'expressions': [SIMPLE, 42]})
+    assert status == 400
+
+    status, headers, text = _request(server, 'POST', '/analyze')
+    assert status == 411
+    status, headers, text = _request(server, 'POST', '/analyze', b'{"expression": ')
+    assert status == 400
+
+    status, result = _post(server, '/desconocida', {'expression': SIMPLE})
+    assert status == 404
+    status, headers, text = _request(server, 'GET', '/desconocida')
+    assert status == 404
+
+
+def test_requests_are_counted_from_concurrent_connections(server):
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda _: _post(server, '/parse', {'expression': SIMPLE}), range(40)))
+    status, headers, text = _request(server, 'GET', '/health')
+    assert json.loads(text)['requests'] == 40
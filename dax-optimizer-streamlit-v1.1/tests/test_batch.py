@@ -0,0 +1,108 @@
+"""
+Tests de la API por lotes: resultados alineados con la entrada e iguales a los de la API individual
+"""
+
+import pytest
+
+from core.analysis_runner import analyze_expression
+from core.batch import (
+    RULE_PREFILTERS,
+    analyze_dax_batch,
+    analyze_expressions_batch,
+    calculate_score_batch,
+    generate_suggestions_batch,
+    iter_analyze_expressions,
+    parse_dax_batch
+)
+from core.dax_analyzer import ANALYSIS_RULES, analyze_dax
+from core.dax_parser import parse_dax_code
+from core.dax_suggestions import calculate_score, generate_suggestions
+
+
+CORPUS = [
+    'SUM(Sales[Amount])',
+    'SUMX(Sales, SUMX(RELATEDTABLE(Items), Items[Qty] * Items[Price]))',
+    'CALCULATE([Total], FILTER(ALL(Product), Product[Color] = "Red"))',
+    'CALCULATE(CALCULATE([Total], Sales[Year] = 2024), ALL(Dates))',
+    'DIVIDE(SUM(Sales[Amount]), SUM(Sales[Amount]) + SUM(Sales[Cost]))',
+    'VAR _x = SUM(Sales[Amount])\nRETURN IF(_x > 0, _x, BLANK())',
+    'Sales[Qty] * EARLIER(Sales[Price])',
+    'COUNTROWS(FILTER(Sales, Sales[Amount] > EARLIER(Sales[Amount])))',
+    '= ADDCOLUMNS(CALENDAR(DATE(2020, 1, 1), DATE(2024, 12, 31)), "Año", YEAR([Date]))',
+    'SUMMARIZE(Sales, Sales[Region], "Total", SUM(Sales[Amount]))',
+    # Fuera de ASCII: los prefiltros no se aplican
+    'CALCULATE([Año], FILTER(ALL(Año), Año[Número] = 1))',
+    'calculate([total], filter(all(product), product[color] = "red"))',
+    '',
+]
+
+
+def _expected(code):
+    return analyze_expression(code, timeout=None)
+
+
+def test_batch_results_match_single_call_api():
+    expressions = CORPUS + CORPUS[::-1]
+
+    results = analyze_expressions_batch(expressions)
+
+    assert len(results) == len(expressions)
+    assert results == [_expected(code) for code in expressions]
+
+
+@pytest.mark.parametrize('chunk_size', [0, 1, 2, 5, 512])
+def test_chunking_keeps_alignment(chunk_size):
+    expressions = [code for code in CORPUS for _ in range(2)]
+
+    results = list(iter_analyze_expressions(iter(expressions), chunk_size=chunk_size))
+
+    assert results == [_expected(code) for code in expressions]
+
+
+def test_step_functions_match_their_single_versions():
+    parsed_list = parse_dax_batch(CORPUS + CORPUS[:3])
+    analyses = analyze_dax_batch(parsed_list)
+    issues_list = [issues for issues, _ in analyses]
+
+    for code, parsed, (issues, metrics) in zip(CORPUS + CORPUS[:3], parsed_list, analyses):
+        single = parse_dax_code(code)
+        assert (parsed.raw, parsed.functions, parsed.object_type) == (single.raw, single.functions, single.object_type)
+        assert (issues, metrics) == analyze_dax(single)
+
+    assert generate_suggestions_batch(parsed_list, issues_list) == [
+        generate_suggestions(parsed, issues) for parsed, issues in zip(parsed_list, issues_list)
+    ]
+    assert calculate_score_batch(parsed_list, issues_list) == [
+        calculate_score(parsed, issues) for parsed, issues in zip(parsed_list, issues_list)
+    ]
+
+
+def test_repeated_expressions_are_parsed_once():
+    parsed_list = parse_dax_batch(['SUM(T[v])', 'SUM(T[w])', 'SUM(T[v])'])
+
+    assert parsed_list[0] is parsed_list[2]
+    assert parsed_list[0] is not parsed_list[1]
+
+
+def test_results_by_code_is_reused_across_chunks():
+    shared = {}
+    first = list(iter_analyze_expressions(CORPUS[:4], chunk_size=2, results_by_code=shared))
+    cached = dict(shared)
+    second = list(iter_analyze_expressions(CORPUS[2:6], chunk_size=3, results_by_code=shared))
+
+    assert set(cached) == set(CORPUS[:4])
+    assert second[0] is first[2] and second[1] is first[3]
+    assert second == [_expected(code) for code in CORPUS[2:6]]
+
+
+@pytest.mark.parametrize('code', CORPUS)
+def test_prefilters_never_skip_an_issue(code):
+    # Una regla cuyo prefiltro descarta la expresión no debe reportar nada sobre ella
+    parsed = parse_dax_code(code)
+    for rule in ANALYSIS_RULES:
+        prefilter = RULE_PREFILTERS.get(rule.__name__)
+        if prefilter is None or not code.isascii() or prefilter(parsed, code.upper()):
+            continue
+        issues = []
+        rule(parsed, issues)
+        assert issues == [], rule.__name__
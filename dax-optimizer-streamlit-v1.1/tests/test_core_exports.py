@@ -0,0 +1,54 @@
+"""
+Tests de las exportaciones perezosas de core y de la memoria pico de instrumentation
+"""
+
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+import core
+from core import instrumentation
+
+
+def test_all_is_derived_from_submodule_exports():
+    assert core.__all__ == list(core._LAZY_ATTRIBUTES)
+    assert len(core.__all__) == len(set(core.__all__))
+
+
+def test_type_checking_imports_match_submodule_exports():
+    tree = ast.parse(Path(core.__file__).read_text(encoding='utf-8'))
+    block, = [node for node in tree.body
+              if isinstance(node, ast.If) and isinstance(node.test, ast.Name) and node.test.id == 'TYPE_CHECKING']
+    imported = {node.module: tuple(alias.name for alias in node.names) for node in block.body}
+    assert imported == core._SUBMODULE_EXPORTS
+
+
+def test_every_export_resolves():
+    for name, module in core._LAZY_ATTRIBUTES.items():
+        assert getattr(core, name) is getattr(sys.modules[f'core.{module}'], name)
+
+
+def test_tracemalloc_is_imported_only_when_tracking_memory():
+    probe = ("import sys; from core import instrumentation\n"
+             "with instrumentation.instrumented(): pass\n"
+             "assert 'tracemalloc' not in sys.modules\n"
+             "with instrumentation.instrumented(trace_memory=True) as stats: bytearray(1 << 20)\n"
+             "assert 'tracemalloc' in sys.modules and stats.memory_peak_mb >= 1\n")
+    subprocess.run([sys.executable, '-c', probe], cwd=Path(core.__file__).parent.parent, check=True)
+
+
+def test_streamlit_app_defers_pipeline_and_importers():
+    # Sin importar la app (necesita streamlit): solo sus imports de core a nivel de módulo
+    app_path = Path(core.__file__).parent.parent / 'streamlit_app' / 'app.py'
+    tree = ast.parse(app_path.read_text(encoding='utf-8'))
+    names = [alias.name for node in tree.body
+             if isinstance(node, ast.ImportFrom) and node.module == 'core' for alias in node.names]
+    deferred = ['core.analysis_runner', 'core.pbip_extractor', 'core.model_watcher', 'core.analysis_service',
+                'core.vpax_importer', 'core.performance_trace', 'core.server_timings', 'core.report_usage',
+                'multiprocessing', 'zipfile']
+    probe = (f"import sys; from core import {', '.join(names)}\n"
+             f"loaded = [name for name in {deferred!r} if name in sys.modules]\n"
+             "assert not loaded, loaded\n")
+    assert names
+    subprocess.run([sys.executable, '-c', probe], cwd=Path(core.__file__).parent.parent, check=True)
@@ -0,0 +1,77 @@
+"""
+Tests de slotted_dataclass: __slots__ sin dataclass(slots=True) (Python 3.8+)
+"""
+
+import ast
+import copy
+import dataclasses
+import pickle
+from pathlib import Path
+
+import pytest
+
+import core
+from core.dataclass_slots import slotted_dataclass
+from core.dax_analyzer import Issue
+from core.dax_ast import Call, Node, Reference
+from core.report_usage import MeasureUsage
+
+
+@slotted_dataclass(frozen=True)
+class _Point:
+    x: int
+    y: int = 0
+    tags: tuple = dataclasses.field(default=())
+
+    @property
+    def total(self) -> int:
+        return self.x + self.y
+
+
+def test_instances_have_slots_and_keep_defaults():
+    point = _Point(1)
+
+    assert _Point.__slots__ == ('x', 'y', 'tags')
+    assert not hasattr(point, '__dict__')
+    assert (point.x, point.y, point.tags, point.total) == (1, 0, (), 1)
+    assert _Point.__qualname__ == '_Point' and dataclasses.is_dataclass(point)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        point.x = 2
+    with pytest.raises((AttributeError, TypeError)):
+        object.__setattr__(point, 'z', 3)
+
+
+def test_frozen_instances_pickle_copy_and_hash():
+    point = _Point(1, 2, ('a',))
+
+    for restored in (pickle.loads(pickle.dumps(point)), copy.deepcopy(point), copy.copy(point)):
+        assert restored == point and hash(restored) == hash(point)
+    assert dataclasses.replace(point, y=5) == _Point(1, 5, ('a',))
+
+
+def test_model_classes_are_slotted_and_picklable():
+    # Subclases de una base con __slots__ vacíos: solo declaran sus campos
+    call = Call('SUM', (Reference('Sales', '[Amount]'),))
+    assert Node.__slots__ == () and Call.__slots__ == ('name', 'args')
+    assert pickle.loads(pickle.dumps(call)) == call
+
+    issue = Issue('all-in-filter', line=2, column=5)
+    assert not hasattr(issue, '__dict__')
+    assert pickle.loads(pickle.dumps(issue)) == issue
+
+    usage = MeasureUsage('Total')
+    usage.visual_count += 1
+    assert not hasattr(usage, '__dict__')
+    assert pickle.loads(pickle.dumps(usage)) == usage
+
+
+def test_core_does_not_use_dataclass_slots_argument():
+    # dataclass(slots=True) no existe antes de Python 3.10
+    core_path = Path(core.__file__).parent
+    offenders = []
+    for path in sorted(core_path.glob('*.py')):
+        for node in ast.walk(ast.parse(path.read_text(encoding='utf-8'))):
+            if (isinstance(node, ast.Call) and getattr(node.func, 'id', None) == 'dataclass'
+                    and any(keyword.arg == 'slots' for keyword in node.keywords)):
+                offenders.append(f"{path.name}:{node.lineno}")
+    assert offenders == []
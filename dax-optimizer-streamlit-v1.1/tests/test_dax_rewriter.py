@@ -0,0 +1,117 @@
+"""
+Tests golden del motor de reescritura: expresión -> código reescrito por regla
+"""
+
+import pytest
+
+from core.analysis_runner import analyze_expression, analyze_measures
+from core.dax_rewriter import REWRITE_RULES, has_comments, rewrite_dax
+from core.shared_expressions import SHARED_EXPRESSION_RULE, apply_shared_expressions
+
+
+REWRITTEN = [
+    ('optimize-all-filter',
+     'CALCULATE(SUM(T[v]), FILTER(ALL(T), T[c] = "x"))',
+     'CALCULATE(SUM(T[v]), T[c] = "x", REMOVEFILTERS(T))'),
+    ('optimize-all-filter',
+     "CALCULATE(SUM('Ventas Netas'[v]), FILTER(ALL('Ventas Netas'), 'Ventas Netas'[c] = \"x\"))",
+     "CALCULATE(\n"
+     "    SUM('Ventas Netas'[v]),\n"
+     "    'Ventas Netas'[c] = \"x\",\n"
+     "    REMOVEFILTERS('Ventas Netas')\n"
+     ")"),
+    ('add-keepfilters',
+     'CALCULATE(SUM(T[v]), FILTER(T, T[c] = "x"))',
+     'CALCULATE(SUM(T[v]), KEEPFILTERS(FILTER(T, T[c] = "x")))'),
+    ('add-keepfilters',
+     'CALCULATE(CALCULATE(SUM(T[v]), FILTER(T, T[a] = 1)), T[b] = 2)',
+     'CALCULATE(CALCULATE(SUM(T[v]), KEEPFILTERS(FILTER(T, T[a] = 1))), T[b] = 2)'),
+    ('flatten-calculate',
+     'CALCULATE(CALCULATE(SUM(T[v]), T[a] = 1), T[b] = 2)',
+     'CALCULATE(SUM(T[v]), T[a] = 1, T[b] = 2)'),
+    ('add-variables',
+     'IF(SUM(T[v]) > 0, SUM(T[v]) * 2, BLANK())',
+     'VAR _Sum = SUM(T[v])\nRETURN\n    IF(_Sum > 0, _Sum * 2, BLANK())'),
+    ('add-variables',
+     'M = IF(SUM(T[v]) > 0, SUM(T[v]) * 2, BLANK())',
+     'M =\nVAR _Sum = SUM(T[v])\nRETURN\n    IF(_Sum > 0, _Sum * 2, BLANK())'),
+    # Los marcadores de comentario dentro de textos y nombres no son comentarios
+    ('add-variables',
+     'IF(SUM(T[v]) > 0, "--x", SUM(T[v]))',
+     'VAR _Sum = SUM(T[v])\nRETURN\n    IF(_Sum > 0, "--x", _Sum)'),
+    ('optimize-all-filter',
+     'CALCULATE(SUM(T[v--]), FILTER(ALL(T), T[c] = "//x"))',
+     'CALCULATE(SUM(T[v--]), T[c] = "//x", REMOVEFILTERS(T))'),
+]
+
+REFUSED = [
+    # Los filtros de los dos CALCULATE usan la misma columna: el de afuera queda reemplazado
+    ('flatten-calculate', 'CALCULATE(CALCULATE(SUM(T[v]), T[a] = 1), T[a] = 2)'),
+    # Ya tiene KEEPFILTERS
+    ('add-keepfilters', 'CALCULATE(SUM(T[v]), KEEPFILTERS(FILTER(T, T[c] = "x")))'),
+    # El predicado usa otra tabla, una medida o compara dos columnas
+    ('optimize-all-filter', 'CALCULATE(SUM(T[v]), FILTER(ALL(T), T[c] = U[d]))'),
+    ('optimize-all-filter', 'CALCULATE(SUM(T[v]), FILTER(ALL(T), [M] > 0))'),
+    ('optimize-all-filter', 'CALCULATE(SUM(T[v]), FILTER(ALL(T), T[c] = "x" && T[d] > T[e]))'),
+    # Repetidas dentro de un iterador o de CALCULATE: una VAR afuera cambia el contexto
+    ('add-variables', 'SUMX(T, [M] * [M])'),
+    ('add-variables', 'SUMX(T, T[a] * T[a] + SUM(U[b]) + SUM(U[b]))'),
+    ('add-variables', 'CALCULATE(SUM(T[v]) + SUM(T[v]), T[a] = 1)'),
+    # No se pudo parsear
+    ('optimize-all-filter', 'CALCULATE(SUM(T[v]), FILTER(ALL(T), T[c] = "x"'),
+    # Con comentarios: el código formateado los perdería
+    ('optimize-all-filter', 'CALCULATE(SUM(T[v]), FILTER(ALL(T), T[c] = "x")) -- x'),
+    ('optimize-all-filter', 'CALCULATE(SUM(T[v]), /* todo */ FILTER(ALL(T), T[c] = "x"))'),
+    ('add-variables', 'IF(SUM(T[v]) > 0, SUM(T[v]) * 2, BLANK()) // doble'),
+]
+
+
+@pytest.mark.parametrize('template_id, code, expected', REWRITTEN)
+def test_rewrite(template_id, code, expected):
+    assert rewrite_dax(code, [template_id]) == {template_id: expected}
+
+
+@pytest.mark.parametrize('template_id, code', REFUSED)
+def test_refused(template_id, code):
+    assert rewrite_dax(code, [template_id]) == {}
+    assert rewrite_dax(code, list(REWRITE_RULES)).get(template_id) is None
+
+
+@pytest.mark.parametrize('code, expected', [
+    ('SUM(T[v]) // total', True),
+    ('SUM(T[v]) -- total', True),
+    ('/* total */ SUM(T[v])', True),
+    ('SUM(T[v])\n/* varias\nlíneas */', True),
+    ('IF(T[c] = "//", 1, 0)', False),
+    ("SUM('Tabla -- x'[v])", False),
+    ('SUM(T[v/*x*/])', False),
+    ('SUM(T[v])', False),
+])
+def test_has_comments(code, expected):
+    assert has_comments(code) is expected
+
+
+def test_suggestion_keeps_catalog_example_when_expression_has_comments():
+    commented = analyze_expression('CALCULATE(SUM(T[v]), FILTER(ALL(T), T[c] = "x")) // ventas de x')
+    plain = analyze_expression('CALCULATE(SUM(T[v]), FILTER(ALL(T), T[c] = "x"))')
+
+    commented_suggestion, = [s for s in commented['suggestions'] if s.template_id == 'optimize-all-filter']
+    plain_suggestion, = [s for s in plain['suggestions'] if s.template_id == 'optimize-all-filter']
+    assert not commented_suggestion.is_rewrite
+    assert 'ventas de x' not in commented_suggestion.suggested_code
+    assert plain_suggestion.is_rewrite
+    assert not plain_suggestion.comments_removed
+
+
+def test_shared_expression_rewrite_is_flagged_when_comments_are_removed():
+    analyzed, _ = analyze_measures([
+        {'name': 'A', 'table': 'T', 'expression': 'DIVIDE(SUM(T[v]) - SUM(T[c]), 2) // mitad'},
+        {'name': 'B', 'table': 'T', 'expression': '(SUM(T[v]) - SUM(T[c])) * 3'},
+    ], workers=0)
+    apply_shared_expressions(analyzed)
+
+    commented, plain = [[s for s in measure['suggestions'] if s.template_id == 'use-base-measure'][0]
+                        for measure in analyzed]
+    assert any(issue.id == SHARED_EXPRESSION_RULE for issue in analyzed[0]['issues'])
+    assert commented.is_rewrite and commented.comments_removed
+    assert plain.is_rewrite and not plain.comments_removed
@@ -0,0 +1,45 @@
+"""
+Tests de la API pública de dax_suggestions (generadores por plantilla y score)
+"""
+
+import pytest
+
+from core import dax_suggestions, rule_catalog
+from core.analysis_runner import analyze_expression
+from core.dax_parser import parse_dax_code
+
+
+@pytest.mark.parametrize('function, template_id, title', [
+    (dax_suggestions.generate_nested_iterator_suggestion, 'optimize-nested-iterators', 'Eliminar iteradores anidados'),
+    (dax_suggestions.generate_keepfilters_suggestion, 'add-keepfilters', 'Usar KEEPFILTERS para mantener contexto'),
+    (dax_suggestions.generate_variable_suggestion, 'add-variables', 'Introducir variables (VAR)'),
+    (dax_suggestions.generate_flatten_calculate_suggestion, 'flatten-calculate', 'Aplanar CALCULATEs anidados'),
+    (dax_suggestions.generate_all_in_filter_suggestion, 'optimize-all-filter', 'Optimizar uso de ALL en FILTER'),
+])
+def test_template_generators(function, template_id, title):
+    suggestion = function(parse_dax_code("SUM(Ventas[Monto])"))
+    assert suggestion == dax_suggestions.create_suggestion(template_id)
+    assert suggestion.title == title
+    assert not suggestion.is_rewrite
+
+
+def test_generic_variable_suggestion_requires_measure_references():
+    assert dax_suggestions.generate_generic_variable_suggestion(parse_dax_code("SUM(Ventas[Monto])")) is None
+    suggestion = dax_suggestions.generate_generic_variable_suggestion(parse_dax_code("[Total] * 2"))
+    assert suggestion.template_id == 'add-variables-generic'
+    assert suggestion.id == 'add-variables'
+
+
+def test_templates_are_reexported_from_catalog():
+    assert dax_suggestions.SuggestionTemplate is rule_catalog.SuggestionTemplate
+    assert dax_suggestions.SUGGESTION_TEMPLATES is rule_catalog.SUGGESTION_TEMPLATES
+
+
+@pytest.mark.parametrize('code', [
+    "SUM(Ventas[Monto])",
+    "VAR Total = SUM(Ventas[Monto]) RETURN IF(Total > 0, Total)",
+    "SUMX(Ventas, SUMX(Productos, Productos[Precio])) + CALCULATE(CALCULATE([M], T[a] = 1), FILTER(ALL(T), T[b] = 2))",
+])
+def test_recalculate_score_matches_calculate_score(code):
+    result = analyze_expression(code)
+    assert dax_suggestions.recalculate_score(result) == result['base_score']
@@ -0,0 +1,138 @@
+"""
+Tests del análisis incremental: tras cualquier secuencia de ediciones, los
+diagnósticos de la sesión son los de analyze_expression sobre el texto completo
+"""
+
+import random
+
+import pytest
+
+from core.analysis_runner import analyze_expression
+from core.dax_parser import parse_dax_code
+from core.incremental import AnalysisSession, TextEdit
+
+
+INITIAL = """VAR _Sales = SUM(Sales[Amount])
+VAR _Cost = SUMX(Sales, Sales[Qty] * Sales[Cost])
+RETURN
+    CALCULATE(
+        _Sales - _Cost,
+        FILTER(ALL(Product), Product[Color] = "Red")
+    )"""
+
+# Fragmentos que abren y cierran textos, comentarios y llamadas a mitad de línea
+FRAGMENTS = [
+    'SUMX(Sales, ', 'FILTER(ALL(Sales), ', 'CALCULATE(', 'KEEPFILTERS(', ')', ', ', '\n', '\n    ',
+    '[Total Sales]', 'Sales[Amount]', "'Date'[Year]", '"x"', '"', '// nota\n', '/* ', ' */', '-- ',
+    'VAR _x = 1\n', 'RETURN ', 'EARLIER(Sales[Qty])', 'DIVIDE(', ' + ', 'IF(', 'VALUES(Product[Color])',
+    '= ADDCOLUMNS(', 'Tabla = ', ' ', 'x',
+]
+
+
+def _assert_matches_full_analysis(session):
+    expected = analyze_expression(session.text, timeout=None)
+    result = session.diagnostics().to_result()
+    assert result == expected, session.text
+
+
+def _assert_parse_matches(session):
+    expected = parse_dax_code(session.text)
+    parsed = session.parse()
+    for name in ('raw', 'object_type', 'name', 'functions', 'measures', 'has_variables', 'variables'):
+        assert getattr(parsed, name) == getattr(expected, name), (name, session.text)
+    assert set(parsed.tables) == set(expected.tables)
+    assert set(parsed.columns) == set(expected.columns)
+
+
+def _random_edit(rng, session):
+    start_line = rng.randrange(session.line_count)
+    end_line = min(session.line_count - 1, start_line + rng.choice([0, 0, 0, 1, 2]))
+    start_column = rng.randint(0, len(session.line(start_line)))
+    if start_line == end_line:
+        end_column = rng.randint(start_column, len(session.line(end_line)))
+    else:
+        end_column = rng.randint(0, len(session.line(end_line)))
+    if rng.random() < 0.3:
+        end_line, end_column = start_line, start_column  # Inserción pura
+    text = ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 3)))
+    return TextEdit(start_line, start_column, end_line, end_column, text)
+
+
+def _apply_to_text(text, edit):
+    lines = text.split('\n')
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line) + 1)
+    start = offsets[edit.start_line] + edit.start_column
+    end = offsets[edit.end_line] + edit.end_column
+    return text[:start] + edit.text + text[end:]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_edits_match_full_analysis(seed):
+    rng = random.Random(seed)
+    session = AnalysisSession(INITIAL, timeout=None)
+    expected_text = INITIAL
+
+    for step in range(30):
+        edit = _random_edit(rng, session)
+        session.apply_edit(edit)
+        expected_text = _apply_to_text(expected_text, edit)
+        assert session.text == expected_text
+
+        # Diagnosticar solo a veces: varias ediciones entre diagnósticos también deben cuadrar
+        if step % 3 == 0 or rng.random() < 0.3:
+            _assert_parse_matches(session)
+            _assert_matches_full_analysis(session)
+
+    _assert_matches_full_analysis(session)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_update_text_matches_full_analysis(seed):
+    rng = random.Random(1000 + seed)
+    session = AnalysisSession(INITIAL, timeout=None)
+    text = INITIAL
+
+    for _ in range(15):
+        text = _apply_to_text(text, _random_edit(rng, AnalysisSession(text)))
+        session.update_text(text)
+        assert session.text == text
+        _assert_matches_full_analysis(session)
+
+
+def test_tokens_are_relexed_past_the_edit_when_the_state_changes():
+    session = AnalysisSession('SUM(T[a])\n+ 1\n+ 2', timeout=None)
+    session.apply_edit(TextEdit(0, 0, 0, 0, '/* '))
+    assert session.diagnostics().to_result() == analyze_expression(session.text, timeout=None)
+
+    # Cerrar el comentario vuelve a tokenizar las líneas siguientes como código
+    session.apply_edit(TextEdit(1, 0, 1, 0, '*/ '))
+    kinds = [token.kind for token in session.tokens(2)]
+    assert kinds == [token.kind for token in AnalysisSession(session.text).tokens(2)]
+    assert session.diagnostics().to_result() == analyze_expression(session.text, timeout=None)
+
+
+def test_unchanged_rules_are_not_rerun():
+    session = AnalysisSession(INITIAL, timeout=None)
+    first = session.diagnostics()
+    assert session.diagnostics() is first
+
+    # Un cambio en un texto no altera referencias a medidas ni el tipo de objeto
+    session.apply_edit(TextEdit(5, 47, 5, 50, 'Blue'))
+    second = session.diagnostics()
+
+    assert 'check_context_transitions' not in second.rules_run
+    assert second.to_result() == analyze_expression(session.text, timeout=None)
+
+
+@pytest.mark.parametrize('edit', [
+    TextEdit(7, 0, 7, 0, 'x'),
+    TextEdit(0, 5, 0, 2, ''),
+    TextEdit(0, 0, 0, 200, ''),
+])
+def test_invalid_ranges_are_rejected(edit):
+    session = AnalysisSession(INITIAL)
+    with pytest.raises(ValueError):
+        session.apply_edit(edit)
+    assert session.text == INITIAL
@@ -0,0 +1,74 @@
+"""
+Tests de la deduplicación de expresiones: qué copias se agrupan y ubicación de sus issues
+"""
+
+import pytest
+
+from core.analysis_runner import analyze_measures
+from core.measure_dedup import expression_hash, group_measures_by_expression, normalize_expression
+
+
+@pytest.mark.parametrize('first, second', [
+    ('SUM(T[v])', '  SUM(T[v])\n'),
+    ('CALCULATE(\n    SUM(T[v]),\n    T[c] = "x"\n)', 'CALCULATE( SUM(T[v]), T[c] = "x" )'),
+    ('SUM(T[v]) // total\n+ 1', 'SUM(T[v]) // total\n\n    + 1'),
+    ('SUM(T[v]) /* a\n b */ + 1', 'SUM(T[v])\n/* a\n b */\n+ 1'),
+])
+def test_whitespace_between_tokens_is_ignored(first, second):
+    assert expression_hash(first) == expression_hash(second)
+
+
+@pytest.mark.parametrize('first, second', [
+    # El salto de línea cierra el comentario: en la segunda, '+ SUM(B[y])' es parte de él
+    ('SUM(A[x]) // note\n+ SUM(B[y])', 'SUM(A[x]) // note + SUM(B[y])'),
+    ('SUM(A[x]) -- note\n+ SUM(B[y])', 'SUM(A[x]) -- note + SUM(B[y])'),
+    # Espacios dentro de nombres, textos y comentarios
+    ("SUM('My  Table'[x])", "SUM('My Table'[x])"),
+    ('SUM(T[My  Column])', 'SUM(T[My Column])'),
+    ('T[c] = "a  b"', 'T[c] = "a b"'),
+    ('SUM(T[v]) /* a  b */', 'SUM(T[v]) /* a b */'),
+    # Los delimitadores dentro de un nombre no abren un texto ni un comentario
+    ("SUM('It''s  -- x'[v])", "SUM('It''s -- x'[v])"),
+])
+def test_different_expressions_do_not_collide(first, second):
+    assert normalize_expression(first) != normalize_expression(second)
+    assert expression_hash(first) != expression_hash(second)
+
+
+def test_groups_keep_measures_in_first_appearance_order():
+    measures = [
+        {'name': 'A', 'table': 'T', 'expression': 'SUM(T[v])'},
+        {'name': 'B', 'table': 'T', 'expression': "SUM('T  2'[v])"},
+        {'name': 'C', 'table': 'T', 'expression': '\nSUM(T[v])  '},
+        {'name': 'D', 'table': 'T', 'expression': "SUM('T 2'[v])"},
+    ]
+
+    groups = group_measures_by_expression(measures)
+
+    assert [[m['name'] for m in group.measures] for group in groups] == [['A', 'C'], ['B'], ['D']]
+
+
+def test_shared_issues_are_located_in_each_copy():
+    first = 'CALCULATE(SUM(T[v]), FILTER(ALL(T), T[c] = 1))'
+    second = '\n\n  CALCULATE(SUM(T[v]),\n      FILTER(ALL(T), T[c] = 1))'
+    analyzed, _ = analyze_measures([
+        {'name': 'A', 'table': 'T', 'expression': first},
+        {'name': 'B', 'table': 'T', 'expression': second},
+    ], workers=0)
+
+    located = {
+        measure['name']: {(issue.id, issue.line, issue.column) for issue in measure['issues'] if issue.line}
+        for measure in analyzed
+    }
+    assert located == {'A': {('all-in-filter', 1, 21)}, 'B': {('all-in-filter', 4, 6)}}
+
+
+def test_analyze_measures_reports_group_stats():
+    stats = {}
+    analyze_measures([
+        {'name': 'A', 'table': 'T', 'expression': 'SUM(T[v])'},
+        {'name': 'B', 'table': 'T', 'expression': 'SUM(T[v])\n'},
+        {'name': 'C', 'table': 'T', 'expression': 'SUM(T[w])'},
+    ], workers=0, dedup_stats=stats)
+
+    assert stats == {'total_measures': 3, 'unique_expressions': 2, 'duplicated_measures': 1}
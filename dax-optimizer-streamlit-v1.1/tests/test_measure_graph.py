@@ -0,0 +1,107 @@
+"""
+Tests del grafo de dependencias: alcanzabilidad desde el reporte y los objetos calculados
+"""
+
+from core.measure_graph import build_dependency_graph, exclude_dead_measures, find_dead_measures, find_reachable
+from core.report_usage import MeasureUsage, ReportUsage
+
+
+def _measure(name, expression, object_type='measure'):
+    return {'name': name, 'table': 'Sales', 'expression': expression, 'object_type': object_type}
+
+
+MEASURES = [
+    _measure('Total Sales', 'SUM(Sales[Amount])'),
+    _measure('Total Cost', 'SUM(Sales[Cost])'),
+    _measure('Margin', '[Total Sales] - [total cost]'),
+    _measure('Margin %', 'DIVIDE([Margin], [Total Sales])'),
+    # Ciclo entre dos medidas que ningún visual usa
+    _measure('Loop A', '[Loop B] + 1'),
+    _measure('Loop B', '[Loop A] - 1'),
+    _measure('Self', '[Self] + [Missing]'),
+    _measure('Old KPI', '[Margin] * 2'),
+    _measure('Refresh Base', 'COUNTROWS(Sales)'),
+    _measure('Band Limit', '100'),
+    _measure('Sales Band', 'IF(Sales[Amount] > [Band Limit], "High", "Low")', 'calculated-column'),
+    _measure('Summary', 'ROW("Rows", [Refresh Base])', 'calculated-table'),
+    # Columna con el mismo nombre que una medida: no es una medida
+    _measure('Amount', 'Sales[Qty] * Sales[Price]', 'calculated-column'),
+]
+
+
+def _usage(*names):
+    return ReportUsage(measures={name.lower(): MeasureUsage(name, visual_count=1) for name in names})
+
+
+def test_graph_links_measures_case_insensitively_and_drops_other_references():
+    graph = build_dependency_graph(MEASURES)
+
+    assert set(graph) == {'total sales', 'total cost', 'margin', 'margin %', 'loop a', 'loop b', 'self',
+                          'old kpi', 'refresh base', 'band limit'}
+    assert graph['margin'] == ['total cost', 'total sales']
+    assert graph['margin %'] == ['margin', 'total sales']
+    assert graph['loop a'] == ['loop b'] and graph['loop b'] == ['loop a']
+    # Sin autorreferencias ni medidas inexistentes
+    assert graph['self'] == []
+    assert graph['total sales'] == []
+
+
+def test_reachability_is_transitive_and_terminates_on_cycles():
+    graph = build_dependency_graph(MEASURES)
+
+    assert find_reachable(graph, ['MARGIN %', 'Unknown']) == {'margin %', 'margin', 'total sales', 'total cost'}
+    assert find_reachable(graph, ['Loop A']) == {'loop a', 'loop b'}
+    assert find_reachable(graph, []) == set()
+
+
+def test_dead_measures_keep_report_and_calculated_roots():
+    reachability = find_dead_measures(MEASURES, _usage('Margin %', 'Not In Model'))
+
+    assert reachability.roots == {'margin %', 'band limit', 'refresh base'}
+    assert [measure['name'] for measure in reachability.unreachable] == ['Loop A', 'Loop B', 'Self', 'Old KPI']
+    assert reachability.is_reachable('TOTAL COST')
+    assert not reachability.is_reachable('Old KPI')
+
+
+def test_extra_roots_and_cycles_reachable_from_a_visual():
+    reachability = find_dead_measures(MEASURES, _usage('Loop B'), extra_roots=['old kpi'])
+
+    assert [measure['name'] for measure in reachability.unreachable] == ['Margin %', 'Self']
+
+
+def test_empty_report_leaves_only_calculated_roots():
+    reachability = find_dead_measures(MEASURES, ReportUsage())
+
+    assert reachability.reachable == {'band limit', 'refresh base'}
+
+
+def test_exclude_dead_measures_keeps_calculated_objects_and_order():
+    reachability = find_dead_measures(MEASURES, _usage('Old KPI'))
+
+    kept = exclude_dead_measures(MEASURES, reachability)
+
+    assert [measure['name'] for measure in kept] == [
+        'Total Sales', 'Total Cost', 'Margin', 'Old KPI', 'Refresh Base', 'Band Limit',
+        'Sales Band', 'Summary', 'Amount'
+    ]
+
+
+def test_table_qualified_measure_references_are_edges():
+    measures = [
+        _measure('A', 'Sales[B] * 2'),
+        _measure('B', 'SUM(Sales[Amount])'),
+        _measure('C', "'Sales'[total c] + [Missing]"),
+        _measure('Total C', '1'),
+        _measure('Flag', 'IF(Sales[Row Count] > 0, 1)', 'calculated-column'),
+        _measure('Row Count', 'COUNTROWS(Sales)'),
+    ]
+
+    assert build_dependency_graph(measures)['a'] == ['b']
+    assert build_dependency_graph(measures)['c'] == ['total c']
+
+    reachability = find_dead_measures(measures, _usage('A'))
+
+    assert reachability.is_reachable('B')
+    # Columna calculada con Tabla[Medida]: la medida es raíz
+    assert reachability.roots == {'a', 'row count'}
+    assert [measure['name'] for measure in reachability.unreachable] == ['C', 'Total C']
@@ -0,0 +1,174 @@
+"""
+Tests de las reglas del modelo: una por regla, con y sin estadísticas VertiPaq, y agrupación por objeto
+"""
+
+from core.model_analyzer import (
+    DATE_ONLY_MAX_CARDINALITY,
+    MODEL_RULES,
+    analyze_model,
+    check_auto_date_tables,
+    check_bidirectional_relationships,
+    check_high_precision_datetime,
+    check_many_to_many_relationships,
+    check_unused_hidden_columns
+)
+from core.model_metadata import ColumnInfo, ModelMetadata, RelationshipInfo, TableInfo
+from core.vpax_importer import ColumnStatistics, ModelStatistics, TableStatistics
+
+
+def _findings(rule, metadata, statistics=None):
+    return [(finding.object_type, finding.table, finding.name, finding.issue.id, finding.rows)
+            for finding in rule(metadata, statistics)]
+
+
+def _statistics(tables=(), columns=()):
+    statistics = ModelStatistics()
+    for name, rows in tables:
+        statistics.tables[name.lower()] = TableStatistics(name, rows)
+    for table, column, cardinality in columns:
+        statistics.columns[f"{table}[{column}]".lower()] = ColumnStatistics(table, column, cardinality)
+    return statistics
+
+
+SALES = TableInfo('Sales', columns=[
+    ColumnInfo('OrderDate', 'dateTime'),
+    ColumnInfo('ShipDate', 'dateTime', date_type='Date'),
+    ColumnInfo('Timestamp', 'dateTime', date_type='DateTime'),
+    ColumnInfo('LoadTime', 'dateTime', format_string='General Date'),
+    ColumnInfo('Hour', 'dateTime', format_string='h:nn', date_type='Time'),
+    ColumnInfo('Amount', 'double'),
+    ColumnInfo('ProductKey', 'int64', is_hidden=True),
+    ColumnInfo('LegacyCode', 'string', is_hidden=True),
+    ColumnInfo('SortKey', 'int64', is_hidden=True),
+    ColumnInfo('RowNumber-2662979B', 'int64', is_hidden=True),
+])
+
+
+def test_auto_date_tables_are_reported_on_their_date_column():
+    metadata = ModelMetadata(
+        tables=[SALES, TableInfo('LocalDateTable_1a2b', is_hidden=True)],
+        relationships=[
+            RelationshipInfo('Sales', 'orderdate', 'LocalDateTable_1a2b', 'Date'),
+            RelationshipInfo('Sales', 'DueDate', 'LocalDateTable_3c4d', 'Date'),
+            RelationshipInfo('DateTableTemplate_x', 'Date', 'LocalDateTable_1a2b', 'Date'),
+            RelationshipInfo('Sales', 'ProductKey', 'Product', 'ProductKey'),
+        ]
+    )
+
+    findings = list(check_auto_date_tables(metadata, None))
+
+    assert [(f.table, f.name, f.issue.params) for f in findings] == [
+        ('Sales', 'OrderDate', (('table', 'LocalDateTable_1a2b'),)),
+        # Columna que no está en los metadatos: se asume dateTime
+        ('Sales', 'DueDate', (('table', 'LocalDateTable_3c4d'),)),
+    ]
+    assert findings[1].definition == 'Sales[DueDate]\ndataType: dateTime'
+
+
+def test_bidirectional_relationships_with_rows_from_statistics():
+    metadata = ModelMetadata(relationships=[
+        RelationshipInfo('Sales', 'ProductKey', 'Product', 'ProductKey', cross_filtering='bothDirections'),
+        RelationshipInfo('Sales', 'StoreKey', 'Store', 'StoreKey', cross_filtering='BothDirections'),
+        RelationshipInfo('Sales', 'DateKey', 'Dates', 'DateKey', cross_filtering='automatic'),
+    ])
+    statistics = _statistics(tables=[('Sales', 1_000_000), ('Product', 500)])
+
+    assert _findings(check_bidirectional_relationships, metadata) == [
+        ('relationship', 'Sales', 'Sales[ProductKey] -> Product[ProductKey]', 'bidirectional-relationship', None),
+        ('relationship', 'Sales', 'Sales[StoreKey] -> Store[StoreKey]', 'bidirectional-relationship', None),
+    ]
+    assert [row[-1] for row in _findings(check_bidirectional_relationships, metadata, statistics)] == [
+        1_000_000, 1_000_000
+    ]
+    finding = next(check_bidirectional_relationships(metadata, None))
+    assert 'crossFilteringBehavior: bothDirections' in finding.definition
+
+
+def test_many_to_many_relationships():
+    metadata = ModelMetadata(relationships=[
+        RelationshipInfo('Budget', 'Region', 'Store', 'Region', to_cardinality='many', is_active=False),
+        RelationshipInfo('Sales', 'StoreKey', 'Store', 'StoreKey'),
+        RelationshipInfo('Store', 'Key', 'Sales', 'Key', from_cardinality='one', to_cardinality='many'),
+    ])
+    statistics = _statistics(tables=[('Store', 40)])
+
+    findings = list(check_many_to_many_relationships(metadata, statistics))
+
+    assert [(f.name, f.issue.id, f.rows) for f in findings] == [
+        ('Budget[Region] -> Store[Region]', 'many-to-many-relationship', 40)
+    ]
+    assert findings[0].definition.endswith('isActive: false')
+
+
+def test_high_precision_datetime_from_metadata():
+    auto_date = TableInfo('LocalDateTable_1', columns=[ColumnInfo('Date', 'dateTime', date_type='DateTime')])
+    metadata = ModelMetadata(tables=[SALES, auto_date])
+
+    # Sin estadísticas: la anotación decide y, si falta, un formato con hora; 'Time' nunca se reporta
+    assert [row[2] for row in _findings(check_high_precision_datetime, metadata)] == ['Timestamp', 'LoadTime']
+
+
+def test_high_precision_datetime_statistics_override_metadata():
+    metadata = ModelMetadata(tables=[SALES])
+    statistics = _statistics(columns=[
+        ('Sales', 'OrderDate', DATE_ONLY_MAX_CARDINALITY + 1),
+        ('Sales', 'Timestamp', 1_000),
+    ])
+
+    # OrderDate por cardinalidad; Timestamp deja de reportarse; LoadTime sigue por su formato
+    assert _findings(check_high_precision_datetime, metadata, statistics) == [
+        ('column', 'Sales', 'OrderDate', 'high-precision-datetime', DATE_ONLY_MAX_CARDINALITY + 1),
+        ('column', 'Sales', 'LoadTime', 'high-precision-datetime', None),
+    ]
+
+
+def test_unused_hidden_columns():
+    metadata = ModelMetadata(
+        tables=[
+            SALES,
+            TableInfo('Summary', is_calculated=True, columns=[ColumnInfo('Hidden', is_hidden=True)]),
+            TableInfo('LocalDateTable_1', is_hidden=True, columns=[ColumnInfo('MonthNo', is_hidden=True)]),
+        ],
+        relationships=[RelationshipInfo('Sales', 'productkey', 'Product', 'ProductKey')],
+        column_references={'sortkey'}
+    )
+    statistics = _statistics(columns=[('Sales', 'LegacyCode', 12)])
+
+    assert _findings(check_unused_hidden_columns, metadata, statistics) == [
+        ('column', 'Sales', 'LegacyCode', 'unused-hidden-column', 12)
+    ]
+
+
+def test_analyze_model_groups_findings_by_object():
+    metadata = ModelMetadata(
+        tables=[SALES],
+        relationships=[
+            RelationshipInfo('Sales', 'OrderDate', 'LocalDateTable_1', 'Date'),
+            RelationshipInfo('Sales', 'ProductKey', 'Product', 'ProductKey', to_cardinality='many',
+                             cross_filtering='bothDirections'),
+        ]
+    )
+
+    analyzed = analyze_model(metadata, _statistics(tables=[('Sales', 10)]))
+
+    by_object = {(item['object_type'], item['name']): item for item in analyzed}
+    assert list(by_object) == [
+        ('column', 'OrderDate'),
+        ('relationship', 'Sales[ProductKey] -> Product[ProductKey]'),
+        ('column', 'Timestamp'),
+        ('column', 'LoadTime'),
+        ('column', 'LegacyCode'),
+        ('column', 'SortKey'),
+    ]
+    relationship = by_object[('relationship', 'Sales[ProductKey] -> Product[ProductKey]')]
+    assert [issue.id for issue in relationship['issues']] == ['bidirectional-relationship',
+                                                             'many-to-many-relationship']
+    assert relationship['issue_rows'] == [10, 10]
+    assert relationship['metrics'] is None
+    assert 0 <= relationship['base_score'] < 100
+    assert len({s.template_id for s in relationship['suggestions']}) == len(relationship['suggestions'])
+
+
+def test_empty_model_has_no_findings():
+    assert analyze_model(ModelMetadata()) == []
+    assert all(list(rule(ModelMetadata(), None)) == [] for rule in MODEL_RULES)
@@ -0,0 +1,149 @@
+"""
+Tests del índice del modelo: qué archivos se reutilizan, verifican por hash o reparsean
+"""
+
+import os
+import time
+
+import pytest
+
+from core import model_index
+from core.model_index import get_index_path, load_index, load_model_indexed
+from core.pbip_extractor import load_tmdl_files
+
+
+def _table(name, expression):
+    return f"table {name}\n\n\tmeasure 'Total {name}' = {expression}\n\n\tcolumn Amount\n\t\tdataType: double\n"
+
+
+@pytest.fixture
+def definition(tmp_path):
+    tables = tmp_path / 'Model.SemanticModel' / 'definition' / 'tables'
+    tables.mkdir(parents=True)
+    for name in ('Sales', 'Stock'):
+        (tables / f'{name}.tmdl').write_text(_table(name, 'SUM(T[a])'), encoding='utf-8')
+    _age(tables.parent)
+    return tables.parent
+
+
+def _age(folder, seconds=60, pattern='*.tmdl'):
+    """Lleva el mtime de los .tmdl fuera de la ventana de carrera del índice"""
+    old = time.time_ns() - seconds * 1_000_000_000
+    for path in folder.rglob(pattern):
+        os.utime(path, ns=(old, old))
+
+
+def _load(definition, tmp_path):
+    return load_model_indexed(str(definition), cache_dir=str(tmp_path / 'cache'), max_workers=2)
+
+
+def _counts(stats):
+    return stats.files_reused, stats.files_verified, stats.files_parsed, stats.files_removed
+
+
+def _expressions(measures):
+    return {measure['name']: measure['expression'] for measure in measures}
+
+
+def test_second_load_reuses_unchanged_files(definition, tmp_path):
+    first, _, first_stats = _load(definition, tmp_path)
+    second, _, second_stats = _load(definition, tmp_path)
+
+    assert _counts(first_stats) == (0, 0, 2, 0)
+    assert _counts(second_stats) == (2, 0, 0, 0)
+    assert second_stats.reuse_rate == 1.0
+    # Mismo resultado y orden que la lectura sin índice
+    assert first == second == load_tmdl_files(str(definition))[0]
+
+
+def test_size_change_reparses_only_that_file(definition, tmp_path):
+    _load(definition, tmp_path)
+    sales = definition / 'tables' / 'Sales.tmdl'
+    sales.write_text(_table('Sales', 'SUM(T[a]) + 1'), encoding='utf-8')
+    _age(definition, pattern='Sales.tmdl')
+
+    measures, _, stats = _load(definition, tmp_path)
+
+    assert _counts(stats) == (1, 0, 1, 0)
+    assert _expressions(measures)['Total Sales'] == 'SUM(T[a]) + 1'
+
+
+def test_mtime_change_with_same_content_is_verified_by_hash(definition, tmp_path):
+    _load(definition, tmp_path)
+    _age(definition, seconds=30)
+
+    measures, _, stats = _load(definition, tmp_path)
+
+    assert _counts(stats) == (0, 2, 0, 0)
+    assert _expressions(measures) == {'Total Sales': 'SUM(T[a])', 'Total Stock': 'SUM(T[a])'}
+
+
+def test_same_size_with_new_content_is_reparsed(definition, tmp_path):
+    _load(definition, tmp_path)
+    sales = definition / 'tables' / 'Sales.tmdl'
+    stat = os.stat(sales)
+    sales.write_text(_table('Sales', 'SUM(T[b])'), encoding='utf-8')
+    os.utime(sales, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    measures, _, stats = _load(definition, tmp_path)
+
+    assert os.stat(sales).st_size == stat.st_size
+    assert _counts(stats) == (1, 0, 1, 0)
+    assert _expressions(measures)['Total Sales'] == 'SUM(T[b])'
+
+
+def test_files_inside_the_racy_window_are_rehashed(definition, tmp_path):
+    # Guardado justo antes del índice: el mismo mtime no garantiza el mismo contenido
+    sales = definition / 'tables' / 'Sales.tmdl'
+    now = time.time_ns()
+    os.utime(sales, ns=(now, now))
+    _load(definition, tmp_path)
+
+    _, _, stats = _load(definition, tmp_path)
+    assert _counts(stats) == (1, 1, 0, 0)
+
+    # Mismo tamaño y mtime pero otro contenido: se detecta por el hash
+    sales.write_text(_table('Sales', 'SUM(T[b])'), encoding='utf-8')
+    os.utime(sales, ns=(now, now))
+    measures, _, stats = _load(definition, tmp_path)
+
+    assert _counts(stats) == (1, 0, 1, 0)
+    assert _expressions(measures)['Total Sales'] == 'SUM(T[b])'
+
+
+def test_racy_window_is_relative_to_index_write_time(definition, tmp_path, monkeypatch):
+    monkeypatch.setattr(model_index, 'RACY_WINDOW_NS', 0)
+    sales = definition / 'tables' / 'Sales.tmdl'
+    now = time.time_ns()
+    os.utime(sales, ns=(now, now))
+    _load(definition, tmp_path)
+
+    _, _, stats = _load(definition, tmp_path)
+
+    assert _counts(stats) == (2, 0, 0, 0)
+
+
+def test_removed_and_new_files(definition, tmp_path):
+    _load(definition, tmp_path)
+    (definition / 'tables' / 'Stock.tmdl').unlink()
+    (definition / 'tables' / 'Budget.tmdl').write_text(_table('Budget', 'SUM(T[c])'), encoding='utf-8')
+    _age(definition, pattern='Budget.tmdl')
+
+    measures, _, stats = _load(definition, tmp_path)
+
+    assert _counts(stats) == (1, 0, 1, 1)
+    assert set(_expressions(measures)) == {'Total Sales', 'Total Budget'}
+
+
+@pytest.mark.parametrize('content', ['{not json', '[]', '{"version": 0, "files": {}}'])
+def test_corrupt_or_outdated_index_is_rebuilt(definition, tmp_path, content):
+    index_path = get_index_path(str(definition), str(tmp_path / 'cache'))
+    os.makedirs(os.path.dirname(index_path))
+    with open(index_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+    measures, _, stats = _load(definition, tmp_path)
+
+    assert _counts(stats) == (0, 0, 2, 0)
+    assert len(measures) == 2
+    assert load_index(index_path, str(definition))['version'] == model_index.INDEX_VERSION
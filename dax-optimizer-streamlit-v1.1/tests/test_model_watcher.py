@@ -0,0 +1,131 @@
+"""
+Tests del modo watch: diferencias entre snapshots y re-análisis incremental
+"""
+
+import os
+
+import pytest
+
+from core import model_watcher
+from core.model_watcher import ModelWatcher, diff_snapshots, snapshot_model_files
+from core.report_usage import MeasureUsage, ReportUsage
+
+
+SALES_TMDL = """table Sales
+
+\tmeasure 'Total Sales' = [Base] * 2
+
+\tmeasure Base = SUM(Sales[Amount])
+
+\tmeasure Unused = SUMX(Sales, Sales[Qty] * Sales[Price])
+
+\tcolumn Amount
+\t\tdataType: double
+"""
+
+
+@pytest.fixture
+def project(tmp_path):
+    tables = tmp_path / 'Model.SemanticModel' / 'definition' / 'tables'
+    tables.mkdir(parents=True)
+    (tables / 'Sales.tmdl').write_text(SALES_TMDL, encoding='utf-8')
+    return tmp_path
+
+
+def _watcher(project, **kwargs):
+    return ModelWatcher(str(project / 'Model.SemanticModel'), workers=0, index_dir=str(project / 'cache'), **kwargs)
+
+
+def _edit(path, old, new):
+    content = path.read_text(encoding='utf-8')
+    path.write_text(content.replace(old, new), encoding='utf-8')
+    # Un mtime distinto aunque el sistema de archivos tenga poca resolución
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_diff_snapshots_lists_new_modified_and_deleted_files():
+    previous = {'a.tmdl': (10, 1), 'b.tmdl': (10, 1), 'c.tmdl': (10, 1)}
+    current = {'a.tmdl': (10, 1), 'b.tmdl': (10, 2), 'd.tmdl': (5, 1)}
+
+    assert diff_snapshots(previous, current) == ['b.tmdl', 'c.tmdl', 'd.tmdl']
+    assert diff_snapshots(current, dict(current)) == []
+
+
+def test_snapshot_only_includes_model_files(project):
+    definition = project / 'Model.SemanticModel' / 'definition'
+    (definition / 'notes.txt').write_text('x', encoding='utf-8')
+
+    assert list(snapshot_model_files(str(definition))) == [os.path.join('tables', 'Sales.tmdl')]
+
+
+def test_refresh_reanalyzes_only_cache_misses(project, monkeypatch):
+    monkeypatch.setattr(model_watcher, 'DEBOUNCE_SECONDS', 0)
+    watcher = _watcher(project)
+
+    first = watcher.refresh()
+    assert first.analyzed_expressions == 3
+    assert watcher.poll() == []
+
+    _edit(project / 'Model.SemanticModel' / 'definition' / 'tables' / 'Sales.tmdl',
+          'SUM(Sales[Amount])', 'SUM(Sales[Amount]) + 0')
+    changed = watcher.poll()
+    second = watcher.refresh(changed)
+
+    assert changed == [os.path.join('tables', 'Sales.tmdl')]
+    assert (second.cycle, second.changed_files, second.analyzed_expressions) == (1, changed, 1)
+    base, = [measure for measure in second.ranked_measures if measure.name == 'Base']
+    assert base.expression == 'SUM(Sales[Amount]) + 0'
+    assert watcher.refresh().analyzed_expressions == 0
+
+
+def test_refresh_excludes_dead_measures_every_cycle(project):
+    usage = ReportUsage(measures={'total sales': MeasureUsage('Total Sales', visual_count=1)})
+    watcher = _watcher(project, report_usage=usage, exclude_dead=True)
+
+    update = watcher.refresh()
+
+    assert [measure['name'] for measure in update.dead_measures] == ['Unused']
+    assert {measure.name for measure in update.ranked_measures if measure.is_measure} == {'Total Sales', 'Base'}
+
+    # Una medida que deja de usarse queda excluida en el ciclo siguiente
+    _edit(project / 'Model.SemanticModel' / 'definition' / 'tables' / 'Sales.tmdl', '[Base] * 2', '2')
+    update = watcher.refresh()
+    assert [measure['name'] for measure in update.dead_measures] == ['Base', 'Unused']
+
+    # Sin exclude_dead se rankean todas
+    watcher.exclude_dead = False
+    assert watcher.refresh().dead_measures == []
+
+
+def test_shared_expressions_are_reparsed_only_for_changed_measures(project):
+    sales = project / 'Model.SemanticModel' / 'definition' / 'tables' / 'Sales.tmdl'
+    _edit(sales, '\tmeasure Unused', '\tmeasure Margin = (SUM(Sales[Amount]) - SUM(Sales[Cost])) * 2\n\n\tmeasure Unused')
+    _edit(sales, '\tmeasure Base = SUM(Sales[Amount])', '\tmeasure Base = DIVIDE(SUM(Sales[Amount]) - SUM(Sales[Cost]), 3)')
+    watcher = _watcher(project)
+
+    def shared(update):
+        return sorted(measure.name for measure in update.ranked_measures
+                      if any(issue.id == 'shared-subexpression' for issue in measure.issues))
+
+    assert shared(watcher.refresh()) == ['Base', 'Margin']
+    assert watcher.shared_expressions.parsed == 4
+
+    # Sin cambios en las medidas: se repite el resultado sin parsear
+    assert shared(watcher.refresh()) == ['Base', 'Margin']
+    assert watcher.shared_expressions.parsed == 4
+
+    _edit(sales, ', 3)', ', 4)')
+    assert shared(watcher.refresh()) == ['Base', 'Margin']
+    assert watcher.shared_expressions.parsed == 5
+
+
+def test_relationship_rewrites_are_cached_between_cycles(project):
+    watcher = _watcher(project)
+
+    watcher.refresh()
+    misses = watcher.relationship_rewrites.misses
+    assert misses == 3 and len(watcher.relationship_rewrites) == 3
+
+    watcher.refresh()
+    assert watcher.relationship_rewrites.misses == misses
@@ -0,0 +1,330 @@
+"""
+Tests de regresión de dax_parser y dax_analyzer (tabla de casos)
+
+Los campos del parseo son la salida del parser por expresiones regulares
+antes de las optimizaciones de rendimiento, incluidas sus limitaciones
+conocidas: no salta textos ni comentarios, y un ]] escapado corta el nombre.
+Un cambio que corrija alguna debe actualizar la tabla a conciencia. Los
+issues incluyen las reglas agregadas después (repeated-subexpression).
+"""
+
+import pytest
+
+from core.dax_analyzer import analyze_dax
+from core.dax_parser import parse_dax_code
+
+
+# (nombre del caso, código, campos esperados del parseo, ids de issues ordenados)
+CASES = [
+    (
+        'nested-iterators',
+        'SUMX(Ventas, SUMX(Productos, Productos[Precio] * Ventas[Cantidad]))',
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [('SUMX', 1, 0, True), ('SUMX', 1, 13, True)],
+            'tables': ['Productos', 'Ventas'],
+            'columns': ['Productos[Precio]', 'Ventas[Cantidad]'],
+            'measures': [],
+            'variables': [],
+        },
+        ['nested-iterators'],
+    ),
+    (
+        'nested-iterators-multiline',
+        'SUMX(\n    Ventas,\n    AVERAGEX(Productos, Productos[Precio])\n)',
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [('SUMX', 1, 0, True), ('AVERAGEX', 3, 4, True)],
+            'tables': ['Productos'],
+            'columns': ['Productos[Precio]'],
+            'measures': [],
+            'variables': [],
+        },
+        ['nested-iterators', 'nested-iterators', 'nested-iterators'],
+    ),
+    (
+        'iterator-filter',
+        'Total = SUMX(FILTER(Ventas, Ventas[Monto] > 100), Ventas[Monto] * [Tasa])',
+        {
+            'object_type': 'measure',
+            'name': 'Total',
+            'functions': [('FILTER', 1, 13, False), ('SUMX', 1, 8, True)],
+            'tables': ['Ventas'],
+            'columns': ['Ventas[Monto]'],
+            'measures': ['Tasa'],
+            'variables': [],
+        },
+        ['nested-iterators'],
+    ),
+    # "[AR]" es un texto pero se reporta como medida
+    (
+        'string-with-brackets',
+        'IF([Pais] = "[AR]", SUM(Ventas[Monto]), 0)',
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [('SUM', 1, 20, False), ('IF', 1, 0, False)],
+            'tables': ['Ventas'],
+            'columns': ['Ventas[Monto]'],
+            'measures': ['AR', 'Pais'],
+            'variables': [],
+        },
+        [],
+    ),
+    (
+        'string-with-table-column',
+        'Etiqueta = "Ventas[Monto]" & FORMAT([Total], "0")',
+        {
+            'object_type': 'measure',
+            'name': 'Etiqueta',
+            'functions': [('FORMAT', 1, 29, False)],
+            'tables': ['Ventas'],
+            'columns': ['Ventas[Monto]'],
+            'measures': ['Total'],
+            'variables': [],
+        },
+        [],
+    ),
+    (
+        'string-with-function',
+        'IF(SELECTEDVALUE(T[c]) = "CALCULATE(", 1, 0)',
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [('CALCULATE', 1, 26, False), ('IF', 1, 0, False), ('SELECTEDVALUE', 1, 3, False)],
+            'tables': ['T'],
+            'columns': ['T[c]'],
+            'measures': [],
+            'variables': [],
+        },
+        [],
+    ),
+    # Las referencias y funciones comentadas se cuentan
+    (
+        'line-comment',
+        'Total = SUM(Ventas[Monto]) // [Comentada] y CALCULATE(\n+ [Otra]',
+        {
+            'object_type': 'measure',
+            'name': 'Total',
+            'functions': [('CALCULATE', 1, 44, False), ('SUM', 1, 8, False)],
+            'tables': ['Ventas'],
+            'columns': ['Ventas[Monto]'],
+            'measures': ['Comentada', 'Otra'],
+            'variables': [],
+        },
+        [],
+    ),
+    (
+        'dash-comment',
+        '-- SUMX(T, SUMX(U, U[x]))\nSUM(Ventas[Monto])',
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [('SUMX', 1, 3, True), ('SUMX', 1, 11, True), ('SUM', 2, 0, False)],
+            'tables': ['U', 'Ventas'],
+            'columns': ['U[x]', 'Ventas[Monto]'],
+            'measures': [],
+            'variables': [],
+        },
+        ['nested-iterators'],
+    ),
+    (
+        'block-comment',
+        '/* FILTER(ALL(Ventas), Ventas[Pais] = "AR") */\nCALCULATE([Total], Ventas[Pais] = "AR")',
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [('FILTER', 1, 3, False), ('ALL', 1, 10, False), ('CALCULATE', 2, 0, False)],
+            'tables': ['Ventas'],
+            'columns': ['Ventas[Pais]'],
+            'measures': ['Total'],
+            'variables': [],
+        },
+        ['all-in-filter'],
+    ),
+    # [Margen ]]bruto]] %] se corta en el primer ]
+    (
+        'escaped-brackets',
+        "[Margen ]]bruto]] %] + SUM('Ventas Netas'[Monto]])])",
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [('SUM', 1, 23, False)],
+            'tables': ['Netas'],
+            'columns': ['Netas[Monto]'],
+            'measures': ['Margen '],
+            'variables': [],
+        },
+        [],
+    ),
+    (
+        'quoted-table',
+        'CALCULATE(SUM(\'Ventas\'[Monto]), FILTER(ALL(\'Ventas\'), \'Ventas\'[Pais] = "AR"))',
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [
+                ('CALCULATE', 1, 0, False),
+                ('FILTER', 1, 32, False),
+                ('ALL', 1, 39, False),
+                ('SUM', 1, 10, False),
+            ],
+            'tables': ['Ventas'],
+            'columns': ['Ventas[Monto]', 'Ventas[Pais]'],
+            'measures': [],
+            'variables': [],
+        },
+        ['all-in-filter'],
+    ),
+    (
+        'nested-calculate',
+        'CALCULATE(CALCULATE([Total], T[a] = 1), T[b] = 2)',
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [('CALCULATE', 1, 0, False), ('CALCULATE', 1, 10, False)],
+            'tables': ['T'],
+            'columns': ['T[a]', 'T[b]'],
+            'measures': ['Total'],
+            'variables': [],
+        },
+        ['nested-calculate'],
+    ),
+    (
+        'keepfilters',
+        'CALCULATE([Total], FILTER(Ventas, Ventas[Monto] > 0))',
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [('CALCULATE', 1, 0, False), ('FILTER', 1, 19, False)],
+            'tables': ['Ventas'],
+            'columns': ['Ventas[Monto]'],
+            'measures': ['Total'],
+            'variables': [],
+        },
+        ['filter-without-keepfilters'],
+    ),
+    (
+        'variables',
+        'VAR Total = SUM(Ventas[Monto])\nVAR Sin Uso = 1\nRETURN\n    IF(Total > 0, Total, BLANK())',
+        {
+            'object_type': 'measure',
+            'name': 'VAR Total',
+            'functions': [('SUM', 1, 12, False), ('IF', 4, 4, False), ('BLANK', 4, 25, False)],
+            'tables': ['Ventas'],
+            'columns': ['Ventas[Monto]'],
+            'measures': [],
+            'variables': [('Total', 2)],
+        },
+        [],
+    ),
+    (
+        'calculated-column',
+        'Margen = Ventas[Monto] - RELATED(Productos[Costo]) + EARLIER(Ventas[Monto])',
+        {
+            'object_type': 'calculated-column',
+            'name': 'Margen',
+            'functions': [('EARLIER', 1, 53, False), ('RELATED', 1, 25, False)],
+            'tables': ['Productos', 'Ventas'],
+            'columns': ['Productos[Costo]', 'Ventas[Monto]'],
+            'measures': [],
+            'variables': [],
+        },
+        [],
+    ),
+    (
+        'calculated-table',
+        'Fechas = CALENDAR(DATE(2020, 1, 1), DATE(2025, 12, 31))',
+        {
+            'object_type': 'calculated-table',
+            'name': 'Fechas',
+            'functions': [('CALENDAR', 1, 9, False), ('DATE', 1, 18, False), ('DATE', 1, 36, False)],
+            'tables': [],
+            'columns': [],
+            'measures': [],
+            'variables': [],
+        },
+        [],
+    ),
+    (
+        'repeated-measure',
+        'DIVIDE([Ventas], [Costo]) + [Ventas] * 2 + [Ventas]',
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [('DIVIDE', 1, 0, False)],
+            'tables': [],
+            'columns': [],
+            'measures': ['Costo', 'Ventas'],
+            'variables': [],
+        },
+        ['repeated-measure-reference'],
+    ),
+    # Sin cerrar: el parser no valida la sintaxis
+    (
+        'unbalanced',
+        'CALCULATE(SUM(Ventas[Monto], FILTER(ALL(Ventas), Ventas[x] = "]"',
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [
+                ('CALCULATE', 1, 0, False),
+                ('FILTER', 1, 29, False),
+                ('ALL', 1, 36, False),
+                ('SUM', 1, 10, False),
+            ],
+            'tables': ['Ventas'],
+            'columns': ['Ventas[Monto]', 'Ventas[x]'],
+            'measures': [],
+            'variables': [],
+        },
+        ['all-in-filter', 'filter-without-keepfilters'],
+    ),
+    (
+        'many-functions',
+        'IF(ISBLANK(SUM(T[a])), 0, DIVIDE(SUM(T[a]), SUM(T[b])) + MAX(T[c]) + MIN(T[c]) + AVERAGE(T[d]) + COUNT(T[e]) + COUNTROWS(T) + DISTINCTCOUNT(T[f]) + ABS(SUM(T[g])))',
+        {
+            'object_type': 'measure',
+            'name': None,
+            'functions': [
+                ('SUM', 1, 11, False),
+                ('SUM', 1, 33, False),
+                ('SUM', 1, 44, False),
+                ('SUM', 1, 152, False),
+                ('AVERAGE', 1, 81, False),
+                ('COUNT', 1, 97, False),
+                ('MIN', 1, 69, False),
+                ('MAX', 1, 57, False),
+                ('IF', 1, 0, False),
+                ('ISBLANK', 1, 3, False),
+                ('DIVIDE', 1, 26, False),
+            ],
+            'tables': ['T'],
+            'columns': ['T[a]', 'T[b]', 'T[c]', 'T[d]', 'T[e]', 'T[f]', 'T[g]'],
+            'measures': [],
+            'variables': [],
+        },
+        ['no-variables-complex', 'repeated-subexpression'],
+    ),
+]
+
+
+@pytest.mark.parametrize('code, expected, issue_ids', [case[1:] for case in CASES],
+                         ids=[case[0] for case in CASES])
+def test_parse_and_analyze(code, expected, issue_ids):
+    parsed = parse_dax_code(code)
+    assert {
+        'object_type': parsed.object_type,
+        'name': parsed.name,
+        'functions': [(call.name, call.line, call.column, call.nested) for call in parsed.functions],
+        'tables': sorted(parsed.tables),
+        'columns': sorted(parsed.columns),
+        'measures': sorted(parsed.measures),
+        'variables': [(variable.name, variable.usage_count) for variable in parsed.variables],
+    } == expected
+
+    issues, metrics = analyze_dax(parsed)
+    assert sorted(issue.id for issue in issues) == issue_ids
+    assert metrics.function_count == len(parsed.functions)
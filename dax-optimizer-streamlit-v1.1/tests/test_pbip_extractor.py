@@ -0,0 +1,170 @@
+"""
+Tests de la extracción TMDL: medidas con propiedades, columnas y tablas calculadas y lectura en paralelo
+"""
+
+import threading
+import time
+
+from core import pbip_extractor
+from core.pbip_extractor import (
+    CALCULATED_COLUMN,
+    CALCULATED_TABLE,
+    MEASURE,
+    find_tmdl_files,
+    iter_tmdl_file_measures,
+    load_tmdl_files,
+    parse_tmdl_content,
+    parse_tmdl_files
+)
+
+
+SALES_TMDL = """table Sales
+
+\tmeasure 'Total Sales' = SUM(Sales[Amount])
+\t\tformatString: #,0
+\t\tdisplayFolder: KPIs
+
+\tmeasure Margin =
+\t\t\tVAR _Cost = SUM(Sales[Cost])
+\t\t\tRETURN
+\t\t\t\t[Total Sales] - _Cost
+\t\tformatString: 0.00%
+\t\tdisplayFolder: KPIs
+\tmeasure 'Customer''s Count' = DISTINCTCOUNT(Sales[CustomerKey])
+
+\tcolumn Amount
+\t\tdataType: double
+\t\tsourceColumn: Amount
+
+\tcolumn 'Amount x2' = Sales[Amount] * 2
+\t\tdataType: double
+\t\tformatString: 0
+
+\tcolumn Band =
+\t\t\tIF(
+\t\t\t\tSales[Amount] > 100,
+\t\t\t\t"High",
+\t\t\t\t"Low"
+\t\t\t)
+\t\tdataType: string
+
+\tpartition Sales = m
+\t\tmode: import
+\t\tsource = let Source = 1 in Source
+"""
+
+DATES_TMDL = """table Dates
+
+\tcolumn Date
+\t\tdataType: dateTime
+
+\tpartition Dates = calculated
+\t\tmode: import
+\t\tsource =
+\t\t\t\tCALENDAR(
+\t\t\t\t\tDATE(2020, 1, 1),
+\t\t\t\t\tDATE(2025, 12, 31)
+\t\t\t\t)
+\t\tannotation PBI_Id = 1
+"""
+
+
+def _by_name(objects):
+    return {(obj['object_type'], obj['name']): obj for obj in objects}
+
+
+def test_measure_properties_are_not_part_of_the_expression():
+    objects = _by_name(parse_tmdl_content(SALES_TMDL, 'Sales'))
+
+    total = objects[(MEASURE, 'Total Sales')]
+    margin = objects[(MEASURE, 'Margin')]
+    assert total['expression'] == 'SUM(Sales[Amount])'
+    assert total['format'] == '#,0'
+    assert margin['expression'] == 'VAR _Cost = SUM(Sales[Cost])\nRETURN\n[Total Sales] - _Cost'
+    assert margin['format'] == '0.00%'
+
+
+def test_measure_without_blank_line_or_properties_and_escaped_name():
+    objects = _by_name(parse_tmdl_content(SALES_TMDL, 'Sales'))
+
+    counted = objects[(MEASURE, "Customer's Count")]
+    assert counted['expression'] == 'DISTINCTCOUNT(Sales[CustomerKey])'
+    assert counted['format'] == ''
+
+
+def test_calculated_columns_are_extracted_like_measures():
+    objects = parse_tmdl_content(SALES_TMDL, 'Sales')
+    columns = {obj['name']: obj['expression'] for obj in objects if obj['object_type'] == CALCULATED_COLUMN}
+
+    # La columna de datos y la partición M no son objetos DAX
+    assert columns == {
+        'Amount x2': 'Sales[Amount] * 2',
+        'Band': 'IF(\nSales[Amount] > 100,\n"High",\n"Low"\n)',
+    }
+    assert [obj['object_type'] for obj in objects].count(CALCULATED_TABLE) == 0
+    # Primero las medidas, en el orden del archivo
+    assert [obj['name'] for obj in objects[:3]] == ['Total Sales', 'Margin', "Customer's Count"]
+
+
+def test_calculated_table_partition_source():
+    objects = parse_tmdl_content(DATES_TMDL, 'Dates')
+
+    assert objects == [{
+        'name': 'Dates',
+        'expression': 'CALENDAR(\nDATE(2020, 1, 1),\nDATE(2025, 12, 31)\n)',
+        'table': 'Dates',
+        'description': '',
+        'format': '',
+        'object_type': CALCULATED_TABLE
+    }]
+
+
+def _write_tables(folder, count):
+    for index in range(count):
+        (folder / f'T{index:02d}.tmdl').write_text(
+            f"table T{index:02d}\n\n\tmeasure 'M{index}' = SUM(T{index:02d}[v])\n\t\tformatString: 0\n",
+            encoding='utf-8'
+        )
+
+
+def test_parallel_tmdl_results_keep_sequential_order(tmp_path, monkeypatch):
+    _write_tables(tmp_path, 24)
+    sequential = parse_tmdl_files(str(tmp_path), max_workers=1)
+    sequential_metadata = load_tmdl_files(str(tmp_path), max_workers=1)
+
+    # Los primeros archivos terminan últimos
+    original = pbip_extractor.parse_single_tmdl_file
+    first_files = set(find_tmdl_files(str(tmp_path))[:4])
+
+    def slow_first(path):
+        if path in first_files:
+            time.sleep(0.05)
+        return original(path)
+
+    monkeypatch.setattr(pbip_extractor, 'parse_single_tmdl_file', slow_first)
+
+    assert parse_tmdl_files(str(tmp_path), max_workers=8) == sequential
+    assert len(sequential) == 24
+    assert load_tmdl_files(str(tmp_path), max_workers=8) == sequential_metadata
+
+
+def test_parallel_tmdl_reads_are_bounded(tmp_path):
+    _write_tables(tmp_path, 20)
+    files = find_tmdl_files(str(tmp_path))
+    lock = threading.Lock()
+    active = [0, 0]  # actuales, máximo
+
+    def tracked(path):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        return path
+
+    results = list(iter_tmdl_file_measures(files, max_workers=3, parse_file=tracked))
+
+    assert sorted(path for path, _ in results) == sorted(files)
+    assert all(path == result for path, result in results)
+    assert active[1] <= 3
@@ -0,0 +1,116 @@
+"""
+Tests de la ingesta del Performance Analyzer: tiempos por consulta, cruce con medidas y archivos inválidos
+"""
+
+import io
+import json
+
+import pytest
+
+from core.performance_trace import (
+    QueryTiming,
+    find_measure_references,
+    join_trace_to_measures,
+    load_performance_trace,
+    parse_performance_data
+)
+
+
+def _event(event_id, name, start, end, parent=None, **metrics):
+    event = {'id': event_id, 'name': name, 'start': f'2024-05-01T10:00:{start}Z', 'end': f'2024-05-01T10:00:{end}Z'}
+    if parent:
+        event['parentId'] = parent
+    if metrics:
+        event['metrics'] = metrics
+    return event
+
+
+SESSION = {
+    'version': '1.1.0',
+    'events': [
+        _event('v1', 'Visual Container Lifecycle', '00.000', '01.500', visualId='abc', visualTitle='Ventas'),
+        _event('q1', 'Query', '00.100', '01.000', 'v1',
+               QueryText="EVALUATE SUMMARIZECOLUMNS('Date'[Year], \"Total\", [Total Sales], \"M\", [Margin %])"),
+        _event('d1', 'Execute DAX Query', '00.200', '00.450', 'q1'),
+        _event('d2', 'Execute DAX Query', '00.500', '00.550', 'q1'),
+        _event('q2', 'Query', '01.000', '01.400', 'v1', QueryText='EVALUATE ROW("x", [Total Sales])'),
+        _event('d3', 'Execute DAX Query', '01.100', '01.200', 'q2'),
+        # Consulta sin Execute DAX Query ni visual: toma su propia duración
+        _event('q3', 'Query', '02.000', '02.080', QueryText='EVALUATE ROW("x", [Weird]]Name])'),
+        # Eventos incompletos o ajenos
+        _event('q4', 'Query', '03.000', '03.500', 'v1'),
+        {'name': 'Query', 'metrics': {'QueryText': 'EVALUATE {1}'}, 'start': 'ayer'},
+        'not an event',
+        _event('r1', 'Render', '00.000', '09.000', 'v1'),
+    ]
+}
+
+MEASURES = [
+    {'name': 'Total Sales', 'table': 'Sales', 'expression': 'SUM(Sales[Amount])'},
+    {'name': 'Margin %', 'table': 'Sales', 'expression': '1'},
+    {'name': 'Weird]Name', 'table': 'Sales', 'expression': '1'},
+    {'name': 'Year', 'table': 'Date', 'expression': 'YEAR([Date])', 'object_type': 'calculated-column'},
+]
+
+
+def test_queries_take_dax_time_and_visual_time_once():
+    trace = parse_performance_data(SESSION, source='session.json')
+
+    assert trace.source == 'session.json'
+    assert [query.query_text[:18] for query in trace.queries] == [
+        'EVALUATE SUMMARIZE', 'EVALUATE ROW("x", ', 'EVALUATE ROW("x", ', 'EVALUATE {1}'
+    ]
+    first, second, orphan, undated = trace.queries
+    assert first == QueryTiming(first.query_text, pytest.approx(300.0), 'abc', 'Ventas', pytest.approx(1500.0))
+    assert (second.dax_ms, second.visual_ms, second.visual_id) == (pytest.approx(100.0), 0.0, 'abc')
+    assert (orphan.dax_ms, orphan.visual_id, orphan.visual_title) == (pytest.approx(80.0), '', '')
+    assert undated.dax_ms == 0.0
+    assert trace.total_dax_ms == pytest.approx(480.0)
+
+
+def test_find_measure_references_is_case_insensitive_and_unescapes_brackets():
+    query = "EVALUATE ROW(\"a\", [total sales], \"b\", [TOTAL SALES], \"c\", 'Date'[Year], \"d\", [Weird]]Name])"
+
+    assert find_measure_references(query, ['total sales', 'weird]name']) == ['total sales', 'weird]name']
+
+
+def test_join_trace_to_measures_sums_every_referencing_query():
+    timings = join_trace_to_measures(parse_performance_data(SESSION), MEASURES)
+
+    assert set(timings) == {'total sales', 'margin %', 'weird]name'}
+    total = timings['total sales']
+    assert (total.name, total.table, total.query_count, total.visuals) == ('Total Sales', 'Sales', 2, ['Ventas'])
+    assert total.dax_ms == pytest.approx(400.0)
+    assert total.visual_ms == pytest.approx(1500.0)
+    assert timings['margin %'].dax_ms == pytest.approx(300.0)
+    assert timings['weird]name'].visuals == []
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_load_from_uploaded_file(binary):
+    content = json.dumps(SESSION)
+    source = io.BytesIO(content.encode('utf-8-sig')) if binary else io.StringIO(content)
+
+    trace = load_performance_trace(source)
+
+    assert len(trace) == 4
+    assert trace.source == 'PowerBIPerformanceData.json'
+
+
+def test_load_from_path(tmp_path):
+    path = tmp_path / 'PowerBIPerformanceData.json'
+    path.write_text(json.dumps(SESSION), encoding='utf-8-sig')
+
+    assert len(load_performance_trace(str(path))) == 4
+
+
+@pytest.mark.parametrize('content, message', [
+    (b'{"events": [', 'JSON'),
+    (b'\xff\xfe{', 'JSON'),
+    (b'[]', 'events'),
+    (b'{"events": {}}', 'events'),
+    (b'{"version": "1.1.0"}', 'events'),
+])
+def test_malformed_files_raise_value_error(content, message):
+    with pytest.raises(ValueError, match=message):
+        load_performance_trace(io.BytesIO(content))
@@ -0,0 +1,206 @@
+"""
+Tests de las reescrituras por relación: LOOKUPVALUE -> RELATED, FILTER -> RELATEDTABLE / TREATAS
+"""
+
+import pytest
+
+from core.analysis_runner import analyze_measures
+from core.dax_suggestions import recalculate_score
+from core.model_metadata import ModelMetadata, RelationshipInfo
+from core.relationship_graph import (
+    LOOKUPVALUE_RULE,
+    RELATEDTABLE_RULE,
+    TREATAS_RULE,
+    RelationshipGraph,
+    RelationshipRewriteCache,
+    apply_relationship_rewrites,
+    build_relationship_graph,
+    find_lookup_rewrites,
+    rewrite_expression
+)
+
+
+SALES_PRODUCT = RelationshipInfo('Sales', 'ProductKey', 'Product', 'ProductKey')
+GRAPH = build_relationship_graph([SALES_PRODUCT])
+INACTIVE_GRAPH = build_relationship_graph([
+    RelationshipInfo('Sales', 'ProductKey', 'Product', 'ProductKey', is_active=False)
+])
+
+LOOKUP = 'LOOKUPVALUE(Product[Color], Product[ProductKey], Sales[ProductKey])'
+FILTER_SALES = 'FILTER(Sales, Sales[ProductKey] = Product[ProductKey])'
+
+
+def _rewrite(code, graph=GRAPH, object_type='measure', table=None):
+    rewrites = find_lookup_rewrites(code, graph, object_type, table)
+    return rewrites, rewrite_expression(code, rewrites)
+
+
+def test_lookupvalue_over_active_many_to_one_relationship_becomes_related():
+    rewrites, rewritten = _rewrite(LOOKUP, object_type='calculated-column', table='Sales')
+
+    assert [rewrite.rule_id for rewrite in rewrites] == [LOOKUPVALUE_RULE]
+    assert rewritten == 'RELATED(Product[Color])'
+
+
+def test_lookupvalue_inside_iterator_over_source_table_becomes_related():
+    _, rewritten = _rewrite(f'SUMX(Sales, Sales[Qty] * {LOOKUP})')
+
+    assert rewritten == 'SUMX(Sales, Sales[Qty] * RELATED(Product[Color]))'
+
+
+@pytest.mark.parametrize('code, graph, object_type, table', [
+    # Relación inactiva: RELATED seguiría otra relación (o ninguna)
+    (LOOKUP, INACTIVE_GRAPH, 'calculated-column', 'Sales'),
+    # Sentido contrario: desde Product la relación lleva a muchas filas de Sales
+    ('LOOKUPVALUE(Sales[Amount], Sales[ProductKey], Product[ProductKey])', GRAPH, 'calculated-column', 'Product'),
+    # Sin contexto de fila sobre Sales
+    (LOOKUP, GRAPH, 'measure', None),
+    ('SUMX(Product, ' + LOOKUP + ')', GRAPH, 'measure', None),
+    # Otras columnas que las de la relación
+    ('LOOKUPVALUE(Product[Color], Product[Sku], Sales[Sku])', GRAPH, 'calculated-column', 'Sales'),
+])
+def test_lookupvalue_is_kept_without_usable_relationship(code, graph, object_type, table):
+    assert find_lookup_rewrites(code, graph, object_type, table) == []
+
+
+def test_filter_on_related_key_becomes_relatedtable():
+    code = f'COUNTROWS({FILTER_SALES})'
+    rewrites, rewritten = _rewrite(code, object_type='calculated-column', table='Product')
+
+    assert [rewrite.rule_id for rewrite in rewrites] == [RELATEDTABLE_RULE]
+    assert rewritten == 'COUNTROWS(RELATEDTABLE(Sales))'
+
+
+def test_filter_on_related_key_needs_row_context_and_active_relationship():
+    code = f'COUNTROWS({FILTER_SALES})'
+
+    assert find_lookup_rewrites(code, GRAPH) == []
+    assert find_lookup_rewrites(code, INACTIVE_GRAPH, 'calculated-column', 'Product') == []
+
+
+@pytest.mark.parametrize('code, expected', [
+    (f'SUMX(Product, CALCULATE(SUM(Sales[Amount]), {FILTER_SALES}))',
+     'SUMX(Product, CALCULATE(SUM(Sales[Amount]), KEEPFILTERS(TREATAS({Product[ProductKey]}, Sales[ProductKey]))))'),
+    # Un KEEPFILTERS existente se reemplaza completo
+    (f'SUMX(Product, CALCULATE(SUM(Sales[Amount]), KEEPFILTERS({FILTER_SALES})))',
+     'SUMX(Product, CALCULATE(SUM(Sales[Amount]), KEEPFILTERS(TREATAS({Product[ProductKey]}, Sales[ProductKey]))))'),
+    # Sin relación: TREATAS no la necesita
+    ('SUMX(Product, CALCULATE(SUM(Budget[Amount]), FILTER(Budget, Budget[ProductKey] = Product[ProductKey])))',
+     'SUMX(Product, CALCULATE(SUM(Budget[Amount]), KEEPFILTERS(TREATAS({Product[ProductKey]}, Budget[ProductKey]))))'),
+])
+def test_filter_key_equality_becomes_treatas(code, expected):
+    rewrites, rewritten = _rewrite(code)
+
+    assert [rewrite.rule_id for rewrite in rewrites] == [TREATAS_RULE]
+    assert rewritten == expected
+
+
+@pytest.mark.parametrize('code', [
+    # Un modificador que quita filtros cambia el resultado del filtro de tabla expandida
+    f'SUMX(Product, CALCULATE(SUM(Sales[Amount]), {FILTER_SALES}, ALL(Sales)))',
+    f'SUMX(Product, CALCULATE(SUM(Sales[Amount]), REMOVEFILTERS(Sales), {FILTER_SALES}))',
+    f'SUMX(Product, CALCULATE(SUM(Sales[Amount]), {FILTER_SALES}, ALLSELECTED()))',
+    # Sin contexto de fila sobre la tabla del valor
+    f'CALCULATE(SUM(Sales[Amount]), {FILTER_SALES}, ALL(Sales))',
+    f'CALCULATE(SUM(Sales[Amount]), {FILTER_SALES})',
+    'CALCULATE(SUM(Budget[Amount]), FILTER(Budget, Budget[ProductKey] = Product[ProductKey]))',
+])
+def test_filter_key_equality_is_reported_without_rewrite(code):
+    rewrites, rewritten = _rewrite(code)
+
+    assert [(rewrite.rule_id, rewrite.replacement) for rewrite in rewrites] == [(TREATAS_RULE, None)]
+    assert rewritten == code
+
+
+def test_several_rewrites_apply_without_overlapping():
+    code = (f'{LOOKUP} & "-" & LOOKUPVALUE(Product[Brand], Product[ProductKey], Sales[ProductKey])'
+            f' & CALCULATE(COUNTROWS(Sales), KEEPFILTERS({FILTER_SALES}))')
+    rewrites, rewritten = _rewrite(code, object_type='calculated-column', table='Sales')
+
+    assert [rewrite.rule_id for rewrite in rewrites] == [LOOKUPVALUE_RULE, LOOKUPVALUE_RULE, TREATAS_RULE]
+    assert all(previous.end <= current.start for previous, current in zip(rewrites, rewrites[1:]))
+    # El KEEPFILTERS y el FILTER que contiene se informan una sola vez
+    assert rewritten == ('RELATED(Product[Color]) & "-" & RELATED(Product[Brand])'
+                         f' & CALCULATE(COUNTROWS(Sales), KEEPFILTERS({FILTER_SALES}))')
+
+
+def _apply(expression, object_type='measure', table='Sales'):
+    analyzed, _ = analyze_measures([
+        {'name': 'M', 'table': table, 'expression': expression, 'object_type': object_type}
+    ], workers=0)
+    count = apply_relationship_rewrites(analyzed, ModelMetadata(relationships=[SALES_PRODUCT]))
+    return count, analyzed[0]
+
+
+def test_apply_replaces_lookupvalue_issue_and_recomputes_score():
+    count, analyzed = _apply(LOOKUP, 'calculated-column')
+
+    issue_ids = [issue.id for issue in analyzed['issues']]
+    suggestion, = [s for s in analyzed['suggestions'] if s.template_id == 'use-related']
+    assert count == 1
+    assert 'expensive-lookupvalue' not in issue_ids and LOOKUPVALUE_RULE in issue_ids
+    assert analyzed['base_score'] == recalculate_score(analyzed)
+    assert suggestion.is_rewrite and suggestion.suggested_code == 'RELATED(Product[Color])'
+
+
+def test_apply_without_equivalent_rewrite_shows_template_pattern():
+    code = f'CALCULATE(SUM(Sales[Amount]), {FILTER_SALES}, ALL(Sales))'
+    count, analyzed = _apply(code)
+
+    suggestion, = [s for s in analyzed['suggestions'] if s.template_id == 'use-treatas']
+    assert count == 1
+    assert TREATAS_RULE in [issue.id for issue in analyzed['issues']]
+    assert analyzed['base_score'] == recalculate_score(analyzed)
+    assert not suggestion.is_rewrite
+    assert suggestion.original_code == code
+    assert 'TREATAS' in suggestion.suggested_code and code not in suggestion.suggested_code
+
+
+def test_apply_leaves_expressions_without_rewrites_untouched():
+    count, analyzed = _apply(LOOKUP)
+
+    assert count == 0
+    assert [issue.id for issue in analyzed['issues']] == ['expensive-lookupvalue']
+
+
+def test_filter_key_equality_is_rewritten_without_relationships():
+    code = f'CALCULATE(SUM(Sales[Amount]), {FILTER_SALES})'
+
+    # Sin relaciones solo se buscan FILTER: TREATAS no necesita una relación
+    assert _rewrite(LOOKUP, RelationshipGraph(), 'calculated-column', 'Sales') == ([], LOOKUP)
+    rewrites, _ = _rewrite(code, RelationshipGraph())
+    assert [rewrite.rule_id for rewrite in rewrites] == [TREATAS_RULE]
+
+
+def test_rewrite_cache_reuses_expressions_until_relationships_change():
+    measures = [
+        {'name': 'Color', 'table': 'Sales', 'expression': LOOKUP, 'object_type': 'calculated-column'},
+        {'name': 'Rows', 'table': 'Sales', 'expression': 'COUNTROWS(Sales)'},
+        {'name': 'Copy', 'table': 'Sales', 'expression': LOOKUP, 'object_type': 'calculated-column'},
+    ]
+    metadata = ModelMetadata(relationships=[SALES_PRODUCT])
+    cache = RelationshipRewriteCache()
+
+    def cycle(metadata):
+        analyzed, _ = analyze_measures(measures, workers=0)
+        return apply_relationship_rewrites(analyzed, metadata, cache), analyzed
+
+    assert cycle(metadata)[0] == 2
+    assert (cache.misses, cache.hits, len(cache)) == (2, 1, 2)
+
+    count, analyzed = cycle(metadata)
+    assert count == 2 and (cache.misses, cache.hits) == (2, 4)
+    assert analyzed[0]['suggestions'][-1].suggested_code == 'RELATED(Product[Color])'
+
+    # Solo las expresiones del modelo actual quedan en la caché
+    measures[1] = dict(measures[1], expression='COUNTROWS(Product)')
+    cycle(metadata)
+    assert (cache.misses, len(cache)) == (3, 2)
+
+    # Relaciones distintas: se vuelve a buscar todo con el grafo nuevo
+    inactive = ModelMetadata(relationships=[
+        RelationshipInfo('Sales', 'ProductKey', 'Product', 'ProductKey', is_active=False)
+    ])
+    assert cycle(inactive)[0] == 0
+    assert cache.misses == 5
+    assert cycle(ModelMetadata(relationships=[SALES_PRODUCT]))[0] == 2
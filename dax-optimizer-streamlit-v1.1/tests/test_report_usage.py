@@ -0,0 +1,154 @@
+"""
+Tests del uso de medidas en el reporte: formatos PBIR y report.json, pesos de página y archivos inválidos
+"""
+
+import json
+
+import pytest
+
+from core.report_usage import (
+    HIDDEN_PAGE_WEIGHT,
+    LANDING_PAGE_WEIGHT,
+    PAGE_WEIGHT,
+    iter_measure_references,
+    load_report_usage,
+    parse_report_usage
+)
+
+
+def _measure(name, entity='Sales'):
+    return {'Measure': {'Expression': {'SourceRef': {'Entity': entity}}, 'Property': name}}
+
+
+def _visual(*fields, filters=()):
+    return {
+        'visual': {
+            'visualType': 'card',
+            'query': {'queryState': {'Values': {'projections': [{'field': field} for field in fields]}}},
+        },
+        'filterConfig': {'filters': [{'field': field} for field in filters]},
+    }
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(data if isinstance(data, str) else json.dumps(data), encoding='utf-8')
+
+
+@pytest.fixture
+def pbir_report(tmp_path):
+    pages = tmp_path / 'Model.Report' / 'definition' / 'pages'
+    _write(pages / 'pages.json', {'pageOrder': ['p2', 'p1', 'p3'], 'activePageName': 'p1'})
+    _write(pages / 'p1' / 'page.json', {'name': 'p1', 'displayName': 'Detalle'})
+    _write(pages / 'p2' / 'page.json', {'name': 'p2', 'displayName': 'Resumen'})
+    _write(pages / 'p3' / 'page.json', {'name': 'p3', 'displayName': 'Tooltip', 'visibility': 'HiddenInViewMode'})
+
+    _write(pages / 'p2' / 'visuals' / 'v1' / 'visual.json', _visual(_measure('Total Sales'), _measure('Margin')))
+    _write(pages / 'p2' / 'visuals' / 'v2' / 'visual.json',
+           _visual(_measure('Total Sales'), _measure('Total Sales'), filters=[_measure('Units')]))
+    _write(pages / 'p1' / 'visuals' / 'v3' / 'visual.json',
+           _visual({'Column': {'Property': 'Year'}}, _measure('total sales')))
+    _write(pages / 'p3' / 'visuals' / 'v4' / 'visual.json', _visual(_measure('Margin')))
+    # Grupo de visuales, archivo corrupto y JSON que no es un objeto: no cuentan
+    _write(pages / 'p1' / 'visuals' / 'group' / 'visual.json', {'name': 'group', 'visualGroup': {}})
+    _write(pages / 'p1' / 'visuals' / 'broken' / 'visual.json', '{"visual": ')
+    _write(pages / 'p1' / 'visuals' / 'list' / 'visual.json', '[]')
+    _write(tmp_path / 'Model.SemanticModel' / 'definition' / 'model.tmdl', 'model Model\n')
+    _write(tmp_path / 'Model.pbip', {'artifacts': [{'report': {'path': 'Model.Report'}}]})
+    return tmp_path
+
+
+def test_pbir_usage_by_measure_and_page(pbir_report):
+    usage = parse_report_usage(str(pbir_report / 'Model.Report'))
+
+    assert usage.pages == ['Detalle', 'Resumen', 'Tooltip']
+    assert usage.visual_count == 4
+    assert set(usage.measures) == {'total sales', 'margin', 'units'}
+
+    total = usage.usage('TOTAL SALES')
+    assert (total.visual_count, total.pages, total.on_landing_page) == (3, ['Detalle', 'Resumen'], True)
+    assert total.exposure == 2 * LANDING_PAGE_WEIGHT + PAGE_WEIGHT
+
+    margin = usage.usage('Margin')
+    assert (margin.visual_count, margin.pages) == (2, ['Resumen', 'Tooltip'])
+    assert margin.exposure == LANDING_PAGE_WEIGHT + HIDDEN_PAGE_WEIGHT
+
+    # Las medidas de los filtros del visual también cuentan
+    assert usage.usage('Units').visual_count == 1
+
+
+@pytest.mark.parametrize('relative', ['Model.pbip', '.', 'Model.SemanticModel'])
+def test_load_report_usage_finds_the_report(pbir_report, relative):
+    usage = load_report_usage(str(pbir_report / relative))
+
+    assert usage is not None
+    assert usage.visual_count == 4
+
+
+def test_project_without_report(tmp_path):
+    (tmp_path / 'Model.SemanticModel').mkdir()
+
+    assert load_report_usage(str(tmp_path / 'Model.SemanticModel')) is None
+    assert len(parse_report_usage(str(tmp_path))) == 0
+
+
+@pytest.mark.parametrize('pages_index', ['{"pageOrder": [', '[]', None])
+def test_pbir_without_usable_pages_json_takes_first_page_as_landing(pbir_report, pages_index):
+    pages_json = pbir_report / 'Model.Report' / 'definition' / 'pages' / 'pages.json'
+    if pages_index is None:
+        pages_json.unlink()
+    else:
+        pages_json.write_text(pages_index, encoding='utf-8')
+    _write(pbir_report / 'Model.Report' / 'definition' / 'pages' / 'p2' / 'page.json', '"p2"')
+
+    usage = parse_report_usage(str(pbir_report / 'Model.Report'))
+
+    assert usage.pages == ['Detalle', 'p2', 'Tooltip']
+    assert usage.usage('Total Sales').exposure == LANDING_PAGE_WEIGHT + 2 * PAGE_WEIGHT
+
+
+def test_legacy_report_json(tmp_path):
+    def container(*measures):
+        config = {'singleVisual': {'prototypeQuery': {'Select': [_measure(name) for name in measures]}}}
+        return {'config': json.dumps(config), 'filters': '[]'}
+
+    report = {
+        'sections': [
+            {'name': 's2', 'displayName': 'Detalle', 'ordinal': 1, 'visualContainers': [container('Margin')]},
+            {'name': 's1', 'displayName': 'Resumen', 'ordinal': 0,
+             'visualContainers': [container('Total Sales', 'Margin'), 'not a visual', {'config': '{broken'}]},
+            {'name': 's3', 'ordinal': 2, 'config': json.dumps({'visibility': 1}),
+             'visualContainers': [container('Margin')]},
+            {'name': 's4', 'ordinal': 3, 'config': '{broken', 'visualContainers': []},
+        ]
+    }
+    _write(tmp_path / 'report.json', report)
+
+    usage = parse_report_usage(str(tmp_path))
+
+    assert usage.pages == ['Detalle', 'Resumen', 's3', 's4']
+    assert usage.visual_count == 4
+    margin = usage.usage('Margin')
+    assert (margin.visual_count, margin.on_landing_page) == (3, True)
+    assert margin.exposure == PAGE_WEIGHT + LANDING_PAGE_WEIGHT + HIDDEN_PAGE_WEIGHT
+    assert usage.usage('Total Sales').pages == ['Resumen']
+
+
+@pytest.mark.parametrize('content', ['{"sections": ', '[]', '{"sections": {"a": 1}}'])
+def test_malformed_legacy_report_is_empty(tmp_path, content):
+    _write(tmp_path / 'report.json', content)
+
+    usage = parse_report_usage(str(tmp_path))
+
+    assert (len(usage), usage.visual_count) == (0, 0)
+
+
+def test_iter_measure_references_reads_embedded_json_and_repeats():
+    node = {
+        'config': json.dumps({'a': [_measure('A'), {'Measure': {'Property': 7}}]}),
+        'query': '{not json',
+        'other': json.dumps(_measure('Ignored')),
+        'filters': [_measure('B'), _measure('A')],
+    }
+
+    assert sorted(iter_measure_references(node)) == ['A', 'A', 'B']
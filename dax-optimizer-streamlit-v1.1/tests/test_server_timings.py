@@ -0,0 +1,138 @@
+"""
+Tests del importador de server timings: lectura en streaming, .daxx, cruce con medidas y archivos inválidos
+"""
+
+import io
+import json
+import zipfile
+
+import pytest
+
+from core.server_timings import (
+    ServerTiming,
+    join_server_timings_to_measures,
+    load_server_timings,
+    parse_server_timings,
+    read_server_timings
+)
+
+
+EVENTS = [
+    {'Class': 'VertiPaqSEQueryEnd', 'Subclass': 'VertiPaqScan', 'Duration': 40, 'CpuTime': 120,
+     'Query': 'SELECT Sales[Amount] FROM Sales'},
+    {'Class': 'VertiPaqSEQueryEnd', 'Subclass': 'VertiPaqScan', 'Duration': 25.5, 'CpuTime': 30,
+     'Query': "SELECT [CallbackDataID(Sales[Amount] * 2)] FROM Sales"},
+    {'Class': 'VertiPaqSEQueryCacheMatch', 'Subclass': 'VertiPaqCacheExactMatch'},
+    {'Class': 'VertiPaqSEQueryEnd', 'Subclass': 'VertiPaqScanInternal', 'Duration': 99, 'IsInternalEvent': True},
+    {'Subclass': 'VertiPaqScan', 'Duration': 'n/a', 'TextData': 'SELECT 1'},
+    'not an event',
+]
+
+QUERY = 'EVALUATE ROW("a", [Total Sales], "b", [Margin])'
+
+
+def _timings_json(**totals):
+    return json.dumps({**totals, 'StorageEngineEvents': EVENTS})
+
+
+class _TrickleIO(io.StringIO):
+    """Entrega de a pocos caracteres: corta números, textos y claves entre lecturas"""
+
+    def read(self, size=-1):
+        return super().read(3)
+
+
+def test_totals_from_the_file_take_precedence():
+    content = _timings_json(QueryText=QUERY, TotalDuration=200, StorageEngineDuration=80, FormulaEngineDuration=120,
+                            StorageEngineCpu=500, StorageEngineQueryCount=7, VertipaqCacheMatches=2)
+
+    timing = parse_server_timings(io.StringIO(content), source='q.json')
+
+    assert timing == ServerTiming(QUERY, 200.0, 80.0, 120.0, 500.0, 7, 2, 1, 'q.json')
+    assert timing.fe_ratio == 0.6
+    assert timing.is_fe_bound
+
+
+def test_missing_totals_are_computed_from_the_events():
+    timing = parse_server_timings(io.StringIO(_timings_json(TotalDuration=100)), query_text=QUERY)
+
+    assert timing.query_text == QUERY
+    assert (timing.se_ms, timing.fe_ms, timing.se_cpu_ms) == (65.5, 34.5, 150.0)
+    assert (timing.se_queries, timing.se_cache_hits, timing.callbacks) == (3, 1, 1)
+    assert not timing.is_fe_bound
+
+
+def test_streaming_reader_handles_values_cut_between_reads():
+    content = _timings_json(TotalDuration=123456.75, Query=QUERY, Extra={'nested': [1, 2, {'x': 'y'}]})
+
+    assert parse_server_timings(_TrickleIO(content)) == parse_server_timings(io.StringIO(content))
+    assert parse_server_timings(_TrickleIO(content)).total_ms == 123456.75
+
+
+def test_daxx_reads_timings_and_query_file(tmp_path):
+    path = tmp_path / 'query.daxx'
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('Query.dax', QUERY.encode('utf-8-sig'))
+        archive.writestr('ServerTimings.json', _timings_json(TotalDuration=100))
+
+    timing, = load_server_timings(str(path))
+
+    assert (timing.query_text, timing.source) == (QUERY, str(path))
+
+
+def test_folder_loads_every_json_and_daxx_in_name_order(tmp_path):
+    (tmp_path / 'b.json').write_text(_timings_json(QueryText='EVALUATE [Margin]', TotalDuration=10), encoding='utf-8')
+    (tmp_path / 'a.JSON').write_text(_timings_json(QueryText=QUERY, TotalDuration=20), encoding='utf-8')
+    (tmp_path / 'notes.txt').write_text('x', encoding='utf-8')
+
+    timings = load_server_timings(str(tmp_path))
+
+    assert [timing.total_ms for timing in timings] == [20.0, 10.0]
+
+
+def test_join_sums_timings_per_referenced_measure():
+    timings = [
+        ServerTiming(QUERY, 100, 40, 60, se_queries=2, callbacks=1, source='a.json'),
+        ServerTiming('EVALUATE ROW("m", [margin])', 50, 10, 40, se_queries=1, source='b.json'),
+    ]
+    measures = [
+        {'name': 'Total Sales', 'table': 'Sales'},
+        {'name': 'Margin', 'table': 'Sales'},
+        {'name': 'Unused', 'table': 'Sales'},
+    ]
+
+    joined = join_server_timings_to_measures(timings, measures)
+
+    assert set(joined) == {'total sales', 'margin'}
+    margin = joined['margin']
+    assert (margin.total_ms, margin.se_ms, margin.fe_ms, margin.se_queries, margin.callbacks) == (150, 50, 100, 3, 1)
+    assert (margin.query_count, margin.sources) == (2, ['a.json', 'b.json'])
+    assert margin.is_fe_bound
+
+
+@pytest.mark.parametrize('content, message', [
+    ('{"TotalDuration": 10, "StorageEngineEvents": [', 'JSON'),
+    ('{"TotalDuration": 10, "StorageEngineEvents": [{"Duration": }]}', 'JSON'),
+    ('{"TotalDuration": 10 "x": 1}', 'JSON'),
+    ('[]', 'JSON'),
+    ('', 'JSON'),
+    ('{"QueryText": "EVALUATE {1}"}', 'server timings'),
+    ('{}', 'server timings'),
+])
+def test_malformed_json_raises_value_error(content, message):
+    with pytest.raises(ValueError, match=message):
+        read_server_timings(io.BytesIO(content.encode('utf-8')), 'q.json')
+
+
+def test_malformed_encoding_and_daxx_raise_value_error():
+    with pytest.raises(ValueError, match='JSON'):
+        read_server_timings(io.BytesIO(b'{"TotalDuration": "\xff\xfe"}'), 'q.json')
+    with pytest.raises(ValueError, match='daxx'):
+        read_server_timings(io.BytesIO(b'not a zip'), 'q.daxx')
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('Query.dax', QUERY)
+    buffer.seek(0)
+    with pytest.raises(ValueError, match='ServerTimings.json'):
+        read_server_timings(buffer, 'q.daxx')
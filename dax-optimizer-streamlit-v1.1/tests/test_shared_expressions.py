@@ -0,0 +1,252 @@
+"""
+Tests de SubtreeIndex (hash-consing) y de las subexpresiones compartidas entre medidas
+"""
+
+from core.analysis_runner import analyze_measures
+from core.dax_ast import SubtreeIndex, format_inline, parse_dax_ast
+from core.dax_suggestions import recalculate_score
+from core.shared_expressions import (
+    SHARED_EXPRESSION_RULE,
+    SharedExpressionCache,
+    apply_shared_expressions,
+    find_shared_expressions
+)
+
+
+def _analyze(expressions):
+    measures = [{'name': name, 'table': 'Ventas', 'expression': expression}
+                for name, expression in expressions.items()]
+    analyzed, failed = analyze_measures(measures, workers=0)
+    assert failed == []
+    return analyzed
+
+
+def _shared_issues(analyzed):
+    return [issue for issue in analyzed['issues'] if issue.id == SHARED_EXPRESSION_RULE]
+
+
+# SubtreeIndex
+
+def test_same_structure_gets_same_id_regardless_of_format_and_case():
+    index = SubtreeIndex()
+    first = index.add(parse_dax_ast("SUM(Ventas[Monto]) + 1"))
+    second = index.add(parse_dax_ast("sum( ventas[MONTO] )\n    +   1"))
+    assert first == second
+
+
+def test_different_literals_get_different_ids():
+    index = SubtreeIndex()
+    assert index.add(parse_dax_ast('Ventas[Pais] = "AR"')) != index.add(parse_dax_ast('Ventas[Pais] = "UY"'))
+    assert index.add(parse_dax_ast("SUM(Ventas[Monto]) * 2")) != index.add(parse_dax_ast("SUM(Ventas[Monto]) * 3"))
+
+
+def test_subtrees_are_numbered_once():
+    index = SubtreeIndex()
+    root = parse_dax_ast("DIVIDE(SUM(Ventas[Monto]), SUM(Ventas[Monto]))")
+    root_id = index.add(root)
+    # DIVIDE, SUM y la columna: las dos SUM comparten id
+    assert len(index) == 3
+    assert index.sizes[root_id] == 5
+    assert index.add(root) == root_id
+    assert len(index) == 3
+
+    # Solo se numeran los nodos nuevos
+    index.add(parse_dax_ast("SUM(Ventas[Monto]) + SUM(Ventas[Costo])"))
+    assert len(index) == 6
+
+
+# Maximalidad
+
+def test_inner_expression_shared_by_same_measures_is_not_reported():
+    analyzed = _analyze({
+        'Margen Doble': "(SUM(Ventas[Monto]) - SUM(Ventas[Costo])) * 2",
+        'Margen Pct': "DIVIDE(SUM(Ventas[Monto]) - SUM(Ventas[Costo]), 100)",
+    })
+    expressions, _ = find_shared_expressions(analyzed)
+    assert [format_inline(shared.expression) for shared in expressions] == ["SUM(Ventas[Monto]) - SUM(Ventas[Costo])"]
+    assert expressions[0].measures == (0, 1)
+    assert expressions[0].base is None
+
+
+def test_inner_expression_shared_by_more_measures_is_reported():
+    analyzed = _analyze({
+        'Precio Doble': "(DIVIDE(SUM(Ventas[Monto]), SUM(Ventas[Cantidad])) - 1) * 2",
+        'Precio Pct': "DIVIDE(DIVIDE(SUM(Ventas[Monto]), SUM(Ventas[Cantidad])) - 1, 100)",
+        'Precio Triple': "DIVIDE(SUM(Ventas[Monto]), SUM(Ventas[Cantidad])) * 3",
+    })
+    expressions, _ = find_shared_expressions(analyzed)
+    assert [(format_inline(shared.expression), shared.measures) for shared in expressions] == [
+        ("DIVIDE(SUM(Ventas[Monto]), SUM(Ventas[Cantidad])) - 1", (0, 1)),
+        ("DIVIDE(SUM(Ventas[Monto]), SUM(Ventas[Cantidad]))", (0, 1, 2)),
+    ]
+
+
+def test_simple_aggregation_over_a_column_is_not_reported():
+    analyzed = _analyze({
+        'Monto Doble': "SUM(Ventas[Monto]) * 2",
+        'Monto Medio': "DIVIDE(SUM(Ventas[Monto]), COUNTROWS(Ventas))",
+        'Filas': "COUNTROWS(Ventas) + 1",
+    })
+    expressions, _ = find_shared_expressions(analyzed)
+    assert expressions == []
+    assert apply_shared_expressions(analyzed) == 0
+
+
+def test_expression_using_variables_is_not_shared():
+    analyzed = _analyze({
+        'A': 'VAR x = 1 RETURN CALCULATE(SUM(Ventas[Monto]), Ventas[Pais] = "AR") * x + 1',
+        'B': 'VAR x = 2 RETURN CALCULATE(SUM(Ventas[Monto]), Ventas[Pais] = "AR") * x + 1',
+    })
+    expressions, _ = find_shared_expressions(analyzed)
+    assert [format_inline(shared.expression) for shared in expressions] == [
+        'CALCULATE(SUM(Ventas[Monto]), Ventas[Pais] = "AR")'
+    ]
+
+
+# Medida base
+
+def test_existing_measure_is_the_base_and_gets_no_issue():
+    analyzed = _analyze({
+        'Margen': "SUM(Ventas[Monto]) - SUM(Ventas[Costo])",
+        'Margen Doble': "(SUM(Ventas[Monto]) - SUM(Ventas[Costo])) * 2",
+        'Margen Triple': "3 * (sum(ventas[Monto]) - SUM(Ventas[Costo]))",
+    })
+    assert apply_shared_expressions(analyzed) == 2
+
+    assert _shared_issues(analyzed[0]) == []
+    for measure, other in ((analyzed[1], '[Margen], [Margen Triple]'), (analyzed[2], '[Margen], [Margen Doble]')):
+        issue, = _shared_issues(measure)
+        assert dict(issue.params)['base'] == 'Margen'
+        assert dict(issue.params)['measures'] == other
+    assert analyzed[1]['suggestions'][-1].suggested_code == "[Margen] * 2"
+    assert analyzed[2]['suggestions'][-1].suggested_code == "3 * [Margen]"
+
+
+def test_new_base_measure_is_proposed_with_its_definition():
+    analyzed = _analyze({
+        'Monto Medio': 'DIVIDE(CALCULATE(SUM(Ventas[Monto]), Ventas[Pais] = "AR"), 2)',
+        'Monto Triple': 'Monto Triple = CALCULATE(SUM(Ventas[Monto]), Ventas[Pais] = "AR") * 3',
+        'Calculate Monto': "COUNTROWS(Ventas)",
+    })
+    assert apply_shared_expressions(analyzed) == 2
+
+    # 'Calculate Monto' ya existe: el nombre propuesto lleva un número
+    assert dict(_shared_issues(analyzed[0])[0].params)['base'] == 'Calculate Monto 2'
+    assert analyzed[0]['suggestions'][-1].suggested_code == (
+        'Calculate Monto 2 = CALCULATE(SUM(Ventas[Monto]), Ventas[Pais] = "AR")\n\n'
+        'DIVIDE([Calculate Monto 2], 2)')
+    assert analyzed[1]['suggestions'][-1].suggested_code == (
+        'Calculate Monto 2 = CALCULATE(SUM(Ventas[Monto]), Ventas[Pais] = "AR")\n\n'
+        'Monto Triple = [Calculate Monto 2] * 3')
+    assert _shared_issues(analyzed[2]) == []
+
+
+def test_score_is_recalculated_from_all_issues():
+    analyzed = _analyze({
+        'A': "DIVIDE(SUM(Ventas[Monto]) - SUM(Ventas[Costo]), 2)",
+        'B': "(SUM(Ventas[Monto]) - SUM(Ventas[Costo])) * 3",
+    })
+    before = [measure['base_score'] for measure in analyzed]
+    apply_shared_expressions(analyzed)
+    for measure, score in zip(analyzed, before):
+        assert measure['base_score'] == recalculate_score(measure) < score
+
+
+def test_measures_with_same_expression_do_not_share_issue_lists():
+    analyzed = _analyze({
+        'A': "SUM(Ventas[Monto]) * 3",
+        'B': "SUM(Ventas[Monto]) * 3",
+        'C': "SUM(Ventas[Monto]) * 3",
+    })
+    assert analyzed[0]['issues'] is analyzed[1]['issues']
+    apply_shared_expressions(analyzed)
+    # A es la medida base: B y C la usan y A no recibe el issue
+    assert [len(_shared_issues(measure)) for measure in analyzed] == [0, 1, 1]
+    assert analyzed[1]['suggestions'][-1].suggested_code == "[A]"
+
+
+# Caché entre ciclos del modo watch
+
+MARGIN = "SUM(Ventas[Monto]) - SUM(Ventas[Costo])"
+
+
+def _summary(analyzed):
+    return [([issue.params for issue in _shared_issues(measure)],
+             [suggestion.suggested_code for suggestion in measure['suggestions']], measure['base_score'])
+            for measure in analyzed]
+
+
+def _cycle(analyzed, cache):
+    """Aplica con y sin caché sobre copias de las medidas (deben coincidir) y devuelve la de la caché"""
+    fresh = [dict(measure) for measure in analyzed]
+    cached = [dict(measure) for measure in analyzed]
+    assert apply_shared_expressions(cached, cache) == apply_shared_expressions(fresh)
+    assert _summary(cached) == _summary(fresh)
+    return cached
+
+
+def _with_issue(analyzed):
+    return [measure['name'] for measure in analyzed if _shared_issues(measure)]
+
+
+def test_cache_parses_only_changed_expressions():
+    analyzed = _analyze({
+        'A': f"({MARGIN}) * 2",
+        'B': f"DIVIDE({MARGIN}, 100)",
+        'C': f"({MARGIN}) * 2",
+        'D': 'CALCULATE(SUM(Ventas[Monto]), Ventas[Pais] = "AR") + 1',
+    })
+    cache = SharedExpressionCache()
+
+    # C usa a A como medida base; A y B comparten la resta
+    assert sorted(_with_issue(_cycle(analyzed, cache))) == ['A', 'B', 'C']
+    assert cache.parsed == 3 and len(cache) == 3
+
+    # Sin cambios: no se parsea nada
+    assert sorted(_with_issue(_cycle(analyzed, cache))) == ['A', 'B', 'C']
+    assert cache.parsed == 3
+
+    # Una medida cambia y otra aparece: solo se parsean sus expresiones y los conteos siguen a la diferencia
+    analyzed = [measure for measure in analyzed if measure['name'] != 'D']
+    analyzed += _analyze({'D': 'CALCULATE(SUM(Ventas[Monto]), Ventas[Pais] = "AR") * 2',
+                          'E': 'CALCULATE(SUM(Ventas[Monto]), Ventas[Pais] = "AR") - 1'})
+    assert sorted(_with_issue(_cycle(analyzed, cache))) == ['A', 'B', 'C', 'D', 'E']
+    assert cache.parsed == 5 and len(cache) == 4
+
+    # Borrar una de las medidas duplicadas no parsea nada
+    analyzed = [measure for measure in analyzed if measure['name'] != 'C']
+    assert sorted(_with_issue(_cycle(analyzed, cache))) == ['A', 'B', 'D', 'E']
+    assert cache.parsed == 5 and len(cache) == 4
+
+
+def test_cache_tracks_variables_and_renames():
+    analyzed = _analyze({
+        'A': "VAR x = 1 RETURN SUM(Ventas[Monto]) * x + 1",
+        'B': "SUM(Ventas[Monto]) * x + 1",
+    })
+    cache = SharedExpressionCache()
+    # x es una variable en A: la subexpresión no se puede extraer de ninguna de las dos
+    assert _with_issue(_cycle(analyzed, cache)) == []
+
+    analyzed = [dict(analyzed[0], expression="SUM(Ventas[Monto]) * x + 1"), analyzed[1]]
+    assert _with_issue(_cycle(analyzed, cache)) == ['B']
+
+    # Un cambio de nombre cambia la medida base de la descripción sin volver a parsear
+    analyzed[0] = dict(analyzed[0], name='Base')
+    assert dict(_shared_issues(_cycle(analyzed, cache)[1])[0].params)['base'] == 'Base'
+    # La expresión nueva de A ya estaba en la caché (es la de B)
+    assert cache.parsed == 2
+
+
+def test_cache_is_emptied_when_most_expressions_were_discarded():
+    cache = SharedExpressionCache()
+    _cycle(_analyze({'A': f"({MARGIN}) * 2", 'B': f"({MARGIN}) * 3"}), cache)
+    first_index = cache.index
+
+    for operator in '/-':
+        _cycle(_analyze({'A': f"({MARGIN}) {operator} 2", 'B': f"({MARGIN}) {operator} 3"}), cache)
+        assert cache.index is first_index and len(cache) == 2
+
+    # Las descartadas (4) superan a las vigentes (2): se libera el índice
+    assert _with_issue(_cycle(_analyze({'A': f"({MARGIN}) ^ 2", 'B': f"({MARGIN}) ^ 3"}), cache)) == ['A', 'B']
+    assert cache.index is not first_index and len(cache) == 2 and cache.parsed == 2
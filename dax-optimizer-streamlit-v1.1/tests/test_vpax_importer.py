@@ -0,0 +1,90 @@
+"""
+Tests del importador .vpax: lectura del ZIP, nombres de campo alternativos y archivos inválidos
+"""
+
+import io
+import json
+import zipfile
+
+import pytest
+
+from core.vpax_importer import ColumnStatistics, TableStatistics, load_vpax, parse_vpa_view
+
+
+VPA_VIEW = {
+    'Tables': [
+        {'TableName': 'Sales', 'RowsCount': 1_200_000, 'TableSize': 5000},
+        {'TableName': 'Product', 'RowCount': '350', 'TotalSize': 80},
+        {'TableName': 'Broken', 'RowsCount': 'n/a'},
+        {'RowsCount': 10},
+        'not a record',
+    ],
+    'Columns': [
+        {'TableName': 'Sales', 'ColumnName': 'Amount', 'ColumnCardinality': 90_000, 'TotalSize': 400},
+        {'TableName': 'Sales', 'Name': 'CustomerKey', 'Cardinality': 20_000, 'DataSize': 64},
+        {'TableName': 'Sales', 'ColumnName': 'RowNumber-2662979B', 'IsRowNumber': True, 'ColumnCardinality': 1},
+        {'TableName': 'Product', 'ColumnName': 'Color', 'ColumnCardinality': -3},
+        {'ColumnName': 'Orphan', 'ColumnCardinality': 5},
+    ],
+}
+
+
+def _vpax(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    buffer.name = 'Model.vpax'
+    return buffer
+
+
+def test_parse_vpa_view_builds_case_insensitive_lookup():
+    statistics = parse_vpa_view(VPA_VIEW, source='Model.vpax')
+
+    assert len(statistics) == 3
+    assert statistics.table('SALES') == TableStatistics('Sales', 1_200_000, 5000)
+    assert statistics.table_rows('product') == 350
+    assert statistics.table_rows('Broken') == 0
+    assert statistics.table_rows('Missing') is None
+    assert statistics.max_rows == 1_200_000
+
+    assert statistics.column('sales', 'amount') == ColumnStatistics('Sales', 'Amount', 90_000, 400)
+    assert statistics.column_cardinality('Sales', 'CustomerKey') == 20_000
+    assert statistics.column_cardinality('Product', 'Color') == 0
+    # La columna interna RowNumber y las filas sin tabla no se cargan
+    assert set(statistics.columns) == {'sales[amount]', 'sales[customerkey]', 'product[color]'}
+
+
+def test_load_vpax_reads_the_view_from_the_zip():
+    content = json.dumps(VPA_VIEW).encode('utf-8-sig')
+    source = _vpax({'DaxModel.json': '{}', 'DaxVpaView.json': content})
+
+    statistics = load_vpax(source)
+
+    assert statistics.source == 'Model.vpax'
+    assert statistics.table_rows('Sales') == 1_200_000
+
+
+def test_load_vpax_from_path_and_nested_member(tmp_path):
+    path = tmp_path / 'Model.vpax'
+    path.write_bytes(_vpax({'folder\\daxvpaview.json': json.dumps({'tables': [{'Name': 'T', 'Rows': 7}]})}).read())
+
+    statistics = load_vpax(str(path))
+
+    assert statistics.source == str(path)
+    assert statistics.table_rows('t') == 7
+    assert statistics.columns == {}
+
+
+@pytest.mark.parametrize('source, message', [
+    (io.BytesIO(b'not a zip'), 'ZIP'),
+    (_vpax({'DaxModel.json': '{}'}), 'DaxVpaView.json'),
+    (_vpax({'DaxVpaView.json': '{"Tables": ['}), 'JSON'),
+    (_vpax({'DaxVpaView.json': b'\xff\xfe\x00'}), 'JSON'),
+    (_vpax({'DaxVpaView.json': '{"Columns": []}'}), 'Tables'),
+    (_vpax({'DaxVpaView.json': '[]'}), 'Tables'),
+])
+def test_invalid_files_raise_value_error(source, message):
+    with pytest.raises(ValueError, match=message):
+        load_vpax(source)